@@ -0,0 +1,459 @@
+"""
+排球分析系統 - 分析結果彙總
+在分析結束時一次性計算球員/回合統計和熱區圖立方體，避免前端重複計算
+"""
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# pandas 只在 build_summary 中使用，延遲導入以加快後端啟動（後端讀取已保存的彙總時不需要它）
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _to_python(value):
+    """將 numpy/pandas 標量轉換為 JSON 可序列化的 Python 類型（NaN -> None）"""
+    if value is None:
+        return None
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+def _tracks_dataframe(players_tracking: List[Dict]) -> "pd.DataFrame":
+    """將 players_tracking 展平成每行一個 (frame, track) 的表格"""
+    import pandas as pd
+
+    frames: List[int] = []
+    track_ids: List[int] = []
+    stable_ids: List[int] = []
+    jerseys: List[Optional[float]] = []
+
+    for entry in players_tracking:
+        frame = entry.get("frame", 0)
+        for p in entry.get("players", []):
+            track_id = p.get("id")
+            if track_id is None:
+                continue
+            frames.append(frame)
+            track_ids.append(track_id)
+            stable_ids.append(p.get("stable_id", track_id))
+            jersey = p.get("jersey_number")
+            jerseys.append(float(jersey) if jersey is not None else np.nan)
+
+    return pd.DataFrame({
+        "frame": np.asarray(frames, dtype=np.int64),
+        "track_id": np.asarray(track_ids, dtype=np.int64),
+        "stable_id": np.asarray(stable_ids, dtype=np.int64),
+        "jersey_number": np.asarray(jerseys, dtype=np.float64),
+    })
+
+
+def _actions_dataframe(actions: List[Dict]) -> "pd.DataFrame":
+    """將合併後的動作列表轉換為表格"""
+    import pandas as pd
+
+    return pd.DataFrame({
+        "frame": np.asarray([a.get("frame", 0) for a in actions], dtype=np.int64),
+        "action": [a.get("action", "unknown") for a in actions],
+        "confidence": np.asarray([a.get("confidence", 0.0) for a in actions], dtype=np.float64),
+        "duration": np.asarray([a.get("duration") or 0.0 for a in actions], dtype=np.float64),
+        "track_id": np.asarray(
+            [a["player_id"] if a.get("player_id") is not None else np.nan for a in actions],
+            dtype=np.float64
+        ),
+    })
+
+
+def _track_to_player(tracks: "pd.DataFrame") -> "pd.Series":
+    """
+    計算 track_id -> player_id 映射
+
+    有球衣號碼投票的追蹤使用最常見的球衣號碼，否則使用最常見的 stable_id
+    （與前端 PlayerStats 的映射規則一致）
+    """
+    import pandas as pd
+
+    if tracks.empty:
+        return pd.Series(dtype=np.int64)
+
+    # 每個 track 最常見的 stable_id
+    stable_mode = (
+        tracks.groupby(["track_id", "stable_id"]).size()
+        .reset_index(name="n")
+        .sort_values(["track_id", "n"], ascending=[True, False])
+        .drop_duplicates("track_id")
+        .set_index("track_id")["stable_id"]
+    )
+
+    # 每個 track 最常見的球衣號碼（只統計 OCR 真正檢測到的幀）
+    with_jersey = tracks.dropna(subset=["jersey_number"])
+    if with_jersey.empty:
+        return stable_mode.astype(np.int64)
+
+    jersey_mode = (
+        with_jersey.groupby(["track_id", "jersey_number"]).size()
+        .reset_index(name="n")
+        .sort_values(["track_id", "n"], ascending=[True, False])
+        .drop_duplicates("track_id")
+        .set_index("track_id")["jersey_number"]
+    )
+
+    mapping = stable_mode.copy()
+    mapping.loc[jersey_mode.index] = jersey_mode.astype(np.int64)
+    return mapping.astype(np.int64)
+
+
+def build_summary(results: Dict) -> Dict:
+    """
+    計算分析結果的彙總統計
+
+    包括：
+    1. 每位球員（stable_id / 球衣號碼）的動作統計和在場幀數
+    2. 每個回合的動作列表
+    3. 每種動作的置信度統計
+    4. 未分配球員的動作數量
+
+    Args:
+        results: analyze_video 產生的結果字典
+
+    Returns:
+        可直接 JSON 序列化的彙總字典
+    """
+    import pandas as pd
+
+    tracks = _tracks_dataframe(results.get("players_tracking", []))
+    actions = _actions_dataframe(results.get("action_recognition", {}).get("actions", []))
+    plays = results.get("plays", [])
+
+    track_to_player = _track_to_player(tracks)
+
+    # ----- 球員在場統計 -----
+    players: Dict[int, Dict] = {}
+    if not tracks.empty:
+        tracks["player_id"] = tracks["track_id"].map(track_to_player)
+        grouped = tracks.groupby("player_id")
+        on_screen = grouped["frame"].agg(["nunique", "min", "max"])
+        track_lists = grouped["track_id"].unique()
+        jersey_ids = set(
+            tracks.dropna(subset=["jersey_number"])["track_id"].map(track_to_player).unique().tolist()
+        )
+
+        for player_id, row in on_screen.iterrows():
+            players[int(player_id)] = {
+                "player_id": int(player_id),
+                "jersey_number": int(player_id) if player_id in jersey_ids else None,
+                "track_ids": sorted(int(t) for t in track_lists[player_id]),
+                "frames_on_screen": int(row["nunique"]),
+                "first_frame": int(row["min"]),
+                "last_frame": int(row["max"]),
+                "total_actions": 0,
+                "action_counts": {},
+            }
+
+    # ----- 動作統計 -----
+    unassigned = 0
+    action_stats: Dict[str, Dict] = {}
+    if not actions.empty:
+        actions["player_id"] = actions["track_id"].map(track_to_player)
+        # 有 track_id 但該 track 沒有出現在 players_tracking 中時，直接使用 track_id
+        missing = actions["player_id"].isna() & actions["track_id"].notna()
+        actions.loc[missing, "player_id"] = actions.loc[missing, "track_id"]
+        unassigned = int(actions["player_id"].isna().sum())
+
+        assigned = actions.dropna(subset=["player_id"])
+        if not assigned.empty:
+            counts = assigned.groupby(["player_id", "action"]).size().unstack(fill_value=0)
+            for player_id, row in counts.iterrows():
+                pid = int(player_id)
+                if pid not in players:
+                    players[pid] = {
+                        "player_id": pid,
+                        "jersey_number": None,
+                        "track_ids": [],
+                        "frames_on_screen": 0,
+                        "first_frame": None,
+                        "last_frame": None,
+                        "total_actions": 0,
+                        "action_counts": {},
+                    }
+                nonzero = row[row > 0]
+                players[pid]["action_counts"] = {str(k): int(v) for k, v in nonzero.items()}
+                players[pid]["total_actions"] = int(nonzero.sum())
+
+        stats = actions.groupby("action").agg(
+            count=("confidence", "size"),
+            mean_confidence=("confidence", "mean"),
+            min_confidence=("confidence", "min"),
+            max_confidence=("confidence", "max"),
+            std_confidence=("confidence", "std"),
+            mean_duration=("duration", "mean"),
+        )
+        for action_type, row in stats.iterrows():
+            action_stats[str(action_type)] = {k: _to_python(v) for k, v in row.items()}
+            action_stats[str(action_type)]["count"] = int(row["count"])
+
+    # ----- 回合動作列表 -----
+    play_summaries: List[Dict] = []
+    if plays:
+        starts = np.asarray([p.get("start_frame", 0) for p in plays], dtype=np.int64)
+        ends = np.asarray(
+            [p["end_frame"] if p.get("end_frame") is not None else np.iinfo(np.int64).max for p in plays],
+            dtype=np.int64
+        )
+        order = np.argsort(starts, kind="stable")
+        play_of_action = np.full(len(actions), -1, dtype=np.int64)
+        if not actions.empty:
+            # 回合互不重疊，用 searchsorted 一次定位每個動作所屬回合
+            action_frames = actions["frame"].to_numpy()
+            pos = np.searchsorted(starts[order], action_frames, side="right") - 1
+            valid = pos >= 0
+            candidate = order[np.clip(pos, 0, None)]
+            valid &= action_frames <= ends[candidate]
+            play_of_action = np.where(valid, candidate, -1)
+
+        for idx, play in enumerate(plays):
+            in_play = actions[play_of_action == idx] if not actions.empty else actions
+            play_summaries.append({
+                "play_id": play.get("play_id", idx + 1),
+                "start_frame": play.get("start_frame"),
+                "end_frame": play.get("end_frame"),
+                "start_timestamp": play.get("start_timestamp"),
+                "end_timestamp": play.get("end_timestamp"),
+                "total_actions": int(len(in_play)),
+                "action_counts": {str(k): int(v) for k, v in in_play["action"].value_counts().items()},
+                "actions": [
+                    {
+                        "frame": int(r.frame),
+                        "action": str(r.action),
+                        "confidence": float(r.confidence),
+                        "track_id": int(r.track_id) if not np.isnan(r.track_id) else None,
+                        "player_id": int(r.player_id) if not pd.isna(r.player_id) else None,
+                    }
+                    for r in in_play.sort_values("frame", kind="stable").itertuples(index=False)
+                ],
+            })
+
+    return {
+        "players": [players[pid] for pid in sorted(players)],
+        "track_to_player": {str(int(k)): int(v) for k, v in track_to_player.items()},
+        "unassigned_actions": unassigned,
+        "action_stats": action_stats,
+        "plays": play_summaries,
+    }
+
+
+def _sidecar_path(results_path, suffix: str) -> Path:
+    """結果文件旁的衍生文件路徑（{video_id}_results.json -> {video_id}{suffix}）"""
+    results_path = Path(results_path)
+    stem = results_path.stem
+    if stem.endswith("_results"):
+        stem = stem[:-len("_results")]
+    return results_path.with_name(f"{stem}{suffix}")
+
+
+def heatmap_path_for(results_path) -> Path:
+    """由結果文件路徑推導熱區圖立方體文件路徑（{video_id}_results.json -> {video_id}_heatmap.npz）"""
+    return _sidecar_path(results_path, "_heatmap.npz")
+
+
+def summary_path_for(results_path) -> Path:
+    """由結果文件路徑推導彙總文件路徑（{video_id}_results.json -> {video_id}_summary.json）"""
+    return _sidecar_path(results_path, "_summary.json")
+
+
+class HeatmapCube:
+    """
+    球員位置熱區圖的時間前綴和立方體
+
+    對每個球員（追蹤ID）建立 (時間片, 網格Y, 網格X) 的計數立方體，
+    並沿時間軸做累積和。任意時間窗口 [t0, t1) 的熱區圖只需一次相減：
+        heatmap = C[i1] - C[i0]
+
+    為控制大小，每個球員只保存其出現期間的時間片：
+    在出現之前累積值為 0，消失之後累積值保持不變。
+    """
+
+    DEFAULT_GRID = (32, 18)  # (X 網格數, Y 網格數)
+    DEFAULT_TIME_STEP = 1.0  # 每個時間片的秒數
+
+    def __init__(self, width: int, height: int, grid: Tuple[int, int], time_step: float,
+                 num_slices: int, all_cube: np.ndarray, player_cubes: Dict[int, Tuple[int, np.ndarray]]):
+        self.width = int(width)
+        self.height = int(height)
+        self.grid = (int(grid[0]), int(grid[1]))
+        self.time_step = float(time_step)
+        self.num_slices = int(num_slices)
+        self.all_cube = all_cube  # (num_slices + 1, gy, gx) 累積計數
+        self.player_cubes = player_cubes  # player_id -> (起始時間片, (L + 1, gy, gx) 累積計數)
+
+    @staticmethod
+    def _cumulative(slice_idx: np.ndarray, cells: np.ndarray, num_slices: int, grid: Tuple[int, int]) -> np.ndarray:
+        """統計每個時間片每個網格的計數，並沿時間軸累積（首行補零）"""
+        gx, gy = grid
+        counts = np.bincount(slice_idx * (gx * gy) + cells, minlength=num_slices * gx * gy)
+        cube = np.zeros((num_slices + 1, gy, gx), dtype=np.uint32)
+        np.cumsum(counts.reshape(num_slices, gy, gx), axis=0, out=cube[1:])
+        return cube
+
+    @classmethod
+    def build(cls, players_tracking: List[Dict], width: int, height: int, fps: float,
+              grid: Tuple[int, int] = DEFAULT_GRID, time_step: float = DEFAULT_TIME_STEP) -> "HeatmapCube":
+        """
+        從 players_tracking 建立熱區圖立方體
+
+        Args:
+            players_tracking: analyze_video 產生的球員追蹤數據
+            width: 影片寬度
+            height: 影片高度
+            fps: 影片幀率
+            grid: 基礎網格大小 (X, Y)
+            time_step: 時間片長度（秒）
+        """
+        gx, gy = int(grid[0]), int(grid[1])
+        fps = float(fps) if fps and fps > 0 else 30.0
+        width = max(1, int(width))
+        height = max(1, int(height))
+
+        frames: List[int] = []
+        ids: List[int] = []
+        cx: List[float] = []
+        cy: List[float] = []
+        for entry in players_tracking:
+            frame = entry.get("frame", 0)
+            for p in entry.get("players", []):
+                bbox = p.get("bbox")
+                if p.get("id") is None or not bbox or len(bbox) < 4:
+                    continue
+                frames.append(frame)
+                ids.append(p["id"])
+                cx.append((bbox[0] + bbox[2]) / 2.0)
+                cy.append((bbox[1] + bbox[3]) / 2.0)
+
+        if not frames:
+            empty = np.zeros((1, gy, gx), dtype=np.uint32)
+            return cls(width, height, (gx, gy), time_step, 0, empty, {})
+
+        frames_arr = np.asarray(frames, dtype=np.float64)
+        ids_arr = np.asarray(ids, dtype=np.int64)
+        slice_idx = np.floor(frames_arr / fps / time_step).astype(np.int64)
+        cell_x = np.clip((np.asarray(cx) / width * gx).astype(np.int64), 0, gx - 1)
+        cell_y = np.clip((np.asarray(cy) / height * gy).astype(np.int64), 0, gy - 1)
+        cells = cell_y * gx + cell_x
+
+        num_slices = int(slice_idx.max()) + 1
+        all_cube = cls._cumulative(slice_idx, cells, num_slices, (gx, gy))
+
+        # 按球員分組（排序後一次切分）
+        order = np.argsort(ids_arr, kind="stable")
+        ids_sorted = ids_arr[order]
+        unique_ids, starts = np.unique(ids_sorted, return_index=True)
+        bounds = np.append(starts, len(ids_sorted))
+
+        player_cubes: Dict[int, Tuple[int, np.ndarray]] = {}
+        for k, player_id in enumerate(unique_ids):
+            idx = order[bounds[k]:bounds[k + 1]]
+            p_slices = slice_idx[idx]
+            first = int(p_slices.min())
+            length = int(p_slices.max()) - first + 1
+            player_cubes[int(player_id)] = (
+                first, cls._cumulative(p_slices - first, cells[idx], length, (gx, gy))
+            )
+
+        return cls(width, height, (gx, gy), time_step, num_slices, all_cube, player_cubes)
+
+    def _cumulative_at(self, player: Optional[int], k: int) -> np.ndarray:
+        """取得第 k 個時間片之前（不含）的累積計數"""
+        if player is None:
+            return self.all_cube[int(np.clip(k, 0, self.num_slices))]
+        first, cube = self.player_cubes[player]
+        return cube[int(np.clip(k - first, 0, cube.shape[0] - 1))]
+
+    def window(self, player: Optional[int] = None, t0: float = 0.0, t1: Optional[float] = None,
+               bins: Optional[int] = None) -> Dict:
+        """
+        計算任意時間窗口的熱區圖（O(網格數)，與追蹤幀數無關）
+
+        Args:
+            player: 球員追蹤ID，None 表示所有球員
+            t0: 起始時間（秒）
+            t1: 結束時間（秒），None 表示影片結尾
+            bins: 輸出的 X 網格數（不超過基礎網格，Y 按比例縮放），None 使用基礎網格
+
+        Returns:
+            熱區圖字典 {player, t0, t1, grid, cell_size, max, total, counts}
+        """
+        if player is not None and player not in self.player_cubes:
+            raise KeyError(player)
+
+        i0 = int(np.floor(max(0.0, t0) / self.time_step))
+        i1 = self.num_slices if t1 is None else int(np.ceil(t1 / self.time_step))
+        i1 = max(i0, min(i1, self.num_slices))
+        i0 = min(i0, i1)
+
+        heat = self._cumulative_at(player, i1).astype(np.int64) - self._cumulative_at(player, i0)
+
+        gx, gy = self.grid
+        if bins is not None and 0 < bins < gx:
+            by = max(1, int(round(bins * gy / gx)))
+            x_edges = np.unique(np.linspace(0, gx, bins + 1)[:-1].round().astype(np.int64))
+            y_edges = np.unique(np.linspace(0, gy, by + 1)[:-1].round().astype(np.int64))
+            heat = np.add.reduceat(np.add.reduceat(heat, y_edges, axis=0), x_edges, axis=1)
+
+        out_y, out_x = heat.shape
+        return {
+            "player": player,
+            "t0": i0 * self.time_step,
+            "t1": i1 * self.time_step,
+            "grid": [int(out_x), int(out_y)],
+            "cell_size": [self.width / out_x, self.height / out_y],
+            "max": int(heat.max()) if heat.size else 0,
+            "total": int(heat.sum()),
+            "counts": heat.tolist(),
+        }
+
+    def metadata(self) -> Dict:
+        """立方體的簡要資訊（寫入分析結果）"""
+        return {
+            "grid": list(self.grid),
+            "time_step": self.time_step,
+            "num_slices": self.num_slices,
+            "players": sorted(self.player_cubes),
+        }
+
+    def save(self, path) -> None:
+        """保存為壓縮的 .npz 文件"""
+        ids = np.asarray(sorted(self.player_cubes), dtype=np.int64)
+        firsts = np.asarray([self.player_cubes[i][0] for i in ids], dtype=np.int64)
+        lengths = np.asarray([self.player_cubes[i][1].shape[0] for i in ids], dtype=np.int64)
+        gx, gy = self.grid
+        data = (np.concatenate([self.player_cubes[i][1] for i in ids])
+                if len(ids) else np.zeros((0, gy, gx), dtype=np.uint32))
+        np.savez_compressed(
+            path,
+            meta=np.asarray([self.width, self.height, gx, gy, self.num_slices], dtype=np.int64),
+            time_step=np.asarray([self.time_step], dtype=np.float64),
+            all_cube=self.all_cube,
+            ids=ids,
+            firsts=firsts,
+            lengths=lengths,
+            data=data,
+        )
+
+    @classmethod
+    def load(cls, path) -> "HeatmapCube":
+        """從 .npz 文件載入"""
+        with np.load(path) as npz:
+            width, height, gx, gy, num_slices = (int(v) for v in npz["meta"])
+            data = npz["data"]
+            bounds = np.concatenate([[0], np.cumsum(npz["lengths"])])
+            player_cubes = {
+                int(pid): (int(first), data[bounds[k]:bounds[k + 1]])
+                for k, (pid, first) in enumerate(zip(npz["ids"], npz["firsts"]))
+            }
+            return cls(width, height, (gx, gy), float(npz["time_step"][0]), num_slices,
+                       npz["all_cube"], player_cubes)
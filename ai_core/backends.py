@@ -0,0 +1,357 @@
+"""
+排球分析系統 - 檢測後端
+球/球員/動作/球衣號碼檢測的可替換後端，以及不需要模型文件的合成場景和錄製回放後端
+"""
+
+import json
+from typing import Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from matching import box_iou_matrix
+
+# 與動作識別模型的類別順序一致
+ACTION_CLASSES = ["spike", "set", "receive", "serve", "block"]
+
+
+class DetectorBackend:
+    """
+    檢測後端接口
+
+    VolleyballAnalyzer 設置了 detector_backend 時，detect_ball / detect_players / detect_actions
+    和球衣號碼識別都改由後端提供，追蹤、合併、後處理和序列化流程保持不變。
+    預設實現不檢測任何東西，影片用 cv2.VideoCapture 打開。
+    """
+
+    name = "none"
+
+    def open_capture(self, video_path: Optional[str]):
+        """打開影片（返回與 cv2.VideoCapture 相同接口的對象）"""
+        return cv2.VideoCapture(video_path)
+
+    def detect_ball(self, frame: np.ndarray, frame_idx: int) -> Optional[Dict]:
+        """球檢測：{center, bbox, confidence} 或 None"""
+        return None
+
+    def detect_players(self, frame: np.ndarray, frame_idx: int) -> List[Dict]:
+        """球員檢測：[{bbox, confidence, class_id, label}]"""
+        return []
+
+    def detect_actions(self, frame: np.ndarray, frame_idx: int) -> List[Dict]:
+        """動作檢測：[{bbox, confidence, class_id, action}]"""
+        return []
+
+    def detect_jersey_number(self, image: np.ndarray, bbox: List[float],
+                             frame_idx: Optional[int] = None) -> Optional[int]:
+        """
+        球衣號碼識別
+
+        Args:
+            image: 完整幀或球員裁剪圖
+            bbox: 球員框（在 image 中的座標）
+            frame_idx: 幀號（非同步識別的裁剪圖為 None）
+        """
+        return None
+
+
+class BlankCapture:
+    """
+    不讀取文件的影片來源：按指定尺寸和幀數輸出幀，接口與 cv2.VideoCapture 相同
+
+    render 為 None 時所有幀都是同一張黑色圖像，否則調用 render(frame_idx) 生成幀（幀號從 1 開始）。
+    """
+
+    def __init__(self, width: int, height: int, fps: float, frame_count: int, render=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = frame_count
+        self.render = render
+        self.position = 0
+        self._blank = np.zeros((height, width, 3), dtype=np.uint8)
+        self._opened = True
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def get(self, prop: int) -> float:
+        values = {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_COUNT: self.frame_count,
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_POS_FRAMES: self.position,
+        }
+        return float(values.get(prop, 0.0))
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.position = int(min(max(value, 0), self.frame_count))
+        return True
+
+    def read(self):
+        if not self._opened or self.position >= self.frame_count:
+            return False, None
+        self.position += 1
+        frame = self._blank if self.render is None else self.render(self.position)
+        return True, frame
+
+    def grab(self) -> bool:
+        if not self._opened or self.position >= self.frame_count:
+            return False
+        self.position += 1
+        return True
+
+    def release(self):
+        self._opened = False
+
+
+class SyntheticBackend(DetectorBackend):
+    """
+    合成比賽場景
+
+    兩隊球員在網兩側隨機移動，回合中球在球員之間以拋物線傳遞，每次觸球產生一個動作
+    （serve / receive / set / spike）。所有檢測在構造時一次生成，相同 seed 的結果完全一致。
+    球衣號碼以像素值畫在幀上（球員框填充為號碼），識別時讀取框內像素，完整幀和裁剪圖都適用。
+    """
+
+    name = "synthetic"
+
+    def __init__(self, num_frames: int = 3000, width: int = 640, height: int = 360, fps: float = 30.0,
+                 num_players: int = 12, rally_frames: int = 240, break_frames: int = 90,
+                 contact_interval: int = 30, ball_miss_rate: float = 0.1, ball_outlier_rate: float = 0.01,
+                 player_miss_rate: float = 0.03, seed: int = 0):
+        """
+        Args:
+            num_frames: 總幀數
+            width, height: 幀尺寸
+            fps: 幀率
+            num_players: 球員數（平均分到兩側）
+            rally_frames: 每個回合的幀數
+            break_frames: 回合之間的幀數
+            contact_interval: 回合中兩次觸球之間的幀數
+            ball_miss_rate: 球漏檢比例
+            ball_outlier_rate: 球誤檢（隨機位置）比例
+            player_miss_rate: 球員漏檢比例
+            seed: 隨機種子
+        """
+        self.num_frames = num_frames
+        self.width = width
+        self.height = height
+        self.fps = fps
+        rng = np.random.default_rng(seed)
+
+        # 球員位置 (F + 1, P, 2)，索引 0 不使用（幀號從 1 開始）
+        self.jersey_numbers = (rng.choice(99, num_players, replace=False) + 1).tolist()
+        self.side = np.arange(num_players) % 2  # 0 = 左側，1 = 右側
+        half = width / 2
+        low = np.stack([np.where(self.side == 0, 0.05 * width, half + 0.05 * width),
+                        np.full(num_players, 0.35 * height)], axis=1)
+        high = np.stack([np.where(self.side == 0, half - 0.05 * width, 0.95 * width),
+                         np.full(num_players, 0.9 * height)], axis=1)
+        steps = rng.normal(0, 0.004 * width, (num_frames + 1, num_players, 2))
+        positions = np.empty_like(steps)
+        positions[0] = rng.uniform(low, high)
+        for f in range(1, num_frames + 1):
+            positions[f] = np.clip(positions[f - 1] + steps[f], low, high)
+        self.box_size = np.array([0.04 * width, 0.17 * height])
+        self.player_boxes = np.concatenate([positions - self.box_size / 2, positions + self.box_size / 2], axis=2)
+        self.player_scores = rng.uniform(0.6, 0.95, (num_frames + 1, num_players))
+        self.player_visible = rng.random((num_frames + 1, num_players)) >= player_miss_rate
+
+        # 回合與觸球
+        self.ball = np.full((num_frames + 1, 2), np.nan)
+        self.actions: Dict[int, List[Dict]] = {}
+        self.rallies: List[tuple] = []
+        start = break_frames + 1
+        while start <= num_frames:
+            end = min(start + rally_frames - 1, num_frames)
+            self.rallies.append((start, end))
+            self._script_rally(rng, start, end, contact_interval)
+            start = end + break_frames + 1
+
+        detected = ~np.isnan(self.ball[:, 0]) & (rng.random(num_frames + 1) >= ball_miss_rate)
+        outliers = detected & (rng.random(num_frames + 1) < ball_outlier_rate)
+        self.ball_detections = np.where(outliers[:, None], rng.uniform([0, 0], [width, height], (num_frames + 1, 2)),
+                                        self.ball + rng.normal(0, 1.0, self.ball.shape))
+        self.ball_detected = detected
+        self.ball_scores = rng.uniform(0.5, 0.95, num_frames + 1)
+
+    def _script_rally(self, rng, start: int, end: int, contact_interval: int):
+        """生成一個回合的觸球序列、動作檢測和球軌跡"""
+        side = int(rng.integers(0, 2))
+        touches = 0
+        contact = start
+        hitter = int(rng.choice(np.flatnonzero(self.side == side)))
+        while contact <= end:
+            action = "serve" if contact == start else ["receive", "set", "spike"][min(touches, 2)]
+            box = self.player_boxes[contact, hitter]
+            for f in range(contact, min(contact + 4, end + 1)):
+                self.actions.setdefault(f, []).append({
+                    "bbox": self.player_boxes[f, hitter].tolist(),
+                    "confidence": 0.85,
+                    "class_id": ACTION_CLASSES.index(action),
+                    "action": action
+                })
+            # 發球和扣球過網，其他觸球傳給同側隊友
+            if action in ("serve", "spike"):
+                side, touches = 1 - side, 0
+            else:
+                touches += 1
+            receiver = int(rng.choice(np.flatnonzero(self.side == side)))
+            arrive = min(contact + contact_interval, end + 1)
+            frames = np.arange(contact, arrive)
+            t = (frames - contact) / contact_interval
+            a = np.array([(box[0] + box[2]) / 2, box[1]])
+            b_box = self.player_boxes[min(arrive, self.num_frames), receiver]
+            b = np.array([(b_box[0] + b_box[2]) / 2, b_box[1]])
+            self.ball[frames] = a + (b - a) * t[:, None]
+            self.ball[frames, 1] -= 0.3 * self.height * 4 * t * (1 - t)
+            hitter, contact = receiver, arrive
+
+    def open_capture(self, video_path: Optional[str] = None) -> BlankCapture:
+        """合成場景不讀取影片文件"""
+        return BlankCapture(self.width, self.height, self.fps, self.num_frames, render=self.render)
+
+    def render(self, frame_idx: int) -> np.ndarray:
+        """畫出一幀：黑色背景，球員框以球衣號碼作為像素值"""
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        for box, number in zip(self.player_boxes[frame_idx], self.jersey_numbers):
+            x1, y1 = max(int(box[0]), 0), max(int(box[1]), 0)
+            x2, y2 = min(int(box[2]), self.width), min(int(box[3]), self.height)
+            frame[y1:y2, x1:x2] = number
+        return frame
+
+    def _in_range(self, frame_idx: int) -> bool:
+        return 1 <= frame_idx <= self.num_frames
+
+    def detect_ball(self, frame: np.ndarray, frame_idx: int) -> Optional[Dict]:
+        if not self._in_range(frame_idx) or not self.ball_detected[frame_idx]:
+            return None
+        x, y = (int(round(v)) for v in self.ball_detections[frame_idx])
+        return {
+            "center": [x, y],
+            "bbox": [float(x - 4), float(y - 4), float(x + 4), float(y + 4)],
+            "confidence": float(self.ball_scores[frame_idx])
+        }
+
+    def detect_players(self, frame: np.ndarray, frame_idx: int) -> List[Dict]:
+        if not self._in_range(frame_idx):
+            return []
+        boxes = self.player_boxes[frame_idx]
+        scores = self.player_scores[frame_idx]
+        return [
+            {"bbox": boxes[i].tolist(), "confidence": float(scores[i]), "class_id": 0, "label": "person"}
+            for i in np.flatnonzero(self.player_visible[frame_idx])
+        ]
+
+    def detect_actions(self, frame: np.ndarray, frame_idx: int) -> List[Dict]:
+        return [dict(a) for a in self.actions.get(frame_idx, [])]
+
+    def detect_jersey_number(self, image: np.ndarray, bbox: List[float],
+                             frame_idx: Optional[int] = None) -> Optional[int]:
+        if image is None or image.size == 0:
+            return None
+        x = int(np.clip((bbox[0] + bbox[2]) / 2, 0, image.shape[1] - 1))
+        y = int(np.clip(bbox[1] + 0.35 * (bbox[3] - bbox[1]), 0, image.shape[0] - 1))
+        value = int(image[y, x, 0])
+        return value if 1 <= value <= 99 else None
+
+
+class ReplayBackend(DetectorBackend):
+    """
+    回放已錄製的檢測
+
+    支持兩種輸入：
+    - 錄製格式：{"video_info": {...}, "frames": [{"frame", "ball", "players", "actions"}]}
+    - analyze_video 的結果：由球軌跡（非插值點）、players_tracking 和 action_detections 還原每幀檢測
+
+    有影片文件時用 cv2.VideoCapture 打開，否則按 video_info 輸出黑色幀。
+    球衣號碼按完整幀中的球員框與錄製框的 IoU 匹配；非同步識別的裁剪圖沒有幀號，不識別。
+    """
+
+    name = "replay"
+
+    def __init__(self, source: Union[str, Dict]):
+        """
+        Args:
+            source: JSON 文件路徑或已載入的字典
+        """
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8") as f:
+                source = json.load(f)
+        self.video_info = dict(source.get("video_info", {}))
+        self.frames: Dict[int, Dict] = {}
+        if "frames" in source:
+            for entry in source["frames"]:
+                self.frames[int(entry["frame"])] = entry
+        else:
+            self._load_results(source)
+        if "total_frames" not in self.video_info:
+            self.video_info["total_frames"] = max(self.frames, default=0)
+
+    def _frame(self, frame_idx: int) -> Dict:
+        return self.frames.setdefault(frame_idx, {"frame": frame_idx, "ball": None, "players": [], "actions": []})
+
+    def _load_results(self, results: Dict):
+        """從分析結果還原每幀檢測"""
+        for point in results.get("ball_tracking", {}).get("trajectory", []):
+            if point.get("interpolated", False):
+                continue
+            self._frame(int(point["frame"]))["ball"] = {
+                "center": point["center"], "bbox": point["bbox"], "confidence": point["confidence"]
+            }
+        for entry in results.get("players_tracking", []):
+            self._frame(int(entry["frame"]))["players"] = [
+                {"bbox": p["bbox"], "confidence": p.get("confidence", 1.0), "class_id": 0, "label": "person",
+                 "jersey_number": p.get("jersey_number")}
+                for p in entry.get("players", [])
+            ]
+        for det in results.get("action_recognition", {}).get("action_detections", []):
+            action = det["action"]
+            self._frame(int(det["frame"]))["actions"].append({
+                "bbox": det["bbox"], "confidence": det["confidence"],
+                "class_id": ACTION_CLASSES.index(action) if action in ACTION_CLASSES else -1, "action": action
+            })
+
+    @staticmethod
+    def record(results: Dict) -> Dict:
+        """把分析結果轉成錄製格式（可寫成 JSON 供之後回放）"""
+        backend = ReplayBackend(results)
+        return {
+            "video_info": backend.video_info,
+            "frames": [backend.frames[f] for f in sorted(backend.frames)]
+        }
+
+    def open_capture(self, video_path: Optional[str] = None):
+        if video_path:
+            cap = cv2.VideoCapture(video_path)
+            if cap.isOpened():
+                return cap
+        info = self.video_info
+        return BlankCapture(int(info.get("width", 640)), int(info.get("height", 360)),
+                            float(info.get("fps", 30.0)), int(info.get("total_frames", 0)))
+
+    def detect_ball(self, frame: np.ndarray, frame_idx: int) -> Optional[Dict]:
+        ball = self.frames.get(frame_idx, {}).get("ball")
+        return dict(ball) if ball else None
+
+    def detect_players(self, frame: np.ndarray, frame_idx: int) -> List[Dict]:
+        return [{k: v for k, v in p.items() if k != "jersey_number"}
+                for p in self.frames.get(frame_idx, {}).get("players", [])]
+
+    def detect_actions(self, frame: np.ndarray, frame_idx: int) -> List[Dict]:
+        return [dict(a) for a in self.frames.get(frame_idx, {}).get("actions", [])]
+
+    def detect_jersey_number(self, image: np.ndarray, bbox: List[float],
+                             frame_idx: Optional[int] = None) -> Optional[int]:
+        if frame_idx is None:
+            return None
+        players = [p for p in self.frames.get(frame_idx, {}).get("players", []) if p.get("jersey_number")]
+        if not players:
+            return None
+        iou = box_iou_matrix([bbox], [p["bbox"] for p in players])[0]
+        best = int(np.argmax(iou))
+        return int(players[best]["jersey_number"]) if iou[best] > 0.5 else None
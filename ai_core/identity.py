@@ -0,0 +1,453 @@
+"""
+排球分析系統 - 球員身份識別
+追蹤身份存儲、球衣號碼 OCR 調度、非同步識別和最佳幀選擇，控制球衣識別開銷
+"""
+
+import sys
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+def vote_is_stable(history: Optional[Sequence[int]], min_votes: int = 5, min_ratio: float = 0.8) -> bool:
+    """
+    判斷一個追蹤的球衣號碼投票是否穩定
+
+    Args:
+        history: 該追蹤歷次識別出的號碼
+        min_votes: 至少需要的投票數
+        min_ratio: 最多票號碼所佔的最低比例
+
+    Returns:
+        投票數足夠且多數號碼佔比達標時為 True
+    """
+    if not history or len(history) < min_votes:
+        return False
+    top_count = Counter(history).most_common(1)[0][1]
+    return top_count / len(history) >= min_ratio
+
+
+class IdentityStore:
+    """
+    有界的追蹤身份存儲
+
+    保存每個追蹤的球衣號碼投票歷史、最近識別的號碼，以及 球衣號碼 -> 穩定ID / 追蹤ID 映射。
+    norfair 會不斷產生新的追蹤ID，因此按追蹤最後出現的幀做淘汰：
+    - TTL：超過 ttl_frames 幀未出現的追蹤
+    - LRU：存活追蹤超過 max_tracks 時淘汰最久未出現的
+
+    被淘汰追蹤的最終投票號碼保存在 retired 中，供分析結束時回填，由 clear_retired() 清除。
+    球衣號碼相關映射最多 99 個號碼，本身有界；其中的追蹤ID列表只保留存活追蹤。
+    """
+
+    def __init__(self, max_tracks: int = 512, ttl_frames: int = 1800, history_size: int = 50):
+        """
+        Args:
+            max_tracks: 最多保留的追蹤數
+            ttl_frames: 追蹤消失多少幀後淘汰
+            history_size: 每個追蹤保留的最近投票數
+        """
+        self.max_tracks = max_tracks
+        self.ttl_frames = ttl_frames
+        self.history_size = history_size
+
+        self.histories: Dict[int, List[int]] = {}  # track_id -> 最近的號碼投票
+        self.jersey_cache: Dict[int, int] = {}  # track_id -> 最近一次識別（投票後）的號碼
+        self.jersey_to_stable_id: Dict[int, int] = {}  # 球衣號碼 -> 穩定ID
+        self.jersey_to_track_ids: Dict[int, List[int]] = {}  # 球衣號碼 -> 存活的追蹤ID
+        self.last_seen: "OrderedDict[int, int]" = OrderedDict()  # track_id -> 最後出現的幀（LRU 順序）
+        self.retired: Dict[int, int] = {}  # 已淘汰追蹤 -> 最終投票號碼
+        self.frame = 0
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    def touch(self, track_ids: Iterable[int], frame: Optional[int] = None):
+        """
+        標記追蹤在當前幀出現，並淘汰過期/超量的追蹤
+
+        Args:
+            track_ids: 當前幀的追蹤ID
+            frame: 幀號（預設為內部幀計數 + 1）
+        """
+        self.frame = self.frame + 1 if frame is None else frame
+        for track_id in track_ids:
+            self.last_seen[track_id] = self.frame
+            self.last_seen.move_to_end(track_id)
+        self.evict()
+
+    def evict(self):
+        """按 TTL 和容量淘汰追蹤"""
+        while self.last_seen:
+            track_id, seen = next(iter(self.last_seen.items()))
+            if self.frame - seen <= self.ttl_frames:
+                break
+            self._drop(track_id)
+            self.evicted_ttl += 1
+        while len(self.last_seen) > self.max_tracks:
+            self._drop(next(iter(self.last_seen)))
+            self.evicted_lru += 1
+
+    def _drop(self, track_id: int):
+        self.last_seen.pop(track_id, None)
+        self.jersey_cache.pop(track_id, None)
+        history = self.histories.pop(track_id, None)
+        if history:
+            self.retired[track_id] = Counter(history).most_common(1)[0][0]
+        # 保留空列表：號碼已出現過，穩定ID不應被重新分配
+        for track_ids in self.jersey_to_track_ids.values():
+            if track_id in track_ids:
+                track_ids.remove(track_id)
+
+    def record_vote(self, track_id: int, number: int):
+        """記錄一次號碼識別（只保留最近 history_size 次）"""
+        if track_id not in self.last_seen:
+            self.last_seen[track_id] = self.frame
+        history = self.histories.setdefault(track_id, [])
+        history.append(number)
+        if len(history) > self.history_size:
+            del history[:-self.history_size]
+
+    def voted_jersey(self, track_id: int) -> Optional[int]:
+        """追蹤的多數投票號碼（包括已淘汰的追蹤）"""
+        history = self.histories.get(track_id)
+        if history:
+            return Counter(history).most_common(1)[0][0]
+        return self.retired.get(track_id)
+
+    def clear_retired(self):
+        """清除已淘汰追蹤的投票結果（每次分析結束後調用）"""
+        self.retired.clear()
+
+    def reset(self):
+        """清除所有追蹤身份和統計（每次分析開始時調用；原地清空，調用方持有的容器別名仍然有效）"""
+        for container in (self.histories, self.jersey_cache, self.jersey_to_stable_id,
+                          self.jersey_to_track_ids, self.last_seen, self.retired):
+            container.clear()
+        self.frame = 0
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    def stats(self) -> Dict:
+        """存儲大小和淘汰計數"""
+        containers = (self.histories, self.jersey_cache, self.jersey_to_stable_id,
+                      self.jersey_to_track_ids, self.last_seen, self.retired)
+        approx_bytes = sum(sys.getsizeof(c) for c in containers)
+        approx_bytes += sum(sys.getsizeof(h) for h in self.histories.values())
+        approx_bytes += sum(sys.getsizeof(t) for t in self.jersey_to_track_ids.values())
+        return {
+            "tracks": len(self.last_seen),
+            "history_entries": sum(len(h) for h in self.histories.values()),
+            "jersey_mappings": len(self.jersey_to_stable_id),
+            "linked_tracks": sum(len(t) for t in self.jersey_to_track_ids.values()),
+            "retired": len(self.retired),
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_lru": self.evicted_lru,
+            "approx_bytes": approx_bytes,
+        }
+
+
+class OCRScheduler:
+    """
+    球衣號碼 OCR 調度器
+
+    - 每個追蹤有自己的識別間隔（cadence），新追蹤立即到期
+    - 每幀最多執行 frame_budget 次識別，超出預算的追蹤順延到下一幀
+    - 到期的追蹤中，尚未有穩定號碼的優先，其次按逾期時間排序
+    - 投票穩定後間隔按 backoff 倍數增長（上限 max_interval），不穩定時恢復 base_interval
+    """
+
+    def __init__(self, base_interval: int = 5, max_interval: int = 60, frame_budget: int = 3,
+                 backoff: float = 2.0, stable_votes: int = 5, stable_ratio: float = 0.8,
+                 stale_after: int = 300):
+        """
+        Args:
+            base_interval: 識別間隔（幀）
+            max_interval: 退避後的最大識別間隔（幀）
+            frame_budget: 每幀最多識別次數
+            backoff: 投票穩定後的間隔倍數
+            stable_votes: 判定穩定需要的投票數
+            stable_ratio: 判定穩定需要的多數比例
+            stale_after: 追蹤消失多少幀後清除其調度狀態
+        """
+        self.base_interval = max(1, int(base_interval))
+        self.max_interval = max(self.base_interval, int(max_interval))
+        self.frame_budget = max(0, int(frame_budget))
+        self.backoff = backoff
+        self.stable_votes = stable_votes
+        self.stable_ratio = stable_ratio
+        self.stale_after = stale_after
+        self.reset()
+
+    def reset(self):
+        """清除所有追蹤狀態和統計"""
+        self.frame = 0
+        self.next_due: Dict[int, int] = {}  # track_id -> 下次識別的幀
+        self.interval: Dict[int, int] = {}  # track_id -> 當前識別間隔
+        self.last_seen: Dict[int, int] = {}  # track_id -> 最後出現的幀
+        self.frame_calls = 0
+        self.total_calls = 0
+        self.deferred = 0  # 到期但因預算順延的次數
+        self.max_calls_per_frame = 0
+        self.calls_histogram: Counter = Counter()  # 每幀識別次數 -> 幀數
+
+    def _close_frame(self):
+        if self.frame > 0:
+            self.calls_histogram[self.frame_calls] += 1
+            self.max_calls_per_frame = max(self.max_calls_per_frame, self.frame_calls)
+
+    def plan(self, track_ids: Iterable[int], histories: Dict[int, List[int]]) -> List[int]:
+        """
+        開始新的一幀，選出這一幀需要識別的追蹤
+
+        Args:
+            track_ids: 當前幀的追蹤ID
+            histories: track_id -> 歷次識別號碼（用於判斷投票是否穩定）
+
+        Returns:
+            本幀要執行 OCR 的追蹤ID（按優先級排序，不超過 frame_budget）
+        """
+        self._close_frame()
+        self.frame += 1
+        self.frame_calls = 0
+        frame = self.frame
+
+        due = []
+        for track_id in track_ids:
+            self.last_seen[track_id] = frame
+            next_due = self.next_due.setdefault(track_id, frame)
+            if next_due <= frame:
+                stable = vote_is_stable(histories.get(track_id), self.stable_votes, self.stable_ratio)
+                due.append((stable, next_due, track_id))
+
+        due.sort()
+        selected = [track_id for _, _, track_id in due[:self.frame_budget]]
+        self.deferred += len(due) - len(selected)
+
+        if frame % self.stale_after == 0:
+            self._prune(frame)
+        return selected
+
+    def record(self, track_id: int, history: Optional[Sequence[int]], called: bool = True):
+        """
+        記錄一次識別，並根據投票穩定性安排下一次
+
+        Args:
+            track_id: 追蹤ID
+            history: 識別後該追蹤的號碼歷史
+            called: 是否真正執行了識別（命中緩存時為 False，只重新排程不計數）
+        """
+        if called:
+            self.frame_calls += 1
+            self.total_calls += 1
+        if vote_is_stable(history, self.stable_votes, self.stable_ratio):
+            interval = min(self.max_interval,
+                           int(round(self.interval.get(track_id, self.base_interval) * self.backoff)))
+        else:
+            interval = self.base_interval
+        self.interval[track_id] = interval
+        self.next_due[track_id] = self.frame + interval
+
+    def _prune(self, frame: int):
+        """清除長時間未出現的追蹤"""
+        stale = [tid for tid, seen in self.last_seen.items() if frame - seen > self.stale_after]
+        for tid in stale:
+            self.last_seen.pop(tid, None)
+            self.next_due.pop(tid, None)
+            self.interval.pop(tid, None)
+
+    def stats(self) -> Dict:
+        """識別次數統計（每幀識別次數分佈等）"""
+        histogram = self.calls_histogram.copy()
+        if self.frame > 0:
+            histogram[self.frame_calls] += 1
+        frames = sum(histogram.values())
+        return {
+            "frames": frames,
+            "total_calls": self.total_calls,
+            "mean_calls_per_frame": self.total_calls / frames if frames else 0.0,
+            "max_calls_per_frame": max(self.max_calls_per_frame, self.frame_calls),
+            "deferred": self.deferred,
+            "tracked": len(self.next_due),
+            "calls_per_frame": {str(k): v for k, v in sorted(histogram.items())},
+        }
+
+
+def crop_player(frame: np.ndarray, bbox: Sequence[float], margin: float = 0.05) -> Tuple[np.ndarray, List[float]]:
+    """
+    複製球員區域（左右各留 margin 倍寬度，與後背 ROI 一致），並把 bbox 換算到裁剪圖座標
+
+    Returns:
+        (裁剪圖副本, 裁剪圖中的 bbox)
+    """
+    x1, y1, x2, y2 = (int(v) for v in bbox[:4])
+    pad = int((x2 - x1) * margin)
+    left, right = max(0, x1 - pad), min(frame.shape[1], x2 + pad)
+    top, bottom = max(0, y1), min(frame.shape[0], y2)
+    crop = frame[top:bottom, left:right].copy()
+    return crop, [float(x1 - left), float(y1 - top), float(x2 - left), float(y2 - top)]
+
+
+class JerseyResult(NamedTuple):
+    """非同步識別結果"""
+    track_id: int
+    frame_idx: int
+    number: Optional[int]
+
+
+class JerseyRecognitionPool:
+    """
+    非同步球衣號碼識別
+
+    幀循環提交 (track_id, frame_idx, 球員裁剪圖) 任務到執行緒池後立即返回，
+    完成的結果由幀循環在之後的幀中 collect() 取回並折算成投票，
+    分析結束時 drain() 等待剩餘任務。
+
+    recognizer(crop, bbox) 在工作執行緒中運行，只返回號碼，不應修改分析器狀態；
+    YOLO/EasyOCR 模型不是執行緒安全的，多於 1 個工作執行緒時 recognizer 需自行保證。
+    """
+
+    def __init__(self, recognizer: Callable[[np.ndarray, List[float]], Optional[int]],
+                 max_workers: int = 1, max_pending: int = 64):
+        """
+        Args:
+            recognizer: 識別函數 (裁剪圖, 裁剪圖中的 bbox) -> 號碼或 None
+            max_workers: 工作執行緒數
+            max_pending: 最多未完成任務數，超過時丟棄新任務（由調度器之後重新安排）
+        """
+        self.recognizer = recognizer
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max_pending
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.pending: Deque = deque()  # (track_id, frame_idx, future)，按提交順序
+        self.lock = threading.Lock()
+        self.stats = {"submitted": 0, "completed": 0, "dropped": 0, "failed": 0}
+
+    def submit(self, track_id: int, frame_idx: int, frame: np.ndarray, bbox: Sequence[float]) -> bool:
+        """
+        提交一個識別任務（裁剪圖在提交時複製，之後不再引用原幀）
+
+        Returns:
+            是否成功提交（未完成任務過多時為 False）
+        """
+        if len(self.pending) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return False
+        crop, local_bbox = crop_player(frame, bbox)
+        if crop.size == 0:
+            return False
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                               thread_name_prefix="jersey-ocr")
+        future = self.executor.submit(self.recognizer, crop, local_bbox)
+        self.pending.append((track_id, frame_idx, future))
+        self.stats["submitted"] += 1
+        return True
+
+    def _pop_done(self, block: bool) -> List[JerseyResult]:
+        results = []
+        with self.lock:
+            if block and self.pending:
+                wait([future for _, _, future in self.pending])
+            remaining: Deque = deque()
+            for track_id, frame_idx, future in self.pending:
+                if not future.done():
+                    remaining.append((track_id, frame_idx, future))
+                    continue
+                try:
+                    number = future.result()
+                    self.stats["completed"] += 1
+                except Exception:
+                    number = None
+                    self.stats["failed"] += 1
+                results.append(JerseyResult(track_id, frame_idx, number))
+            self.pending = remaining
+        return results
+
+    def collect(self) -> List[JerseyResult]:
+        """取回已完成的結果（不阻塞）"""
+        return self._pop_done(block=False)
+
+    def drain(self) -> List[JerseyResult]:
+        """等待並取回所有未完成的結果"""
+        return self._pop_done(block=True)
+
+    def shutdown(self):
+        """關閉執行緒池（未取回的結果會被丟棄）"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.pending.clear()
+
+
+class BestFrameCandidate(NamedTuple):
+    """球衣識別候選幀"""
+    track_id: int
+    frame: int
+    bbox: Tuple[float, float, float, float]
+    score: float  # 尺寸 x 置信度
+
+
+def select_best_frames(players_tracking: List[Dict], per_track: int = 9,
+                       min_frame_gap: int = 5) -> Dict[int, List[BestFrameCandidate]]:
+    """
+    從 players_tracking 為每個追蹤選出品質最高的候選幀
+
+    品質分數 = bbox 面積（相對該追蹤最大面積）x 檢測置信度。
+    同一追蹤選出的幀至少相隔 min_frame_gap 幀，避免候選集中在幾乎相同的畫面。
+
+    Args:
+        players_tracking: 分析結果中的 players_tracking
+        per_track: 每個追蹤最多的候選數
+        min_frame_gap: 同一追蹤候選幀之間的最小間隔
+
+    Returns:
+        track_id -> 候選列表（按分數從高到低）
+    """
+    rows = [
+        (p["id"], entry.get("frame", 0), *p["bbox"][:4], p.get("confidence", 1.0))
+        for entry in players_tracking
+        for p in entry.get("players", [])
+        if p.get("id") is not None and p.get("bbox") is not None
+    ]
+    if not rows:
+        return {}
+
+    data = np.asarray(rows, dtype=np.float64)
+    track_ids = data[:, 0].astype(np.int64)
+    area = np.clip(data[:, 4] - data[:, 2], 0, None) * np.clip(data[:, 5] - data[:, 3], 0, None)
+
+    # 每個追蹤內按其最大面積歸一化（遠處球員的分數不會因整體面積小而被壓低）
+    order = np.argsort(track_ids, kind="stable")
+    sorted_ids = track_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    max_area = np.maximum.reduceat(area[order], starts)
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(order)]))
+    norm_area = np.empty_like(area)
+    norm_area[order] = area[order] / np.maximum(max_area[group], 1e-9)
+    score = norm_area * data[:, 6]
+
+    # 追蹤內按分數從高到低，貪心選取相隔足夠遠的幀
+    ranked = np.lexsort((-score, track_ids))
+    candidates: Dict[int, List[BestFrameCandidate]] = {}
+    for i in ranked.tolist():
+        track_id = int(track_ids[i])
+        chosen = candidates.setdefault(track_id, [])
+        if len(chosen) >= per_track:
+            continue
+        frame = int(data[i, 1])
+        if any(abs(frame - c.frame) < min_frame_gap for c in chosen):
+            continue
+        chosen.append(BestFrameCandidate(track_id, frame, tuple(float(v) for v in data[i, 2:6]), float(score[i])))
+    return candidates
+
+
+def sharpness(image: np.ndarray) -> float:
+    """清晰度：灰度圖拉普拉斯算子響應的方差"""
+    if image.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
@@ -1,20 +1,179 @@
 """
 排球分析系統 - 日誌模組
 Centralized logging configuration for the Volleyball Analysis System
+
+日誌記錄經 QueueHandler 放入佇列，由背景 QueueListener 執行緒格式化並寫出，
+調用方（推理幀循環、事件循環）不會因 I/O 阻塞；輸出為結構化 JSON（LOG_FORMAT=text 時為文本），
+並附帶 log_context 綁定的任務/影片 ID，重複的警告和錯誤按時間間隔限流
 """
 
+import atexit
+import contextvars
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, Optional
+
+# 佇列容量：寫出跟不上時丟棄新記錄，而不是阻塞調用方
+QUEUE_SIZE = 10000
+# 相同警告/錯誤的最短輸出間隔（秒）
+RATE_LIMIT_SECONDS = 10.0
+
+# LogRecord 的標準屬性，其餘屬性視為結構化欄位
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "taskName"}
+
+# 當前上下文綁定的欄位（如 task_id、video_id），在各自的執行緒/協程中獨立
+_log_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+
+# logger 名稱 -> 背景寫出執行緒
+_listeners: Dict[str, QueueListener] = {}
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    在 with 範圍內為所有日誌附加欄位
+    
+    contextvars 不會自動傳到 run_in_executor 的執行緒，需在執行緒內再綁定一次
+    
+    Args:
+        **fields: 附加欄位（如 task_id、video_id）
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """把 log_context 綁定的欄位寫入記錄（在調用方執行緒中執行）"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    限流重複的警告和錯誤（如每幀都出現的檢測錯誤）
+    
+    相同 logger、級別和訊息在 interval 秒內只輸出一次，之後輸出的記錄帶 suppressed 欄位（期間被丟棄的次數）
+    """
+    
+    def __init__(self, interval: float = RATE_LIMIT_SECONDS, level: int = logging.WARNING, max_keys: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            interval: 相同記錄的最短輸出間隔（秒），0 表示不限流
+            level: 限流的最低級別
+            max_keys: 最多記住的不同訊息數
+            clock: 返回當前時間（秒）的函數
+        """
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        self.clock = clock
+        self._seen: "OrderedDict[tuple, list]" = OrderedDict()  # key -> [上次輸出時間, 丟棄次數]
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0 or record.levelno < self.level:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = self.clock()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                return False
+            if entry is not None and entry[1]:
+                record.suppressed = entry[1]
+            self._seen[key] = [now, 0]
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每條記錄輸出一行 JSON：time、level、logger、message 和結構化欄位"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """寫到當前的 sys.stdout（替換 stdout 後仍然有效，如測試捕獲輸出）"""
+    
+    def __init__(self):
+        super().__init__(sys.stdout)
+    
+    @property
+    def stream(self):
+        return sys.stdout
+    
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """佇列已滿時丟棄記錄並計數，不阻塞調用方"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合併訊息參數，保留結構化欄位；異常在這裡轉成文字（traceback 不能跨執行緒保存）
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 def setup_logger(
     name: str = "volleyball_ai",
     level: int = logging.INFO,
     log_file: Optional[Path] = None,
-    console_output: bool = True
+    console_output: bool = True,
+    json_format: Optional[bool] = None,
+    rate_limit_seconds: float = RATE_LIMIT_SECONDS
 ) -> logging.Logger:
     """
     設置並返回配置好的 Logger 實例
@@ -24,7 +183,9 @@ def setup_logger(
         level: 日誌級別 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: 可選的日誌文件路徑
         console_output: 是否輸出到控制台
-        
+        json_format: 是否輸出 JSON（預設為是，環境變數 LOG_FORMAT=text 時輸出文本）
+        rate_limit_seconds: 相同警告/錯誤的最短輸出間隔（秒），0 表示不限流
+    
     Returns:
         配置好的 Logger 實例
     """
@@ -35,19 +196,28 @@ def setup_logger(
         return logger
     
     logger.setLevel(level)
+    # 各 logger 有自己的 handler，不再傳給父 logger（避免重複輸出）
+    logger.propagate = False
     
     # 定義格式
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "json").lower() != "text"
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
+    
+    handlers = []
     
     # 控制台輸出
     if console_output:
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = _ConsoleHandler()
         console_handler.setLevel(level)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
     
     # 文件輸出
     if log_file:
@@ -55,11 +225,36 @@ def setup_logger(
         file_handler = logging.FileHandler(log_file, encoding="utf-8")
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # 調用方只把記錄放進佇列，由背景執行緒寫出
+    previous = _listeners.pop(name, None)
+    if previous is not None:
+        previous.stop()
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RateLimitFilter(rate_limit_seconds))
+    logger.addHandler(queue_handler)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
     
     return logger
 
 
+def flush_logs():
+    """等待所有佇列中的記錄寫出並停止背景執行緒（進程退出時自動調用）"""
+    for name in list(_listeners):
+        _listeners.pop(name).stop()
+        for handler in logging.getLogger(name).handlers:
+            if isinstance(handler, QueueHandler):
+                logging.getLogger(name).removeHandler(handler)
+
+
+atexit.register(flush_logs)
+
+
 # 預設的 Logger 實例
 def get_logger(name: str = "volleyball_ai") -> logging.Logger:
     """獲取 Logger 實例（如果不存在則創建）"""
@@ -79,32 +274,35 @@ class AILogger:
     def device_detected(self, device: str, device_name: Optional[str] = None):
         """記錄設備檢測結果"""
         if device == "cuda" and device_name:
-            self.logger.info(f"Detected NVIDIA GPU: {device_name}")
+            self.logger.info(f"Detected NVIDIA GPU: {device_name}", extra={"device": device})
         elif device == "mps":
-            self.logger.info("Detected Apple Silicon MPS acceleration")
+            self.logger.info("Detected Apple Silicon MPS acceleration", extra={"device": device})
         else:
-            self.logger.info("Using CPU for computation")
+            self.logger.info("Using CPU for computation", extra={"device": device})
     
     def model_loaded(self, model_type: str, model_path: str):
         """記錄模型載入"""
-        self.logger.info(f"{model_type} model loaded: {Path(model_path).name}")
+        self.logger.info(f"{model_type} model loaded: {Path(model_path).name}", extra={"model": model_type})
     
     def model_failed(self, model_type: str, error: str):
         """記錄模型載入失敗"""
-        self.logger.error(f"{model_type} model load failed: {error}")
+        self.logger.error(f"{model_type} model load failed: {error}", extra={"model": model_type})
     
     def analysis_start(self, video_path: str, total_frames: int):
         """記錄分析開始"""
-        self.logger.info(f"Starting analysis: {Path(video_path).name} ({total_frames} frames)")
+        self.logger.info(f"Starting analysis: {Path(video_path).name} ({total_frames} frames)",
+                         extra={"total_frames": total_frames})
     
     def analysis_progress(self, current: int, total: int, fps: float):
         """記錄分析進度"""
-        percent = (current / total) * 100
-        self.logger.debug(f"Progress: {current}/{total} ({percent:.1f}%) - {fps:.2f} FPS")
+        percent = (current / total) * 100 if total else 0.0
+        self.logger.debug(f"Progress: {current}/{total} ({percent:.1f}%) - {fps:.2f} FPS",
+                          extra={"frame": current, "progress": round(percent, 1), "fps": round(fps, 2)})
     
     def analysis_complete(self, duration: float, results_path: str):
         """記錄分析完成"""
-        self.logger.info(f"Analysis complete in {duration:.2f}s, saved to: {Path(results_path).name}")
+        self.logger.info(f"Analysis complete in {duration:.2f}s, saved to: {Path(results_path).name}",
+                         extra={"duration": round(duration, 3)})
     
     def trajectory_stats(self, original: int, removed: int, interpolated: int, final: int):
         """記錄軌跡處理統計"""
@@ -112,15 +310,23 @@ class AILogger:
     
     def detection(self, detection_type: str, count: int, frame: int):
         """記錄偵測結果"""
-        self.logger.debug(f"Frame {frame}: detected {count} {detection_type}")
+        self.logger.debug(f"Frame {frame}: detected {count} {detection_type}", extra={"frame": frame})
+    
+    def info(self, message: str, **fields):
+        """記錄一般信息（fields 為結構化欄位）"""
+        self.logger.info(message, extra=fields)
+    
+    def debug(self, message: str, **fields):
+        """記錄調試信息"""
+        self.logger.debug(message, extra=fields)
     
-    def warning(self, message: str):
+    def warning(self, message: str, **fields):
         """記錄警告"""
-        self.logger.warning(message)
+        self.logger.warning(message, extra=fields)
     
-    def error(self, message: str, exc_info: bool = False):
-        """記錄錯誤"""
-        self.logger.error(message, exc_info=exc_info)
+    def error(self, message: str, exc_info: bool = False, **fields):
+        """記錄錯誤（每幀重複的錯誤會被限流，幀號等變化的值應放在 fields 中）"""
+        self.logger.error(message, exc_info=exc_info, extra=fields)
 
 
 # 後端服務 Logger
@@ -132,7 +338,7 @@ class APILogger:
     
     def request(self, method: str, path: str, status: int = 200):
         """記錄 API 請求"""
-        self.logger.info(f"{method} {path} -> {status}")
+        self.logger.info(f"{method} {path} -> {status}", extra={"method": method, "path": path, "status": status})
     
     def upload(self, filename: str, size_mb: float):
         """記錄文件上傳"""
@@ -140,21 +346,34 @@ class APILogger:
     
     def analysis_started(self, video_id: str, task_id: str):
         """記錄分析任務啟動"""
-        self.logger.info(f"Analysis started: video={video_id}, task={task_id}")
+        self.logger.info(f"Analysis started: video={video_id}, task={task_id}",
+                         extra={"video_id": video_id, "task_id": task_id})
     
     def analysis_completed(self, video_id: str, duration: float):
         """記錄分析任務完成"""
-        self.logger.info(f"Analysis completed: video={video_id}, duration={duration:.2f}s")
+        self.logger.info(f"Analysis completed: video={video_id}, duration={duration:.2f}s",
+                         extra={"video_id": video_id, "duration": round(duration, 3)})
     
     def websocket_connected(self, video_id: str):
         """記錄 WebSocket 連接"""
-        self.logger.info(f"WebSocket connected: {video_id}")
+        self.logger.info(f"WebSocket connected: {video_id}", extra={"video_id": video_id})
     
     def websocket_disconnected(self, video_id: str):
         """記錄 WebSocket 斷開"""
-        self.logger.info(f"WebSocket disconnected: {video_id}")
+        self.logger.info(f"WebSocket disconnected: {video_id}", extra={"video_id": video_id})
+    
+    def info(self, message: str, **fields):
+        """記錄一般信息（fields 為結構化欄位）"""
+        self.logger.info(message, extra=fields)
+    
+    def debug(self, message: str, **fields):
+        """記錄調試信息"""
+        self.logger.debug(message, extra=fields)
     
-    def error(self, message: str, exc_info: bool = False):
+    def warning(self, message: str, **fields):
+        """記錄警告"""
+        self.logger.warning(message, extra=fields)
+    
+    def error(self, message: str, exc_info: bool = False, **fields):
         """記錄錯誤"""
-        self.logger.error(message, exc_info=exc_info)
-
+        self.logger.error(message, exc_info=exc_info, extra=fields)
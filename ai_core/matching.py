@@ -0,0 +1,154 @@
+"""
+排球分析系統 - 邊界框匹配
+以 NumPy 陣列向量化計算成對 IoU / 中心距離矩陣，以及動作與球員的一對一匹配
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:  # scipy 隨 norfair 安裝，缺失時退回貪心匹配
+    SCIPY_AVAILABLE = False
+
+
+def as_boxes(boxes) -> np.ndarray:
+    """把 [x1, y1, x2, y2] 列表轉成 (n, 4) float64 陣列"""
+    arr = np.asarray(boxes, dtype=np.float64)
+    return arr.reshape(-1, 4)
+
+
+def box_iou_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """
+    計算兩組邊界框的成對 IoU
+
+    Args:
+        boxes_a: (n, 4) 邊界框 [x1, y1, x2, y2]
+        boxes_b: (m, 4) 邊界框
+
+    Returns:
+        (n, m) IoU 矩陣（與 VolleyballAnalyzer._iou 相同，分母加 1e-6）
+    """
+    a = as_boxes(boxes_a)
+    b = as_boxes(boxes_b)
+    inter_w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def box_centers(boxes) -> np.ndarray:
+    """邊界框中心點 (n, 2)"""
+    b = as_boxes(boxes)
+    return np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2], axis=1)
+
+
+def center_distance_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """
+    計算兩組邊界框中心點的成對歐氏距離
+
+    Returns:
+        (n, m) 距離矩陣
+    """
+    diff = box_centers(boxes_a)[:, None, :] - box_centers(boxes_b)[None, :, :]
+    return np.sqrt((diff ** 2).sum(axis=2))
+
+
+def greedy_assignment(score: np.ndarray) -> List[tuple]:
+    """
+    貪心匹配：按分數從高到低取互不衝突的 (行, 列)，只取分數 > 0 的配對
+    """
+    rows, cols = np.nonzero(score > 0)
+    order = np.argsort(-score[rows, cols], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def linear_assignment(score: np.ndarray, optimal: bool = True) -> List[tuple]:
+    """
+    分數矩陣上的一對一匹配，只返回分數 > 0 的 (行, 列) 配對
+
+    Args:
+        score: (n, m) 分數矩陣，0 表示不可匹配
+        optimal: True 時用匈牙利演算法最大化總分數（需要 scipy），否則貪心
+    """
+    if score.size == 0:
+        return []
+    if optimal and SCIPY_AVAILABLE:
+        rows, cols = linear_sum_assignment(score, maximize=True)
+        return [(int(r), int(c)) for r, c in zip(rows, cols) if score[r, c] > 0]
+    return greedy_assignment(score)
+
+
+def action_player_scores(action_boxes, player_boxes, iou_threshold: float = 0.05,
+                         distance_factor: float = 1.5) -> np.ndarray:
+    """
+    動作框與球員框的匹配分數矩陣
+
+    - IoU > iou_threshold：分數 1 + IoU（重疊匹配永遠優先於距離匹配）
+    - 否則中心距離 < 動作框對角線 x distance_factor：分數 1 - 距離 / 上限，落在 (0, 1]
+    - 其餘為 0（不可匹配）
+
+    Returns:
+        (n_actions, n_players) 分數矩陣
+    """
+    actions = as_boxes(action_boxes)
+    iou = box_iou_matrix(actions, player_boxes)
+    dist = center_distance_matrix(actions, player_boxes)
+    diagonal = np.hypot(actions[:, 2] - actions[:, 0], actions[:, 3] - actions[:, 1])
+    limit = (diagonal * distance_factor)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 下限 1e-9：剛好在上限內的球員也保持可匹配
+        near = np.where(dist < limit, np.maximum(1.0 - dist / limit, 1e-9), 0.0)
+    return np.where(iou > iou_threshold, 1.0 + iou, near)
+
+
+def assign_actions(action_boxes, player_boxes, iou_threshold: float = 0.05,
+                   distance_factor: float = 1.5, optimal: bool = True) -> List[Optional[int]]:
+    """
+    同一幀的動作框與球員框一對一匹配（每個球員最多分配一個動作）
+
+    Args:
+        action_boxes: (n, 4) 動作邊界框
+        player_boxes: (m, 4) 球員邊界框
+        iou_threshold: IoU 匹配閾值
+        distance_factor: 距離匹配上限（動作框對角線的倍數）
+        optimal: True 時用匈牙利演算法最大化總分數（需要 scipy），否則貪心
+
+    Returns:
+        每個動作匹配到的球員索引，無匹配為 None
+    """
+    n = len(action_boxes)
+    if n == 0 or len(player_boxes) == 0:
+        return [None] * n
+    score = action_player_scores(action_boxes, player_boxes, iou_threshold, distance_factor)
+    pairs = linear_assignment(score, optimal)
+    assigned: List[Optional[int]] = [None] * n
+    for r, c in pairs:
+        assigned[r] = c
+    return assigned
+
+
+def best_match(box: Sequence[float], player_boxes, iou_threshold: float = 0.05,
+               distance_factor: float = 1.5) -> Optional[int]:
+    """
+    單個動作框的最佳球員索引（不考慮其他動作的佔用）
+
+    IoU 最大且 > iou_threshold 的球員優先，否則取距離上限內最近的球員。
+    """
+    if len(player_boxes) == 0:
+        return None
+    score = action_player_scores([box], player_boxes, iou_threshold, distance_factor)[0]
+    idx = int(np.argmax(score))
+    return idx if score[idx] > 0 else None
@@ -0,0 +1,404 @@
+"""
+排球分析系統 - 監控指標
+不依賴 prometheus_client 的最小實現：Counter / Gauge / Histogram（可帶標籤），輸出 Prometheus 文本格式，
+以及後端和 Celery worker 共用的分析流程指標
+"""
+
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    """指標基類：按標籤值保存子指標"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """取得（必要時建立）指定標籤值的子指標"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        """移除指定標籤值的子指標（如已結束的任務）"""
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def _samples(self, key: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._samples(key, child))
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("計數器只能增加")
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """只增不減的計數器（名稱以 _total 結尾）"""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self, key, child) -> List[str]:
+        return [f"{self.name}{_label_text(list(zip(self.labelnames, key)))} {_format_value(child.value)}"]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self._lock = lock
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """輸出時調用 function 取值（如 RSS、隊列長度）"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Gauge(_Metric):
+    """可增可減的數值"""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def _samples(self, key, child) -> List[str]:
+        return [f"{self.name}{_label_text(list(zip(self.labelnames, key)))} {_format_value(child.get())}"]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...], lock: threading.Lock):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最後一格為 +Inf
+        self.sum = 0.0
+        self._lock = lock
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def observe_many(self, values):
+        """一次加入多個觀測值（如一段影片每幀的階段耗時）"""
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        if not len(values):
+            return
+        counts = np.bincount(np.searchsorted(self.bounds, values, side="left"), minlength=len(self.counts))
+        with self._lock:
+            for i, count in enumerate(counts.tolist()):
+                self.counts[i] += count
+            self.sum += float(values.sum())
+
+
+class Histogram(_Metric):
+    """分桶直方圖（輸出累積計數、總和與次數）"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds, self._lock)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def observe_many(self, values):
+        self.labels().observe_many(values)
+
+    def _samples(self, key, child) -> List[str]:
+        pairs = list(zip(self.labelnames, key))
+        with self._lock:
+            counts, total = list(child.counts), child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_label_text(pairs + [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(pairs)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_label_text(pairs)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指標註冊表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指標已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def process_rss_bytes() -> float:
+    """當前進程的常駐記憶體（psutil 可用時使用，否則讀取 /proc，最後退回峰值 RSS）"""
+    try:
+        import psutil
+        return float(psutil.Process().memory_info().rss)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return float(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, IndexError):
+        import resource
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int, host: str = "0.0.0.0",
+                         max_tries: int = 1) -> Tuple[ThreadingHTTPServer, int]:
+    """
+    在背景執行緒中提供 /metrics（供沒有 Web 服務的進程使用，如 Celery worker）
+
+    Args:
+        registry: 指標註冊表
+        port: 起始端口（0 表示由系統分配）
+        host: 綁定地址
+        max_tries: 端口被佔用時依次嘗試的端口數（多個 worker 子進程各自綁定一個端口）
+
+    Returns:
+        (server, 實際綁定的端口)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    error = None
+    for offset in range(max(1, max_tries)):
+        try:
+            server = ThreadingHTTPServer((host, port + offset if port else 0), Handler)
+        except OSError as e:
+            error = e
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, server.server_address[1]
+    raise error
+
+
+class _JobMetrics:
+    """一個分析任務的指標更新（由 AnalysisMetrics.job 建立）"""
+
+    def __init__(self, metrics: "AnalysisMetrics", task_id: str):
+        self.metrics = metrics
+        self.task_id = task_id
+        self.started = time.perf_counter()
+
+    def progress(self, frame_count: int):
+        """更新執行中任務的處理速度"""
+        elapsed = time.perf_counter() - self.started
+        if elapsed > 0:
+            self.metrics.job_fps.labels(self.task_id).set(frame_count / elapsed)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.metrics.running.inc()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.running.dec()
+        self.metrics.job_fps.remove(self.task_id)
+        self.metrics.jobs.labels("failed" if exc_type is not None else "completed").inc()
+        return False
+
+
+class AnalysisMetrics:
+    """
+    分析流程指標（後端和 Celery worker 使用相同的名稱）
+
+    - {prefix}_analysis_queue_depth: 等待開始的分析任務數
+    - {prefix}_analysis_running: 執行中的分析任務數
+    - {prefix}_analysis_jobs_total{status}: 結束的分析任務數
+    - {prefix}_analysis_job_fps{task_id}: 執行中任務的處理速度（任務結束後移除）
+    - {prefix}_analysis_fps: 已完成任務的處理速度分布
+    - {prefix}_analysis_stage_seconds{stage}: 每幀各階段耗時分布
+    - {prefix}_model_load_seconds{model}: 模型載入耗時分布
+    - {prefix}_process_resident_memory_bytes: 進程 RSS
+    """
+
+    STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+    FPS_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 240, 480)
+    MODEL_LOAD_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, registry: MetricsRegistry, prefix: str = "volleyball"):
+        self.queue_depth = registry.gauge(f"{prefix}_analysis_queue_depth", "等待開始的分析任務數")
+        self.running = registry.gauge(f"{prefix}_analysis_running", "執行中的分析任務數")
+        self.jobs = registry.counter(f"{prefix}_analysis_jobs_total", "結束的分析任務數", ["status"])
+        self.job_fps = registry.gauge(f"{prefix}_analysis_job_fps", "執行中任務的處理速度（幀/秒）", ["task_id"])
+        self.fps = registry.histogram(f"{prefix}_analysis_fps", "已完成任務的處理速度（幀/秒）",
+                                      buckets=self.FPS_BUCKETS)
+        self.stage_seconds = registry.histogram(f"{prefix}_analysis_stage_seconds", "每幀各階段耗時（秒）",
+                                                ["stage"], buckets=self.STAGE_BUCKETS)
+        self.model_load_seconds = registry.histogram(f"{prefix}_model_load_seconds", "模型載入耗時（秒）",
+                                                     ["model"], buckets=self.MODEL_LOAD_BUCKETS)
+        self.rss = registry.gauge(f"{prefix}_process_resident_memory_bytes", "進程常駐記憶體（位元組）")
+        self.rss.set_function(process_rss_bytes)
+        # 沒有標籤的指標在第一次更新前也輸出 0
+        self.queue_depth.set(0)
+        self.running.set(0)
+
+    def job(self, task_id: str) -> _JobMetrics:
+        """with 語句包住一次分析：更新執行中任務數、即時處理速度和結束狀態"""
+        return _JobMetrics(self, task_id)
+
+    def observe_model_loads(self, load_times: Dict[str, float]):
+        """記錄模型載入耗時（VolleyballAnalyzer.model_load_times）"""
+        for model, seconds in load_times.items():
+            self.model_load_seconds.labels(model).observe(seconds)
+
+    def observe_analysis(self, profiler, results: Dict):
+        """
+        記錄一次完成的分析
+
+        Args:
+            profiler: 分析使用的 StageProfiler（None 時不記錄階段耗時）
+            results: analyze_video 的結果（使用 profile.fps）
+        """
+        if profiler is not None:
+            for stage, samples in profiler.frame_samples().items():
+                self.stage_seconds.labels(stage).observe_many(samples)
+        fps = ((results or {}).get("profile") or {}).get("fps")
+        if fps:
+            self.fps.observe(fps)
@@ -0,0 +1,205 @@
+"""
+排球分析系統 - 回合劃分
+帶遲滯的比賽狀態機，以及按幀號索引動作/得分事件，回合結束時以二分查找收集回合內的事件
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+
+
+class FrameIndex:
+    """
+    按幀號排序的事件索引
+
+    事件按完成順序加入（動作在結束後才完成，幀號大致遞增但不嚴格有序），
+    以 (幀號, 加入順序) 為鍵保持排序，區間查詢為 O(log n + k)。
+    """
+
+    def __init__(self, key: str = "frame"):
+        """
+        Args:
+            key: 事件字典中的幀號欄位
+        """
+        self.key = key
+        self._keys: List[Tuple[int, int]] = []
+        self._items: List[Dict] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: Dict):
+        """加入一個事件（幀號缺失時視為 0）"""
+        key = (item.get(self.key, 0), self._seq)
+        self._seq += 1
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+            self._items.append(item)
+        else:
+            pos = bisect_right(self._keys, key)
+            self._keys.insert(pos, key)
+            self._items.insert(pos, item)
+
+    def between(self, start_frame: int, end_frame: int) -> List[Dict]:
+        """
+        幀號在 [start_frame, end_frame] 內的事件
+
+        Returns:
+            事件列表，按加入順序排列（與逐個掃描事件列表的結果一致）
+        """
+        lo = bisect_left(self._keys, (start_frame, -1))
+        hi = bisect_right(self._keys, (end_frame, float("inf")))
+        order = sorted(range(lo, hi), key=lambda i: self._keys[i][1])
+        return [self._items[i] for i in order]
+
+
+class GameStateMachine:
+    """
+    帶遲滯的比賽狀態機（Play / No-Play）
+
+    逐幀輸入「本幀是否有球或動作」，避免單幀缺失造成狀態頻繁切換：
+    - No-Play -> Play：連續 enter_frames 幀有活動，Play 從這段活動的第一幀開始
+    - Play -> No-Play：連續超過 gap_frames 幀沒有活動，Play 在最後一個有活動的幀結束
+    - 短於 min_play_frames 的回合被丟棄，併回前後的 No-Play 狀態段
+
+    states 為遊程編碼的狀態段列表，plays 為回合列表（格式與 analyze_video 的結果一致）。
+    enter_frames=1、gap_frames=0、min_play_frames=1 時退化為逐幀切換。
+    """
+
+    def __init__(self, enter_frames: int = 3, gap_frames: int = 30, min_play_frames: int = 15):
+        """
+        Args:
+            enter_frames: 進入 Play 需要的連續活動幀數
+            gap_frames: Play 中允許的最長連續無活動幀數
+            min_play_frames: 回合的最短幀數
+        """
+        self.enter_frames = max(1, enter_frames)
+        self.gap_frames = max(0, gap_frames)
+        self.min_play_frames = max(1, min_play_frames)
+        self.states: List[Dict] = []
+        self.plays: List[Dict] = []
+        self._previous = None  # 上一幀 (frame, timestamp)
+        self._run_start = None  # 當前連續活動段第一幀的 (frame, timestamp)
+        self._before_run = None  # 連續活動段之前一幀的 (frame, timestamp)
+        self._run_length = 0
+        self._last_active = None  # 最後一個有活動的 (frame, timestamp)
+        self._after_last_active = None  # 最後一個活動幀之後第一幀的時間戳
+        self._idle = 0
+        self.discarded = 0
+
+    @property
+    def state(self):
+        """當前狀態（尚未輸入任何幀時為 None）"""
+        return self.states[-1]["state"] if self.states else None
+
+    def _append_state(self, state: str, start, end):
+        self.states.append({
+            "state": state,
+            "start_frame": int(start[0]),
+            "end_frame": int(end[0]),
+            "start_timestamp": start[1],
+            "end_timestamp": end[1]
+        })
+
+    def _enter_play(self, current):
+        """從連續活動段的第一幀開始新回合"""
+        segment = self.states[-1]
+        if segment["start_frame"] >= self._run_start[0]:
+            # 當前 No-Play 段還沒有任何幀在活動段之前，直接改為 Play
+            self.states.pop()
+        else:
+            segment["end_frame"] = int(self._before_run[0])
+            segment["end_timestamp"] = self._before_run[1]
+        self._append_state("Play", self._run_start, current)
+        self.plays.append({
+            "play_id": len(self.plays) + 1,
+            "start_frame": int(self._run_start[0]),
+            "start_timestamp": self._run_start[1],
+            "end_frame": None,  # 將在回合結束時設置
+            "end_timestamp": None,
+            "duration": None,
+            "actions": [],  # 將在回合結束時填充
+            "scores": []  # 將在回合結束時填充
+        })
+
+    def _end_play(self, current) -> List[Dict]:
+        """
+        回合在最後一個有活動的幀結束，之後的幀歸入 No-Play
+
+        Returns:
+            結束的回合（太短而被丟棄時為空列表）
+        """
+        play = self.plays[-1]
+        segment = self.states[-1]
+        end_frame, end_timestamp = self._last_active
+        if end_frame - play["start_frame"] + 1 < self.min_play_frames:
+            # 太短：丟棄回合，整段併回 No-Play
+            self.plays.pop()
+            self.states.pop()
+            self.discarded += 1
+            if self.states and self.states[-1]["state"] == "No-Play":
+                self.states[-1]["end_frame"] = int(current[0])
+                self.states[-1]["end_timestamp"] = current[1]
+            else:
+                self._append_state("No-Play", (segment["start_frame"], segment["start_timestamp"]), current)
+            return []
+        play["end_frame"] = int(end_frame)
+        play["end_timestamp"] = end_timestamp
+        play["duration"] = end_timestamp - play["start_timestamp"]
+        segment["end_frame"] = int(end_frame)
+        segment["end_timestamp"] = end_timestamp
+        if current[0] > end_frame:
+            self._append_state("No-Play", (end_frame + 1, self._after_last_active), current)
+        return [play]
+
+    def update(self, frame: int, timestamp: float, active: bool) -> List[Dict]:
+        """
+        輸入一幀
+
+        Args:
+            frame: 幀號（遞增）
+            timestamp: 時間戳（秒）
+            active: 本幀是否有球或動作
+
+        Returns:
+            本幀結束的回合
+        """
+        current = (frame, timestamp)
+        if not self.states:
+            self._append_state("No-Play", current, current)
+        else:
+            self.states[-1]["end_frame"] = int(frame)
+            self.states[-1]["end_timestamp"] = timestamp
+
+        if self._last_active is not None and self._idle == 0 and not active:
+            # 之後 No-Play 段的開始時間
+            self._after_last_active = timestamp
+        if active:
+            if self._run_length == 0:
+                self._run_start = current
+                self._before_run = self._previous
+            self._run_length += 1
+            self._last_active = current
+            self._idle = 0
+        else:
+            self._run_length = 0
+            self._idle += 1
+        self._previous = current
+
+        ended: List[Dict] = []
+        if self.state == "No-Play" and self._run_length >= self.enter_frames:
+            self._enter_play(current)
+        elif self.state == "Play" and self._idle > self.gap_frames:
+            ended = self._end_play(current)
+        return ended
+
+    def finish(self) -> List[Dict]:
+        """
+        影片結束：結束進行中的回合
+
+        Returns:
+            結束的回合
+        """
+        if self.state != "Play" or self._previous is None:
+            return []
+        return self._end_play(self._previous)
@@ -20,11 +20,29 @@ try:
     EASYOCR_AVAILABLE = True
 except ImportError:
     EASYOCR_AVAILABLE = False
-    print("⚠️  EasyOCR 未安裝，球衣號碼識別功能將不可用。安裝方式: pip install easyocr")
 
 # 添加項目根目錄到路徑
 sys.path.append(str(Path(__file__).parent.parent))
 
+from analytics import build_summary, HeatmapCube, heatmap_path_for, summary_path_for
+from trajectory import (
+    parabola_outlier_scores, outlier_threshold, BallTrajectory,
+    velocity_filter, smooth_trajectory, interpolate_gaps, BallKalmanTracker
+)
+from matching import box_iou_matrix, center_distance_matrix, assign_actions, best_match
+from tracking import ByteTracker
+from backends import DetectorBackend
+from profiling import StageProfiler, NullProfiler, runtime_environment
+from plays import FrameIndex, GameStateMachine
+from identity import IdentityStore, OCRScheduler, JerseyRecognitionPool, JerseyResult, select_best_frames, sharpness, crop_player
+from logger import AILogger
+
+# 日誌經佇列由背景執行緒寫出，幀循環中記錄不會阻塞推理
+log = AILogger()
+
+if not EASYOCR_AVAILABLE:
+    log.warning("EasyOCR 未安裝，球衣號碼識別功能將不可用。安裝方式: pip install easyocr")
+
 class VolleyballAnalyzer:
     """排球分析器 - 整合球追蹤和動作識別"""
     
@@ -41,16 +59,16 @@ class VolleyballAnalyzer:
         # 檢查 CUDA (NVIDIA GPU)
         if torch.cuda.is_available():
             device_name = torch.cuda.get_device_name(0)
-            print(f"🚀 檢測到 NVIDIA GPU: {device_name}")
+            log.device_detected("cuda", device_name)
             return "cuda"
         
         # 檢查 MPS (Apple Silicon)
         if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-            print("🚀 檢測到 Apple Silicon MPS 加速")
+            log.device_detected("mps")
             return "mps"
         
         # 回退到 CPU
-        print("💻 使用 CPU 運算")
+        log.device_detected("cpu")
         return "cpu"
     
     def __init__(self, 
@@ -58,7 +76,20 @@ class VolleyballAnalyzer:
                  action_model_path: str = None,
                  player_model_path: str = None,
                  jersey_number_model_path: str = None,
-                 device: str = None):
+                 device: str = None,
+                 online_ball_filter: bool = True,
+                 ball_post_filter: bool = True,
+                 ocr_interval: int = 5,
+                 ocr_frame_budget: int = 3,
+                 async_jersey_workers: int = 0,
+                 jersey_post_pass: bool = False,
+                 jersey_post_pass_k: int = 3,
+                 tracker: str = "norfair",
+                 play_enter_seconds: float = 0.1,
+                 play_gap_seconds: float = 1.0,
+                 min_play_seconds: float = 0.5,
+                 detector_backend: DetectorBackend = None,
+                 profile_stages: bool = True):
         """
         初始化分析器
         
@@ -68,18 +99,45 @@ class VolleyballAnalyzer:
             player_model_path: 球員偵測模型路徑 (YOLO格式)
             jersey_number_model_path: 球衣號碼檢測模型路徑 (YOLO格式)
             device: 運行設備 ('cpu', 'cuda', 'mps')，設為 None 時自動檢測最佳設備
+            online_ball_filter: 在逐幀循環中使用卡爾曼濾波器即時過濾球軌跡
+            ball_post_filter: 分析結束後對整段球軌跡執行過濾/平滑/插值後處理
+            ocr_interval: 每個追蹤的球衣號碼識別間隔（幀），投票穩定後自動退避
+            ocr_frame_budget: 每幀最多執行的球衣號碼識別次數
+            async_jersey_workers: 非同步球衣號碼識別的工作執行緒數，0 表示在幀循環中同步識別
+            jersey_post_pass: 不在幀循環中識別球衣號碼，改為分析結束後只在每個追蹤的最佳幀上識別
+            jersey_post_pass_k: 最佳幀後處理中每個追蹤識別的幀數
+            tracker: 球員追蹤器，"norfair" 或 "bytetrack"（向量化 IoU + 卡爾曼追蹤器）
+            play_enter_seconds: 連續有球/動作多久後進入 Play 狀態
+            play_gap_seconds: Play 狀態中允許的最長無球/動作時間，超過後回合結束
+            min_play_seconds: 回合的最短時長，更短的回合被丟棄
+            detector_backend: 檢測後端（如 SyntheticBackend / ReplayBackend），設置後球/球員/動作/球衣號碼
+                檢測都由後端提供，不需要模型文件
+            profile_stages: 記錄各階段耗時並寫入結果的 profile 欄位（每次階段調用約 1 微秒開銷）
         """
+        if tracker not in ("norfair", "bytetrack"):
+            raise ValueError(f"不支持的追蹤器: {tracker}")
+
         # 自動檢測最佳設備（如果未指定）
         if device is None:
             self.device = self.get_optimal_device()
         else:
             self.device = device
-            print(f"📱 使用指定設備: {self.device}")
+            log.info(f"使用指定設備: {self.device}", device=self.device)
         
         self.ball_model = None
         self.action_model = None
         self.player_model = None
         self.jersey_number_yolo_model = None  # YOLOv8 球衣號碼檢測模型
+        self.model_load_times: Dict[str, float] = {}  # 模型名稱 -> 載入耗時（秒），用於監控指標
+        
+        # 球軌跡過濾方式：在線卡爾曼濾波 和/或 分析結束後的整段後處理
+        self.online_ball_filter = online_ball_filter
+        # 比賽狀態機參數（秒）
+        self.play_enter_seconds = play_enter_seconds
+        self.play_gap_seconds = play_gap_seconds
+        self.min_play_seconds = min_play_seconds
+        self.ball_post_filter = ball_post_filter
+        self.ball_tracker = BallKalmanTracker()
         
         # 載入球追蹤模型
         if ball_model_path and os.path.exists(ball_model_path):
@@ -102,61 +160,94 @@ class VolleyballAnalyzer:
         # - 增加 distance_threshold：允許更大的距離變化（玩家移動）
         # - 增加 hit_counter_max：需要更多次檢測才認為追蹤穩定
         # - 增加 initialization_delay：延遲初始化，減少短暫誤檢測
-        self.tracker = norfair.Tracker(
-            distance_function="euclidean",  # 使用 euclidean 距離函數（與 volleyball_analytics-main 一致）
-            distance_threshold=100,  # 增加到100像素，允許更大的移動範圍
-            initialization_delay=3,  # 增加到3幀，減少短暫誤檢測
-            hit_counter_max=15  # 增加到15，需要更多連續檢測才認為追蹤穩定
-        )
+        self.tracker_type = tracker
+        self.player_conf_threshold = 0.5  # 球員檢測最低置信度
+        if tracker == "bytetrack":
+            # 與 norfair 配置對應：3 幀確認，最多 15 幀未匹配；保留低置信度檢測供第二階段匹配
+            self.tracker = ByteTracker(high_thresh=0.5, min_hits=3, max_age=15)
+            self.player_conf_threshold = self.tracker.low_thresh
+        else:
+            self.tracker = norfair.Tracker(
+                distance_function="euclidean",  # 使用 euclidean 距離函數（與 volleyball_analytics-main 一致）
+                distance_threshold=100,  # 增加到100像素，允許更大的移動範圍
+                initialization_delay=3,  # 增加到3幀，減少短暫誤檢測
+                hit_counter_max=15  # 增加到15，需要更多連續檢測才認為追蹤穩定
+            )
         
         # 球衣號碼OCR相關
         self.jersey_number_model = None  # EasyOCR 模型（備選方案）
-        self.jersey_number_cache = {}  # 緩存 (track_id, bbox) -> jersey_number
-        self.jersey_to_stable_id = {}  # 球衣號碼 -> 穩定ID映射
-        self.jersey_to_track_ids = {}  # 球衣號碼 -> [track_ids] 映射（用於追蹤穩定性）
+        # 身份相關的緩存和映射都由有界的 IdentityStore 持有（按追蹤 LRU/TTL 淘汰），以下為其容器的別名
+        self.identity_store = IdentityStore()
+        self.jersey_number_cache = self.identity_store.jersey_cache  # 緩存 track_id -> 最近識別的 jersey_number
+        self.jersey_to_stable_id = self.identity_store.jersey_to_stable_id  # 球衣號碼 -> 穩定ID映射
+        self.jersey_to_track_ids = self.identity_store.jersey_to_track_ids  # 球衣號碼 -> [track_ids] 映射（用於追蹤穩定性）
         self.next_stable_id = 1  # 下一個穩定ID
-        self.track_id_to_jersey_history = {}  # 追蹤ID -> [jersey_numbers] 歷史記錄（用於多幀融合）
+        self.track_id_to_jersey_history = self.identity_store.histories  # 追蹤ID -> [jersey_numbers] 歷史記錄（用於多幀融合）
+        self.ocr_scheduler = OCRScheduler(base_interval=ocr_interval, frame_budget=ocr_frame_budget)
+        self._batched_jersey_numbers: Dict[int, Optional[int]] = {}  # 本幀批量檢測的結果 track_id -> 號碼
+        # 非同步識別：識別在工作執行緒中進行，結果在之後的幀折算成投票
+        self.jersey_pool = None
+        if async_jersey_workers > 0:
+            self.jersey_pool = JerseyRecognitionPool(self._recognize_jersey_number, max_workers=async_jersey_workers)
+        self.jersey_post_pass = jersey_post_pass
+        self.jersey_post_pass_k = jersey_post_pass_k
         
         # 球追蹤緩衝區（VballNet 需要 9 幀序列輸入）
         self.ball_frame_buffer: List[np.ndarray] = []
+        
+        # 可替換的檢測後端，_frame_idx 為 analyze_video 當前處理的幀號
+        self.detector_backend = detector_backend
+        self._frame_idx = 0
+        
+        # 分段計時器（analyze_video 執行期間有效，未啟用時不計時）
+        self.profile_stages = profile_stages
+        self.profiler = NullProfiler()
     
     def load_ball_model(self, model_path: str):
         """載入球追蹤模型 (ONNX)"""
         try:
+            start = time.perf_counter()
             self.ball_model = ort.InferenceSession(model_path)
-            print(f"✅ 球追蹤模型載入成功: {model_path}")
+            self.model_load_times["ball"] = time.perf_counter() - start
+            log.model_loaded("ball", model_path)
         except Exception as e:
-            print(f"❌ 球追蹤模型載入失敗: {e}")
+            log.model_failed("ball", str(e))
             self.ball_model = None
     
     def load_action_model(self, model_path: str):
         """載入動作識別模型 (YOLO)"""
         try:
+            start = time.perf_counter()
             self.action_model = YOLO(model_path)
-            print(f"✅ 動作識別模型載入成功: {model_path}")
+            self.model_load_times["action"] = time.perf_counter() - start
+            log.model_loaded("action", model_path)
         except Exception as e:
-            print(f"❌ 動作識別模型載入失敗: {e}")
+            log.model_failed("action", str(e))
             self.action_model = None
 
     def load_player_model(self, model_path: str):
         """載入球員偵測模型 (YOLOv8/YOLO 系列 .pt)"""
         try:
+            start = time.perf_counter()
             self.player_model = YOLO(model_path)
-            print(f"✅ 球員偵測模型載入成功: {model_path}")
+            self.model_load_times["player"] = time.perf_counter() - start
+            log.model_loaded("player", model_path)
         except Exception as e:
-            print(f"❌ 球員偵測模型載入失敗: {e}")
+            log.model_failed("player", str(e))
             self.player_model = None
     
     def load_jersey_number_model(self, model_path: str):
         """載入球衣號碼檢測模型 (YOLOv8)"""
         try:
+            start = time.perf_counter()
             self.jersey_number_yolo_model = YOLO(model_path)
-            print(f"✅ 球衣號碼檢測模型載入成功: {model_path}")
+            self.model_load_times["jersey_number"] = time.perf_counter() - start
+            log.model_loaded("jersey_number", model_path)
             # 打印模型類別信息（用於調試）
             if hasattr(self.jersey_number_yolo_model, 'names'):
-                print(f"   模型類別: {self.jersey_number_yolo_model.names}")
+                log.debug(f"球衣號碼模型類別: {self.jersey_number_yolo_model.names}")
         except Exception as e:
-            print(f"❌ 球衣號碼檢測模型載入失敗: {e}")
+            log.model_failed("jersey_number", str(e))
             self.jersey_number_yolo_model = None
     
     def detect_ball(self, frame: np.ndarray) -> Optional[Dict]:
@@ -170,6 +261,9 @@ class VolleyballAnalyzer:
         Returns:
             球的位置信息或None
         """
+        if self.detector_backend is not None:
+            return self.detector_backend.detect_ball(frame, self._frame_idx)
+        
         # 優先使用VballNet ONNX模型
         if self.ball_model is not None:
             try:
@@ -208,10 +302,8 @@ class VolleyballAnalyzer:
                 if ball_info and ball_info.get('confidence', 0) > 0.2:  # 降低閾值到0.2
                     return ball_info
             except Exception as e:
-                # 如果ONNX模型失敗，嘗試YOLO
-                if not hasattr(self, '_ball_onnx_error_logged'):
-                    print(f"ONNX球檢測錯誤，嘗試YOLO: {e}")
-                    self._ball_onnx_error_logged = True
+                # 如果ONNX模型失敗，嘗試YOLO（每幀重複的錯誤由日誌限流）
+                log.warning(f"ONNX球檢測錯誤，嘗試YOLO: {e}", frame=self._frame_idx)
         
         # 備選方案：使用YOLO檢測"sports ball"
         if self.player_model is not None:
@@ -255,6 +347,8 @@ class VolleyballAnalyzer:
         Returns:
             動作檢測結果列表
         """
+        if self.detector_backend is not None:
+            return self.detector_backend.detect_actions(frame, self._frame_idx)
         if self.action_model is None:
             return []
         
@@ -295,7 +389,7 @@ class VolleyballAnalyzer:
             return actions
             
         except Exception as e:
-            print(f"動作檢測錯誤: {e}")
+            log.error(f"動作檢測錯誤: {e}", frame=self._frame_idx)
             return []
 
     def detect_players(self, frame: np.ndarray) -> List[Dict]:
@@ -303,6 +397,9 @@ class VolleyballAnalyzer:
         偵測球員框 (目標為人/球員)
         Returns: 每個偵測包含 {bbox, confidence, class_id, label}
         """
+        if self.detector_backend is not None:
+            return [p for p in self.detector_backend.detect_players(frame, self._frame_idx)
+                    if p["confidence"] >= self.player_conf_threshold]
         if self.player_model is None:
             return []
         try:
@@ -317,8 +414,8 @@ class VolleyballAnalyzer:
                         x1, y1, x2, y2 = float(xyxy[0]), float(xyxy[1]), float(xyxy[2]), float(xyxy[3])
                         confidence = float(box.conf[0].cpu().numpy())
                         
-                        # 只保留置信度 >= 0.5 的球員檢測
-                        if confidence < 0.5:
+                        # 只保留置信度 >= player_conf_threshold 的球員檢測（norfair 為 0.5，bytetrack 保留低置信度檢測）
+                        if confidence < self.player_conf_threshold:
                             continue
                         
                         class_id = int(box.cls[0].cpu().numpy()) if box.cls is not None else 0
@@ -336,9 +433,7 @@ class VolleyballAnalyzer:
                         })
             return players
         except Exception as e:
-            print(f"球員偵測錯誤: {e}")
-            import traceback
-            traceback.print_exc()
+            log.error(f"球員偵測錯誤: {e}", exc_info=True, frame=self._frame_idx)
             return []
     
     def preprocess_ball_frame(self, frame: np.ndarray) -> np.ndarray:
@@ -434,31 +529,17 @@ class VolleyballAnalyzer:
             return None
             
         except Exception as e:
-            # 添加錯誤輸出以便調試
-            if not hasattr(self, '_ball_error_count'):
-                self._ball_error_count = 0
-            if self._ball_error_count < 3:
-                print(f"球檢測後處理錯誤: {e}")
-                import traceback
-                traceback.print_exc()
-                self._ball_error_count += 1
+            # 添加錯誤輸出以便調試（每幀重複的錯誤由日誌限流）
+            log.error(f"球檢測後處理錯誤: {e}", exc_info=True, frame=self._frame_idx)
             return None
     
-    def track_players(self, players, frame: Optional[np.ndarray] = None):
+    def _track_players_norfair(self, players) -> List[Dict]:
         """
-        追蹤球員 - 使用 bbox 模式（類似 volleyball_analytics-main）
-        players = [{bbox:..., confidence:...}]
-        
-        使用 bbox 的兩個點（左上角和右下角）來創建 norfair Detection
-        這樣可以使用 IOU 距離函數來追蹤，更準確地保留 bbox 信息
+        norfair 追蹤：使用 bbox 的兩個點（左上角和右下角）創建 Detection，並從追蹤對象恢復原始 bbox
         
-        Args:
-            players: 檢測到的玩家列表
-            frame: 當前幀圖像（用於球衣號碼OCR，可選）
+        Returns:
+            追蹤結果列表（stable_id / jersey_number 由 track_players 填入）
         """
-        if not players:
-            return []
-        
         norfair_dets = []
         
         for idx, d in enumerate(players):
@@ -489,7 +570,7 @@ class VolleyballAnalyzer:
         
         tracked = self.tracker.update(norfair_dets)
         output = []
-        
+        player_boxes = None  # 延遲建立的本幀檢測框陣列 (n, 4)
         for t in tracked:
             est = t.estimate  # estimate 應該是 bbox 的兩個點 [[x1, y1], [x2, y2]]
             
@@ -562,23 +643,25 @@ class VolleyballAnalyzer:
                 except:
                     est_cx = est_cy = 0.0
                 
-                for p in players:
-                    p_bbox = p['bbox']
-                    p_cx = (float(p_bbox[0]) + float(p_bbox[2])) / 2.0
-                    p_cy = (float(p_bbox[1]) + float(p_bbox[3])) / 2.0
-                    dist = ((est_cx - p_cx)**2 + (est_cy - p_cy)**2)**0.5
-                    
-                    # 使用 IOU 來匹配
-                    if est_arr is not None and est_arr.shape == (2, 2):
-                        est_bbox = [float(est_arr[0, 0]), float(est_arr[0, 1]), float(est_arr[1, 0]), float(est_arr[1, 1])]
-                        iou = self._iou(est_bbox, p_bbox)
-                        if iou > min_iou:
-                            min_iou = iou
-                            closest_player = p
-                    elif dist < 100:  # 100像素閾值
-                        if closest_player is None or dist < min_iou:
-                            min_iou = dist
-                            closest_player = p
+                # 本幀檢測框只轉換一次，對所有球員一次計算 IOU / 距離
+                if player_boxes is None:
+                    player_boxes = np.array([p['bbox'] for p in players], dtype=np.float64)
+                
+                # 使用 IOU 來匹配
+                if est_arr is not None and est_arr.shape == (2, 2):
+                    est_bbox = [float(est_arr[0, 0]), float(est_arr[0, 1]), float(est_arr[1, 0]), float(est_arr[1, 1])]
+                    ious = box_iou_matrix([est_bbox], player_boxes)[0]
+                    best = int(np.argmax(ious))
+                    if ious[best] > min_iou:
+                        min_iou = float(ious[best])
+                        closest_player = players[best]
+                else:
+                    est_point = [est_cx, est_cy, est_cx, est_cy]
+                    dists = center_distance_matrix([est_point], player_boxes)[0]
+                    best = int(np.argmin(dists))
+                    if dists[best] < 100:  # 100像素閾值
+                        min_iou = float(dists[best])
+                        closest_player = players[best]
                 
                 if closest_player and min_iou > 0.1:  # IOU 閾值或距離閾值
                     bbox_to_use = closest_player['bbox']
@@ -621,25 +704,113 @@ class VolleyballAnalyzer:
             else:
                 final_bbox = [0.0, 0.0, 80.0, 160.0]
             
-            # 獲取穩定ID和球衣號碼（分開處理）
-            stable_id, jersey_num = self._get_stable_player_id(int(t.id), final_bbox, frame) if frame is not None else (int(t.id), None)
-            
             output.append({
                 'id': int(t.id),  # Norfair追蹤ID（保留用於後續處理）
-                'stable_id': stable_id,  # 穩定ID（基於球衣號碼或追蹤ID）
+                'stable_id': int(t.id),  # 穩定ID（基於球衣號碼或追蹤ID），在下方填入
                 'bbox': final_bbox,
                 'confidence': conf_to_use,
-                'jersey_number': jersey_num  # 只有OCR真正檢測到球衣號碼時才設置
+                'jersey_number': None  # 只有OCR真正檢測到球衣號碼時才設置
             })
         
         return output
     
-    def _get_stable_player_id(self, track_id: int, bbox: List[float], frame: np.ndarray) -> Tuple[int, Optional[int]]:
+    def _track_players_bytetrack(self, players) -> List[Dict]:
+        """
+        ByteTracker 追蹤：直接在 (N, 4) 檢測框陣列上匹配，輸出匹配到的原始檢測框
+        
+        Returns:
+            追蹤結果列表（stable_id / jersey_number 由 track_players 填入）
+        """
+        boxes = [p['bbox'] for p in players or []]
+        scores = [p['confidence'] for p in players or []]
+        return [
+            {
+                'id': t.track_id,
+                'stable_id': t.track_id,
+                'bbox': [float(v) for v in t.bbox],
+                'confidence': t.confidence,
+                'jersey_number': None
+            }
+            for t in self.tracker.update(boxes, scores)
+        ]
+    
+    def track_players(self, players, frame: Optional[np.ndarray] = None):
+        """
+        追蹤球員 - 使用 bbox 模式（類似 volleyball_analytics-main）
+        players = [{bbox:..., confidence:...}]
+        
+        追蹤器由構造參數 tracker 選擇：
+        - norfair：使用 bbox 的兩個點（左上角和右下角）來創建 norfair Detection
+        - bytetrack：向量化的 IoU + 卡爾曼追蹤器，高/低置信度檢測兩階段匹配
+        
+        Args:
+            players: 檢測到的玩家列表
+            frame: 當前幀圖像（用於球衣號碼OCR，可選）
+        """
+        with self.profiler.stage("track"):
+            if self.tracker_type == "bytetrack":
+                # 沒有檢測的幀也要更新，讓追蹤器累計未匹配幀數
+                output = self._track_players_bytetrack(players)
+            elif players:
+                output = self._track_players_norfair(players)
+            else:
+                output = []
+            
+            # 更新存活追蹤，淘汰長時間消失的追蹤的身份記錄（沒有球員的幀也推進，TTL 按影片幀號計；
+            # 不在 analyze_video 中時 _frame_idx 為 0，按調用次數計）
+            self.identity_store.touch((p['id'] for p in output), frame=self._frame_idx or None)
+        
+        with self.profiler.stage("ocr"):
+            # 非同步識別：先折算已完成的識別結果
+            if self.jersey_pool is not None:
+                self._fold_jersey_results(self.jersey_pool.collect())
+        
+            # 球衣號碼識別調度：按追蹤的識別間隔和每幀預算選出本幀要識別的追蹤
+            # 啟用最佳幀後處理時幀循環中不識別
+            ocr_tracks = set()
+            if frame is not None and output and not self.jersey_post_pass:
+                ocr_tracks = set(self.ocr_scheduler.plan([p['id'] for p in output], self.track_id_to_jersey_history))
+        
+            # 非同步識別：提交任務後不在本幀等待結果
+            if ocr_tracks and self.jersey_pool is not None:
+                for p in output:
+                    if p['id'] in ocr_tracks:
+                        if self.jersey_pool.submit(p['id'], self._frame_idx, frame, p['bbox']):
+                            self.ocr_scheduler.record(p['id'], self.track_id_to_jersey_history.get(p['id']))
+                ocr_tracks = set()
+        
+            # 本幀要識別的追蹤一次批量送入球衣號碼模型
+            if ocr_tracks and self.jersey_number_yolo_model is not None:
+                self._batched_jersey_numbers = self._detect_jersey_numbers_batch(
+                    frame, [(p['id'], p['bbox']) for p in output if p['id'] in ocr_tracks]
+                )
+        
+            # 獲取穩定ID和球衣號碼（分開處理）
+            for p in output:
+                if frame is not None:
+                    stable_id, jersey_num = self._get_stable_player_id(p['id'], p['bbox'], frame,
+                                                                       run_ocr=p['id'] in ocr_tracks)
+                else:
+                    stable_id, jersey_num = (p['id'], None)
+                p['stable_id'] = stable_id
+                p['jersey_number'] = jersey_num
+            self._batched_jersey_numbers = {}
+        
+        return output
+    
+    def _get_stable_player_id(self, track_id: int, bbox: List[float], frame: np.ndarray,
+                              run_ocr: bool = True) -> Tuple[int, Optional[int]]:
         """
         獲取穩定的玩家ID和球衣號碼（分開返回）
         
         改善追蹤穩定性：當檢測到相同的球衣號碼時，即使 track_id 改變，也使用相同的 stable_id
         
+        Args:
+            track_id: 追蹤ID
+            bbox: 玩家邊界框
+            frame: 當前幀圖像
+            run_ocr: 本幀是否對這個追蹤執行球衣號碼識別（由 OCRScheduler 決定）
+        
         Returns:
             (stable_id, jersey_number): 
             - stable_id: 穩定ID（基於球衣號碼或追蹤ID）
@@ -647,19 +818,19 @@ class VolleyballAnalyzer:
         """
         jersey_num = None
         
-        # 檢查緩存
-        cache_key = (track_id, tuple(bbox))
-        if cache_key in self.jersey_number_cache:
-            jersey_num = self.jersey_number_cache[cache_key]
+        # 本幀不識別時使用該追蹤最近一次識別的號碼
+        if not run_ocr and track_id in self.jersey_number_cache:
+            jersey_num = self.jersey_number_cache[track_id]
             if jersey_num and jersey_num in self.jersey_to_stable_id:
                 return (self.jersey_to_stable_id[jersey_num], jersey_num)
         
-        # 嘗試識別球衣號碼（每5幀執行一次，提高檢測頻率）
+        # 嘗試識別球衣號碼（是否執行由 OCR 調度器按追蹤間隔和每幀預算決定）
         # 優先使用 YOLOv8 模型，如果不可用則使用 EasyOCR
-        if frame is not None and track_id % 5 == 0:  # 從每10幀改為每5幀
+        if frame is not None and run_ocr:
             jersey_num = self._detect_jersey_number(frame, bbox, track_id)
+            self.ocr_scheduler.record(track_id, self.track_id_to_jersey_history.get(track_id))
             if jersey_num:
-                self.jersey_number_cache[cache_key] = jersey_num
+                self.jersey_number_cache[track_id] = jersey_num
                 
                 # 改善追蹤穩定性：檢查這個球衣號碼是否已經被其他 track_id 使用過
                 if jersey_num in self.jersey_to_track_ids:
@@ -731,9 +902,18 @@ class VolleyballAnalyzer:
         Returns:
             球衣號碼（如果識別成功），否則None
         """
-        # 優先使用 YOLOv8 球衣號碼檢測模型
+        if self.detector_backend is not None:
+            number = self.detector_backend.detect_jersey_number(frame, bbox, self._frame_idx)
+            if number is not None and track_id is not None:
+                self._record_jersey_vote(track_id, number)
+            return number
+        
+        # 優先使用 YOLOv8 球衣號碼檢測模型（本幀已批量檢測過的追蹤直接取結果）
         if self.jersey_number_yolo_model is not None:
-            result = self._detect_jersey_number_yolo(frame, bbox, track_id)
+            if track_id in self._batched_jersey_numbers:
+                result = self._batched_jersey_numbers.pop(track_id)
+            else:
+                result = self._detect_jersey_number_yolo(frame, bbox, track_id)
             if result is not None:
                 return result
         
@@ -743,6 +923,295 @@ class VolleyballAnalyzer:
         
         return None
     
+    def _recognize_jersey_number(self, crop: np.ndarray, bbox: List[float]) -> Optional[int]:
+        """
+        識別單張球員裁剪圖的球衣號碼，不記錄投票（供非同步識別的工作執行緒調用）
+        """
+        if self.detector_backend is not None:
+            return self.detector_backend.detect_jersey_number(crop, bbox)
+        if self.jersey_number_yolo_model is not None:
+            result = self._detect_jersey_number_yolo(crop, bbox)
+            if result is not None:
+                return result
+        if EASYOCR_AVAILABLE:
+            return self._detect_jersey_number_ocr(crop, bbox)
+        return None
+    
+    def _record_jersey_vote(self, track_id: int, number: int):
+        """記錄一次球衣號碼識別到追蹤的投票歷史（只保留最近 history_size 次）"""
+        self.identity_store.record_vote(track_id, number)
+    
+    def _fold_jersey_results(self, results):
+        """
+        把非同步識別結果折算成投票，並更新球衣號碼 -> 穩定ID / 追蹤ID 映射
+        
+        Args:
+            results: JerseyRecognitionPool 返回的 JerseyResult 列表
+        """
+        for result in results:
+            if result.number is None or not 1 <= result.number <= 99:
+                continue
+            self._record_jersey_vote(result.track_id, result.number)
+            if result.number not in self.jersey_to_stable_id:
+                self.jersey_to_stable_id[result.number] = result.number
+            track_ids = self.jersey_to_track_ids.setdefault(result.number, [])
+            if result.track_id not in track_ids:
+                track_ids.append(result.track_id)
+    
+    def _backfill_stable_ids(self, players_tracking: List[Dict]) -> int:
+        """
+        按最終的投票結果回填已輸出的 players_tracking 記錄中的 stable_id / jersey_number
+        
+        Returns:
+            被修改的記錄數
+        """
+        from collections import Counter
+        resolved = {}
+        # 已被 IdentityStore 淘汰的追蹤使用淘汰時的投票結果
+        for track_id, jersey_num in self.identity_store.retired.items():
+            resolved[track_id] = (self.jersey_to_stable_id.get(jersey_num, jersey_num), jersey_num)
+        for track_id, history in self.track_id_to_jersey_history.items():
+            if history:
+                jersey_num = Counter(history).most_common(1)[0][0]
+                resolved[track_id] = (self.jersey_to_stable_id.get(jersey_num, jersey_num), jersey_num)
+        
+        updated = 0
+        for entry in players_tracking:
+            for p in entry.get("players", []):
+                identity = resolved.get(p.get("id"))
+                if identity is None:
+                    continue
+                if (p.get("stable_id"), p.get("jersey_number")) != identity:
+                    p["stable_id"], p["jersey_number"] = identity
+                    updated += 1
+        return updated
+    
+    # 最佳幀後處理：目標幀在當前位置之後且相距不超過此幀數時順序讀取，否則 seek
+    SEQUENTIAL_READ_LIMIT = 30
+    
+    def identify_jerseys_from_best_frames(self, video_path: str, players_tracking: List[Dict],
+                                          k: int = 3, candidates_per_track: int = None) -> Dict:
+        """
+        最佳幀球衣號碼識別後處理
+        
+        1. 用 players_tracking 中的 bbox 尺寸和置信度為每個追蹤預選候選幀
+        2. 按幀號順序定位到候選幀（CAP_PROP_POS_FRAMES），計算球員裁剪圖的清晰度
+        3. 每個追蹤取 尺寸 x 置信度 x 清晰度 最高的 k 張裁剪圖做識別，結果折算成投票
+        4. 回填 players_tracking 中的 stable_id / jersey_number
+        
+        識別次數從 O(幀數 x 球員數) 降為 O(追蹤數 x k)。
+        
+        Args:
+            video_path: 影片路徑
+            players_tracking: 主流程輸出的 players_tracking（會被原地回填）
+            k: 每個追蹤識別的幀數
+            candidates_per_track: 每個追蹤預選的候選幀數（預設 3k）
+            
+        Returns:
+            統計 {tracks, candidates, seeks, ocr_calls, recognized, backfilled}
+        """
+        candidates = select_best_frames(players_tracking, per_track=candidates_per_track or 3 * k)
+        stats = {"tracks": len(candidates), "candidates": 0, "seeks": 0,
+                 "ocr_calls": 0, "recognized": 0, "backfilled": 0}
+        if not candidates:
+            return stats
+        
+        # 按幀分組，順序掃描一次影片
+        by_frame: Dict[int, List] = {}
+        for track_candidates in candidates.values():
+            for candidate in track_candidates:
+                by_frame.setdefault(candidate.frame, []).append(candidate)
+        stats["candidates"] = sum(len(c) for c in by_frame.values())
+        
+        cap = self._open_capture(video_path)
+        if not cap.isOpened():
+            log.warning(f"最佳幀後處理無法打開影片: {video_path}")
+            return stats
+        
+        crops: Dict[int, List[Tuple[float, int, np.ndarray, List[float]]]] = {}
+        position = 0  # 下一次 read() 返回的幀索引（0 起算；players_tracking 的 frame 從 1 起算）
+        try:
+            for frame_number in sorted(by_frame):
+                target = frame_number - 1
+                if target < position or target - position > self.SEQUENTIAL_READ_LIMIT:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    stats["seeks"] += 1
+                else:
+                    while position < target:
+                        cap.grab()
+                        position += 1
+                ret, frame = cap.read()
+                position = target + 1
+                if not ret:
+                    continue
+                
+                for candidate in by_frame[frame_number]:
+                    crop, local_bbox = crop_player(frame, candidate.bbox)
+                    if crop.size == 0:
+                        continue
+                    quality = candidate.score * np.log1p(sharpness(crop))
+                    crops.setdefault(candidate.track_id, []).append((quality, frame_number, crop, local_bbox))
+        finally:
+            cap.release()
+        
+        # 每個追蹤只在品質最高的 k 張裁剪圖上識別
+        results = []
+        for track_id, track_crops in crops.items():
+            track_crops.sort(key=lambda c: c[0], reverse=True)
+            for _, frame_number, crop, local_bbox in track_crops[:k]:
+                number = self._recognize_jersey_number(crop, local_bbox)
+                stats["ocr_calls"] += 1
+                if number is not None:
+                    stats["recognized"] += 1
+                results.append(JerseyResult(track_id, frame_number, number))
+        
+        self._fold_jersey_results(results)
+        stats["backfilled"] = self._backfill_stable_ids(players_tracking)
+        return stats
+    
+    # 批量檢測時每個 ROI 等比縮放並填充到的正方形邊長
+    JERSEY_ROI_SIZE = 160
+    
+    def _jersey_rois(self, frame: np.ndarray, bbox: List[float]) -> List[Tuple[Dict, np.ndarray]]:
+        """
+        球衣號碼的 ROI 區域（前胸 + 後背），返回 (區域配置, 幀切片視圖)
+        """
+        x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
+        height = y2 - y1
+        width = x2 - x1
+        
+        # 定義多個 ROI 區域進行偵測
+        roi_configs = [
+            # 前胸區域（上半身 60%）
+            {
+                'name': 'front',
+                'top': max(0, y1),
+                'bottom': min(frame.shape[0], y1 + int(height * 0.6)),
+                'left': max(0, x1),
+                'right': min(frame.shape[1], x2),
+                'weight': 1.0
+            },
+            # 後背區域（稍微往下，覆蓋更大面積，因為背號通常較大）
+            {
+                'name': 'back',
+                'top': max(0, y1 + int(height * 0.1)),
+                'bottom': min(frame.shape[0], y1 + int(height * 0.7)),
+                'left': max(0, x1 - int(width * 0.05)),
+                'right': min(frame.shape[1], x2 + int(width * 0.05)),
+                'weight': 1.2  # 後背號碼通常更大更清晰，給予較高權重
+            }
+        ]
+        
+        rois = []
+        for config in roi_configs:
+            if config['bottom'] <= config['top'] or config['right'] <= config['left']:
+                continue
+            # 切片視圖即可：縮放/推理都不會修改原幀
+            roi = frame[config['top']:config['bottom'], config['left']:config['right']]
+            if roi.size == 0:
+                continue
+            rois.append((config, roi))
+        return rois
+    
+    def _letterbox_roi(self, roi: np.ndarray, size: int) -> Tuple[np.ndarray, float, int, int]:
+        """
+        等比縮放 ROI 並填充到 size x size，使整批輸入形狀一致
+        
+        Returns:
+            (填充後圖像, 縮放比例, x 偏移, y 偏移)
+        """
+        h, w = roi.shape[:2]
+        scale = size / max(h, w)
+        new_w, new_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        canvas = np.full((size, size) + roi.shape[2:], 114, dtype=roi.dtype)
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(roi, (new_w, new_h))
+        return canvas, scale, pad_x, pad_y
+    
+    def _parse_digit_detections(self, result, weight: float, scale: float = 1.0,
+                                pad_x: int = 0, pad_y: int = 0) -> List[Dict]:
+        """
+        從一個 YOLO 結果中提取數字檢測（座標換算回原始 ROI）
+        """
+        digit_detections = []
+        boxes = result.boxes
+        if boxes is None:
+            return digit_detections
+        
+        for box in boxes:
+            xyxy = box.xyxy[0].cpu().numpy()
+            conf = float(box.conf[0].cpu().numpy())
+            class_id = int(box.cls[0].cpu().numpy())
+            
+            if hasattr(self.jersey_number_yolo_model, 'names'):
+                class_name = self.jersey_number_yolo_model.names.get(class_id, str(class_id))
+            else:
+                class_name = str(class_id)
+            
+            digit = None
+            try:
+                if class_name.isdigit():
+                    digit = int(class_name)
+                elif 0 <= class_id <= 9:
+                    digit = class_id
+            except:
+                pass
+            
+            if digit is not None and 0 <= digit <= 9:
+                bx1 = (float(xyxy[0]) - pad_x) / scale
+                by1 = (float(xyxy[1]) - pad_y) / scale
+                bx2 = (float(xyxy[2]) - pad_x) / scale
+                by2 = (float(xyxy[3]) - pad_y) / scale
+                digit_detections.append({
+                    'digit': digit,
+                    'bbox': [bx1, by1, bx2, by2],
+                    'confidence': conf * weight,  # 應用區域權重
+                    'center_x': (bx1 + bx2) / 2
+                })
+        return digit_detections
+    
+    def _select_jersey_number(self, region_results: List[Dict], track_id: int = None) -> Optional[int]:
+        """
+        從多區域結果中選擇最佳號碼，並記錄到追蹤的多幀投票歷史
+        
+        Args:
+            region_results: 每個區域的 {number, confidence, region}
+            track_id: 追蹤ID（用於多幀融合）
+            
+        Returns:
+            投票後的球衣號碼，沒有結果時為 None
+        """
+        if not region_results:
+            return None
+        
+        # 按置信度排序，選擇最高的
+        best_result = max(region_results, key=lambda x: x['confidence'])
+        merged_number = best_result['number']
+        
+        # 多幀融合：記錄歷史並投票
+        if track_id is not None:
+            self._record_jersey_vote(track_id, merged_number)
+            
+            # 投票：返回最常見的號碼
+            from collections import Counter
+            counter = Counter(self.track_id_to_jersey_history[track_id])
+            if counter:
+                most_common = counter.most_common(1)[0]
+                if most_common[1] >= 1:
+                    return most_common[0]
+        
+        return merged_number
+    
+    def _region_result(self, config: Dict, digit_detections: List[Dict]) -> Optional[Dict]:
+        """合併一個區域的數字檢測，得到 {number, confidence, region}"""
+        if not digit_detections:
+            return None
+        merged_number = self._merge_digit_detections(digit_detections)
+        if merged_number is None or not 1 <= merged_number <= 99:
+            return None
+        avg_conf = sum(d['confidence'] for d in digit_detections) / len(digit_detections)
+        return {'number': merged_number, 'confidence': avg_conf, 'region': config['name']}
+    
     def _detect_jersey_number_yolo(self, frame: np.ndarray, bbox: List[float], track_id: int = None) -> Optional[int]:
         """
         使用 YOLOv8 模型檢測球衣號碼 - 多角度版本（前胸 + 後背）
@@ -756,124 +1225,76 @@ class VolleyballAnalyzer:
             球衣號碼（如果識別成功），否則None
         """
         try:
-            x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
-            height = y2 - y1
-            width = x2 - x1
-            
-            # 定義多個 ROI 區域進行偵測
-            roi_configs = [
-                # 前胸區域（上半身 60%）
-                {
-                    'name': 'front',
-                    'top': max(0, y1),
-                    'bottom': min(frame.shape[0], y1 + int(height * 0.6)),
-                    'left': max(0, x1),
-                    'right': min(frame.shape[1], x2),
-                    'weight': 1.0
-                },
-                # 後背區域（稍微往下，覆蓋更大面積，因為背號通常較大）
-                {
-                    'name': 'back',
-                    'top': max(0, y1 + int(height * 0.1)),
-                    'bottom': min(frame.shape[0], y1 + int(height * 0.7)),
-                    'left': max(0, x1 - int(width * 0.05)),
-                    'right': min(frame.shape[1], x2 + int(width * 0.05)),
-                    'weight': 1.2  # 後背號碼通常更大更清晰，給予較高權重
-                }
-            ]
-            
             # 收集所有區域的偵測結果
             all_results = []
             
-            for config in roi_configs:
-                roi_top, roi_bottom = config['top'], config['bottom']
-                roi_left, roi_right = config['left'], config['right']
-                
-                if roi_bottom <= roi_top or roi_right <= roi_left:
-                    continue
-                
-                roi = frame[roi_top:roi_bottom, roi_left:roi_right].copy()
-                
-                if roi.size == 0:
-                    continue
-                
+            for config, roi in self._jersey_rois(frame, bbox):
                 # 使用 YOLOv8 模型檢測數字
                 results = self.jersey_number_yolo_model(roi, verbose=False, conf=0.15, iou=0.4)
                 
                 digit_detections = []
                 for result in results:
-                    boxes = result.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            xyxy = box.xyxy[0].cpu().numpy()
-                            conf = float(box.conf[0].cpu().numpy())
-                            class_id = int(box.cls[0].cpu().numpy())
-                            
-                            if hasattr(self.jersey_number_yolo_model, 'names'):
-                                class_name = self.jersey_number_yolo_model.names.get(class_id, str(class_id))
-                            else:
-                                class_name = str(class_id)
-                            
-                            digit = None
-                            try:
-                                if class_name.isdigit():
-                                    digit = int(class_name)
-                                elif 0 <= class_id <= 9:
-                                    digit = class_id
-                            except:
-                                pass
-                            
-                            if digit is not None and 0 <= digit <= 9:
-                                digit_detections.append({
-                                    'digit': digit,
-                                    'bbox': [float(xyxy[0]), float(xyxy[1]), float(xyxy[2]), float(xyxy[3])],
-                                    'confidence': conf * config['weight'],  # 應用區域權重
-                                    'center_x': float((xyxy[0] + xyxy[2]) / 2)
-                                })
+                    digit_detections.extend(self._parse_digit_detections(result, config['weight']))
                 
-                if digit_detections:
-                    merged_number = self._merge_digit_detections(digit_detections)
-                    if merged_number is not None and 1 <= merged_number <= 99:
-                        avg_conf = sum(d['confidence'] for d in digit_detections) / len(digit_detections)
-                        all_results.append({
-                            'number': merged_number,
-                            'confidence': avg_conf,
-                            'region': config['name']
-                        })
+                region = self._region_result(config, digit_detections)
+                if region is not None:
+                    all_results.append(region)
             
             # 從多區域結果中選擇最佳結果
-            if all_results:
-                # 按置信度排序，選擇最高的
-                best_result = max(all_results, key=lambda x: x['confidence'])
-                merged_number = best_result['number']
-                
-                # 多幀融合：記錄歷史並投票
-                if track_id is not None:
-                    if track_id not in self.track_id_to_jersey_history:
-                        self.track_id_to_jersey_history[track_id] = []
-                    
-                    self.track_id_to_jersey_history[track_id].append(merged_number)
-                    
-                    # 只保留最近50次識別結果
-                    if len(self.track_id_to_jersey_history[track_id]) > 50:
-                        self.track_id_to_jersey_history[track_id] = self.track_id_to_jersey_history[track_id][-50:]
-                    
-                    # 投票：返回最常見的號碼
-                    from collections import Counter
-                    counter = Counter(self.track_id_to_jersey_history[track_id])
-                    if counter:
-                        most_common = counter.most_common(1)[0]
-                        if most_common[1] >= 1:
-                            return most_common[0]
-                
-                return merged_number
-            
-            return None
+            return self._select_jersey_number(all_results, track_id)
             
         except Exception as e:
             # 靜默失敗，降級到 OCR
             return None
     
+    def _detect_jersey_numbers_batch(self, frame: np.ndarray,
+                                     requests: List[Tuple[int, List[float]]]) -> Dict[int, Optional[int]]:
+        """
+        批量檢測一幀中多個球員的球衣號碼
+        
+        收集所有球員的前胸/後背 ROI，等比縮放填充到相同大小後一次送入 YOLO 模型，
+        再按 ROI 分發結果並逐區域合併數字。
+        
+        Args:
+            frame: 完整幀圖像
+            requests: [(track_id, bbox), ...]
+            
+        Returns:
+            track_id -> 球衣號碼（未識別為 None）
+        """
+        numbers: Dict[int, Optional[int]] = {track_id: None for track_id, _ in requests}
+        if self.jersey_number_yolo_model is None or not requests:
+            return numbers
+        
+        try:
+            batch = []
+            owners = []  # 每個 ROI 對應的 (track_id, 區域配置, 縮放比例, x 偏移, y 偏移)
+            for track_id, bbox in requests:
+                for config, roi in self._jersey_rois(frame, bbox):
+                    image, scale, pad_x, pad_y = self._letterbox_roi(roi, self.JERSEY_ROI_SIZE)
+                    batch.append(image)
+                    owners.append((track_id, config, scale, pad_x, pad_y))
+            
+            if not batch:
+                return numbers
+            
+            results = self.jersey_number_yolo_model(batch, verbose=False, conf=0.15, iou=0.4)
+            
+            region_results: Dict[int, List[Dict]] = {track_id: [] for track_id, _ in requests}
+            for (track_id, config, scale, pad_x, pad_y), result in zip(owners, results):
+                digits = self._parse_digit_detections(result, config['weight'], scale, pad_x, pad_y)
+                region = self._region_result(config, digits)
+                if region is not None:
+                    region_results[track_id].append(region)
+            
+            for track_id, regions in region_results.items():
+                numbers[track_id] = self._select_jersey_number(regions, track_id)
+        except Exception as e:
+            # 靜默失敗，各追蹤降級到 OCR
+            pass
+        
+        return numbers
+    
     def _merge_digit_detections(self, digit_detections: List[Dict]) -> Optional[int]:
         """
         合併多個數字檢測結果成完整號碼
@@ -998,15 +1419,9 @@ class VolleyballAnalyzer:
             
             # 多幀融合：如果提供了track_id，記錄歷史並投票
             if track_id is not None and detected_numbers:
-                if track_id not in self.track_id_to_jersey_history:
-                    self.track_id_to_jersey_history[track_id] = []
-                
-                # 記錄本次識別結果
-                self.track_id_to_jersey_history[track_id].extend(detected_numbers)
-                
-                # 只保留最近50次識別結果（避免內存過大）
-                if len(self.track_id_to_jersey_history[track_id]) > 50:
-                    self.track_id_to_jersey_history[track_id] = self.track_id_to_jersey_history[track_id][-50:]
+                # 記錄本次識別結果（IdentityStore 只保留最近的識別結果，避免內存過大）
+                for num in detected_numbers:
+                    self.identity_store.record_vote(track_id, num)
                 
                 # 投票：返回最常見的號碼（如果出現次數 >= 2）
                 from collections import Counter
@@ -1087,43 +1502,27 @@ class VolleyballAnalyzer:
 
     def assign_action_to_player(self, action_bbox, tracked_players):
         # action_bbox: [x1,y1,x2,y2]; tracked_players含id/bbox
-        if not tracked_players:
-            return None
-        
-        max_iou, player_id = 0, None
-        for p in tracked_players:
-            if 'bbox' not in p or not p['bbox']:
-                continue
-            iou = self._iou(action_bbox, p['bbox'])
-            if iou > max_iou:
-                max_iou, player_id = iou, p['id']
-        
-        # 降低 IOU 閾值到 0.05，並考慮距離（如果 IOU 低但距離近也匹配）
-        if max_iou > 0.05:
-            return player_id
+        # IOU > 0.05 時取 IOU 最大的球員，否則取中心距離小於動作框對角線 1.5 倍的最近球員
+        players = [p for p in tracked_players or [] if p.get('bbox')]
+        idx = best_match(action_bbox, [p['bbox'] for p in players])
+        return players[idx]['id'] if idx is not None else None
+    
+    def assign_actions_to_players(self, action_bboxes: List[List[float]], tracked_players: List[Dict]) -> List[Optional[int]]:
+        """
+        同一幀的所有動作一次性匹配到球員（IOU/距離矩陣 + 匈牙利匹配）
         
-        # 如果 IOU 低，嘗試基於中心點距離匹配
-        action_center = [(action_bbox[0] + action_bbox[2]) / 2, (action_bbox[1] + action_bbox[3]) / 2]
-        min_distance = float('inf')
-        closest_player_id = None
+        匹配規則與 assign_action_to_player 相同，但每個球員最多分配一個動作。
         
-        for p in tracked_players:
-            if 'bbox' not in p or not p['bbox']:
-                continue
-            player_bbox = p['bbox']
-            player_center = [(player_bbox[0] + player_bbox[2]) / 2, (player_bbox[1] + player_bbox[3]) / 2]
-            distance = ((action_center[0] - player_center[0])**2 + (action_center[1] - player_center[1])**2)**0.5
-            
-            # 計算動作框的對角線長度作為參考距離
-            action_diagonal = ((action_bbox[2] - action_bbox[0])**2 + (action_bbox[3] - action_bbox[1])**2)**0.5
-            
-            # 如果距離小於動作框對角線的1.5倍，認為是匹配的
-            if distance < action_diagonal * 1.5 and distance < min_distance:
-                min_distance = distance
-                closest_player_id = p['id']
+        Args:
+            action_bboxes: 本幀的動作邊界框
+            tracked_players: 本幀的追蹤球員（含 id/bbox）
         
-        # 返回最接近的球員ID（如果找到）
-        return closest_player_id
+        Returns:
+            每個動作對應的球員ID，無匹配為 None
+        """
+        players = [p for p in tracked_players or [] if p.get('bbox')]
+        assigned = assign_actions(action_bboxes, [p['bbox'] for p in players])
+        return [players[idx]['id'] if idx is not None else None for idx in assigned]
     
     def _filter_ball_trajectory(self, trajectory: List[Dict]) -> List[Dict]:
         """
@@ -1138,53 +1537,33 @@ class VolleyballAnalyzer:
         if len(trajectory) <= 3:
             return trajectory
         
+        return self._filter_ball_track(BallTrajectory.from_points(trajectory)).to_points()
+    
+    def _filter_ball_track(self, track: BallTrajectory) -> BallTrajectory:
+        """在陣列表示的球軌跡上執行 _filter_ball_trajectory 的各個步驟"""
+        if len(track) <= 3:
+            return track
+        
         # Step 1: 基本過濾 - 移除明顯的異常值（速度過快）
-        basic_filtered = self._basic_velocity_filter(trajectory)
+        # 放寬速度限制（排球最快可達 100 km/h，約 27 m/s）
+        # 在 1920x1080 視頻中，假設球場寬度約 800 像素 = 9m，最高速度約 2400 像素/秒
+        basic_filtered = velocity_filter(track, max_velocity=3000.0, min_confidence=0.15)
         
         if len(basic_filtered) <= 5:
             return basic_filtered
         
         # Step 2: 使用 RANSAC 風格的拋物線擬合檢測異常值
-        physics_filtered = self._physics_based_outlier_removal(basic_filtered)
+        physics_filtered = self._remove_trajectory_outliers(basic_filtered)
         
         # Step 3: 應用高斯加權平滑
-        smoothed = self._smooth_ball_trajectory(physics_filtered)
-        
-        return smoothed
+        return smooth_trajectory(physics_filtered)
     
     def _basic_velocity_filter(self, trajectory: List[Dict]) -> List[Dict]:
         """基本速度過濾 - 移除速度明顯不合理的點"""
         if len(trajectory) <= 2:
             return trajectory
         
-        filtered = [trajectory[0]]
-        
-        for i in range(1, len(trajectory)):
-            prev_point = filtered[-1] if filtered else trajectory[i - 1]
-            curr_point = trajectory[i]
-            
-            # 計算時間差
-            time_diff = curr_point.get("timestamp", 0) - prev_point.get("timestamp", 0)
-            if time_diff <= 0:
-                time_diff = 1.0 / 30.0  # 假設 30 FPS
-            
-            # 計算距離和速度
-            prev_center = prev_point.get("center", [0, 0])
-            curr_center = curr_point.get("center", [0, 0])
-            distance = ((curr_center[0] - prev_center[0])**2 + (curr_center[1] - prev_center[1])**2)**0.5
-            velocity = distance / time_diff
-            
-            # 放寬速度限制（排球最快可達 100 km/h，約 27 m/s）
-            # 在 1920x1080 視頻中，假設球場寬度約 800 像素 = 9m
-            # 最高速度約 2400 像素/秒
-            max_velocity = 3000.0  # 像素/秒（給予更大容忍度）
-            min_confidence = 0.15
-            
-            if (velocity <= max_velocity and 
-                curr_point.get("confidence", 0) >= min_confidence):
-                filtered.append(curr_point)
-        
-        return filtered
+        return velocity_filter(BallTrajectory.from_points(trajectory)).to_points()
     
     def _physics_based_outlier_removal(self, trajectory: List[Dict]) -> List[Dict]:
         """
@@ -1199,99 +1578,32 @@ class VolleyballAnalyzer:
         if len(trajectory) <= 5:
             return trajectory
         
-        # 提取座標和幀
-        frames = [p.get("frame", i) for i, p in enumerate(trajectory)]
-        centers = [p.get("center", [0, 0]) for p in trajectory]
-        x_coords = [c[0] for c in centers]
-        y_coords = [c[1] for c in centers]
+        return self._remove_trajectory_outliers(BallTrajectory.from_points(trajectory)).to_points()
+    
+    def _remove_trajectory_outliers(self, track: BallTrajectory) -> BallTrajectory:
+        """_physics_based_outlier_removal 的陣列實現"""
+        if len(track) <= 5:
+            return track
         
-        # 計算每個點的異常分數
-        outlier_scores = [0.0] * len(trajectory)
-        window_size = 7  # 使用 7 個點進行局部擬合
+        # 所有留一法窗口的拋物線擬合一次向量化求解
+        outlier_scores = parabola_outlier_scores(track.frame, track.x, track.y, window_size=7)
         
-        for i in range(len(trajectory)):
-            # 確定窗口範圍
-            start = max(0, i - window_size // 2)
-            end = min(len(trajectory), i + window_size // 2 + 1)
-            
-            if end - start < 4:
-                continue
-            
-            # 提取窗口內的點（排除當前點）
-            window_frames = []
-            window_x = []
-            window_y = []
-            
-            for j in range(start, end):
-                if j != i:
-                    window_frames.append(frames[j])
-                    window_x.append(x_coords[j])
-                    window_y.append(y_coords[j])
-            
-            if len(window_frames) < 3:
-                continue
-            
-            try:
-                # 對 x 坐標擬合一次多項式（線性運動）
-                t_normalized = np.array(window_frames) - np.mean(window_frames)
-                x_coeffs = np.polyfit(t_normalized, window_x, 1)
-                
-                # 對 y 坐標擬合二次多項式（拋物線運動）
-                y_coeffs = np.polyfit(t_normalized, window_y, 2)
-                
-                # 預測當前點的位置
-                t_curr = frames[i] - np.mean(window_frames)
-                predicted_x = np.polyval(x_coeffs, t_curr)
-                predicted_y = np.polyval(y_coeffs, t_curr)
-                
-                # 計算實際位置與預測位置的偏差
-                actual_x = x_coords[i]
-                actual_y = y_coords[i]
-                deviation = ((actual_x - predicted_x)**2 + (actual_y - predicted_y)**2)**0.5
-                
-                # 計算窗口內的平均移動距離作為參考
-                avg_distance = 0
-                for j in range(1, len(window_x)):
-                    avg_distance += ((window_x[j] - window_x[j-1])**2 + 
-                                   (window_y[j] - window_y[j-1])**2)**0.5
-                avg_distance /= max(1, len(window_x) - 1)
-                
-                # 如果偏差超過平均移動距離的 3 倍，標記為異常
-                if avg_distance > 0:
-                    outlier_scores[i] = deviation / avg_distance
-                else:
-                    outlier_scores[i] = 0
-                    
-            except Exception as e:
-                # 擬合失敗時不標記為異常
-                outlier_scores[i] = 0
-        
-        # 確定異常閾值（使用動態閾值）
-        valid_scores = [s for s in outlier_scores if s > 0]
-        if valid_scores:
-            median_score = np.median(valid_scores)
-            threshold = max(3.0, median_score * 2.5)  # 至少 3 倍偏差才算異常
-        else:
-            threshold = 3.0
+        # 確定異常閾值（使用動態閾值，至少 3 倍偏差才算異常）
+        threshold = outlier_threshold(outlier_scores)
         
         # 過濾異常點
-        filtered = []
-        removed_indices = []
-        
-        for i, point in enumerate(trajectory):
-            if outlier_scores[i] < threshold:
-                filtered.append(point)
-            else:
-                removed_indices.append(i)
-                print(f"🎯 移除異常球位置: frame={point.get('frame')}, "
-                      f"score={outlier_scores[i]:.2f}, threshold={threshold:.2f}")
+        keep = outlier_scores < threshold
+        for i in np.flatnonzero(~keep):
+            log.debug("移除異常球位置", frame=int(track.frame[i]),
+                      score=round(float(outlier_scores[i]), 2), threshold=round(float(threshold), 2))
         
         # 如果移除了太多點，可能是過度過濾，回退到原始數據
-        if len(filtered) < len(trajectory) * 0.5:
-            print(f"⚠️ 過濾移除了太多點 ({len(trajectory) - len(filtered)}/{len(trajectory)})，回退")
-            return trajectory
+        kept = int(keep.sum())
+        if kept < len(track) * 0.5:
+            log.warning(f"過濾移除了太多點 ({len(track) - kept}/{len(track)})，回退")
+            return track
         
-        return filtered
+        return track.take(np.flatnonzero(keep))
     
     def _smooth_ball_trajectory(self, trajectory: List[Dict], window_size: int = 5) -> List[Dict]:
         """
@@ -1307,60 +1619,7 @@ class VolleyballAnalyzer:
         if len(trajectory) < window_size:
             return trajectory
         
-        smoothed = []
-        half_window = window_size // 2
-        
-        for i in range(len(trajectory)):
-            # 確定窗口範圍
-            start_idx = max(0, i - half_window)
-            end_idx = min(len(trajectory), i + half_window + 1)
-            
-            # 提取窗口內的點
-            window_points = trajectory[start_idx:end_idx]
-            
-            # 計算加權平均（中心點權重最高）
-            weights = []
-            centers_x = []
-            centers_y = []
-            
-            for j, point in enumerate(window_points):
-                center = point.get("center", [0, 0])
-                # 使用高斯權重：距離中心越近權重越高
-                distance_to_center = abs(j - (i - start_idx))
-                weight = np.exp(-0.5 * (distance_to_center / (half_window + 1)) ** 2)
-                weights.append(weight)
-                centers_x.append(center[0])
-                centers_y.append(center[1])
-            
-            # 計算加權平均
-            total_weight = sum(weights)
-            if total_weight > 0:
-                smoothed_x = sum(w * x for w, x in zip(weights, centers_x)) / total_weight
-                smoothed_y = sum(w * y for w, y in zip(weights, centers_y)) / total_weight
-            else:
-                smoothed_x = trajectory[i]["center"][0]
-                smoothed_y = trajectory[i]["center"][1]
-            
-            # 創建平滑後的點（保留原始其他屬性）
-            smoothed_point = trajectory[i].copy()
-            smoothed_point["center"] = [int(smoothed_x), int(smoothed_y)]
-            
-            # 更新 bbox（如果存在）
-            if "bbox" in smoothed_point:
-                original_bbox = smoothed_point["bbox"]
-                original_center = trajectory[i]["center"]
-                dx = smoothed_x - original_center[0]
-                dy = smoothed_y - original_center[1]
-                smoothed_point["bbox"] = [
-                    original_bbox[0] + dx,
-                    original_bbox[1] + dy,
-                    original_bbox[2] + dx,
-                    original_bbox[3] + dy
-                ]
-            
-            smoothed.append(smoothed_point)
-        
-        return smoothed
+        return smooth_trajectory(BallTrajectory.from_points(trajectory), window_size).to_points()
     
     def _interpolate_missing_frames(self, trajectory: List[Dict], fps: float) -> List[Dict]:
         """
@@ -1378,112 +1637,43 @@ class VolleyballAnalyzer:
         if len(trajectory) < 2:
             return trajectory
         
-        interpolated = [trajectory[0]]
-        
-        for i in range(1, len(trajectory)):
-            prev_point = trajectory[i - 1]
-            curr_point = trajectory[i]
-            
-            prev_frame = prev_point.get("frame", 0)
-            curr_frame = curr_point.get("frame", 0)
-            
-            frame_gap = curr_frame - prev_frame
-            
-            # 如果缺失幀數不超過 15 幀，進行插值
-            if 1 < frame_gap <= 15:
-                prev_center = prev_point.get("center", [0, 0])
-                curr_center = curr_point.get("center", [0, 0])
-                
-                # 嘗試使用前一個點和後一個點來擬合拋物線
-                if i >= 2 and i < len(trajectory) - 1:
-                    # 使用 3 個點擬合拋物線
-                    p0 = trajectory[i - 2].get("center", prev_center)
-                    p1 = prev_center
-                    p2 = curr_center
-                    
-                    f0 = trajectory[i - 2].get("frame", prev_frame - 1)
-                    f1 = prev_frame
-                    f2 = curr_frame
-                    
-                    try:
-                        # 對 y 坐標擬合二次多項式
-                        frames_arr = np.array([f0, f1, f2])
-                        y_arr = np.array([p0[1], p1[1], p2[1]])
-                        y_coeffs = np.polyfit(frames_arr, y_arr, 2)
-                        
-                        # 對 x 坐標擬合線性多項式
-                        x_arr = np.array([p0[0], p1[0], p2[0]])
-                        x_coeffs = np.polyfit(frames_arr, x_arr, 1)
-                        
-                        for j in range(1, frame_gap):
-                            interp_frame = prev_frame + j
-                            interp_x = int(np.polyval(x_coeffs, interp_frame))
-                            interp_y = int(np.polyval(y_coeffs, interp_frame))
-                            interp_timestamp = prev_point.get("timestamp", 0) + (j / fps)
-                            
-                            interpolated.append({
-                                "frame": interp_frame,
-                                "timestamp": interp_timestamp,
-                                "center": [interp_x, interp_y],
-                                "confidence": 0.0,
-                                "interpolated": True,
-                                "method": "quadratic"
-                            })
-                        
-                    except Exception:
-                        # 擬合失敗，回退到線性插值
-                        for j in range(1, frame_gap):
-                            t = j / frame_gap
-                            interp_x = int(prev_center[0] + t * (curr_center[0] - prev_center[0]))
-                            interp_y = int(prev_center[1] + t * (curr_center[1] - prev_center[1]))
-                            interp_frame = prev_frame + j
-                            interp_timestamp = prev_point.get("timestamp", 0) + (j / fps)
-                            
-                            interpolated.append({
-                                "frame": interp_frame,
-                                "timestamp": interp_timestamp,
-                                "center": [interp_x, interp_y],
-                                "confidence": 0.0,
-                                "interpolated": True,
-                                "method": "linear"
-                            })
-                else:
-                    # 沒有足夠的點進行拋物線擬合，使用線性插值
-                    for j in range(1, frame_gap):
-                        t = j / frame_gap
-                        interp_x = int(prev_center[0] + t * (curr_center[0] - prev_center[0]))
-                        interp_y = int(prev_center[1] + t * (curr_center[1] - prev_center[1]))
-                        interp_frame = prev_frame + j
-                        interp_timestamp = prev_point.get("timestamp", 0) + (j / fps)
-                        
-                        interpolated.append({
-                            "frame": interp_frame,
-                            "timestamp": interp_timestamp,
-                            "center": [interp_x, interp_y],
-                            "confidence": 0.0,
-                            "interpolated": True,
-                            "method": "linear"
-                        })
-            
-            interpolated.append(curr_point)
-        
-        return interpolated
+        return interpolate_gaps(BallTrajectory.from_points(trajectory), fps).to_points()
     
-    def analyze_video(self, video_path: str, output_path: str = None, progress_callback=None) -> dict:
+    def _open_capture(self, video_path: Optional[str]):
+        """打開影片（檢測後端可以提供不讀取文件的影片來源）"""
+        if self.detector_backend is not None:
+            return self.detector_backend.open_capture(video_path)
+        return cv2.VideoCapture(video_path)
+    
+    def analyze_video(self, video_path: str, output_path: str = None, progress_callback=None,
+                      ball_callback=None, profiler: StageProfiler = None) -> dict:
         """
         分析整個影片
         
         Args:
             video_path: 輸入影片路徑
             output_path: 輸出結果路徑
+            progress_callback: 進度回調 (progress, frame_count, total_frames)
+            ball_callback: 在線過濾後的球位置回調（每個輸出點調用一次，需啟用 online_ball_filter）
+            profiler: 分段計時器（StageProfiler），記錄解碼、偵測、追蹤、識別、後處理和寫出各階段的耗時；
+                未指定且 profile_stages 為 True 時自動建立（不記錄 trace 事件）
             
         Returns:
             分析結果字典
         """
-        print(f"🎬 開始分析影片: {video_path}")
-        
+        if profiler is None and self.profile_stages:
+            profiler = StageProfiler()
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        try:
+            return self._analyze_video(video_path, output_path, progress_callback, ball_callback)
+        finally:
+            # 失敗時也要解除：重用的分析器（如工作進程中的單例）不應繼續記錄到調用者的 profiler
+            self.profiler = NullProfiler()
+    
+    def _analyze_video(self, video_path: str, output_path: str, progress_callback, ball_callback) -> dict:
+        """analyze_video 的主體（self.profiler 已設置）"""
         # 打開影片
-        cap = cv2.VideoCapture(video_path)
+        cap = self._open_capture(video_path)
         if not cap.isOpened():
             raise ValueError(f"無法打開影片: {video_path}")
         
@@ -1502,7 +1692,8 @@ class VolleyballAnalyzer:
         height_raw = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
         height = int(float(height_raw) if not isinstance(height_raw, (list, tuple, np.ndarray)) else float(height_raw[0] if len(height_raw) > 0 else 360))
         
-        print(f"📊 影片信息: {width}x{height}, {fps:.2f} FPS, {total_frames} 幀")
+        log.info(f"開始分析影片: {video_path} ({width}x{height}, {fps:.2f} FPS, {total_frames} 幀)",
+                 width=int(width), height=int(height), fps=float(fps), total_frames=int(total_frames))
         
         # 初始化結果
         results = {
@@ -1535,6 +1726,15 @@ class VolleyballAnalyzer:
             "analysis_time": time.time()
         }
         
+        # 比賽狀態機（秒數按 FPS 換算成幀數），狀態段和回合直接寫入結果
+        game_state = GameStateMachine(
+            enter_frames=max(1, round(self.play_enter_seconds * fps)),
+            gap_frames=round(self.play_gap_seconds * fps),
+            min_play_frames=max(1, round(self.min_play_seconds * fps))
+        )
+        results["game_states"] = game_state.states
+        results["plays"] = game_state.plays
+        
         frame_count = 0
         start_time = time.time()
         
@@ -1558,6 +1758,21 @@ class VolleyballAnalyzer:
         # 重置球追蹤緩衝區（每次分析新視頻時）
         self.ball_frame_buffer = []
         
+        # 在線球軌跡濾波器、OCR 調度統計和追蹤身份（每個視頻重新開始；
+        # 重用的分析器不應把上一個視頻的追蹤淘汰到本次的回填中）
+        self.ball_tracker = BallKalmanTracker()
+        self.ocr_scheduler.reset()
+        self.identity_store.reset()
+        live_trajectory: List[Dict] = []
+        # 按幀號索引已完成的動作和得分，回合結束時二分查找收集，不再每個回合掃描全部事件
+        action_index = FrameIndex()
+        score_index = FrameIndex()
+        
+        def collect_play_events(play: Dict):
+            """收集回合 [start_frame, end_frame] 內已完成的動作和得分"""
+            play["actions"].extend(action_index.between(play["start_frame"], play["end_frame"]))
+            play["scores"].extend(score_index.between(play["start_frame"], play["end_frame"]))
+        
         def finalize_action(key: Tuple[int, str], current_frame: int, current_timestamp: float):
             """完成並保存一個動作"""
             if key not in active_actions:
@@ -1580,6 +1795,7 @@ class VolleyballAnalyzer:
                     "duration": action_data["end_timestamp"] - action_data["start_timestamp"]  # 動作持續時間
                 }
                 results["action_recognition"]["actions"].append(final_action)
+                action_index.add(final_action)
                 
                 # 統計動作數量
                 if action_type not in results["action_recognition"]["action_counts"]:
@@ -1588,29 +1804,35 @@ class VolleyballAnalyzer:
                 
                 # 若此action=得分，可加score event
                 if action_type in ["score", "spike_score", "attack_score"]:
-                    results["scores"].append({
+                    score_event = {
                         "player_id": player_id,
                         "frame": action_data["start_frame"],
                         "timestamp": action_data["start_timestamp"],
                         "score_type": action_type
-                    })
+                    }
+                    results["scores"].append(score_event)
+                    score_index.add(score_event)
             
             del active_actions[key]
         
         try:
             while True:
-                ret, frame = cap.read()
+                self.profiler.begin_frame(frame_count + 1)
+                with self.profiler.stage("decode"):
+                    ret, frame = cap.read()
                 if not ret:
                     break
                 
                 frame_count += 1
+                self._frame_idx = frame_count
                 
                 # 確保 fps 是標量（在循環開始時計算一次）
                 fps_scalar = float(fps)
                 timestamp = float(frame_count) / fps_scalar
                 
                 # ----- 球員偵測 + 追蹤 -----
-                players = self.detect_players(frame)
+                with self.profiler.stage("player_detect"):
+                    players = self.detect_players(frame)
                 tracked_players = self.track_players(players, frame)  # 傳遞frame用於OCR
                 if tracked_players:
                     results["players_tracking"].append({
@@ -1621,223 +1843,235 @@ class VolleyballAnalyzer:
                     results["player_detection"]["total_players_detected"] += len(tracked_players)
 
                 # ----- 球偵測 -----
-                ball_info = self.detect_ball(frame)
-                if ball_info:
-                    results["ball_tracking"]["trajectory"].append({
-                        "frame": int(frame_count),
-                        "timestamp": timestamp,
-                        "center": ball_info["center"],
-                        "bbox": ball_info["bbox"],
-                        "confidence": ball_info["confidence"]
-                    })
-                    results["ball_tracking"]["detected_frames"] += 1
+                with self.profiler.stage("ball"):
+                    ball_info = self.detect_ball(frame)
+                    if ball_info:
+                        results["ball_tracking"]["trajectory"].append({
+                            "frame": int(frame_count),
+                            "timestamp": timestamp,
+                            "center": ball_info["center"],
+                            "bbox": ball_info["bbox"],
+                            "confidence": ball_info["confidence"]
+                        })
+                        results["ball_tracking"]["detected_frames"] += 1
+                    
+                    # 在線卡爾曼濾波：拒絕門控外的誤檢測，缺失幀以預測補齊（最多延遲 max_missed 幀輸出）
+                    if self.online_ball_filter:
+                        for point in self.ball_tracker.update(int(frame_count), timestamp, ball_info):
+                            live_trajectory.append(point)
+                            if ball_callback:
+                                try:
+                                    ball_callback(point)
+                                except Exception as e:
+                                    log.error(f"球軌跡回調錯誤: {e}", frame=frame_count)
                 
                 # ----- 動作偵測並關聯球員id，合併連續動作 -----
-                actions = self.detect_actions(frame)
-                detected_action_keys = set()
+                with self.profiler.stage("action"):
+                    actions = self.detect_actions(frame)
                 
-                # 保存每一幀的動作檢測結果（用於動態顯示框）
-                for action in actions:
-                    pid = self.assign_action_to_player(action["bbox"], tracked_players)
-                    player_id = int(pid) if pid is not None else None
+                with self.profiler.stage("merge"):
+                    detected_action_keys = set()
                     
-                    # 將每一幀的檢測結果保存到 action_detections
-                    results["action_recognition"]["action_detections"].append({
-                        "frame": int(frame_count),
-                        "timestamp": timestamp,
-                        "bbox": action["bbox"],
-                        "confidence": action["confidence"],
-                        "action": action["action"],
-                        "player_id": player_id
-                    })
+                    # 保存每一幀的動作檢測結果（用於動態顯示框）
+                    action_player_ids = self.assign_actions_to_players([a["bbox"] for a in actions], tracked_players)
+                    for action, pid in zip(actions, action_player_ids):
+                        player_id = int(pid) if pid is not None else None
                     
-                    action_type = action["action"]
-                    key = (player_id, action_type)
-                    detected_action_keys.add(key)
-                    
-                    if key in active_actions:
-                        # 更新現有動作：延長結束時間
-                        active_actions[key]["end_frame"] = int(frame_count)
-                        active_actions[key]["end_timestamp"] = timestamp
-                        active_actions[key]["frame_count"] += 1
-                        active_actions[key]["last_seen_frame"] = int(frame_count)
-                        # 更新最大置信度和bbox（使用最新的）
-                        if action["confidence"] > active_actions[key]["max_confidence"]:
-                            active_actions[key]["max_confidence"] = action["confidence"]
-                            active_actions[key]["bbox"] = action["bbox"]
-                    else:
-                        # 開始新動作
-                        active_actions[key] = {
-                            "start_frame": int(frame_count),
-                            "end_frame": int(frame_count),
-                            "start_timestamp": timestamp,
-                            "end_timestamp": timestamp,
+                        # 將每一幀的檢測結果保存到 action_detections
+                        results["action_recognition"]["action_detections"].append({
+                            "frame": int(frame_count),
+                            "timestamp": timestamp,
                             "bbox": action["bbox"],
-                            "max_confidence": action["confidence"],
-                            "frame_count": 1,
-                            "last_seen_frame": int(frame_count)
-                        }
-                
-                # 檢查並完成中斷的動作（超過最大間隔幀數沒有檢測到）
-                keys_to_finalize = []
-                for key in active_actions:
-                    if key not in detected_action_keys:
-                        gap = frame_count - active_actions[key]["last_seen_frame"]
-                        if gap > MAX_GAP_FRAMES:
-                            keys_to_finalize.append(key)
-                
-                for key in keys_to_finalize:
-                    finalize_action(key, frame_count, timestamp)
-                
-                # ----- 遊戲狀態判斷和回合檢測 -----
-                # 簡單的遊戲狀態判斷：有動作時為Play，否則為No-Play
-                has_action = len(actions) > 0 or ball_info is not None
-                current_state = "Play" if has_action else "No-Play"
-                
-                # 獲取上一個狀態
-                previous_state = results["game_states"][-1]["state"] if results["game_states"] else None
-                
-                # 更新遊戲狀態（簡單邏輯：如果狀態改變，記錄新狀態段）
-                if not results["game_states"] or previous_state != current_state:
-                    results["game_states"].append({
-                        "state": current_state,
-                        "start_frame": int(frame_count),
-                        "end_frame": int(frame_count),  # 將在下次狀態改變時更新
-                        "start_timestamp": timestamp,
-                        "end_timestamp": timestamp
-                    })
-                    
-                    # 回合檢測：從 No-Play 轉換到 Play = 新回合開始
-                    if previous_state == "No-Play" and current_state == "Play":
-                        # 開始新回合
-                        results["plays"].append({
-                            "play_id": len(results["plays"]) + 1,
-                            "start_frame": int(frame_count),
-                            "start_timestamp": timestamp,
-                            "end_frame": None,  # 將在回合結束時設置
-                            "end_timestamp": None,
-                            "duration": None,
-                            "actions": [],  # 將在回合結束時填充
-                            "scores": []  # 將在回合結束時填充
+                            "confidence": action["confidence"],
+                            "action": action["action"],
+                            "player_id": player_id
                         })
                     
-                    # 回合結束：從 Play 轉換到 No-Play = 當前回合結束
-                    elif previous_state == "Play" and current_state == "No-Play":
-                        if results["plays"]:
-                            current_play = results["plays"][-1]
-                            if current_play["end_frame"] is None:  # 確保回合還沒結束
-                                current_play["end_frame"] = int(frame_count - 1)  # 上一幀是回合最後一幀
-                                current_play["end_timestamp"] = timestamp - (1.0 / fps_scalar)
-                                current_play["duration"] = current_play["end_timestamp"] - current_play["start_timestamp"]
-                                
-                                # 收集該回合內的動作和得分
-                                play_start_frame = current_play["start_frame"]
-                                play_end_frame = current_play["end_frame"]
-                                
-                                # 收集回合內的動作
-                                for action in results["action_recognition"]["actions"]:
-                                    action_frame = action.get("frame", 0)
-                                    if play_start_frame <= action_frame <= play_end_frame:
-                                        current_play["actions"].append(action)
-                                
-                                # 收集回合內的得分
-                                for score in results["scores"]:
-                                    score_frame = score.get("frame", 0)
-                                    if play_start_frame <= score_frame <= play_end_frame:
-                                        current_play["scores"].append(score)
-                else:
-                    # 更新當前狀態段的結束時間
-                    results["game_states"][-1]["end_frame"] = int(frame_count)
-                    results["game_states"][-1]["end_timestamp"] = timestamp
+                        action_type = action["action"]
+                        key = (player_id, action_type)
+                        detected_action_keys.add(key)
+                    
+                        if key in active_actions:
+                            # 更新現有動作：延長結束時間
+                            active_actions[key]["end_frame"] = int(frame_count)
+                            active_actions[key]["end_timestamp"] = timestamp
+                            active_actions[key]["frame_count"] += 1
+                            active_actions[key]["last_seen_frame"] = int(frame_count)
+                            # 更新最大置信度和bbox（使用最新的）
+                            if action["confidence"] > active_actions[key]["max_confidence"]:
+                                active_actions[key]["max_confidence"] = action["confidence"]
+                                active_actions[key]["bbox"] = action["bbox"]
+                        else:
+                            # 開始新動作
+                            active_actions[key] = {
+                                "start_frame": int(frame_count),
+                                "end_frame": int(frame_count),
+                                "start_timestamp": timestamp,
+                                "end_timestamp": timestamp,
+                                "bbox": action["bbox"],
+                                "max_confidence": action["confidence"],
+                                "frame_count": 1,
+                                "last_seen_frame": int(frame_count)
+                            }
+                    
+                    # 檢查並完成中斷的動作（超過最大間隔幀數沒有檢測到）
+                    keys_to_finalize = []
+                    for key in active_actions:
+                        if key not in detected_action_keys:
+                            gap = frame_count - active_actions[key]["last_seen_frame"]
+                            if gap > MAX_GAP_FRAMES:
+                                keys_to_finalize.append(key)
                     
-                    # 如果當前是 Play 狀態，更新當前回合的結束時間（臨時，直到狀態改變）
-                    if current_state == "Play" and results["plays"]:
-                        current_play = results["plays"][-1]
-                        if current_play["end_frame"] is None:  # 回合還在進行中
-                            # 只更新結束時間作為臨時值，狀態改變時會正式設置
-                            pass
+                    for key in keys_to_finalize:
+                        finalize_action(key, frame_count, timestamp)
+                    
+                    # ----- 遊戲狀態判斷和回合檢測 -----
+                    # 簡單的遊戲狀態判斷：有球或動作時為活動幀
+                    has_action = len(actions) > 0 or ball_info is not None
+                    
+                    # 帶遲滯的狀態機：短暫缺失不切換狀態，只輸出遊程編碼的狀態段和穩定的回合
+                    for ended_play in game_state.update(int(frame_count), timestamp, has_action):
+                        # 收集該回合內的動作和得分
+                        collect_play_events(ended_play)
                 
                 # 進度顯示和回調
                 if frame_count % 10 == 0 or frame_count == total_frames:  # 每10幀或最後一幀更新一次
                     progress = (frame_count / total_frames) * 100 if total_frames > 0 else 0
                     elapsed = time.time() - start_time
-                    if frame_count % 100 == 0:  # 每100幀打印一次
-                        print(f"⏳ 進度: {progress:.1f}% ({frame_count}/{total_frames}) - {elapsed:.1f}s")
+                    if frame_count % 100 == 0:  # 每100幀記錄一次
+                        log.analysis_progress(frame_count, total_frames, frame_count / elapsed if elapsed > 0 else 0.0)
                     # 調用進度回調
                     if progress_callback:
                         try:
                             progress_callback(progress, frame_count, total_frames)
                         except Exception as e:
-                            print(f"進度回調錯誤: {e}")
-            
-            # 視頻處理完成，完成所有未完成的動作
-            final_timestamp = float(frame_count) / fps_scalar if frame_count > 0 else 0.0
-            for key in list(active_actions.keys()):
-                finalize_action(key, frame_count, final_timestamp)
-            
-            # 完成未結束的回合（如果視頻結束時還在 Play 狀態）
-            if results["plays"]:
-                current_play = results["plays"][-1]
-                if current_play["end_frame"] is None:  # 回合還沒結束
-                    current_play["end_frame"] = int(frame_count)
-                    current_play["end_timestamp"] = final_timestamp
-                    current_play["duration"] = current_play["end_timestamp"] - current_play["start_timestamp"]
-                    
-                    # 收集該回合內的動作和得分
-                    play_start_frame = current_play["start_frame"]
-                    play_end_frame = current_play["end_frame"]
-                    
-                    # 收集回合內的動作
-                    for action in results["action_recognition"]["actions"]:
-                        action_frame = action.get("frame", 0)
-                        if play_start_frame <= action_frame <= play_end_frame:
-                            current_play["actions"].append(action)
-                    
-                    # 收集回合內的得分
-                    for score in results["scores"]:
-                        score_frame = score.get("frame", 0)
-                        if play_start_frame <= score_frame <= play_end_frame:
-                            current_play["scores"].append(score)
+                            log.error(f"進度回調錯誤: {e}", frame=frame_count)
+                
+                self.profiler.end_frame()
+            
+            with self.profiler.stage("merge"):
+                # 視頻處理完成，完成所有未完成的動作
+                final_timestamp = float(frame_count) / fps_scalar if frame_count > 0 else 0.0
+                for key in list(active_actions.keys()):
+                    finalize_action(key, frame_count, final_timestamp)
+                
+                # 完成未結束的回合（如果視頻結束時還在 Play 狀態）
+                for ended_play in game_state.finish():
+                    collect_play_events(ended_play)
         
         finally:
             cap.release()
-        
-        # 過濾球追蹤誤檢測（移除不在連續軌跡上的點）
-        if len(results["ball_tracking"]["trajectory"]) > 0:
-            original_count = len(results["ball_tracking"]["trajectory"])
             
-            # Step 1: 過濾異常點
-            filtered_trajectory = self._filter_ball_trajectory(results["ball_tracking"]["trajectory"])
-            
-            # Step 2: 插值缺失的幀（使用拋物線插值）
-            fps_scalar = float(results["video_info"].get("fps", 30.0))
-            interpolated_trajectory = self._interpolate_missing_frames(filtered_trajectory, fps_scalar)
+            with self.profiler.stage("post_pass"):
+                # 非同步識別：等待剩餘任務，折算投票後回填已輸出記錄的穩定ID
+                if self.jersey_pool is not None:
+                    self._fold_jersey_results(self.jersey_pool.drain())
+                    self.jersey_pool.shutdown()
+        
+        with self.profiler.stage("post_pass"):
+            # 最佳幀球衣號碼識別（取代幀循環中的識別）
+            if self.jersey_post_pass:
+                try:
+                    results["jersey_post_pass"] = self.identify_jerseys_from_best_frames(
+                        video_path, results["players_tracking"], k=self.jersey_post_pass_k
+                    )
+                    log.info("最佳幀球衣號碼識別完成", stats=results["jersey_post_pass"])
+                except Exception as e:
+                    log.warning(f"最佳幀球衣號碼識別失敗: {e}")
+            
+            if self.jersey_pool is not None:
+                backfilled = self._backfill_stable_ids(results["players_tracking"])
+                results["jersey_recognition"] = dict(self.jersey_pool.stats, backfilled=backfilled)
+                log.info("非同步球衣號碼識別完成", stats=results["jersey_recognition"])
+        
+        with self.profiler.stage("ball_post"):
+            # 在線濾波結果：未啟用後處理時直接作為球軌跡輸出
+            if self.online_ball_filter:
+                self.ball_tracker.flush()
+                results["ball_tracking"]["online_filter"] = dict(self.ball_tracker.stats)
+                log.info("在線球軌跡濾波完成", stats=results["ball_tracking"]["online_filter"])
+                if self.ball_post_filter:
+                    results["ball_tracking"]["filtered_trajectory"] = live_trajectory
+                else:
+                    results["ball_tracking"]["trajectory"] = live_trajectory
+                    results["ball_tracking"]["detected_frames"] = len([p for p in live_trajectory if not p.get("interpolated", False)])
+                    results["ball_tracking"]["total_frames_with_interpolation"] = len(live_trajectory)
             
-            results["ball_tracking"]["trajectory"] = interpolated_trajectory
-            results["ball_tracking"]["detected_frames"] = len([p for p in interpolated_trajectory if not p.get("interpolated", False)])
-            results["ball_tracking"]["total_frames_with_interpolation"] = len(interpolated_trajectory)
+            # 過濾球追蹤誤檢測（移除不在連續軌跡上的點）
+            if self.ball_post_filter and len(results["ball_tracking"]["trajectory"]) > 0:
+                original_count = len(results["ball_tracking"]["trajectory"])
+                
+                # Step 1: 過濾異常點（在陣列上處理，只在最後轉換回字典）
+                ball_track = self._filter_ball_track(BallTrajectory.from_points(results["ball_tracking"]["trajectory"]))
+                
+                # Step 2: 插值缺失的幀（使用拋物線插值）
+                fps_scalar = float(results["video_info"].get("fps", 30.0))
+                interpolated_trajectory = interpolate_gaps(ball_track, fps_scalar).to_points()
+                
+                results["ball_tracking"]["trajectory"] = interpolated_trajectory
+                results["ball_tracking"]["detected_frames"] = len([p for p in interpolated_trajectory if not p.get("interpolated", False)])
+                results["ball_tracking"]["total_frames_with_interpolation"] = len(interpolated_trajectory)
+                
+                # 統計
+                interpolated_count = len([p for p in interpolated_trajectory if p.get("interpolated", False)])
+                removed_count = original_count - results["ball_tracking"]["detected_frames"]
+                log.trajectory_stats(original_count, removed_count, interpolated_count, len(interpolated_trajectory))
+        
+        with self.profiler.stage("summary"):
+            # 完成統計
+            results["action_recognition"]["total_actions"] = len(results["action_recognition"]["actions"])
+            results["ocr_stats"] = self.ocr_scheduler.stats()
+            results["identity_store"] = self.identity_store.stats()
+            # 淘汰追蹤的投票只用於本次分析的回填
+            self.identity_store.clear_retired()
+            
+            # 彙總統計（球員/回合/動作），一次計算後隨結果保存
+            try:
+                results["summary"] = build_summary(results)
+            except Exception as e:
+                log.warning(f"彙總統計計算失敗: {e}")
             
-            # 統計
-            interpolated_count = len([p for p in interpolated_trajectory if p.get("interpolated", False)])
-            removed_count = original_count - results["ball_tracking"]["detected_frames"]
-            print(f"🎯 球軌跡處理: 原始 {original_count} 點 → 移除 {removed_count} 異常點 → 插值 {interpolated_count} 點 → 最終 {len(interpolated_trajectory)} 點")
+            # 球員熱區圖立方體（時間前綴和），任意時間窗口只需一次相減
+            heatmap_cube = None
+            try:
+                heatmap_cube = HeatmapCube.build(results["players_tracking"], width, height, fps)
+                results["heatmap"] = heatmap_cube.metadata()
+            except Exception as e:
+                log.warning(f"熱區圖立方體建立失敗: {e}")
         
-        # 完成統計
-        results["action_recognition"]["total_actions"] = len(results["action_recognition"]["actions"])
         results["analysis_time"] = time.time() - start_time
         
-        print(f"✅ 分析完成!")
-        print(f"⏱️  總耗時: {results['analysis_time']:.2f} 秒")
-        print(f"👥 球員偵測: 總框數 {results['player_detection']['total_players_detected']}")
-        print(f"⚽ 球追蹤: {results['ball_tracking']['detected_frames']}/{total_frames} 幀")
-        print(f"🏐 動作識別: {results['action_recognition']['total_actions']} 個動作")
-        print(f"🎮 回合檢測: {len(results['plays'])} 個回合")
+        # 分段耗時（寫出結果之前彙總，不含 write 階段）
+        if isinstance(self.profiler, StageProfiler):
+            profile = self.profiler.summary()
+            profile["realtime_factor"] = profile["fps"] / fps if fps > 0 else 0.0
+            profile["environment"] = runtime_environment(self.device)
+            results["profile"] = profile
+        
+        log.info(
+            f"分析完成: 耗時 {results['analysis_time']:.2f} 秒, "
+            f"球追蹤 {results['ball_tracking']['detected_frames']}/{total_frames} 幀, "
+            f"{results['action_recognition']['total_actions']} 個動作, {len(results['plays'])} 個回合",
+            duration=round(results["analysis_time"], 3),
+            players_detected=results["player_detection"]["total_players_detected"],
+            ball_frames=results["ball_tracking"]["detected_frames"],
+            total_frames=total_frames,
+            actions=results["action_recognition"]["total_actions"],
+            plays=len(results["plays"])
+        )
         
         # 保存結果
         if output_path:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            print(f"💾 結果已保存: {output_path}")
+            with self.profiler.stage("write"):
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, ensure_ascii=False, indent=2)
+                log.info(f"結果已保存: {output_path}")
+                # 彙總另存一份小文件，API 讀取彙總時不必解析整個結果文件
+                if "summary" in results:
+                    with open(summary_path_for(output_path), 'w', encoding='utf-8') as f:
+                        json.dump(results["summary"], f, ensure_ascii=False)
+                if heatmap_cube is not None:
+                    heatmap_cube.save(heatmap_path_for(output_path))
         
         return results
 
@@ -1860,9 +2094,9 @@ def main():
     test_video = "../data/test_video.mp4"
     if os.path.exists(test_video):
         results = analyzer.analyze_video(test_video, "../data/results.json")
-        print("🎉 測試完成!")
+        log.info("測試完成")
     else:
-        print("❌ 測試影片不存在，請提供有效的影片路徑")
+        log.error("測試影片不存在，請提供有效的影片路徑")
 
 if __name__ == "__main__":
     main()
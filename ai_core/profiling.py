@@ -0,0 +1,221 @@
+"""
+排球分析系統 - 分段計時
+記錄分析流程每個階段的耗時（總計和每幀 p50/p95），可輸出 Chrome trace（chrome://tracing / Perfetto）
+"""
+
+import json
+import os
+import platform
+import threading
+import time
+from array import array
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class _Stage:
+    """可重用的階段計時上下文（每個階段名稱一個實例，避免每次調用建立生成器）"""
+
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: "StageProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack.append([time.perf_counter(), 0.0])
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        profiler = self.profiler
+        start, children = profiler._stack.pop()
+        elapsed = end - start
+        if profiler._stack:
+            profiler._stack[-1][1] += elapsed
+        profiler._record(self.name, elapsed - children)
+        if profiler.trace:
+            profiler._add_event(self.name, start, elapsed, profiler._frame if profiler._current is not None else None)
+        return False
+
+
+class StageProfiler:
+    """
+    分段計時器
+
+    用法：
+        profiler.begin_frame(frame_idx)
+        with profiler.stage("decode"):
+            ...
+        profiler.end_frame()
+
+    階段可以嵌套，每個階段只計自身時間（子階段的時間不重複計入父階段）；
+    begin_frame/end_frame 之間的階段耗時按幀彙總，用於每幀延遲的分位數，幀外的階段（如後處理、寫出）只計總時間。
+    每幀每個階段只保存一個 double，每次階段調用的開銷約 1 微秒，可以常開。
+    """
+
+    def __init__(self, trace: bool = False):
+        """
+        Args:
+            trace: 是否記錄每次階段調用的事件（用於 Chrome trace，長影片會佔用較多記憶體）
+        """
+        self.trace = trace
+        self.totals: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.events: List[Dict] = []
+        self._stages: Dict[str, _Stage] = {}
+        self._frame_times: Dict[str, array] = {}  # 每個幀內階段每幀的耗時
+        self._frame_total = array("d")
+        self._current: Optional[Dict[str, float]] = None
+        self._frame = None
+        self._frame_start = 0.0
+        self._stack: List[List[float]] = []  # [開始時間, 子階段耗時]
+        self._origin = time.perf_counter()
+        self._started = time.time()
+
+    def stage(self, name: str) -> _Stage:
+        """計時一個階段（with 語句）"""
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage(self, name)
+        return stage
+
+    def _record(self, name: str, own: float):
+        self.totals[name] = self.totals.get(name, 0.0) + own
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self._current is not None:
+            self._current[name] = self._current.get(name, 0.0) + own
+
+    def begin_frame(self, frame: int):
+        """開始一幀"""
+        self._frame = frame
+        self._current = {}
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """結束當前幀"""
+        if self._current is None:
+            return
+        end = time.perf_counter()
+        current, self._current = self._current, None
+        for name in current:
+            if name not in self._frame_times:
+                # 之前的幀沒有執行過這個階段
+                self._frame_times[name] = array("d", bytes(8 * len(self._frame_total)))
+        for name, times in self._frame_times.items():
+            times.append(current.get(name, 0.0))
+        self._frame_total.append(end - self._frame_start)
+        if self.trace:
+            self._add_event("frame", self._frame_start, end - self._frame_start, self._frame)
+
+    def _add_event(self, name: str, start: float, elapsed: float, frame: Optional[int]):
+        self.events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": elapsed * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"frame": frame} if frame is not None else {}
+        })
+
+    @staticmethod
+    def _distribution(values) -> Dict[str, float]:
+        """毫秒分布"""
+        if not len(values):
+            return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        ms = np.frombuffer(values, dtype=np.float64) * 1000
+        return {
+            "mean": float(ms.mean()),
+            "p50": float(np.percentile(ms, 50)),
+            "p95": float(np.percentile(ms, 95)),
+            "max": float(ms.max())
+        }
+
+    def summary(self) -> Dict:
+        """
+        彙總結果
+
+        Returns:
+            {frames, wall_seconds, frame_seconds, fps, frame_ms: {mean, p50, p95, max},
+             stages: {名稱: {total_seconds, share, calls, mean_ms, per_frame_ms}}}，
+            fps 為幀循環的處理速度，share 為佔全部階段時間的比例，
+            per_frame_ms 只對幀內階段計算（本幀沒執行時計為 0）
+        """
+        staged = sum(self.totals.values())
+        frame_seconds = float(sum(self._frame_total))
+        stages = {}
+        for name, total in sorted(self.totals.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            stats = {
+                "total_seconds": total,
+                "share": total / staged if staged > 0 else 0.0,
+                "calls": calls,
+                "mean_ms": total * 1000 / calls if calls else 0.0
+            }
+            if name in self._frame_times:
+                stats["per_frame_ms"] = self._distribution(self._frame_times[name])
+            stages[name] = stats
+        return {
+            "frames": len(self._frame_total),
+            "wall_seconds": time.time() - self._started,
+            "frame_seconds": frame_seconds,
+            "fps": len(self._frame_total) / frame_seconds if frame_seconds > 0 else 0.0,
+            "frame_ms": self._distribution(self._frame_total),
+            "stages": stages
+        }
+
+    def frame_samples(self) -> Dict[str, np.ndarray]:
+        """各幀內階段每幀的耗時（秒，本幀沒執行時為 0），用於輸出延遲直方圖"""
+        return {name: np.frombuffer(times, dtype=np.float64).copy() for name, times in self._frame_times.items()}
+
+    def chrome_trace(self) -> Dict:
+        """Chrome trace 格式（需要 trace=True）"""
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        """寫出 Chrome trace JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class NullProfiler:
+    """不計時的替代實現（未啟用分段計時時使用）"""
+
+    _context = nullcontext()
+
+    def stage(self, name: str):
+        return self._context
+
+    def begin_frame(self, frame: int):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+def runtime_environment(device: str = None) -> Dict:
+    """運行環境（用於比較不同硬體上的分段耗時）"""
+    return {
+        "device": device,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version()
+    }
+
+
+def format_profile(summary: Dict) -> List[str]:
+    """把 StageProfiler.summary() 格式化為可打印的行"""
+    frame_ms = summary["frame_ms"]
+    lines = [
+        f"⏱️  分段耗時 ({summary['frames']} 幀, 每幀 p50 {frame_ms['p50']:.2f} ms / p95 {frame_ms['p95']:.2f} ms)"
+    ]
+    for name, stats in summary["stages"].items():
+        line = f"   - {name:<14} {stats['total_seconds']:8.3f} 秒 {stats['share'] * 100:5.1f}%"
+        if "per_frame_ms" in stats:
+            per_frame = stats["per_frame_ms"]
+            line += f"  p50 {per_frame['p50']:.2f} ms  p95 {per_frame['p95']:.2f} ms"
+        lines.append(line)
+    return lines
@@ -0,0 +1,192 @@
+"""
+排球分析系統 - 球員多目標追蹤
+以 NumPy 陣列向量化實現的 IoU + 卡爾曼追蹤器（ByteTrack 式高/低置信度兩階段匹配）
+"""
+
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from matching import as_boxes, box_iou_matrix, linear_assignment
+
+# 狀態 [cx, cy, w, h, vx, vy, vw, vh]，等速模型
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+
+
+class TrackedBox(NamedTuple):
+    """一個已確認追蹤在當前幀的輸出"""
+    track_id: int
+    bbox: List[float]  # 匹配到的原始檢測框 [x1, y1, x2, y2]
+    confidence: float
+    detection: int  # 匹配到的檢測在輸入中的索引
+
+
+def _xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    return np.stack([
+        (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+        boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+    ], axis=1)
+
+
+def _cxcywh_to_xyxy(state: np.ndarray) -> np.ndarray:
+    half_w = np.maximum(state[:, 2], 0) / 2
+    half_h = np.maximum(state[:, 3], 0) / 2
+    return np.stack([state[:, 0] - half_w, state[:, 1] - half_h,
+                     state[:, 0] + half_w, state[:, 1] + half_h], axis=1)
+
+
+class ByteTracker:
+    """
+    IoU + 卡爾曼濾波的球員追蹤器（ByteTrack 式）
+
+    所有追蹤的狀態存放在 (T, 8) 均值和 (T, 8, 8) 協方差陣列中，預測和更新對所有追蹤一次計算：
+    1. 高置信度檢測 (>= high_thresh) 與所有追蹤按 IoU 匹配
+    2. 剩餘的已確認追蹤再與低置信度檢測 (low_thresh ~ high_thresh) 匹配，遮擋時不易斷開
+    3. 未匹配的高置信度檢測 (>= new_track_thresh) 建立新追蹤，連續匹配 min_hits 幀後確認輸出
+    4. 未確認的追蹤一旦未匹配即刪除；已確認的追蹤連續 max_age 幀未匹配後刪除
+    """
+
+    # 過程/觀測噪聲相對於框尺寸的比例（與 ByteTrack 的卡爾曼濾波一致）
+    STD_POSITION = 1.0 / 20
+    STD_VELOCITY = 1.0 / 160
+
+    def __init__(self, high_thresh: float = 0.5, low_thresh: float = 0.1, new_track_thresh: float = 0.6,
+                 match_iou: float = 0.2, low_match_iou: float = 0.5, min_hits: int = 3, max_age: int = 15):
+        """
+        Args:
+            high_thresh: 高置信度檢測閾值
+            low_thresh: 低於此置信度的檢測直接忽略
+            new_track_thresh: 建立新追蹤所需的最低置信度
+            match_iou: 第一階段匹配的最低 IoU
+            low_match_iou: 第二階段（低置信度）匹配的最低 IoU
+            min_hits: 追蹤確認前需要的連續匹配幀數
+            max_age: 已確認追蹤最多允許連續未匹配的幀數
+        """
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.reset()
+
+    def reset(self):
+        """清除所有追蹤"""
+        self._mean = np.zeros((0, 8))
+        self._cov = np.zeros((0, 8, 8))
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._missed = np.zeros(0, dtype=np.int64)
+        self.next_id = 1
+        self.frame = 0
+        self.stats: Dict[str, int] = {"created": 0, "removed": 0, "low_matches": 0}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _noise_std(self, wh: np.ndarray, position: float, velocity: float) -> np.ndarray:
+        w, h = wh[:, 0], wh[:, 1]
+        return np.stack([position * w, position * h, position * w, position * h,
+                         velocity * w, velocity * h, velocity * w, velocity * h], axis=1)
+
+    def _predict(self):
+        if not len(self._ids):
+            return
+        std = self._noise_std(np.abs(self._mean[:, 2:4]), self.STD_POSITION, self.STD_VELOCITY)
+        self._mean = self._mean @ _F.T
+        self._cov = _F @ self._cov @ _F.T
+        self._cov[:, np.arange(8), np.arange(8)] += std ** 2
+
+    def _correct(self, idx: np.ndarray, measurement: np.ndarray):
+        """對 idx 中的追蹤批量執行卡爾曼更新"""
+        mean, cov = self._mean[idx], self._cov[idx]
+        std = self._noise_std(np.abs(mean[:, 2:4]), self.STD_POSITION, 0.0)[:, :4]
+        s = cov[:, :4, :4] + std[:, :, None] ** 2 * np.eye(4)
+        # K = P H^T S^-1，S 對稱，故 K^T = S^-1 H P
+        gain = np.linalg.solve(s, cov[:, :4, :]).transpose(0, 2, 1)
+        innovation = measurement - mean[:, :4]
+        self._mean[idx] = mean + (gain @ innovation[:, :, None])[:, :, 0]
+        self._cov[idx] = cov - gain @ cov[:, :4, :]
+
+    def _match(self, track_idx: np.ndarray, det_idx: np.ndarray, track_boxes: np.ndarray,
+               boxes: np.ndarray, min_iou: float) -> List[tuple]:
+        """按 IoU 一對一匹配，返回 (追蹤索引, 檢測索引)"""
+        if not len(track_idx) or not len(det_idx):
+            return []
+        iou = box_iou_matrix(track_boxes[track_idx], boxes[det_idx])
+        pairs = linear_assignment(np.where(iou >= min_iou, iou, 0.0))
+        return [(int(track_idx[r]), int(det_idx[c])) for r, c in pairs]
+
+    def update(self, boxes, scores) -> List[TrackedBox]:
+        """
+        處理一幀檢測
+
+        Args:
+            boxes: (N, 4) 檢測框 [x1, y1, x2, y2]
+            scores: (N,) 檢測置信度
+
+        Returns:
+            本幀匹配到檢測的已確認追蹤
+        """
+        boxes = as_boxes(boxes)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        self.frame += 1
+        self._predict()
+
+        track_boxes = _cxcywh_to_xyxy(self._mean)
+        num_tracks = len(self._ids)
+        all_tracks = np.arange(num_tracks)
+        high = np.flatnonzero(scores >= self.high_thresh)
+        low = np.flatnonzero((scores >= self.low_thresh) & (scores < self.high_thresh))
+
+        matched = np.full(num_tracks, -1, dtype=np.int64)
+        for t, d in self._match(all_tracks, high, track_boxes, boxes, self.match_iou):
+            matched[t] = d
+        # 第二階段：未匹配的已確認追蹤與低置信度檢測匹配
+        remaining = np.flatnonzero((matched < 0) & (self._hits >= self.min_hits))
+        low_pairs = self._match(remaining, low, track_boxes, boxes, self.low_match_iou)
+        for t, d in low_pairs:
+            matched[t] = d
+        self.stats["low_matches"] += len(low_pairs)
+
+        updated = np.flatnonzero(matched >= 0)
+        if len(updated):
+            self._correct(updated, _xyxy_to_cxcywh(boxes[matched[updated]]))
+        self._hits[updated] += 1
+        self._missed += 1
+        self._missed[updated] = 0
+
+        outputs = [
+            TrackedBox(int(self._ids[t]), boxes[matched[t]].tolist(), float(scores[matched[t]]), int(matched[t]))
+            for t in updated if self._hits[t] >= self.min_hits
+        ]
+
+        keep = (matched >= 0) | ((self._hits >= self.min_hits) & (self._missed <= self.max_age))
+        self.stats["removed"] += int(num_tracks - keep.sum())
+        self._mean, self._cov = self._mean[keep], self._cov[keep]
+        self._ids, self._hits, self._missed = self._ids[keep], self._hits[keep], self._missed[keep]
+
+        unmatched = np.ones(len(boxes), dtype=bool)
+        unmatched[matched[updated]] = False
+        new = high[unmatched[high] & (scores[high] >= self.new_track_thresh)]
+        if len(new):
+            self._spawn(boxes[new])
+        return outputs
+
+    def _spawn(self, boxes: np.ndarray):
+        """用未匹配的檢測建立新追蹤"""
+        n = len(boxes)
+        mean = np.zeros((n, 8))
+        mean[:, :4] = _xyxy_to_cxcywh(boxes)
+        std = self._noise_std(np.abs(mean[:, 2:4]), 2 * self.STD_POSITION, 10 * self.STD_VELOCITY)
+        cov = np.zeros((n, 8, 8))
+        cov[:, np.arange(8), np.arange(8)] = std ** 2
+        self._mean = np.concatenate([self._mean, mean])
+        self._cov = np.concatenate([self._cov, cov])
+        self._ids = np.concatenate([self._ids, np.arange(self.next_id, self.next_id + n)])
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=np.int64)])
+        self._missed = np.concatenate([self._missed, np.zeros(n, dtype=np.int64)])
+        self.next_id += n
+        self.stats["created"] += n
@@ -0,0 +1,592 @@
+"""
+排球分析系統 - 球軌跡數值計算
+以 NumPy 陣列向量化實現的軌跡過濾演算法
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# BallTrajectory.method 取值
+METHOD_DETECTED = 0
+METHOD_LINEAR = 1
+METHOD_QUADRATIC = 2
+_METHOD_NAMES = {METHOD_LINEAR: "linear", METHOD_QUADRATIC: "quadratic"}
+
+
+def _sliding_windows(values: np.ndarray, half: int, fill: float = 0.0) -> np.ndarray:
+    """
+    建立以每個點為中心的滑動窗口 (n, 2 * half + 1)，超出範圍的位置以 fill 填充
+    """
+    padded = np.concatenate([np.full(half, fill), values.astype(np.float64), np.full(half, fill)])
+    return np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1)
+
+
+def parabola_outlier_scores(frames: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+                            window_size: int = 7) -> np.ndarray:
+    """
+    計算每個軌跡點的拋物線異常分數（向量化的留一法擬合）
+
+    對每個點 i，用窗口內其餘的點擬合 x(t) 一次多項式和 y(t) 二次多項式，
+    預測點 i 的位置，異常分數 = 預測偏差 / 窗口內平均移動距離。
+    所有窗口的最小二乘解以正規方程的閉式解一次求出。
+
+    Args:
+        frames: 幀號陣列 (n,)
+        xs: x 座標陣列 (n,)
+        ys: y 座標陣列 (n,)
+        window_size: 窗口大小（奇數，包含中心點）
+
+    Returns:
+        異常分數陣列 (n,)，無法擬合的點為 0
+    """
+    n = len(frames)
+    half = window_size // 2
+    if n == 0:
+        return np.zeros(0)
+
+    # 窗口內有效點遮罩：在範圍內且不是中心點
+    in_range = _sliding_windows(np.ones(n), half) > 0
+    mask = in_range.copy()
+    mask[:, half] = False
+    count = mask.sum(axis=1)
+
+    f_win = _sliding_windows(frames, half)
+    x_win = _sliding_windows(xs, half)
+    y_win = _sliding_windows(ys, half)
+    w = mask.astype(np.float64)
+
+    # 以窗口均值中心化時間（與 np.polyfit 調用方式一致）
+    safe_count = np.maximum(count, 1)
+    t_mean = (f_win * w).sum(axis=1) / safe_count
+    t = (f_win - t_mean[:, None]) * w
+    t_curr = frames - t_mean
+
+    # 正規方程的各階矩
+    s0 = count.astype(np.float64)
+    s1 = t.sum(axis=1)
+    s2 = (t ** 2).sum(axis=1)
+    s3 = (t ** 3).sum(axis=1)
+    s4 = (t ** 4).sum(axis=1)
+
+    # x: 一次多項式 x = a0 + a1 * t
+    sx0 = (x_win * w).sum(axis=1)
+    sx1 = (x_win * t).sum(axis=1)
+    det_x = s0 * s2 - s1 * s1
+
+    # y: 二次多項式 y = b0 + b1 * t + b2 * t^2
+    sy0 = (y_win * w).sum(axis=1)
+    sy1 = (y_win * t).sum(axis=1)
+    sy2 = (y_win * t * t).sum(axis=1)
+    normal = np.stack([
+        np.stack([s0, s1, s2], axis=1),
+        np.stack([s1, s2, s3], axis=1),
+        np.stack([s2, s3, s4], axis=1),
+    ], axis=1)
+    rhs = np.stack([sy0, sy1, sy2], axis=1)
+
+    # 與原實現一致：窗口（含中心點）少於 4 個點時不計算
+    fit_ok = in_range.sum(axis=1) >= 4
+
+    # 至少需要 3 個不同的時間點，正規方程才滿秩；否則逐點回退到 np.polyfit
+    sorted_f = np.sort(np.where(mask, f_win, np.nan), axis=1)
+    distinct = 1 + (np.diff(sorted_f, axis=1) > 0).sum(axis=1)
+    full_rank = fit_ok & (distinct >= 3)
+
+    pred_x = np.zeros(n)
+    pred_y = np.zeros(n)
+    if full_rank.any():
+        idx = np.flatnonzero(full_rank)
+        a1 = (s0[idx] * sx1[idx] - s1[idx] * sx0[idx]) / det_x[idx]
+        a0 = (sx0[idx] - a1 * s1[idx]) / s0[idx]
+        pred_x[idx] = a0 + a1 * t_curr[idx]
+
+        coeffs = np.linalg.solve(normal[idx], rhs[idx][..., None])[..., 0]
+        tc = t_curr[idx]
+        pred_y[idx] = coeffs[:, 0] + coeffs[:, 1] * tc + coeffs[:, 2] * tc * tc
+
+    for i in np.flatnonzero(fit_ok & ~full_rank):
+        sel = mask[i]
+        tw = f_win[i][sel] - np.mean(f_win[i][sel])
+        try:
+            pred_x[i] = np.polyval(np.polyfit(tw, x_win[i][sel], 1), t_curr[i])
+            pred_y[i] = np.polyval(np.polyfit(tw, y_win[i][sel], 2), t_curr[i])
+        except Exception:
+            fit_ok[i] = False
+
+    deviation = np.hypot(xs - pred_x, ys - pred_y)
+
+    # 窗口內相鄰有效點之間的平均移動距離（跳過中心點：half-1 與 half+1 直接相連）
+    dx = np.diff(x_win, axis=1)
+    dy = np.diff(y_win, axis=1)
+    pair_valid = mask[:, :-1] & mask[:, 1:]
+    step = np.hypot(dx, dy) * pair_valid
+    bridge = mask[:, half - 1] & mask[:, half + 1]
+    step_sum = step.sum(axis=1) + np.hypot(
+        x_win[:, half + 1] - x_win[:, half - 1],
+        y_win[:, half + 1] - y_win[:, half - 1]
+    ) * bridge
+    avg_distance = step_sum / np.maximum(1, count - 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(avg_distance > 0, deviation / avg_distance, 0.0)
+    scores[~fit_ok] = 0.0
+    scores[~np.isfinite(scores)] = 0.0
+    return scores
+
+
+def outlier_threshold(scores: np.ndarray) -> float:
+    """動態異常閾值：至少 3 倍偏差，或正分數中位數的 2.5 倍"""
+    positive = scores[scores > 0]
+    if len(positive) == 0:
+        return 3.0
+    return max(3.0, float(np.median(positive)) * 2.5)
+
+
+def trajectory_arrays(trajectory) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """從軌跡字典列表提取 (frames, xs, ys) 陣列"""
+    n = len(trajectory)
+    frames = np.fromiter((p.get("frame", i) for i, p in enumerate(trajectory)), dtype=np.float64, count=n)
+    centers = np.array([p.get("center", [0, 0]) for p in trajectory], dtype=np.float64).reshape(n, 2)
+    return frames, centers[:, 0], centers[:, 1]
+
+
+class BallTrajectory:
+    """
+    球軌跡的陣列表示
+
+    frame/timestamp/x/y/confidence 以連續的 NumPy 陣列存放，過濾、平滑、插值都在陣列上完成，
+    只在輸出時（to_points）轉換回字典列表。
+
+    - source: 指向原始軌跡點的索引，插值點為 -1
+    - offset_x/offset_y: 平滑造成的中心位移（用於平移原始 bbox）
+    - smoothed: 該點中心是否被平滑修改過
+    - method: METHOD_DETECTED / METHOD_LINEAR / METHOD_QUADRATIC
+    """
+
+    def __init__(self, points: List[Dict], frame: np.ndarray, timestamp: np.ndarray,
+                 x: np.ndarray, y: np.ndarray, confidence: np.ndarray, source: np.ndarray,
+                 offset_x: Optional[np.ndarray] = None, offset_y: Optional[np.ndarray] = None,
+                 smoothed: Optional[np.ndarray] = None, method: Optional[np.ndarray] = None):
+        n = len(frame)
+        self.points = points
+        self.frame = frame
+        self.timestamp = timestamp
+        self.x = x
+        self.y = y
+        self.confidence = confidence
+        self.source = source
+        self.offset_x = offset_x if offset_x is not None else np.zeros(n)
+        self.offset_y = offset_y if offset_y is not None else np.zeros(n)
+        self.smoothed = smoothed if smoothed is not None else np.zeros(n, dtype=bool)
+        self.method = method if method is not None else np.full(n, METHOD_DETECTED, dtype=np.int8)
+
+    _FIELDS = ("frame", "timestamp", "x", "y", "confidence", "source",
+               "offset_x", "offset_y", "smoothed", "method")
+
+    @classmethod
+    def from_points(cls, points: List[Dict]) -> "BallTrajectory":
+        """從軌跡字典列表建立（缺少 frame 時使用列表索引）"""
+        n = len(points)
+        frame, x, y = trajectory_arrays(points)
+        timestamp = np.fromiter((p.get("timestamp", 0) for p in points), dtype=np.float64, count=n)
+        confidence = np.fromiter((p.get("confidence", 0) for p in points), dtype=np.float64, count=n)
+        return cls(points, frame, timestamp, x, y, confidence, np.arange(n))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def take(self, indices: np.ndarray) -> "BallTrajectory":
+        """按索引選取子軌跡（共享原始點列表）"""
+        return BallTrajectory(self.points, *(getattr(self, name)[indices] for name in self._FIELDS))
+
+    def to_points(self) -> List[Dict]:
+        """
+        轉換回字典列表
+
+        未修改的檢測點直接返回原始字典；平滑過的點複製原始字典並更新 center/bbox；
+        插值點新建字典。
+        """
+        points = []
+        frames = self.frame.tolist()
+        timestamps = self.timestamp.tolist()
+        xs = self.x.astype(np.int64).tolist()
+        ys = self.y.astype(np.int64).tolist()
+        offsets = zip(self.offset_x.tolist(), self.offset_y.tolist())
+        for i, (src, smoothed, method, (dx, dy)) in enumerate(zip(
+                self.source.tolist(), self.smoothed.tolist(), self.method.tolist(), offsets)):
+            if src < 0:
+                points.append({
+                    "frame": int(frames[i]),
+                    "timestamp": timestamps[i],
+                    "center": [xs[i], ys[i]],
+                    "confidence": 0.0,
+                    "interpolated": True,
+                    "method": _METHOD_NAMES[method]
+                })
+                continue
+
+            point = self.points[src]
+            if smoothed:
+                point = point.copy()
+                point["center"] = [xs[i], ys[i]]
+                if "bbox" in point:
+                    bbox = point["bbox"]
+                    point["bbox"] = [bbox[0] + dx, bbox[1] + dy, bbox[2] + dx, bbox[3] + dy]
+            points.append(point)
+        return points
+
+
+def velocity_filter(track: BallTrajectory, max_velocity: float = 3000.0,
+                    min_confidence: float = 0.15, default_dt: float = 1.0 / 30.0) -> BallTrajectory:
+    """
+    移除速度明顯不合理或置信度過低的點（第一個點總是保留）
+
+    每個點與上一個保留的點比較速度。先假設所有候選點都保留做一次向量化檢查，
+    只有從第一個被拒絕的點開始才需要逐點處理（保留鏈依賴前一個保留點）。
+
+    Args:
+        track: 球軌跡
+        max_velocity: 最大速度（像素/秒）
+        min_confidence: 最低置信度
+        default_dt: 時間差非正時使用的時間差
+
+    Returns:
+        過濾後的球軌跡
+    """
+    n = len(track)
+    if n <= 2:
+        return track
+
+    candidate = track.confidence >= min_confidence
+    candidate[0] = True
+    cand = np.flatnonzero(candidate)
+
+    def speeds(prev: np.ndarray, curr: np.ndarray) -> np.ndarray:
+        dt = track.timestamp[curr] - track.timestamp[prev]
+        dt = np.where(dt <= 0, default_dt, dt)
+        return np.hypot(track.x[curr] - track.x[prev], track.y[curr] - track.y[prev]) / dt
+
+    rejected = np.flatnonzero(speeds(cand[:-1], cand[1:]) > max_velocity)
+    if len(rejected) == 0:
+        return track.take(cand)
+
+    first = rejected[0] + 1
+    keep = cand[:first].tolist()
+    ts = track.timestamp.tolist()
+    xs = track.x.tolist()
+    ys = track.y.tolist()
+    last = keep[-1]
+    for i in cand[first:].tolist():
+        dt = ts[i] - ts[last]
+        if dt <= 0:
+            dt = default_dt
+        if ((xs[i] - xs[last]) ** 2 + (ys[i] - ys[last]) ** 2) ** 0.5 / dt <= max_velocity:
+            keep.append(i)
+            last = i
+    return track.take(np.array(keep, dtype=np.int64))
+
+
+@lru_cache(maxsize=8)
+def gaussian_kernel(window_size: int) -> np.ndarray:
+    """平滑用的高斯權重（長度 2 * (window_size // 2) + 1，中心權重最高）"""
+    half = window_size // 2
+    offsets = np.arange(-half, half + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 * (offsets / (half + 1)) ** 2)
+    kernel.setflags(write=False)
+    return kernel
+
+
+def smooth_trajectory(track: BallTrajectory, window_size: int = 5) -> BallTrajectory:
+    """
+    以預先計算的高斯核卷積平滑軌跡中心（邊界處按實際權重和歸一化）
+
+    Args:
+        track: 球軌跡
+        window_size: 平滑窗口大小（奇數）
+
+    Returns:
+        平滑後的球軌跡（中心取整，bbox 位移記錄在 offset_x/offset_y）
+    """
+    n = len(track)
+    if n < window_size:
+        return track
+
+    kernel = gaussian_kernel(window_size)
+    half = len(kernel) // 2
+    weight = np.convolve(np.ones(n), kernel)[half:half + n]
+    smooth_x = np.convolve(track.x, kernel)[half:half + n] / weight
+    smooth_y = np.convolve(track.y, kernel)[half:half + n] / weight
+
+    result = track.take(np.arange(n))
+    result.offset_x = track.offset_x + (smooth_x - track.x)
+    result.offset_y = track.offset_y + (smooth_y - track.y)
+    result.x = np.trunc(smooth_x)
+    result.y = np.trunc(smooth_y)
+    result.smoothed[:] = True
+    return result
+
+
+def interpolate_gaps(track: BallTrajectory, fps: float, max_gap: int = 15) -> BallTrajectory:
+    """
+    向量化填補缺失的幀（缺口不超過 max_gap 幀）
+
+    有前兩個點且不是最後一個缺口時，x 用三點一次最小二乘、y 用過三點的拋物線插值；
+    其他情況（或三點幀號重複）使用線性插值。
+
+    Args:
+        track: 球軌跡
+        fps: 視頻幀率
+        max_gap: 最大可插值的幀差
+
+    Returns:
+        插值後的球軌跡
+    """
+    n = len(track)
+    if n < 2:
+        return track
+
+    f, x, y = track.frame, track.x, track.y
+    gaps = np.diff(f)
+    fill = (gaps > 1) & (gaps <= max_gap)
+    counts = np.where(fill, gaps - 1, 0).astype(np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return track
+
+    # 每個插值點所屬的缺口（以後一個點的索引 i 表示）及其在缺口內的序號 j
+    gap_of = np.repeat(np.arange(1, n), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    j = (np.arange(total) - starts + 1).astype(np.float64)
+    i = gap_of
+    prev = i - 1
+    gap = gaps[prev]
+
+    new_frame = f[prev] + j
+    new_timestamp = track.timestamp[prev] + j / fps
+
+    # 線性插值
+    t = j / gap
+    new_x = x[prev] + t * (x[i] - x[prev])
+    new_y = y[prev] + t * (y[i] - y[prev])
+    method = np.full(total, METHOD_LINEAR, dtype=np.int8)
+
+    # 拋物線插值：使用點 i-2, i-1, i
+    quad = (i >= 2) & (i < n - 1)
+    quad[quad] = f[i[quad] - 2] != f[prev[quad]]
+    if quad.any():
+        q = np.flatnonzero(quad)
+        i0, i1, i2 = i[q] - 2, prev[q], i[q]
+        f0, f1, f2 = f[i0], f[i1], f[i2]
+        tq = new_frame[q]
+
+        # x: 三點一次最小二乘
+        fm = (f0 + f1 + f2) / 3
+        xm = (x[i0] + x[i1] + x[i2]) / 3
+        slope = (((f0 - fm) * (x[i0] - xm) + (f1 - fm) * (x[i1] - xm) + (f2 - fm) * (x[i2] - xm)) /
+                 ((f0 - fm) ** 2 + (f1 - fm) ** 2 + (f2 - fm) ** 2))
+        new_x[q] = xm + slope * (tq - fm)
+
+        # y: 過三點的拉格朗日二次插值
+        new_y[q] = (y[i0] * (tq - f1) * (tq - f2) / ((f0 - f1) * (f0 - f2)) +
+                    y[i1] * (tq - f0) * (tq - f2) / ((f1 - f0) * (f1 - f2)) +
+                    y[i2] * (tq - f0) * (tq - f1) / ((f2 - f0) * (f2 - f1)))
+        method[q] = METHOD_QUADRATIC
+
+    # 合併：原始點 k 之前插入了 sum(counts[:k]) 個插值點
+    size = n + total
+    orig_pos = np.arange(n) + np.concatenate([[0], np.cumsum(counts)])
+    new_pos = np.ones(size, dtype=bool)
+    new_pos[orig_pos] = False
+
+    def merge(original: np.ndarray, inserted: np.ndarray) -> np.ndarray:
+        merged = np.empty(size, dtype=np.result_type(original, inserted))
+        merged[orig_pos] = original
+        merged[new_pos] = inserted
+        return merged
+
+    return BallTrajectory(
+        track.points,
+        merge(f, new_frame),
+        merge(track.timestamp, new_timestamp),
+        merge(x, np.trunc(new_x)),
+        merge(y, np.trunc(new_y)),
+        merge(track.confidence, np.zeros(total)),
+        merge(track.source, np.full(total, -1, dtype=track.source.dtype)),
+        merge(track.offset_x, np.zeros(total)),
+        merge(track.offset_y, np.zeros(total)),
+        merge(track.smoothed, np.zeros(total, dtype=bool)),
+        merge(track.method, method),
+    )
+
+
+class BallKalmanTracker:
+    """
+    在線球追蹤卡爾曼濾波器（等加速度彈道模型 + 馬氏距離門控）
+
+    每個座標軸的狀態為 [位置, 速度, 加速度]，以白噪聲加加速度（jerk）作為過程噪聲。
+    x、y 兩軸的模型和噪聲相同，因此共用同一個 3x3 協方差矩陣，狀態存成 (3, 2) 陣列。
+
+    - 門控外的檢測視為誤檢測並拒絕；連續拒絕 max_rejections 次後以最新檢測重新初始化
+      （球被擊打時速度突變）
+    - 缺失幀用模型預測，預測點暫存到下一次接受的檢測才輸出；
+      超過 max_missed 幀仍未恢復則丟棄並結束軌跡，因此輸出延遲最多 max_missed 幀
+    """
+
+    def __init__(self, process_noise: float = 1e8, measurement_noise: float = 4.0,
+                 gate: float = 16.0, max_missed: int = 15, max_rejections: int = 3,
+                 min_confidence: float = 0.15, initial_velocity_std: float = 1500.0,
+                 initial_acceleration_std: float = 3000.0):
+        """
+        Args:
+            process_noise: 加加速度白噪聲功率譜密度（像素²/秒⁵）
+            measurement_noise: 檢測位置標準差（像素）
+            gate: 馬氏距離平方門限（2 自由度）
+            max_missed: 最多預測的連續缺失幀數
+            max_rejections: 連續拒絕多少次後重新初始化
+            min_confidence: 檢測最低置信度
+            initial_velocity_std: 初始化時速度標準差（像素/秒）
+            initial_acceleration_std: 初始化時加速度標準差（像素/秒²）
+        """
+        self.process_noise = process_noise
+        self.measurement_var = measurement_noise ** 2
+        self.gate = gate
+        self.max_missed = max_missed
+        self.max_rejections = max_rejections
+        self.min_confidence = min_confidence
+        self.initial_cov = np.diag([self.measurement_var, initial_velocity_std ** 2,
+                                    initial_acceleration_std ** 2])
+        self.stats = {"accepted": 0, "rejected": 0, "predicted": 0, "dropped": 0, "resets": 0}
+        self.reset()
+
+    def reset(self):
+        """清除當前軌跡（統計保留）"""
+        self.state: Optional[np.ndarray] = None  # (3, 2): [位置, 速度, 加速度] x [x, y]
+        self.cov: Optional[np.ndarray] = None
+        self.last_frame: Optional[int] = None
+        self.last_timestamp = 0.0
+        self.missed = 0
+        self.rejections = 0
+        self.pending: List[Dict] = []
+
+    @property
+    def active(self) -> bool:
+        return self.state is not None
+
+    def _transition(self, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """等加速度模型的狀態轉移矩陣和過程噪聲"""
+        F = np.array([[1.0, dt, 0.5 * dt * dt],
+                      [0.0, 1.0, dt],
+                      [0.0, 0.0, 1.0]])
+        Q = self.process_noise * np.array([
+            [dt ** 5 / 20, dt ** 4 / 8, dt ** 3 / 6],
+            [dt ** 4 / 8, dt ** 3 / 3, dt ** 2 / 2],
+            [dt ** 3 / 6, dt ** 2 / 2, dt],
+        ])
+        return F, Q
+
+    def _start(self, frame: int, timestamp: float, center) -> None:
+        self.state = np.zeros((3, 2))
+        self.state[0] = center
+        self.cov = self.initial_cov.copy()
+        self.last_frame = frame
+        self.last_timestamp = timestamp
+        self.missed = 0
+        self.rejections = 0
+        self.pending = []
+
+    def _point(self, frame: int, timestamp: float, detection: Optional[Dict]) -> Dict:
+        """以當前狀態生成輸出點（與 ball_tracking.trajectory 格式相容）"""
+        x, y = self.state[0]
+        point = {
+            "frame": int(frame),
+            "timestamp": float(timestamp),
+            "center": [int(x), int(y)],
+            "velocity": [float(self.state[1, 0]), float(self.state[1, 1])],
+        }
+        if detection is None:
+            point.update({"confidence": 0.0, "interpolated": True, "method": "kalman"})
+        else:
+            point["confidence"] = detection.get("confidence", 0.0)
+            if "bbox" in detection:
+                cx, cy = detection["center"]
+                dx, dy = float(x - cx), float(y - cy)
+                bbox = detection["bbox"]
+                point["bbox"] = [bbox[0] + dx, bbox[1] + dy, bbox[2] + dx, bbox[3] + dy]
+        return point
+
+    def update(self, frame: int, timestamp: float, detection: Optional[Dict] = None) -> List[Dict]:
+        """
+        處理一幀
+
+        Args:
+            frame: 幀號
+            timestamp: 時間戳（秒）
+            detection: 該幀的球檢測（包含 center/bbox/confidence），沒有檢測時為 None
+
+        Returns:
+            本幀可以輸出的已過濾軌跡點（可能包含之前暫存的預測點），按幀號排序
+        """
+        if detection is not None and detection.get("confidence", 0.0) < self.min_confidence:
+            detection = None
+
+        if self.state is None:
+            if detection is None:
+                return []
+            self._start(frame, timestamp, detection["center"])
+            self.stats["accepted"] += 1
+            return [self._point(frame, timestamp, detection)]
+
+        # 預測
+        dt = timestamp - self.last_timestamp
+        if dt <= 0:
+            dt = 1.0 / 30.0
+        F, Q = self._transition(dt)
+        state = F @ self.state
+        cov = F @ self.cov @ F.T + Q
+
+        if detection is not None:
+            # 兩軸共用協方差，創新協方差 S 為標量
+            innovation = np.asarray(detection["center"], dtype=np.float64) - state[0]
+            s = cov[0, 0] + self.measurement_var
+            if float(innovation @ innovation) / s <= self.gate:
+                gain = cov[:, 0] / s
+                self.state = state + np.outer(gain, innovation)
+                self.cov = cov - np.outer(gain, cov[0])
+                self.last_frame = frame
+                self.last_timestamp = timestamp
+                self.missed = 0
+                self.rejections = 0
+                self.stats["accepted"] += 1
+                self.stats["predicted"] += len(self.pending)
+                output = self.pending + [self._point(frame, timestamp, detection)]
+                self.pending = []
+                return output
+
+            self.stats["rejected"] += 1
+            self.rejections += 1
+            if self.rejections >= self.max_rejections:
+                # 持續與預測不符：很可能是擊球造成的速度突變，以最新檢測重新開始
+                self.stats["dropped"] += len(self.pending)
+                self.stats["resets"] += 1
+                self._start(frame, timestamp, detection["center"])
+                self.stats["accepted"] += 1
+                return [self._point(frame, timestamp, detection)]
+
+        # 沒有（可接受的）檢測：只做預測
+        self.state = state
+        self.cov = cov
+        self.last_timestamp = timestamp
+        self.missed += 1
+        if self.missed > self.max_missed:
+            self.stats["dropped"] += len(self.pending)
+            self.reset()
+            return []
+        self.pending.append(self._point(frame, timestamp, None))
+        return []
+
+    def flush(self) -> None:
+        """視頻結束：丟棄未確認的預測點"""
+        self.stats["dropped"] += len(self.pending)
+        self.pending = []
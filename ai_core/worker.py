@@ -4,6 +4,7 @@
 """
 
 from celery import Celery
+from celery.signals import worker_process_init, worker_ready
 import os
 import json
 import sys
@@ -15,6 +16,11 @@ sys.path.append(str(Path(__file__).parent.parent))
 sys.path.append(str(Path(__file__).parent))  # 也添加 ai_core 目錄
 
 from processor import VolleyballAnalyzer
+from profiling import StageProfiler
+from metrics import MetricsRegistry, AnalysisMetrics, start_metrics_server
+from logger import AILogger, log_context
+
+log = AILogger("volleyball_ai.worker")
 
 # Celery配置
 app = Celery('volleyball_analyzer')
@@ -33,6 +39,41 @@ BALL_MODEL_PATH = os.getenv('BALL_MODEL_PATH', '../models/VballNetV1_seq9_graysc
 ACTION_MODEL_PATH = os.getenv('ACTION_MODEL_PATH', '../models/action_recognition_yv11m.pt')
 DEVICE = os.getenv('DEVICE', 'cpu')
 
+# 監控指標（與後端 /metrics 的分析流程指標同名）
+# prefork 模式下主進程和每個子進程各自從 WORKER_METRICS_PORT 起綁定第一個空閒端口
+METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', '9101'))
+METRICS_PORT_RANGE = int(os.getenv('WORKER_METRICS_PORT_RANGE', '16'))
+metrics_registry = MetricsRegistry()
+analysis_metrics = AnalysisMetrics(metrics_registry)
+_metrics_server = None
+
+
+def broker_queue_depth() -> float:
+    """Broker 中等待執行的任務數（無法連接時為 NaN）"""
+    try:
+        with app.connection_for_read() as conn:
+            declared = conn.default_channel.queue_declare(queue=app.conf.task_default_queue, passive=True)
+            return float(declared.message_count)
+    except Exception:
+        return float('nan')
+
+
+analysis_metrics.queue_depth.set_function(broker_queue_depth)
+
+
+@worker_ready.connect
+@worker_process_init.connect
+def start_worker_metrics(**kwargs):
+    """Worker（或 prefork 子進程）啟動時開啟指標服務"""
+    global _metrics_server
+    if _metrics_server is not None or METRICS_PORT <= 0:
+        return
+    try:
+        _metrics_server, port = start_metrics_server(metrics_registry, METRICS_PORT, max_tries=METRICS_PORT_RANGE)
+        log.info(f"指標服務已啟動: http://0.0.0.0:{port}/metrics", port=port)
+    except OSError as e:
+        log.warning(f"指標服務啟動失敗: {e}")
+
 # 全局分析器實例
 analyzer = None
 
@@ -46,6 +87,7 @@ def get_analyzer():
             player_model_path=None,  # 如果需要球員檢測，添加 PLAYER_MODEL_PATH
             device=DEVICE
         )
+        analysis_metrics.observe_model_loads(analyzer.model_load_times)
     return analyzer
 
 @app.task(bind=True)
@@ -61,52 +103,61 @@ def analyze_video_task(self, video_id: str, video_path: str):
         分析結果字典
     """
     try:
-        # 更新任務狀態
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'initializing', 'progress': 0}
-        )
-        
-        # 獲取分析器
-        analyzer = get_analyzer()
-        
-        # 檢查文件是否存在
-        if not os.path.exists(video_path):
-            raise FileNotFoundError(f"影片文件不存在: {video_path}")
-        
-        # 更新狀態
-        self.update_state(
-            state='PROGRESS',
-            meta={'status': 'analyzing', 'progress': 10}
-        )
-        
-        # 執行分析
-        results_dir = Path(__file__).parent.parent / "data" / "results"
-        results_dir.mkdir(parents=True, exist_ok=True)
-        
-        output_path = results_dir / f"{video_id}_results.json"
-        
-        # 分析影片
-        results = analyzer.analyze_video(video_path, str(output_path))
-        
-        # 添加任務信息
-        results['task_id'] = self.request.id
-        results['video_id'] = video_id
-        results['status'] = 'completed'
-        
-        # 更新最終狀態
-        self.update_state(
-            state='SUCCESS',
-            meta={
-                'status': 'completed',
-                'progress': 100,
-                'results': results
-            }
-        )
-        
-        return results
+        # 執行中任務數和即時處理速度；任務內的日誌附帶任務/影片 ID
+        with analysis_metrics.job(self.request.id) as job, log_context(task_id=self.request.id, video_id=video_id):
+            # 更新任務狀態
+            self.update_state(
+                state='PROGRESS',
+                meta={'status': 'initializing', 'progress': 0}
+            )
+        
+            # 獲取分析器
+            analyzer = get_analyzer()
+        
+            # 檢查文件是否存在
+            if not os.path.exists(video_path):
+                raise FileNotFoundError(f"影片文件不存在: {video_path}")
+        
+            # 更新狀態
+            self.update_state(
+                state='PROGRESS',
+                meta={'status': 'analyzing', 'progress': 10}
+            )
+        
+            # 執行分析
+            results_dir = Path(__file__).parent.parent / "data" / "results"
+            results_dir.mkdir(parents=True, exist_ok=True)
+        
+            output_path = results_dir / f"{video_id}_results.json"
+        
+            # 分析影片（分段耗時和處理速度寫入指標）
+            profiler = StageProfiler()
+            results = analyzer.analyze_video(
+                video_path, str(output_path),
+                progress_callback=lambda progress, frame_count, total_frames: job.progress(frame_count),
+                profiler=profiler
+            )
+            analysis_metrics.observe_analysis(profiler, results)
+        
+            # 添加任務信息
+            results['task_id'] = self.request.id
+            results['video_id'] = video_id
+            results['status'] = 'completed'
+        
+            # 更新最終狀態
+            self.update_state(
+                state='SUCCESS',
+                meta={
+                    'status': 'completed',
+                    'progress': 100,
+                    'results': results
+                }
+            )
+        
+            return results
         
     except Exception as e:
+        log.error(f"分析任務失敗: {e}", exc_info=True, task_id=self.request.id, video_id=video_id)
         # 更新錯誤狀態
         self.update_state(
             state='FAILURE',
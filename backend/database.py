@@ -5,28 +5,122 @@
 
 import sqlite3
 import json
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Dict, Optional
 from pathlib import Path
+import sys
 import threading
+import time
 
-# 線程本地存儲，確保每個線程使用自己的連接
+# 結構化日誌（佇列寫出、限流）在 ai_core/logger.py
+sys.path.append(str(Path(__file__).parent.parent / "ai_core"))
+from logger import APILogger  # type: ignore  # noqa: E402
+
+log = APILogger("volleyball_ai.database")
+
+# 線程本地存儲，確保每個線程使用自己的連接（每個資料庫文件一個）
 _local = threading.local()
 
+# 每個新連接執行的 PRAGMA：
+# WAL 讓讀取不被寫入阻塞（API 線程讀、分析線程寫），WAL 下 synchronous=NORMAL 只在檢查點時 fsync，
+# 斷電最多丟失最後幾個已提交的交易，不會損壞資料庫
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -16000,  # 負數單位為 KiB（16 MB）
+    "temp_store": "MEMORY",
+}
+
+# list_videos 可用的排序欄位，每個都有 (欄位, id) 和 (status, 欄位, id) 索引
+VIDEO_SORT_COLUMNS = ("upload_time", "filename", "file_size")
+
+# 文件名搜索：FTS5 trigram 索引只能匹配至少 3 個字元的詞，更短的詞用 LIKE
+FTS_MIN_TERM_LENGTH = 3
+
+
+def _encode_cursor(sort: str, order: str, value: Any, video_id: str) -> str:
+    """分頁游標：最後一行的 (排序值, id)，連同排序方式一起編碼，避免換了排序後沿用舊游標"""
+    payload = json.dumps([sort, order, value, video_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> tuple:
+    """解析分頁游標，返回 (排序值, id)；無效或與排序方式不符時拋出 ValueError"""
+    try:
+        cursor_sort, cursor_order, value, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("無效的分頁游標")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("分頁游標與排序方式不符")
+    return value, video_id
+
+
+def _like_pattern(term: str) -> str:
+    """LIKE 子字串匹配模式（轉義 % _ \\）"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _operation(sql: str) -> str:
+    """語句類型（select/insert/update/delete...），用作耗時指標的標籤"""
+    words = sql.split(None, 1)
+    return words[0].lower() if words else "unknown"
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """連接設置了 query_observer 時記錄每條語句的執行耗時"""
+
+    def execute(self, sql, parameters=()):
+        observer = self.connection.query_observer
+        if observer is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observer(_operation(sql), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        observer = self.connection.query_observer
+        if observer is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observer(_operation(sql), time.perf_counter() - start)
+
+
+class _TimedConnection(sqlite3.Connection):
+    """游標預設為 _TimedCursor 的連接"""
+
+    query_observer: Optional[Callable[[str, float], None]] = None
+    transaction_depth = 0  # Database.transaction() 的嵌套層數，大於 0 時各方法不單獨提交
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
 class Database:
     """SQLite 資料庫管理類"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, query_observer: Callable[[str, float], None] = None):
         """
         初始化資料庫
         
         Args:
             db_path: 資料庫檔案路徑，預設為 data/volleyball.db
+            query_observer: 每條語句執行後調用 query_observer(語句類型, 耗時秒數)，用於監控指標（可之後再設置）
         """
         if db_path is None:
             db_path = str(Path(__file__).parent.parent / "data" / "volleyball.db")
         
         self.db_path = db_path
+        self.query_observer = query_observer
         
         # 確保目錄存在
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -37,10 +131,62 @@ class Database:
     
     def _get_connection(self) -> sqlite3.Connection:
         """獲取當前線程的資料庫連接"""
-        if not hasattr(_local, 'connection') or _local.connection is None:
-            _local.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            _local.connection.row_factory = sqlite3.Row
-        return _local.connection
+        connections = getattr(_local, 'connections', None)
+        if connections is None:
+            connections = _local.connections = {}
+        conn = connections.get(self.db_path)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=_TimedConnection,
+                                   cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            for name, value in PRAGMAS.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            connections[self.db_path] = conn
+        conn.query_observer = self.query_observer
+        return conn
+    
+    def _commit(self, conn: sqlite3.Connection):
+        """提交（在 transaction() 中時由最外層統一提交）"""
+        if not conn.transaction_depth:
+            conn.commit()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        在一個交易中執行多個操作（批量寫入用），期間各方法不單獨提交
+        
+        最外層以 BEGIN IMMEDIATE 開始（一開始就取得寫鎖，避免 WAL 下讀鎖升級失敗），正常結束時提交、異常時回滾；
+        嵌套調用使用 SAVEPOINT，異常時只回滾內層。
+        
+        用法：
+            with db.transaction():
+                db.add_video(...)
+                db.set_jersey_mapping(...)
+        """
+        conn = self._get_connection()
+        depth = conn.transaction_depth
+        if depth == 0:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT sp_{depth}")
+        conn.transaction_depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            conn.transaction_depth = depth
+            if depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+            raise
+        conn.transaction_depth = depth
+        if depth == 0:
+            conn.commit()
+        else:
+            conn.execute(f"RELEASE sp_{depth}")
     
     def _init_tables(self):
         """初始化資料表"""
@@ -94,8 +240,106 @@ class Database:
             )
         ''')
         
+        # 索引：list_videos 按 (排序欄位, id) 鍵集分頁（可再按狀態過濾）、按視頻查找/刪除任務
+        # （jersey_mappings 的 UNIQUE(video_id, track_id) 已自帶可按 video_id 查找的索引）
+        cursor.execute('DROP INDEX IF EXISTS idx_videos_upload_time')
+        for column in VIDEO_SORT_COLUMNS:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_videos_{column}_id ON videos({column}, id)')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_videos_status_{column}_id ON videos(status, {column}, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_tasks_video_id ON analysis_tasks(video_id)')
+        # 排序欄位不能為 NULL：(col, id) > (NULL, ?) 的結果是 NULL，分頁會跳過這些行（舊資料可能寫入過 None）
+        cursor.execute('UPDATE videos SET file_size = 0 WHERE file_size IS NULL')
+        
+        self._init_status_counts(cursor)
+        self.fts_enabled = self._init_fts(cursor)
+        
         conn.commit()
     
+    def _table_exists(self, cursor: sqlite3.Cursor, name: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+        return cursor.fetchone() is not None
+    
+    def _init_status_counts(self, cursor: sqlite3.Cursor):
+        """各狀態的視頻數（由觸發器維護，影片庫取計數不必掃描整個表）"""
+        created = not self._table_exists(cursor, 'video_status_counts')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS video_status_counts (
+                status TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # 狀態為 NULL 的視頻不記入計數表（get_status_counts 另外統計），與升級時的回填一致
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS videos_status_count_insert AFTER INSERT ON videos
+            WHEN new.status IS NOT NULL BEGIN
+                INSERT INTO video_status_counts (status, count) VALUES (new.status, 1)
+                ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS videos_status_count_delete AFTER DELETE ON videos
+            WHEN old.status IS NOT NULL BEGIN
+                UPDATE video_status_counts SET count = count - 1 WHERE status = old.status;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS videos_status_count_update AFTER UPDATE OF status ON videos
+            WHEN old.status IS NOT new.status BEGIN
+                UPDATE video_status_counts SET count = count - 1 WHERE status = old.status;
+                INSERT INTO video_status_counts (status, count) SELECT new.status, 1 WHERE new.status IS NOT NULL
+                ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        if created:
+            # 升級已有資料庫：按現有記錄建立計數
+            cursor.execute('''
+                INSERT INTO video_status_counts (status, count)
+                SELECT status, COUNT(*) FROM videos WHERE status IS NOT NULL GROUP BY status
+            ''')
+    
+    def _init_fts(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        文件名全文索引（FTS5 trigram 外部內容表，由觸發器與 videos 同步）
+        
+        Returns:
+            是否可用（SQLite 未編譯 FTS5 或低於 3.34 不支持 trigram 時返回 False，搜索退回 LIKE）
+        """
+        created = not self._table_exists(cursor, 'videos_fts')
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+                    filename, original_filename,
+                    content='videos', content_rowid='rowid', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            log.warning("文件名全文索引不可用，搜索將使用 LIKE", error=str(e))
+            return False
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+                INSERT INTO videos_fts (rowid, filename, original_filename)
+                VALUES (new.rowid, new.filename, new.original_filename);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+                INSERT INTO videos_fts (videos_fts, rowid, filename, original_filename)
+                VALUES ('delete', old.rowid, old.filename, old.original_filename);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF filename, original_filename ON videos BEGIN
+                INSERT INTO videos_fts (videos_fts, rowid, filename, original_filename)
+                VALUES ('delete', old.rowid, old.filename, old.original_filename);
+                INSERT INTO videos_fts (rowid, filename, original_filename)
+                VALUES (new.rowid, new.filename, new.original_filename);
+            END
+        ''')
+        if created:
+            # 升級已有資料庫：為現有記錄建立索引
+            cursor.execute("INSERT INTO videos_fts (videos_fts) VALUES ('rebuild')")
+        return True
+    
     # ========== 視頻操作 ==========
     
     def add_video(self, video_data: Dict) -> bool:
@@ -114,10 +358,10 @@ class Database:
                 video_data.get('file_path', ''),
                 video_data.get('upload_time', datetime.now().isoformat()),
                 video_data.get('status', 'uploaded'),
-                video_data.get('file_size', 0)
+                video_data.get('file_size') or 0
             ))
             
-            conn.commit()
+            self._commit(conn)
             return True
         except sqlite3.IntegrityError:
             # 記錄已存在，更新
@@ -148,6 +392,129 @@ class Database:
         
         return [dict(row) for row in rows]
     
+    def list_videos(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                    query: Optional[str] = None, sort: str = "upload_time", order: str = "desc") -> Dict:
+        """
+        分頁列出視頻（鍵集分頁：從游標的 (排序值, id) 之後沿索引繼續讀，每頁耗時與視頻總數無關）
+        
+        Args:
+            limit: 每頁記錄數
+            cursor: 上一頁返回的 next_cursor，None 表示第一頁
+            status: 只列出此狀態的視頻
+            query: 文件名搜索（空白分隔的詞都須出現在 filename 或 original_filename 中，不分大小寫）
+            sort: 排序欄位，見 VIDEO_SORT_COLUMNS
+            order: "asc" 或 "desc"
+        
+        Returns:
+            {"videos": [...], "next_cursor": 下一頁游標，沒有更多時為 None}
+        
+        Raises:
+            ValueError: 排序參數或游標無效
+        """
+        if sort not in VIDEO_SORT_COLUMNS:
+            raise ValueError(f"不支持的排序欄位: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"不支持的排序方向: {order}")
+        
+        where = []
+        params = []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if cursor:
+            value, last_id = _decode_cursor(cursor, sort, order)
+            where.append(f"({sort}, id) {'<' if order == 'desc' else '>'} (?, ?)")
+            params.extend([value, last_id])
+        
+        terms = query.split() if query else []
+        fts_terms = [t for t in terms if self.fts_enabled and len(t) >= FTS_MIN_TERM_LENGTH]
+        if fts_terms:
+            where.append("rowid IN (SELECT rowid FROM videos_fts WHERE videos_fts MATCH ?)")
+            params.append(" ".join('"' + t.replace('"', '""') + '"' for t in fts_terms))
+        for term in terms:
+            if term not in fts_terms:
+                where.append("(filename LIKE ? ESCAPE '\\' OR original_filename LIKE ? ESCAPE '\\')")
+                params.extend([_like_pattern(term)] * 2)
+        
+        sql = "SELECT * FROM videos"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {sort} {order.upper()}, id {order.upper()} LIMIT ?"
+        params.append(limit + 1)
+        
+        conn = self._get_connection()
+        rows = conn.cursor().execute(sql, params).fetchall()
+        videos = [dict(row) for row in rows]
+        
+        next_cursor = None
+        if len(videos) > limit:
+            videos = videos[:limit]
+            last = videos[-1]
+            next_cursor = _encode_cursor(sort, order, last[sort], last['id'])
+        return {"videos": videos, "next_cursor": next_cursor}
+    
+    def get_status_counts(self) -> Dict[str, int]:
+        """
+        各狀態的視頻數（讀觸發器維護的計數表）
+        
+        Returns:
+            {"all": 總數, 狀態: 數量, ...}
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT status, count FROM video_status_counts WHERE count > 0')
+        counts = {row[0]: row[1] for row in cursor.fetchall()}
+        
+        cursor.execute('SELECT COUNT(*) FROM videos WHERE status IS NULL')
+        unknown = cursor.fetchone()[0]
+        counts["all"] = sum(counts.values()) + unknown
+        return counts
+    
+    def get_video_ids(self) -> set:
+        """獲取所有視頻 ID（只讀主鍵，不載入整行）"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id FROM videos')
+        return {row[0] for row in cursor.fetchall()}
+    
+    def add_videos(self, videos: List[Dict]) -> int:
+        """
+        批量添加視頻記錄（單一交易，已存在的 ID 跳過）
+        
+        Args:
+            videos: 視頻資料列表，欄位同 add_video（另外寫入 analysis_time）
+        
+        Returns:
+            實際插入的記錄數
+        """
+        if not videos:
+            return 0
+        rows = [(
+            video['id'],
+            video.get('filename', ''),
+            video.get('original_filename', video.get('filename', '')),
+            video.get('file_path', ''),
+            video.get('upload_time', datetime.now().isoformat()),
+            video.get('status', 'uploaded'),
+            video.get('file_size') or 0,
+            video.get('analysis_time')
+        ) for video in videos]
+        
+        try:
+            with self.transaction() as conn:
+                # rowcount 不含觸發器（狀態計數、全文索引）寫入的行，total_changes 會包含
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO videos (id, filename, original_filename, file_path, upload_time, status, file_size, analysis_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                return cursor.rowcount
+        except Exception as e:
+            log.error("批量添加視頻失敗", error=str(e), videos=len(rows))
+            return 0
+    
     def update_video(self, video_id: str, data: Dict) -> bool:
         """更新視頻記錄"""
         try:
@@ -160,6 +527,8 @@ class Database:
             
             for key, value in data.items():
                 if key != 'id':
+                    if key == 'file_size' and value is None:
+                        value = 0  # 排序欄位不能為 NULL（list_videos 的鍵集游標比較會跳過 NULL 行）
                     updates.append(f"{key} = ?")
                     values.append(value)
             
@@ -173,7 +542,7 @@ class Database:
             query = f"UPDATE videos SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, values)
             
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
         except Exception as e:
             print(f"❌ 更新視頻失敗: {e}")
@@ -194,7 +563,7 @@ class Database:
             # 刪除視頻
             cursor.execute('DELETE FROM videos WHERE id = ?', (video_id,))
             
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
         except Exception as e:
             print(f"❌ 刪除視頻失敗: {e}")
@@ -219,7 +588,7 @@ class Database:
                 task_data.get('start_time', datetime.now().isoformat())
             ))
             
-            conn.commit()
+            self._commit(conn)
             return True
         except Exception as e:
             print(f"❌ 添加任務失敗: {e}")
@@ -258,7 +627,7 @@ class Database:
             query = f"UPDATE analysis_tasks SET {', '.join(updates)} WHERE task_id = ?"
             cursor.execute(query, values)
             
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
         except Exception as e:
             print(f"❌ 更新任務失敗: {e}")
@@ -280,12 +649,43 @@ class Database:
                 VALUES (?, ?, ?, ?, ?)
             ''', (video_id, track_id, jersey_number, frame, bbox_json))
             
-            conn.commit()
+            self._commit(conn)
             return True
         except Exception as e:
             print(f"❌ 設置球衣映射失敗: {e}")
             return False
     
+    def set_jersey_mappings(self, mappings: List[Dict]) -> int:
+        """
+        批量設置球衣號碼映射（單一交易，同一 video_id/track_id 覆蓋）
+        
+        Args:
+            mappings: [{video_id, track_id, jersey_number, frame, bbox}, ...]
+        
+        Returns:
+            寫入的映射數
+        """
+        if not mappings:
+            return 0
+        rows = [(
+            mapping['video_id'],
+            int(mapping['track_id']),
+            mapping.get('jersey_number', 0),
+            mapping.get('frame'),
+            json.dumps(mapping['bbox']) if mapping.get('bbox') else None
+        ) for mapping in mappings]
+        
+        try:
+            with self.transaction() as conn:
+                conn.cursor().executemany('''
+                    INSERT OR REPLACE INTO jersey_mappings (video_id, track_id, jersey_number, frame, bbox)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+            return len(rows)
+        except Exception as e:
+            log.error("批量設置球衣映射失敗", error=str(e), mappings=len(rows))
+            return 0
+    
     def get_jersey_mappings(self, video_id: str) -> Dict:
         """獲取視頻的所有球衣映射"""
         conn = self._get_connection()
@@ -314,7 +714,7 @@ class Database:
             cursor.execute('DELETE FROM jersey_mappings WHERE video_id = ? AND track_id = ?', 
                           (video_id, track_id))
             
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
         except Exception as e:
             print(f"❌ 刪除球衣映射失敗: {e}")
@@ -326,28 +726,73 @@ class Database:
         """從 JSON 遷移資料到 SQLite"""
         print("📦 開始從 JSON 遷移資料到 SQLite...")
         
-        # 遷移視頻資料
-        for video in videos_db:
-            self.add_video(video)
-        
-        # 遷移球衣映射
-        for video_id, mappings in jersey_mappings.items():
-            for track_id, data in mappings.items():
-                self.set_jersey_mapping(
-                    video_id=video_id,
-                    track_id=int(track_id),
-                    jersey_number=data.get('jersey_number', 0),
-                    frame=data.get('frame'),
-                    bbox=data.get('bbox')
-                )
+        # 單一交易寫入（逐條提交時每條記錄都要等一次磁碟同步）
+        with self.transaction():
+            # 遷移視頻資料（逐條 add_video：重複的 ID 以後出現的為準）
+            for video in videos_db:
+                self.add_video(video)
+            
+            # 遷移球衣映射
+            self.set_jersey_mappings([
+                dict(data, video_id=video_id, track_id=int(track_id))
+                for video_id, mappings in jersey_mappings.items()
+                for track_id, data in mappings.items()
+            ])
         
         print(f"✅ 遷移完成: {len(videos_db)} 個視頻, {sum(len(m) for m in jersey_mappings.values())} 個映射")
     
     def close(self):
-        """關閉資料庫連接"""
-        if hasattr(_local, 'connection') and _local.connection:
-            _local.connection.close()
-            _local.connection = None
+        """關閉當前線程到此資料庫的連接"""
+        connections = getattr(_local, 'connections', None)
+        conn = connections.pop(self.db_path, None) if connections else None
+        if conn is not None:
+            conn.close()
+
+
+class AsyncDatabase:
+    """
+    Database 的非同步外觀，供 async 端點 await，資料庫操作不在事件循環執行緒中執行
+    
+    讀取方法在多個讀取執行緒中執行（每個執行緒一個連接，WAL 下讀取互不阻塞，也不被寫入阻塞）；
+    寫入方法交給單一寫入執行緒串行執行（SQLite 同時只允許一個寫入者，串行避免在鎖上等待）。
+    
+    用法：
+        adb = AsyncDatabase(lambda: db)
+        video = await adb.get_video(video_id)
+        await adb.update_video(video_id, {"status": "processing"})
+    """
+    
+    READ_METHODS = frozenset({"get_video", "get_all_videos", "list_videos", "get_status_counts", "get_video_ids",
+                              "get_task", "get_jersey_mappings"})
+    
+    def __init__(self, database: Callable[[], Database], readers: int = 4):
+        """
+        Args:
+            database: 每次調用時返回要使用的 Database（例如 lambda: db，替換全局實例後立即生效）
+            readers: 讀取執行緒（連接）數
+        """
+        self._database = database
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+    
+    async def run_read(self, fn: Callable, *args, **kwargs) -> Any:
+        """在讀取執行緒中執行 fn(*args, **kwargs)"""
+        return await asyncio.wrap_future(self._readers.submit(fn, *args, **kwargs))
+    
+    async def run_write(self, fn: Callable, *args, **kwargs) -> Any:
+        """在寫入執行緒中執行 fn(*args, **kwargs)（例如在 transaction() 中的多個寫入）"""
+        return await asyncio.wrap_future(self._writer.submit(fn, *args, **kwargs))
+    
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(Database, name, None)):
+            raise AttributeError(name)
+        run = self.run_read if name in self.READ_METHODS else self.run_write
+        
+        async def call(*args, **kwargs):
+            return await run(getattr(self._database(), name), *args, **kwargs)
+        
+        call.__name__ = name
+        return call
 
 
 # 全局資料庫實例
@@ -4,16 +4,19 @@
 """
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
-from fastapi import Request
+from fastapi import Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response, JSONResponse
 import os
 import uuid
 import json
 from datetime import datetime
-from typing import List, Optional, Dict, Union
+from typing import List, Optional, Dict, Union, Callable, Tuple, Any
+from collections import OrderedDict
 import asyncio
+import threading
+import time
 from pathlib import Path
 from pydantic import BaseModel
 
@@ -22,7 +25,31 @@ import sys
 BACKEND_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = BACKEND_DIR.parent
 sys.path.append(str(PROJECT_ROOT / "ai_core"))
-from processor import VolleyballAnalyzer  # type: ignore
+from analytics import build_summary, HeatmapCube, heatmap_path_for, summary_path_for  # type: ignore
+from metrics import MetricsRegistry, AnalysisMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE  # type: ignore
+from profiling import StageProfiler  # type: ignore
+from logger import APILogger, log_context  # type: ignore
+
+# 日誌經佇列由背景執行緒寫出，不阻塞事件循環
+api_log = APILogger()
+
+
+# processor 會導入 torch、onnxruntime、ultralytics、norfair 等重型依賴（數秒），
+# 只提供 /videos、/play 等接口的進程不需要它們，因此延遲到第一次分析時再導入
+def load_analyzer_class():
+    """分析器類（第一次調用時導入 processor）"""
+    analyzer_class = globals().get("VolleyballAnalyzer")
+    if analyzer_class is None:
+        from processor import VolleyballAnalyzer as analyzer_class  # type: ignore
+        globals()["VolleyballAnalyzer"] = analyzer_class
+    return analyzer_class
+
+
+def __getattr__(name: str):
+    """模組屬性 main.VolleyballAnalyzer 在第一次訪問時導入"""
+    if name == "VolleyballAnalyzer":
+        return load_analyzer_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 創建FastAPI應用
 app = FastAPI(
@@ -52,6 +79,7 @@ BACKEND_UPLOAD_DIR = BACKEND_DIR / "data" / "uploads"
 BACKEND_RESULTS_DIR = BACKEND_DIR / "data" / "results"
 DB_FILE = PROJECT_ROOT / "data" / "videos_db.json"  # JSON 數據庫文件（用於遷移）
 JERSEY_MAPPINGS_FILE = PROJECT_ROOT / "data" / "jersey_mappings.json"  # 球衣號碼映射文件（用於遷移）
+SCAN_MANIFEST_NAME = ".scan_manifest.json"  # 恢復掃描清單（位於 data 目錄）
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
 os.makedirs(DB_FILE.parent, exist_ok=True)
@@ -133,11 +161,97 @@ def resolve_results_path(video_id: str) -> Optional[Path]:
     return None
 
 
+# ========== 監控指標 ==========
+# GET /metrics 以 Prometheus 文本格式輸出；分析流程指標與 Celery worker 同名
+metrics_registry = MetricsRegistry()
+analysis_metrics = AnalysisMetrics(metrics_registry)
+cache_requests = metrics_registry.counter(
+    "volleyball_results_cache_requests_total", "結果衍生數據緩存請求數（result=hit/miss）", ["kind", "result"])
+play_bytes = metrics_registry.counter(
+    "volleyball_play_bytes_total", "/play 傳送的影片位元組數（range=partial/full）", ["range"])
+sqlite_query_seconds = metrics_registry.histogram(
+    "volleyball_sqlite_query_seconds", "SQLite 語句執行耗時（秒）", ["operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+
+# ========== 結果衍生數據緩存 ==========
+# 以文件路徑為鍵、mtime 為失效依據的小型 LRU 緩存，避免每次請求都重新解析大型結果文件
+# （load_cached 在執行緒池中調用，緩存的讀寫由鎖保護；載入本身不持鎖）
+DERIVED_CACHE_SIZE = 32
+_derived_cache: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+_derived_cache_lock = threading.Lock()
+
+
+def load_cached(path: Path, kind: str, loader: Callable[[Path], Any]) -> Any:
+    """
+    載入並緩存從結果文件衍生的數據
+    
+    Args:
+        path: 來源文件路徑
+        kind: 數據種類（同一文件可緩存多種衍生數據，如 summary）
+        loader: 緩存未命中時的載入函數
+        
+    Returns:
+        loader 的返回值（命中時直接返回緩存）
+    """
+    key = (str(path), kind)
+    mtime = path.stat().st_mtime
+    with _derived_cache_lock:
+        cached = _derived_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            _derived_cache.move_to_end(key)
+            cache_requests.labels(kind, "hit").inc()
+            return cached[1]
+    
+    cache_requests.labels(kind, "miss").inc()
+    value = loader(path)
+    with _derived_cache_lock:
+        _derived_cache[key] = (mtime, value)
+        _derived_cache.move_to_end(key)
+        while len(_derived_cache) > DERIVED_CACHE_SIZE:
+            _derived_cache.popitem(last=False)
+    return value
+
+
+def _read_json(path: Path) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_summary(results_path: Path) -> Dict:
+    """從結果文件讀取彙總（舊版結果沒有 summary 時即時計算）"""
+    with open(results_path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    summary = results.get("summary")
+    if summary is None:
+        summary = build_summary(results)
+    return summary
+
+
+def _build_heatmap(results_path: Path) -> HeatmapCube:
+    """從結果文件即時建立熱區圖立方體（舊版結果沒有 .npz 文件時使用）"""
+    with open(results_path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    video_info = results.get("video_info", {})
+    return HeatmapCube.build(
+        results.get("players_tracking", []),
+        video_info.get("width", 1920),
+        video_info.get("height", 1080),
+        video_info.get("fps", 30.0)
+    )
+
+
 # 導入 SQLite 資料庫模組
-from database import get_database, Database
+from database import get_database, Database, AsyncDatabase, VIDEO_SORT_COLUMNS
+from scan_manifest import ScanManifest
 
 # 初始化 SQLite 資料庫
 db = get_database()
+db.query_observer = lambda operation, seconds: sqlite_query_seconds.labels(operation).observe(seconds)
+
+# async 端點通過 adb 訪問資料庫（在專用的讀寫執行緒中執行，不阻塞事件循環）；
+# 分析執行緒和啟動掃描本身不在事件循環中，直接使用 db
+adb = AsyncDatabase(lambda: db, readers=int(os.getenv("DB_READ_THREADS", "4")))
 
 # 內存中的任務狀態（任務是臨時的，不需要持久化到資料庫）
 analysis_tasks = {}
@@ -148,10 +262,10 @@ def migrate_json_to_sqlite():
     migration_flag = PROJECT_ROOT / "data" / ".sqlite_migrated"
     
     if migration_flag.exists():
-        print("✅ SQLite 已遷移，跳過遷移步驟")
+        api_log.info("SQLite 已遷移，跳過遷移步驟")
         return
     
-    print("📦 開始從 JSON 遷移到 SQLite...")
+    api_log.info("開始從 JSON 遷移到 SQLite...")
     
     # 載入舊的 JSON 資料
     videos_db = []
@@ -161,27 +275,24 @@ def migrate_json_to_sqlite():
         try:
             with open(DB_FILE, 'r', encoding='utf-8') as f:
                 videos_db = json.load(f)
-            print(f"  📄 載入 {len(videos_db)} 個視頻記錄")
+            api_log.info(f"載入 {len(videos_db)} 個視頻記錄")
         except Exception as e:
-            print(f"  ⚠️  載入視頻資料失敗: {e}")
+            api_log.warning(f"載入視頻資料失敗: {e}")
     
     if JERSEY_MAPPINGS_FILE.exists():
         try:
             with open(JERSEY_MAPPINGS_FILE, 'r', encoding='utf-8') as f:
                 jersey_mappings = json.load(f)
-            print(f"  📄 載入 {len(jersey_mappings)} 個球衣映射")
+            api_log.info(f"載入 {len(jersey_mappings)} 個球衣映射")
         except Exception as e:
-            print(f"  ⚠️  載入球衣映射失敗: {e}")
+            api_log.warning(f"載入球衣映射失敗: {e}")
     
     # 遷移資料
     db.migrate_from_json(videos_db, jersey_mappings)
     
     # 標記遷移完成
     migration_flag.touch()
-    print("✅ 遷移完成！")
-
-# 執行遷移
-migrate_json_to_sqlite()
+    api_log.info("遷移完成！")
 
 # ========== 兼容函數：保持 API 不變 ==========
 def save_videos_db():
@@ -193,119 +304,97 @@ def load_videos_db():
     pass  # SQLite 在需要時即時查詢
 
 
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
+
+
+def _recovered_video_record(video_id: str, file_path: Path, file_size: int, mtime_ns: int,
+                            results_mtime_ns: Optional[int]) -> Dict:
+    """由磁碟上的視頻文件（和結果文件）生成恢復的視頻記錄"""
+    modified = datetime.fromtimestamp(mtime_ns / 1e9)
+    display_filename = file_path.name
+    # 如果文件名看起來像 UUID（36個字符，包含連字符），使用文件大小和日期生成一個更友好的名稱
+    if len(file_path.stem) == 36 and file_path.stem.count('-') == 4:
+        display_filename = f"Video_{modified.strftime('%Y-%m-%d')}_{file_size / (1024 * 1024):.0f}MB{file_path.suffix}"
+    
+    video_data = {
+        "id": video_id,
+        "filename": display_filename,
+        "original_filename": display_filename,
+        "file_path": str(file_path.relative_to(PROJECT_ROOT)),
+        "upload_time": modified.isoformat(),
+        "status": "completed" if results_mtime_ns is not None else "uploaded",
+        "file_size": file_size
+    }
+    if results_mtime_ns is not None:
+        video_data["analysis_time"] = datetime.fromtimestamp(results_mtime_ns / 1e9).isoformat()
+    return video_data
+
+
 def scan_existing_videos():
-    """掃描 data 文件夾，自動恢復已存在的視頻記錄到 SQLite"""
-    # 獲取現有 ID
-    existing_videos = db.get_all_videos()
-    existing_ids = {v["id"] for v in existing_videos}
+    """
+    掃描 data 文件夾，自動恢復已存在的視頻記錄到 SQLite
     
-    # 掃描 uploads 文件夾（檢查兩個可能的位置）
-    upload_dirs = [UPLOAD_DIR]
-    if BACKEND_UPLOAD_DIR.exists():
-        upload_dirs.append(BACKEND_UPLOAD_DIR)
+    目錄內容記錄在 data/.scan_manifest.json，沒有變更的目錄不重新列出，只 stat 新出現的文件；
+    缺少記錄的視頻在一個交易中批量寫入。
+    """
+    manifest = ScanManifest(PROJECT_ROOT / "data" / SCAN_MANIFEST_NAME)
+    existing_ids = db.get_video_ids()
     
-    for upload_dir in upload_dirs:
-        if upload_dir.exists():
-            for file_path in upload_dir.iterdir():
-                if file_path.is_file() and file_path.suffix.lower() in ['.mp4', '.avi', '.mov', '.mkv', '.webm']:
-                    # 從文件名提取 video_id（格式：{video_id}.{ext}）
-                    video_id = file_path.stem
-                    
-                    if video_id not in existing_ids:
-                        # 使用相對於 PROJECT_ROOT 的路徑
-                        relative_path = str(file_path.relative_to(PROJECT_ROOT))
-                        # 檢查是否有對應的結果文件（檢查兩個可能的位置）
-                        results_file = RESULTS_DIR / f"{video_id}_results.json"
-                        if not results_file.exists() and BACKEND_RESULTS_DIR.exists():
-                            results_file = BACKEND_RESULTS_DIR / f"{video_id}_results.json"
-                        
-                        status = "completed" if results_file.exists() else "uploaded"
-                        
-                        # 嘗試從文件名中提取有意義的名稱（如果文件名是 UUID，使用默認名稱）
-                        display_filename = file_path.name
-                        # 如果文件名看起來像 UUID（36個字符，包含連字符），使用一個更友好的名稱
-                        if len(file_path.stem) == 36 and file_path.stem.count('-') == 4:
-                            # 使用文件大小和日期來生成一個友好的名稱
-                            file_size_mb = file_path.stat().st_size / (1024 * 1024)
-                            date_str = datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d')
-                            display_filename = f"Video_{date_str}_{file_size_mb:.0f}MB{file_path.suffix}"
-                        
-                        video_data = {
-                            "id": video_id,
-                            "filename": display_filename,
-                            "original_filename": display_filename,
-                            "file_path": relative_path,
-                            "upload_time": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                            "status": status,
-                            "file_size": file_path.stat().st_size
-                        }
-                        
-                        # 檢查 SQLite 中是否有這個視頻的記錄
-                        existing_video = db.get_video(video_id)
-                        if existing_video and existing_video.get("original_filename"):
-                            video_data["original_filename"] = existing_video["original_filename"]
-                            video_data["filename"] = existing_video["original_filename"]
-                        
-                        if status == "completed":
-                            video_data["analysis_time"] = datetime.fromtimestamp(results_file.stat().st_mtime).isoformat()
-                        
-                        db.add_video(video_data)
-                        existing_ids.add(video_id)
-                        print(f"✅ 恢復視頻記錄: {file_path.name} ({status})")
+    # 檢查兩個可能的位置，同一 video_id 以先出現的目錄為準
+    upload_dirs = [UPLOAD_DIR] + ([BACKEND_UPLOAD_DIR] if BACKEND_UPLOAD_DIR.exists() else [])
+    results_dirs = [RESULTS_DIR] + ([BACKEND_RESULTS_DIR] if BACKEND_RESULTS_DIR.exists() else [])
     
-    # 掃描 results 文件夾（檢查兩個可能的位置）
-    results_dirs = [RESULTS_DIR]
-    if BACKEND_RESULTS_DIR.exists():
-        results_dirs.append(BACKEND_RESULTS_DIR)
+    # 文件名格式：{video_id}.{ext}（只對需要恢復的文件建立 Path，數萬個文件時 pathlib 本身就是主要開銷）
+    uploads = {}
+    for upload_dir in upload_dirs:
+        files, _ = manifest.scan(upload_dir, VIDEO_EXTENSIONS)
+        for name, (size, mtime_ns) in sorted(files.items()):
+            uploads.setdefault(os.path.splitext(name)[0], (upload_dir, name, size, mtime_ns))
     
+    # 文件名格式：{video_id}_results.json
+    results_mtimes = {}
     for results_dir in results_dirs:
-        if results_dir.exists():
-            for results_file in results_dir.iterdir():
-                if results_file.is_file() and results_file.suffix == '.json':
-                    video_id = results_file.stem.replace('_results', '')
-                    
-                    if video_id not in existing_ids:
-                        # 檢查是否有對應的上傳文件（檢查兩個可能的位置）
-                        upload_file = None
-                        for upload_dir in upload_dirs:
-                            if upload_dir.exists():
-                                upload_file = upload_dir / f"{video_id}.mp4"
-                                if not upload_file.exists():
-                                    # 嘗試其他擴展名
-                                    for ext in ['.avi', '.mov', '.mkv', '.webm']:
-                                        upload_file = upload_dir / f"{video_id}{ext}"
-                                        if upload_file.exists():
-                                            break
-                                if upload_file and upload_file.exists():
-                                    break
-                        
-                        if upload_file and upload_file.exists():
-                            relative_path = str(upload_file.relative_to(PROJECT_ROOT))
-                            
-                            # 嘗試從文件名中提取有意義的名稱
-                            display_filename = upload_file.name
-                            if len(upload_file.stem) == 36 and upload_file.stem.count('-') == 4:
-                                file_size_mb = upload_file.stat().st_size / (1024 * 1024)
-                                date_str = datetime.fromtimestamp(upload_file.stat().st_mtime).strftime('%Y-%m-%d')
-                                display_filename = f"Video_{date_str}_{file_size_mb:.0f}MB{upload_file.suffix}"
-                            
-                            video_data = {
-                                "id": video_id,
-                                "filename": display_filename,
-                                "original_filename": display_filename,
-                                "file_path": relative_path,
-                                "upload_time": datetime.fromtimestamp(upload_file.stat().st_mtime).isoformat(),
-                                "status": "completed",
-                                "file_size": upload_file.stat().st_size,
-                                "analysis_time": datetime.fromtimestamp(results_file.stat().st_mtime).isoformat()
-                            }
-                            
-                            db.add_video(video_data)
-                            existing_ids.add(video_id)
-                            print(f"✅ 恢復視頻記錄（從結果文件）: {upload_file.name}")
-
-# 啟動時掃描已有文件
-scan_existing_videos()
+        files, _ = manifest.scan(results_dir, ['.json'])
+        for name, (_, mtime_ns) in files.items():
+            results_mtimes.setdefault(os.path.splitext(name)[0].replace('_results', ''), mtime_ns)
+    
+    # 只有結果文件、沒有視頻文件的記錄無法播放，不恢復
+    recovered = [
+        _recovered_video_record(video_id, upload_dir / name, size, mtime_ns, results_mtimes.get(video_id))
+        for video_id, (upload_dir, name, size, mtime_ns) in uploads.items()
+        if video_id not in existing_ids
+    ]
+    inserted = db.add_videos(recovered)
+    for video_data in recovered:
+        api_log.debug(f"恢復視頻記錄: {video_data['file_path']} ({video_data['status']})")
+    
+    manifest.save()
+    api_log.info(f"恢復掃描完成: 恢復 {inserted} 個視頻記錄", recovered=inserted, **manifest.stats)
+
+# ========== 啟動任務 ==========
+# 遷移和文件恢復掃描在背景執行緒中進行，不延遲服務啟動（完成前 /videos 可能暫缺未登記的文件）
+startup_state = {"recovery": "pending", "recovery_seconds": None}
+
+
+def run_startup_recovery():
+    """執行 JSON 遷移和文件恢復掃描（在執行緒池中運行）"""
+    startup_state["recovery"] = "running"
+    start = time.perf_counter()
+    try:
+        migrate_json_to_sqlite()
+        scan_existing_videos()
+        startup_state["recovery"] = "completed"
+    except Exception as e:
+        startup_state["recovery"] = "failed"
+        api_log.error(f"啟動恢復掃描失敗: {e}", exc_info=True)
+    finally:
+        startup_state["recovery_seconds"] = round(time.perf_counter() - start, 3)
+
+
+@app.on_event("startup")
+async def start_background_recovery():
+    """服務啟動後在背景執行恢復掃描"""
+    app.state.recovery = asyncio.get_running_loop().run_in_executor(None, run_startup_recovery)
 
 class VideoUpdateRequest(BaseModel):
     new_filename: str
@@ -329,8 +418,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """健康檢查"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    """健康檢查（附帶啟動恢復掃描的狀態）"""
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "startup": startup_state}
+
+@app.get("/metrics")
+async def get_metrics():
+    """監控指標（Prometheus 文本格式）"""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.post("/upload")
 async def upload_video(file: UploadFile = File(...)):
@@ -367,7 +461,7 @@ async def upload_video(file: UploadFile = File(...)):
             "status": "uploaded",
             "file_size": bytes_written
         }
-        db.add_video(video_data)
+        await adb.add_video(video_data)
         
         return {
             "video_id": video_id,
@@ -384,7 +478,7 @@ async def start_analysis(video_id: str, background_tasks: BackgroundTasks):
     """開始分析影片"""
     try:
         # 查找影片
-        video = db.get_video(video_id)
+        video = await adb.get_video(video_id)
         if not video:
             raise HTTPException(status_code=404, detail="影片不存在")
         
@@ -397,10 +491,12 @@ async def start_analysis(video_id: str, background_tasks: BackgroundTasks):
             "progress": 0
         }
         
-        db.update_video(video_id, {"status": "processing", "task_id": task_id})
+        await adb.update_video(video_id, {"status": "processing", "task_id": task_id})
         
-        # 添加背景任務 (實際應用中應使用Celery)
+        # 添加背景任務 (實際應用中應使用Celery)，開始執行前計入等待隊列
+        analysis_metrics.queue_depth.inc()
         background_tasks.add_task(process_video, video_id, task_id)
+        api_log.analysis_started(video_id, task_id)
         
         return {
             "task_id": task_id,
@@ -412,21 +508,37 @@ async def start_analysis(video_id: str, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=f"開始分析失敗: {str(e)}")
 
 @app.get("/videos")
-async def get_videos():
-    """獲取所有影片列表"""
-    return {"videos": db.get_all_videos()}
+async def get_videos(limit: int = Query(50, ge=1, le=200),
+                     cursor: Optional[str] = None,
+                     status: Optional[str] = None,
+                     q: Optional[str] = Query(None, max_length=200),
+                     sort: str = Query("upload_time", regex=f"^({'|'.join(VIDEO_SORT_COLUMNS)})$"),
+                     order: str = Query("desc", regex="^(asc|desc)$")):
+    """
+    獲取影片列表（游標分頁，可按狀態過濾、按文件名搜索和排序）
+    
+    返回 {"videos": 本頁影片, "next_cursor": 下一頁游標（傳回 cursor 參數，沒有更多時為 null）,
+          "counts": 各狀態影片數（含 "all"），不受 status/q 影響}
+    """
+    try:
+        page = await adb.list_videos(limit=limit, cursor=cursor, status=status, query=q, sort=sort, order=order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page["counts"] = await adb.get_status_counts()
+    # SQLite 的值已經可以直接序列化為 JSON；跳過 jsonable_encoder（逐欄位遞歸，比查詢本身慢得多，且在事件循環中執行）
+    return JSONResponse(page)
 
 @app.get("/videos/{video_id}")
 async def get_video(video_id: str):
     """獲取特定影片信息"""
-    video = db.get_video(video_id)
+    video = await adb.get_video(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="影片不存在")
     return video
 
 @app.get("/analysis/{task_id}")
 async def get_analysis_status(task_id: str):
-    """獲取分析任務狀態"""
+    """獲取分析任務狀態（完成後包含分段耗時 profile）"""
     task = analysis_tasks.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="任務不存在")
@@ -454,11 +566,62 @@ async def get_analysis_results(video_id: str):
             raise e
         raise HTTPException(status_code=500, detail=f"獲取結果失敗: {str(e)}")
 
+@app.get("/results/{video_id}/summary")
+async def get_results_summary(video_id: str):
+    """獲取分析結果彙總（球員動作統計、回合動作列表、動作置信度統計）"""
+    try:
+        results_path = resolve_results_path(video_id)
+        if results_path is None:
+            raise HTTPException(status_code=404, detail="分析結果不存在")
+        
+        # 解析結果文件可能需要數百毫秒（長比賽的結果有數十 MB），在執行緒池中執行，不阻塞事件循環；
+        # 新版結果旁有只含彙總的小文件，不必解析整個結果文件
+        summary_path = summary_path_for(results_path)
+        loop = asyncio.get_running_loop()
+        if summary_path.exists():
+            return await loop.run_in_executor(None, load_cached, summary_path, "summary", _read_json)
+        return await loop.run_in_executor(None, load_cached, results_path, "summary", _load_summary)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"獲取彙總失敗: {str(e)}")
+
+@app.get("/results/{video_id}/heatmap")
+async def get_player_heatmap(video_id: str,
+                             player: Optional[int] = None,
+                             t0: float = Query(0.0, ge=0),
+                             t1: Optional[float] = Query(None, ge=0),
+                             bins: Optional[int] = Query(None, ge=1)):
+    """獲取任意時間窗口的球員熱區圖（player 為追蹤ID，省略時為所有球員）"""
+    try:
+        results_path = resolve_results_path(video_id)
+        if results_path is None:
+            raise HTTPException(status_code=404, detail="分析結果不存在")
+        
+        # 載入 .npz 或從舊版結果建立立方體都可能耗時，在執行緒池中執行，不阻塞事件循環
+        cube_path = heatmap_path_for(results_path)
+        loop = asyncio.get_running_loop()
+        if cube_path.exists():
+            cube = await loop.run_in_executor(None, load_cached, cube_path, "heatmap", HeatmapCube.load)
+        else:
+            cube = await loop.run_in_executor(None, load_cached, results_path, "heatmap", _build_heatmap)
+        
+        try:
+            return cube.window(player, t0, t1, bins)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"球員不存在 (ID: {player})")
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"獲取熱區圖失敗: {str(e)}")
+
 @app.delete("/videos/{video_id}")
 async def delete_video(video_id: str):
     """刪除視頻及其相關文件"""
     try:
-        video = db.get_video(video_id)
+        video = await adb.get_video(video_id)
         if not video:
             raise HTTPException(status_code=404, detail="影片不存在")
         
@@ -475,38 +638,47 @@ async def delete_video(video_id: str):
             if os.path.exists(video_path):
                 try:
                     os.remove(video_path)
-                    print(f"✅ 已刪除視頻文件: {video_path}")
+                    api_log.info(f"已刪除視頻文件: {video_path}")
                 except Exception as e:
-                    print(f"⚠️  刪除視頻文件失敗: {e}")
+                    api_log.warning(f"刪除視頻文件失敗: {e}")
             
             # 也嘗試刪除 backend/data 目錄中的文件（如果存在）
             backend_video_path = str(BACKEND_UPLOAD_DIR / os.path.basename(video_path))
             if os.path.exists(backend_video_path):
                 try:
                     os.remove(backend_video_path)
-                    print(f"✅ 已刪除備份視頻文件: {backend_video_path}")
+                    api_log.info(f"已刪除備份視頻文件: {backend_video_path}")
                 except Exception as e:
-                    print(f"⚠️  刪除備份視頻文件失敗: {e}")
+                    api_log.warning(f"刪除備份視頻文件失敗: {e}")
         
         # 刪除結果文件（檢查兩個可能的位置）
         results_file = RESULTS_DIR / f"{video_id}_results.json"
         if results_file.exists():
             try:
                 results_file.unlink()
-                print(f"✅ 已刪除結果文件: {results_file}")
+                api_log.info(f"已刪除結果文件: {results_file}")
             except Exception as e:
-                print(f"⚠️  刪除結果文件失敗: {e}")
+                api_log.warning(f"刪除結果文件失敗: {e}")
         
         backend_results_file = BACKEND_RESULTS_DIR / f"{video_id}_results.json"
         if backend_results_file.exists():
             try:
                 backend_results_file.unlink()
-                print(f"✅ 已刪除備份結果文件: {backend_results_file}")
+                api_log.info(f"已刪除備份結果文件: {backend_results_file}")
             except Exception as e:
-                print(f"⚠️  刪除備份結果文件失敗: {e}")
+                api_log.warning(f"刪除備份結果文件失敗: {e}")
+        
+        # 刪除熱區圖立方體和彙總文件
+        for derived_file in (heatmap_path_for(results_file), heatmap_path_for(backend_results_file),
+                             summary_path_for(results_file), summary_path_for(backend_results_file)):
+            if derived_file.exists():
+                try:
+                    derived_file.unlink()
+                except Exception as e:
+                    api_log.warning(f"刪除衍生文件失敗: {e}")
         
         # 從數據庫中移除
-        db.delete_video(video_id)
+        await adb.delete_video(video_id)
         
         # 刪除相關的分析任務
         task_ids_to_remove = [task_id for task_id, task in analysis_tasks.items() if task.get("video_id") == video_id]
@@ -528,12 +700,12 @@ async def set_jersey_mapping_endpoint(video_id: str, request: JerseyNumberMappin
     """設置玩家球衣號碼映射（用戶手動標記）"""
     try:
         # 驗證視頻存在
-        video = db.get_video(video_id)
+        video = await adb.get_video(video_id)
         if not video:
             raise HTTPException(status_code=404, detail="影片不存在")
         
         # 保存映射到 SQLite
-        db.set_jersey_mapping(video_id, request.track_id, request.jersey_number, request.frame, request.bbox)
+        await adb.set_jersey_mapping(video_id, request.track_id, request.jersey_number, request.frame, request.bbox)
         
         return {
             "success": True,
@@ -552,14 +724,14 @@ async def set_jersey_mapping_endpoint(video_id: str, request: JerseyNumberMappin
 @app.get("/videos/{video_id}/jersey-mappings")
 async def get_jersey_mappings_endpoint(video_id: str):
     """獲取視頻的所有球衣號碼映射"""
-    mappings = db.get_jersey_mappings(video_id)
+    mappings = await adb.get_jersey_mappings(video_id)
     return {"mappings": mappings}
 
 @app.delete("/videos/{video_id}/jersey-mapping/{track_id}")
 async def delete_jersey_mapping_endpoint(video_id: str, track_id: str):
     """刪除球衣號碼映射"""
     try:
-        success = db.delete_jersey_mapping(video_id, int(track_id))
+        success = await adb.delete_jersey_mapping(video_id, int(track_id))
         if success:
             return {"success": True, "message": f"已刪除追蹤ID {track_id} 的映射"}
         else:
@@ -572,26 +744,26 @@ async def delete_jersey_mapping_endpoint(video_id: str, track_id: str):
 @app.put("/videos/{video_id}")
 async def update_video_endpoint(video_id: str, request: VideoUpdateRequest):
     """更新視頻文件名"""
-    video = db.get_video(video_id)
+    video = await adb.get_video(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="影片不存在")
     
     # 更新顯示文件名
-    db.update_video(video_id, {"filename": request.new_filename})
-    video = db.get_video(video_id)  # 重新獲取更新後的資料
+    await adb.update_video(video_id, {"filename": request.new_filename})
+    video = await adb.get_video(video_id)  # 重新獲取更新後的資料
     return {"message": "視頻名稱已更新", "video": video}
 
 @app.get("/play/{video_id}")
 async def play_video(video_id: str, request: Request):
     """播放影片文件（支持 Range 请求以支持视频跳转）"""
-    video = db.get_video(video_id)
+    video = await adb.get_video(video_id)
     if not video:
-        print(f"❌ 視頻不存在: video_id={video_id}")
+        api_log.warning("播放的視頻不存在", video_id=video_id)
         raise HTTPException(status_code=404, detail=f"影片不存在 (ID: {video_id})")
     
     video_path = video.get("file_path")
     if not video_path:
-        print(f"❌ 視頻路徑不存在: video_id={video_id}, video={video}")
+        api_log.warning("視頻路徑不存在", video_id=video_id)
         raise HTTPException(status_code=404, detail="影片路徑不存在")
     
     # 確保路徑是絕對路徑
@@ -601,8 +773,6 @@ async def play_video(video_id: str, request: Request):
     # 標準化路徑（處理相對路徑和絕對路徑）
     video_path = os.path.normpath(video_path)
     
-    print(f"🔍 檢查視頻文件: video_id={video_id}, video_path={video_path}, exists={os.path.exists(video_path)}")
-    
     if not os.path.exists(video_path):
         # 嘗試其他可能的路徑
         alt_paths = [
@@ -613,11 +783,10 @@ async def play_video(video_id: str, request: Request):
         for alt_path in alt_paths:
             if alt_path and os.path.exists(alt_path):
                 video_path = alt_path
-                print(f"✅ 找到替代路徑: {video_path}")
+                api_log.debug(f"找到替代路徑: {video_path}", video_id=video_id)
                 break
         else:
-            print(f"❌ 影片文件不存在: video_path={video_path}, PROJECT_ROOT={PROJECT_ROOT}")
-            print(f"   嘗試的路徑: {alt_paths}")
+            api_log.warning(f"影片文件不存在: {video_path}", video_id=video_id, tried_paths=alt_paths)
             raise HTTPException(status_code=404, detail=f"影片文件不存在: {video_path}")
     
     # 確定媒體類型
@@ -658,6 +827,7 @@ async def play_video(video_id: str, request: Request):
                     if not chunk:
                         break
                     remaining -= len(chunk)
+                    play_bytes.labels("partial").inc(len(chunk))
                     yield chunk
         
         headers = {
@@ -675,6 +845,7 @@ async def play_video(video_id: str, request: Request):
         )
     else:
         # 沒有 Range 請求，返回整個文件
+        play_bytes.labels("full").inc(file_size)
         return FileResponse(
             video_path,
             media_type=media_type,
@@ -683,9 +854,10 @@ async def play_video(video_id: str, request: Request):
 
 async def process_video(video_id: str, task_id: str):
     """處理影片的後台任務 (實際執行分析器)"""
+    analysis_metrics.queue_depth.dec()
     try:
         # 取得影片路徑
-        video = db.get_video(video_id)
+        video = await adb.get_video(video_id)
         if not video:
             raise FileNotFoundError("影片不存在")
 
@@ -715,6 +887,8 @@ async def process_video(video_id: str, task_id: str):
         # 定義一個內部函數來執行所有阻塞操作（包括分析器初始化和分析）
         def run_analysis():
             """在執行緒池中運行的阻塞操作"""
+            job = analysis_metrics.job(task_id)  # 執行中任務數和即時處理速度
+            
             # 創建進度回調函數來更新任務進度
             def update_progress(progress: float, frame_count: int, total_frames: int):
                 """更新進度（在線程中執行，需要安全地更新共享狀態）"""
@@ -722,15 +896,26 @@ async def process_video(video_id: str, task_id: str):
                 # 5% + (progress * 0.90) 將視頻分析的進度映射到 5-95%
                 mapped_progress = 5 + (progress * 0.90)
                 analysis_tasks[task_id]["progress"] = min(95, mapped_progress)
+                job.progress(frame_count)
+            
+            VolleyballAnalyzer = load_analyzer_class()  # 第一次分析時才導入 processor
             
-            analyzer = VolleyballAnalyzer(
-                ball_model_path=ball_model if os.path.exists(ball_model) else None,
-                action_model_path=action_model if os.path.exists(action_model) else None,
-                player_model_path=player_model if os.path.exists(player_model) else None,
-                jersey_number_model_path=jersey_number_model if os.path.exists(jersey_number_model) else None
-                # device 參數留空，自動檢測最佳設備 (CUDA/MPS/CPU)
-            )
-            return analyzer.analyze_video(video_path, str(results_path), progress_callback=update_progress)
+            # 分析器的日誌附帶任務/影片 ID（contextvars 不會傳入執行緒池，在這裡綁定）
+            with job, log_context(task_id=task_id, video_id=video_id):
+                analyzer = VolleyballAnalyzer(
+                    ball_model_path=ball_model if os.path.exists(ball_model) else None,
+                    action_model_path=action_model if os.path.exists(action_model) else None,
+                    player_model_path=player_model if os.path.exists(player_model) else None,
+                    jersey_number_model_path=jersey_number_model if os.path.exists(jersey_number_model) else None,
+                    async_jersey_workers=1  # 球衣號碼識別在背景執行緒中進行，不阻塞幀循環
+                    # device 參數留空，自動檢測最佳設備 (CUDA/MPS/CPU)
+                )
+                analysis_metrics.observe_model_loads(analyzer.model_load_times)
+                profiler = StageProfiler()
+                results = analyzer.analyze_video(video_path, str(results_path), progress_callback=update_progress,
+                                                 profiler=profiler)
+                analysis_metrics.observe_analysis(profiler, results)
+                return results
 
         # 實際分析（在執行緒池中執行，避免阻塞事件循環）
         try:
@@ -743,9 +928,7 @@ async def process_video(video_id: str, task_id: str):
             
             results = await loop.run_in_executor(None, run_analysis)
         except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            print(f"❌ 分析錯誤詳情:\n{error_detail}")
+            api_log.error(f"分析錯誤: {e}", exc_info=True, video_id=video_id, task_id=task_id)
             raise
         
         # 保存結果
@@ -753,13 +936,15 @@ async def process_video(video_id: str, task_id: str):
         with open(results_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
         
-        # 更新任務狀態
+        # 更新任務狀態（附帶分段耗時，供 /analysis/{task_id} 查詢）
         analysis_tasks[task_id]["status"] = "completed"
         analysis_tasks[task_id]["progress"] = 100
         analysis_tasks[task_id]["end_time"] = datetime.now().isoformat()
+        analysis_tasks[task_id]["profile"] = results.get("profile")
+        api_log.analysis_completed(video_id, results.get("analysis_time", 0.0))
         
         # 更新影片狀態
-        db.update_video(video_id, {
+        await adb.update_video(video_id, {
             "status": "completed",
             "analysis_time": datetime.now().isoformat()
         })
@@ -777,19 +962,19 @@ class ConnectionManager:
     async def connect(self, video_id: str, websocket: WebSocket):
         await websocket.accept()
         self.active_connections[video_id] = websocket
-        print(f"🔌 WebSocket 連接建立: video_id={video_id}")
+        api_log.websocket_connected(video_id)
     
     def disconnect(self, video_id: str):
         if video_id in self.active_connections:
             del self.active_connections[video_id]
-            print(f"🔌 WebSocket 連接斷開: video_id={video_id}")
+            api_log.websocket_disconnected(video_id)
     
     async def send_progress(self, video_id: str, data: dict):
         if video_id in self.active_connections:
             try:
                 await self.active_connections[video_id].send_json(data)
             except Exception as e:
-                print(f"⚠️ 發送進度失敗: {e}")
+                api_log.warning(f"發送進度失敗: {e}", video_id=video_id)
                 self.disconnect(video_id)
 
 ws_manager = ConnectionManager()
@@ -801,7 +986,7 @@ async def websocket_analysis(websocket: WebSocket, video_id: str):
     
     try:
         # 驗證視頻存在
-        video = db.get_video(video_id)
+        video = await adb.get_video(video_id)
         if not video:
             await websocket.send_json({"error": "影片不存在", "status": "failed"})
             return
@@ -837,28 +1022,38 @@ async def websocket_analysis(websocket: WebSocket, video_id: str):
             "start_time": datetime.now().isoformat(),
             "progress": 0
         }
-        db.update_video(video_id, {"status": "processing", "task_id": task_id})
+        await adb.update_video(video_id, {"status": "processing", "task_id": task_id})
         
         # 定義進度回調（將在分析執行緒中調用）
         last_sent_progress = [0]  # 使用列表來允許閉包修改
+        job = analysis_metrics.job(task_id)  # 執行中任務數和即時處理速度
         
         def progress_callback(progress: float, frame_count: int, total_frames: int):
             """進度回調函數"""
             mapped_progress = 5 + (progress * 0.90)
             analysis_tasks[task_id]["progress"] = min(95, mapped_progress)
             last_sent_progress[0] = mapped_progress
+            job.progress(frame_count)
         
         # 啟動背景分析任務
         loop = asyncio.get_event_loop()
         
         def run_analysis_sync():
-            analyzer = VolleyballAnalyzer(
-                ball_model_path=ball_model if os.path.exists(ball_model) else None,
-                action_model_path=action_model if os.path.exists(action_model) else None,
-                player_model_path=player_model if os.path.exists(player_model) else None,
-                jersey_number_model_path=jersey_number_model if os.path.exists(jersey_number_model) else None
-            )
-            return analyzer.analyze_video(video_path, str(results_path), progress_callback=progress_callback)
+            VolleyballAnalyzer = load_analyzer_class()  # 第一次分析時才導入 processor
+            with job, log_context(task_id=task_id, video_id=video_id):
+                analyzer = VolleyballAnalyzer(
+                    ball_model_path=ball_model if os.path.exists(ball_model) else None,
+                    action_model_path=action_model if os.path.exists(action_model) else None,
+                    player_model_path=player_model if os.path.exists(player_model) else None,
+                    jersey_number_model_path=jersey_number_model if os.path.exists(jersey_number_model) else None,
+                    async_jersey_workers=1
+                )
+                analysis_metrics.observe_model_loads(analyzer.model_load_times)
+                profiler = StageProfiler()
+                results = analyzer.analyze_video(video_path, str(results_path), progress_callback=progress_callback,
+                                                 profiler=profiler)
+                analysis_metrics.observe_analysis(profiler, results)
+                return results
         
         # 非阻塞地運行分析並定期發送進度
         import concurrent.futures
@@ -885,10 +1080,10 @@ async def websocket_analysis(websocket: WebSocket, video_id: str):
                 except asyncio.TimeoutError:
                     pass  # 正常情況，沒有消息
                 except WebSocketDisconnect:
-                    print(f"⚠️ 客戶端斷開連接: video_id={video_id}")
+                    api_log.info("客戶端斷開連接", video_id=video_id)
                     break
             except Exception as e:
-                print(f"⚠️ WebSocket 進度發送錯誤: {e}")
+                api_log.warning(f"WebSocket 進度發送錯誤: {e}", video_id=video_id)
                 break
         
         # 獲取分析結果
@@ -903,8 +1098,9 @@ async def websocket_analysis(websocket: WebSocket, video_id: str):
             analysis_tasks[task_id]["status"] = "completed"
             analysis_tasks[task_id]["progress"] = 100
             analysis_tasks[task_id]["end_time"] = datetime.now().isoformat()
+            analysis_tasks[task_id]["profile"] = results.get("profile")
             
-            db.update_video(video_id, {
+            await adb.update_video(video_id, {
                 "status": "completed",
                 "analysis_time": datetime.now().isoformat()
             })
@@ -934,9 +1130,9 @@ async def websocket_analysis(websocket: WebSocket, video_id: str):
         executor.shutdown(wait=False)
         
     except WebSocketDisconnect:
-        print(f"🔌 WebSocket 客戶端斷開: video_id={video_id}")
+        api_log.websocket_disconnected(video_id)
     except Exception as e:
-        print(f"❌ WebSocket 錯誤: {e}")
+        api_log.error(f"WebSocket 錯誤: {e}", video_id=video_id)
         try:
             await websocket.send_json({"error": str(e), "status": "failed"})
         except:
@@ -948,11 +1144,11 @@ async def websocket_analysis(websocket: WebSocket, video_id: str):
 async def websocket_progress(websocket: WebSocket, video_id: str):
     """WebSocket endpoint for monitoring progress only (does NOT start analysis)"""
     await websocket.accept()
-    print(f"📊 Progress WebSocket connected: video_id={video_id}")
+    api_log.info("Progress WebSocket connected", video_id=video_id)
     
     try:
         # Get video info to find task_id
-        video = db.get_video(video_id)
+        video = await adb.get_video(video_id)
         if not video:
             await websocket.send_json({"error": "Video not found", "status": "failed"})
             return
@@ -1018,11 +1214,11 @@ async def websocket_progress(websocket: WebSocket, video_id: str):
                         "message": f"Analyzing... {current_progress:.1f}%"
                     })
                 except Exception as e:
-                    print(f"⚠️ Progress send error: {e}")
+                    api_log.warning(f"Progress send error: {e}", video_id=video_id)
                     break
             
             # Also check if video status changed in database
-            video = db.get_video(video_id)
+            video = await adb.get_video(video_id)
             if video and video.get("status") == "completed":
                 await websocket.send_json({
                     "status": "completed",
@@ -1032,9 +1228,9 @@ async def websocket_progress(websocket: WebSocket, video_id: str):
                 break
                 
     except WebSocketDisconnect:
-        print(f"📊 Progress WebSocket disconnected: video_id={video_id}")
+        api_log.info("Progress WebSocket disconnected", video_id=video_id)
     except Exception as e:
-        print(f"❌ Progress WebSocket error: {e}")
+        api_log.error(f"Progress WebSocket error: {e}", video_id=video_id)
         try:
             await websocket.send_json({"error": str(e), "status": "failed"})
         except:
@@ -0,0 +1,108 @@
+"""
+排球分析系統 - 恢復掃描清單
+記錄上傳/結果目錄的 mtime 和其中每個文件的 size/mtime，啟動時只重新列出有變更的目錄、只 stat 新出現的文件
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 文件簽名：(size, mtime_ns)
+FileSignature = Tuple[int, int]
+
+
+class ScanManifest:
+    """
+    持久化的目錄掃描清單
+
+    目錄的 mtime 只在文件新增、刪除或改名時改變，所以 mtime 不變的目錄直接沿用清單中的文件列表，不列目錄也不 stat；
+    變更的目錄重新列出，但只 stat 清單中沒有的文件。恢復掃描只關心文件是否存在，
+    原地覆寫的文件保留第一次看到時的 size/mtime。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: 清單 JSON 文件路徑（不存在或損壞時等同第一次全量掃描）
+        """
+        self.path = Path(path)
+        self.directories: Dict[str, Dict] = self._load()
+        self.stats = {"skipped_directories": 0, "listed_directories": 0, "new_files": 0, "removed_files": 0}
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return {}
+        return data.get("directories", {})
+
+    def scan(self, directory: Path, suffixes: Optional[Iterable[str]] = None) -> Tuple[Dict[str, FileSignature], List[str]]:
+        """
+        掃描一個目錄
+
+        Args:
+            directory: 目錄路徑
+            suffixes: 只保留這些副檔名的文件（小寫，含點），None 表示全部
+
+        Returns:
+            (目錄中的文件 {文件名: (size, mtime_ns)}, 本次新出現的文件名)
+        """
+        key = str(directory)
+        previous = self.directories.get(key)
+        try:
+            # 先取目錄 mtime 再列目錄：列目錄期間新增的文件會讓下次掃描看到不同的 mtime
+            directory_mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            if self.directories.pop(key, None) is not None:
+                self._dirty = True
+            return {}, []
+
+        if previous is not None and previous.get("mtime_ns") == directory_mtime:
+            self.stats["skipped_directories"] += 1
+            return {name: tuple(signature) for name, signature in previous["files"].items()}, []
+
+        self.stats["listed_directories"] += 1
+        suffixes = {s.lower() for s in suffixes} if suffixes is not None else None
+        known = previous["files"] if previous is not None else {}
+        files: Dict[str, FileSignature] = {}
+        new_files: List[str] = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if suffixes is not None and os.path.splitext(entry.name)[1].lower() not in suffixes:
+                    continue
+                signature = known.get(entry.name)
+                if signature is not None:
+                    files[entry.name] = tuple(signature)
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue  # 列目錄後被刪除
+                files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                new_files.append(entry.name)
+
+        self.stats["new_files"] += len(new_files)
+        self.stats["removed_files"] += len(known.keys() - files.keys())
+        self.directories[key] = {"mtime_ns": directory_mtime, "files": {name: list(sig) for name, sig in files.items()}}
+        self._dirty = True
+        return files, new_files
+
+    def save(self):
+        """寫回清單（先寫臨時文件再替換，中途中斷不會留下損壞的清單）"""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "directories": self.directories}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - SQLite 資料庫微基準
+比較預設日誌模式、逐條提交、無索引（原實現）與 WAL + 批量交易 + 索引的寫入和查詢耗時
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加後端到路徑
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+import database  # noqa: E402
+from database import Database  # noqa: E402
+
+# 原實現的連接設定：預設 rollback journal、synchronous=FULL、沒有索引
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL"}
+TUNED_PRAGMAS = dict(database.PRAGMAS)
+INDEXES = [f"idx_videos{prefix}_{column}_id" for column in database.VIDEO_SORT_COLUMNS
+           for prefix in ("", "_status")] + ["idx_analysis_tasks_video_id"]
+
+
+def synthetic_videos(count: int):
+    """生成視頻記錄（上傳時間亂序，讓 ORDER BY 需要排序或索引）"""
+    return [{
+        "id": f"video-{i:06d}",
+        "filename": f"match_{i}.mp4",
+        "file_path": f"data/uploads/video-{i:06d}.mp4",
+        "upload_time": f"2025-{1 + i * 7 % 12:02d}-{1 + i * 13 % 28:02d}T{i % 24:02d}:00:00",
+        "status": "completed" if i % 3 else "uploaded",
+        "file_size": 1000 * i
+    } for i in range(count)]
+
+
+def timed(fn, repeat: int = 1) -> float:
+    """執行 repeat 次，返回中位數耗時（秒）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(db_path: Path, tuned: bool, videos, mappings_per_video: int, lookups: int, repeat: int) -> dict:
+    """在一個新資料庫文件上執行全部操作"""
+    saved = database.PRAGMAS
+    database.PRAGMAS = TUNED_PRAGMAS if tuned else BASELINE_PRAGMAS
+    try:
+        db = Database(str(db_path))
+        conn = db._get_connection()
+        if not tuned:
+            for index in INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+        mappings = [{"video_id": video["id"], "track_id": track, "jersey_number": track + 1}
+                    for video in videos for track in range(mappings_per_video)]
+
+        if tuned:
+            insert = timed(lambda: db.add_videos(videos))
+            jersey = timed(lambda: db.set_jersey_mappings(mappings))
+        else:
+            insert = timed(lambda: [db.add_video(video) for video in videos])
+            jersey = timed(lambda: [db.set_jersey_mapping(m["video_id"], m["track_id"], m["jersey_number"])
+                                    for m in mappings])
+
+        ids = [video["id"] for video in videos]
+        result = {
+            "journal_mode": conn.execute("PRAGMA journal_mode").fetchone()[0],
+            "insert_videos_seconds": insert,
+            "insert_jersey_mappings_seconds": jersey,
+            "get_all_videos_seconds": timed(db.get_all_videos, repeat),
+            "get_video_seconds": timed(lambda: [db.get_video(ids[i % len(ids)]) for i in range(lookups)], repeat) / lookups,
+            "update_video_seconds": timed(lambda: db.update_video(ids[0], {"status": "processing"}), repeat),
+        }
+        db.close()
+        return result
+    finally:
+        database.PRAGMAS = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 資料庫微基準")
+    parser.add_argument("--videos", type=int, default=2000, help="視頻記錄數")
+    parser.add_argument("--mappings", type=int, default=5, help="每個視頻的球衣映射數")
+    parser.add_argument("--lookups", type=int, default=2000, help="按 ID 查詢次數")
+    parser.add_argument("--repeat", type=int, default=5, help="查詢重複次數（取中位數）")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    args = parser.parse_args()
+
+    videos = synthetic_videos(args.videos)
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = run(Path(tmp) / "baseline.db", False, videos, args.mappings, args.lookups, args.repeat)
+        tuned = run(Path(tmp) / "tuned.db", True, videos, args.mappings, args.lookups, args.repeat)
+
+    result = {
+        "benchmark": "database",
+        "videos": args.videos,
+        "jersey_mappings": args.videos * args.mappings,
+        "baseline": baseline,
+        "tuned": tuned,
+        "speedup": {key: baseline[key] / tuned[key] for key in baseline if key.endswith("_seconds") and tuned[key] > 0},
+    }
+
+    rows = [
+        ("插入視頻", "insert_videos_seconds", 1),
+        ("插入球衣映射", "insert_jersey_mappings_seconds", 1),
+        ("get_all_videos", "get_all_videos_seconds", 1000),
+        ("get_video", "get_video_seconds", 1e6),
+        ("update_video", "update_video_seconds", 1000),
+    ]
+    print(f"🗄️  SQLite 微基準 ({args.videos} 個視頻, {result['jersey_mappings']} 個球衣映射)")
+    print(f"   {'':<16}{'原實現 (' + baseline['journal_mode'] + ')':>20}{'WAL + 批量 + 索引':>20}{'加速比':>10}")
+    for label, key, scale in rows:
+        unit = {1: "秒", 1000: "ms", 1e6: "µs"}[scale]
+        print(f"   {label:<16}{baseline[key] * scale:>16.3f} {unit:<3}{tuned[key] * scale:>16.3f} {unit:<3}"
+              f"{result['speedup'].get(key, 0):>9.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 結果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - 回合事件收集性能基準
+比較回合結束時逐個掃描全部動作/得分與 FrameIndex 二分查找的耗時
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加AI核心到路徑
+sys.path.append(str(Path(__file__).parent.parent / "ai_core"))
+
+from plays import FrameIndex  # noqa: E402
+
+
+def synthetic_match(num_rallies: int, actions_per_rally: int = 12, seed: int = 0):
+    """
+    生成整場比賽的事件流：每個回合約 300 幀、回合間隔 200 幀
+
+    動作在結束後才完成（完成順序與開始幀不完全一致），每個回合最後一個動作附帶一次得分。
+
+    Returns:
+        按發生時間排序的 (完成幀, 類型, 內容) 列表，類型為 action / score / play_end
+    """
+    rng = np.random.default_rng(seed)
+    events = []
+    start = 0
+    for rally in range(num_rallies):
+        length = int(rng.integers(200, 400))
+        end = start + length
+        starts = np.sort(rng.integers(start, end, actions_per_rally))
+        for i, frame in enumerate(starts):
+            finalized = int(frame + rng.integers(5, 40))
+            events.append((finalized, "action", {"frame": int(frame), "action": "spike", "rally": rally}))
+            if i == actions_per_rally - 1:
+                events.append((finalized, "score", {"frame": int(frame), "score_type": "score"}))
+        events.append((end + 1, "play_end", {"start_frame": start, "end_frame": end}))
+        start = end + int(rng.integers(150, 250))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def collect_scan(events):
+    """原實現：每個回合結束時掃描全部已完成的動作和得分"""
+    actions, scores, plays = [], [], []
+    for _, kind, item in events:
+        if kind == "action":
+            actions.append(item)
+        elif kind == "score":
+            scores.append(item)
+        else:
+            play = dict(item, actions=[], scores=[])
+            for action in actions:
+                if play["start_frame"] <= action.get("frame", 0) <= play["end_frame"]:
+                    play["actions"].append(action)
+            for score in scores:
+                if play["start_frame"] <= score.get("frame", 0) <= play["end_frame"]:
+                    play["scores"].append(score)
+            plays.append(play)
+    return plays
+
+
+def collect_indexed(events):
+    """FrameIndex：加入事件時保持排序，回合結束時二分查找"""
+    actions, scores, plays = FrameIndex(), FrameIndex(), []
+    for _, kind, item in events:
+        if kind == "action":
+            actions.add(item)
+        elif kind == "score":
+            scores.add(item)
+        else:
+            play = dict(item, actions=[], scores=[])
+            play["actions"].extend(actions.between(play["start_frame"], play["end_frame"]))
+            play["scores"].extend(scores.between(play["start_frame"], play["end_frame"]))
+            plays.append(play)
+    return plays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回合事件收集性能基準")
+    parser.add_argument("--rallies", type=int, default=300, help="回合數")
+    parser.add_argument("--actions", type=int, default=12, help="每回合動作數")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    args = parser.parse_args()
+
+    events = synthetic_match(args.rallies, args.actions)
+
+    start = time.perf_counter()
+    scanned = collect_scan(events)
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = collect_indexed(events)
+    indexed_time = time.perf_counter() - start
+
+    result = {
+        "benchmark": "play_event_collection",
+        "rallies": args.rallies,
+        "actions": sum(1 for e in events if e[1] == "action"),
+        "scan_seconds": scan_time,
+        "indexed_seconds": indexed_time,
+        "speedup": scan_time / indexed_time if indexed_time > 0 else float("inf"),
+        "identical": scanned == indexed,
+    }
+
+    print(f"📊 回合事件收集 ({args.rallies} 回合, {result['actions']} 個動作)")
+    print(f"   - 逐個掃描: {scan_time:.4f} 秒")
+    print(f"   - 二分查找: {indexed_time:.4f} 秒")
+    print(f"   - 加速比: {result['speedup']:.1f}x")
+    print(f"   - 結果一致: {result['identical']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0 if result["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
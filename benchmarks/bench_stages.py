@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - 分段性能基準
+在合成比賽影片上分別測量解碼、球幀預處理、球熱力圖後處理、球員追蹤、球衣號碼合併、
+球軌跡過濾、回合聚合和結果序列化的耗時，結果寫成 JSON，可用 --compare 與之前的提交比較
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加AI核心到路徑
+sys.path.append(str(Path(__file__).parent.parent / "ai_core"))
+
+from backends import SyntheticBackend  # noqa: E402
+from plays import FrameIndex, GameStateMachine  # noqa: E402
+from processor import VolleyballAnalyzer  # noqa: E402
+from trajectory import BallTrajectory, interpolate_gaps  # noqa: E402
+from synthetic_video import generate_video  # noqa: E402
+
+# 解碼後保留在記憶體中、供預處理階段重複使用的幀數
+CACHED_FRAMES = 64
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被測函數的進度輸出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(run, repeat: int):
+    """
+    重複執行 run() 並取最快一次
+
+    Returns:
+        (最短耗時秒數, run 的返回值)
+    """
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = run()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def stage_decode(video_path: str):
+    """逐幀解碼整部影片"""
+    def run():
+        cap = cv2.VideoCapture(video_path)
+        count = 0
+        while cap.read()[0]:
+            count += 1
+        cap.release()
+        return count
+    return "frame", run
+
+
+def stage_preprocess(analyzer: VolleyballAnalyzer, frames, units: int):
+    """preprocess_ball_frame（灰度、縮放、正規化）"""
+    def run():
+        for i in range(units):
+            analyzer.preprocess_ball_frame(frames[i % len(frames)])
+        return units
+    return "frame", run
+
+
+def stage_ball_postprocess(analyzer: VolleyballAnalyzer, scene: SyntheticBackend, shape, units: int):
+    """postprocess_ball_output（熱力圖閾值、輪廓、質心）"""
+    ys, xs = np.mgrid[0:288, 0:512]
+    heatmaps = []
+    for f in np.linspace(1, scene.num_frames, min(units, 32)).astype(int):
+        x, y = scene.ball[f]
+        heat = np.zeros((288, 512), dtype=np.float32)
+        if not np.isnan(x):
+            cx, cy = x * 512 / scene.width, y * 288 / scene.height
+            heat = np.exp(-((xs - cx) ** 2 + (ys - cy) ** 2) / 18.0).astype(np.float32)
+        # VballNet 輸出 (1, 9, 288, 512)，後處理只使用最後一個時間步
+        heatmaps.append([np.broadcast_to(heat, (1, 9, 288, 512))])
+
+    def run():
+        for i in range(units):
+            analyzer.postprocess_ball_output(heatmaps[i % len(heatmaps)], shape)
+        return units
+    return "frame", run
+
+
+def stage_tracking(scene: SyntheticBackend, tracker: str):
+    """track_players（不含球衣號碼識別）"""
+    detections = [scene.detect_players(None, f) for f in range(1, scene.num_frames + 1)]
+
+    def run():
+        with quiet():
+            analyzer = VolleyballAnalyzer(device="cpu", tracker=tracker)
+        for players in detections:
+            analyzer.track_players([p for p in players if p["confidence"] >= analyzer.player_conf_threshold],
+                                   frame=None)
+        return len(detections)
+    return "frame", run
+
+
+def stage_jersey_merge(analyzer: VolleyballAnalyzer, units: int, seed: int):
+    """_merge_digit_detections（一到三個數字檢測合併為號碼）"""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(256):
+        digits = []
+        for _ in range(int(rng.integers(1, 4))):
+            x1 = float(rng.uniform(0, 60))
+            digits.append({"digit": int(rng.integers(0, 10)), "bbox": [x1, 10.0, x1 + 12.0, 30.0],
+                           "confidence": float(rng.uniform(0.1, 0.95)), "center_x": x1 + 6.0})
+        samples.append(digits)
+
+    def run():
+        for i in range(units):
+            analyzer._merge_digit_detections(samples[i % len(samples)])
+        return units
+    return "call", run
+
+
+def ball_points(scene: SyntheticBackend):
+    """場景中的球檢測，格式與 analyze_video 的 ball_tracking.trajectory 相同"""
+    points = []
+    for f in range(1, scene.num_frames + 1):
+        ball = scene.detect_ball(None, f)
+        if ball is not None:
+            points.append(dict(ball, frame=f, timestamp=f / scene.fps))
+    return points
+
+
+def stage_trajectory(analyzer: VolleyballAnalyzer, scene: SyntheticBackend):
+    """球軌跡後處理（速度過濾、拋物線異常點移除、平滑、插值）"""
+    points = ball_points(scene)
+
+    def run():
+        with quiet():
+            track = analyzer._filter_ball_track(BallTrajectory.from_points(points))
+            interpolate_gaps(track, scene.fps).to_points()
+        return len(points)
+    return "point", run
+
+
+def stage_plays(scene: SyntheticBackend, fps: float):
+    """回合聚合（遲滯狀態機 + 按幀號索引收集動作）"""
+    activity = [(f, scene.detect_ball(None, f) is not None, scene.detect_actions(None, f))
+                for f in range(1, scene.num_frames + 1)]
+
+    def run():
+        machine = GameStateMachine(max(1, round(0.1 * fps)), round(fps), max(1, round(0.5 * fps)))
+        actions = FrameIndex()
+        for frame, has_ball, detected in activity:
+            for action in detected:
+                actions.add({"frame": frame, "action": action["action"]})
+            for play in machine.update(frame, frame / fps, has_ball or bool(detected)):
+                play["actions"].extend(actions.between(play["start_frame"], play["end_frame"]))
+        for play in machine.finish():
+            play["actions"].extend(actions.between(play["start_frame"], play["end_frame"]))
+        return len(activity)
+    return "frame", run
+
+
+def stage_serialization(scene: SyntheticBackend):
+    """以 analyze_video 的完整結果測量 json.dumps（與保存結果時的參數相同）"""
+    with quiet():
+        results = VolleyballAnalyzer(device="cpu", detector_backend=scene).analyze_video(None)
+
+    def run():
+        return len(json.dumps(results, ensure_ascii=False, indent=2).encode("utf-8"))
+    return "MB", run
+
+
+def git_commit() -> str:
+    """當前提交（不在 git 倉庫中時為空字串）"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(result: dict, baseline_path: str, threshold: float) -> list:
+    """
+    與基準結果比較每個階段的每單位耗時
+
+    Returns:
+        變慢超過 threshold 比例的階段名稱
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"📈 與 {baseline.get('commit') or baseline_path} 比較")
+    for name, stats in result["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or before["ms_per_unit"] <= 0:
+            continue
+        ratio = stats["ms_per_unit"] / before["ms_per_unit"]
+        mark = "⚠️" if ratio > 1 + threshold else "  "
+        print(f"   {mark} {name}: {before['ms_per_unit']:.4f} → {stats['ms_per_unit']:.4f} ms/{stats['unit']} "
+              f"({ratio:.2f}x)")
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分段性能基準（合成影片，無模型）")
+    parser.add_argument("--video", help="使用已有的影片（預設生成合成影片）")
+    parser.add_argument("--frames", type=int, default=600, help="合成影片幀數")
+    parser.add_argument("--width", type=int, default=1280, help="合成影片寬度")
+    parser.add_argument("--height", type=int, default=720, help="合成影片高度")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    parser.add_argument("--repeat", type=int, default=3, help="每個階段重複次數（取最快一次）")
+    parser.add_argument("--stages", nargs="+", help="只執行指定階段")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    parser.add_argument("--compare", help="與之前的結果 JSON 比較")
+    parser.add_argument("--threshold", type=float, default=0.2, help="視為性能退化的變慢比例")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video
+        if video_path is None:
+            video_path = str(Path(tmp) / "synthetic.mp4")
+            generate_video(video_path, args.frames, args.width, args.height, seed=args.seed)
+
+        cap = cv2.VideoCapture(video_path)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = []
+        while len(frames) < CACHED_FRAMES:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            print(f"❌ 無法讀取影片: {video_path}")
+            return 1
+
+        # 追蹤、軌跡和回合階段使用與影片相同的場景腳本（--video 時按其尺寸重新生成）
+        scene = SyntheticBackend(num_frames=total_frames, width=width, height=height, fps=fps, seed=args.seed)
+        with quiet():
+            analyzer = VolleyballAnalyzer(device="cpu")
+
+        stages = {
+            "decode": lambda: stage_decode(video_path),
+            "preprocess_ball_frame": lambda: stage_preprocess(analyzer, frames, total_frames),
+            "ball_postprocess": lambda: stage_ball_postprocess(analyzer, scene, frames[0].shape, total_frames),
+            "tracking_norfair": lambda: stage_tracking(scene, "norfair"),
+            "tracking_bytetrack": lambda: stage_tracking(scene, "bytetrack"),
+            "jersey_merge": lambda: stage_jersey_merge(analyzer, 10_000, args.seed),
+            "trajectory_filters": lambda: stage_trajectory(analyzer, scene),
+            "play_aggregation": lambda: stage_plays(scene, fps),
+            "serialization": lambda: stage_serialization(scene),
+        }
+        selected = args.stages or list(stages)
+        unknown = [name for name in selected if name not in stages]
+        if unknown:
+            parser.error(f"未知階段: {', '.join(unknown)}（可選: {', '.join(stages)}）")
+
+        result = {
+            "benchmark": "stages",
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "environment": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "opencv": cv2.__version__,
+                "platform": platform.platform(),
+            },
+            "video": {"width": width, "height": height, "fps": fps, "frames": total_frames,
+                      "synthetic": args.video is None},
+            "repeat": args.repeat,
+            "stages": {},
+        }
+
+        print(f"📊 分段性能 ({total_frames} 幀, {width}x{height})")
+        for name in selected:
+            unit, run = stages[name]()
+            seconds, units = measure(run, args.repeat)
+            if unit == "MB":
+                units = units / 1e6
+            result["stages"][name] = {
+                "unit": unit,
+                "units": units,
+                "seconds": seconds,
+                "ms_per_unit": seconds * 1000 / units if units else 0.0,
+                "units_per_second": units / seconds if seconds > 0 else 0.0,
+            }
+            print(f"   - {name}: {seconds * 1000:.1f} ms "
+                  f"({result['stages'][name]['ms_per_unit']:.4f} ms/{unit}, "
+                  f"{result['stages'][name]['units_per_second']:.1f} {unit}/s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 結果已保存: {args.output}")
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.threshold)
+        if regressions:
+            print(f"❌ 性能退化: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - 後端啟動時間基準
+在獨立的子進程中測量導入 backend/main.py 的耗時、首個請求的延遲、啟動時已載入的重型依賴，
+以及第一次分析時延遲導入 processor 的耗時
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+# 只有分析時才需要的依賴，API 進程啟動時不應載入
+HEAVY_MODULES = ["torch", "onnxruntime", "ultralytics", "norfair", "easyocr", "cv2", "pandas"]
+
+# 在子進程中執行（每次都是冷啟動的解釋器）；不進入 TestClient 上下文，不觸發啟動恢復掃描。
+# 結果寫到 argv[1] 指定的文件（stdout 上有非同步寫出的日誌）
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+t = time.perf_counter()
+client.get("/health")
+health = time.perf_counter() - t
+t = time.perf_counter()
+client.get("/videos")
+videos = time.perf_counter() - t
+loaded = [name for name in HEAVY if name in sys.modules]
+analyzer_import = None
+if {analyzer}:
+    t = time.perf_counter()
+    main.load_analyzer_class()
+    analyzer_import = time.perf_counter() - t
+with open(sys.argv[1], "w") as f:
+    json.dump({{"import_seconds": imported - start, "health_seconds": health, "videos_seconds": videos,
+               "heavy_modules": loaded, "analyzer_import_seconds": analyzer_import}}, f)
+"""
+
+
+def run_probe(analyzer: bool) -> dict:
+    """啟動一次子進程並返回測量結果"""
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + PROBE.format(analyzer=analyzer)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "probe.json"
+        completed = subprocess.run([sys.executable, "-c", code, str(output)], cwd=BACKEND_DIR,
+                                   capture_output=True, text=True)
+        if completed.returncode != 0 or not output.exists():
+            raise RuntimeError(f"啟動測量失敗:\n{completed.stderr[-2000:]}")
+        with open(output, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="後端啟動時間基準")
+    parser.add_argument("--repeat", type=int, default=5, help="冷啟動次數（取中位數）")
+    parser.add_argument("--no-analyzer", action="store_true", help="不測量延遲導入 processor 的耗時")
+    parser.add_argument("--max-import-seconds", type=float, help="導入耗時中位數超過此值時返回非零")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    args = parser.parse_args()
+
+    runs = [run_probe(not args.no_analyzer) for _ in range(args.repeat)]
+
+    def median(key):
+        values = [r[key] for r in runs if r[key] is not None]
+        return statistics.median(values) if values else None
+
+    result = {
+        "benchmark": "startup",
+        "repeat": args.repeat,
+        "import_seconds": median("import_seconds"),
+        "import_seconds_min": min(r["import_seconds"] for r in runs),
+        "health_seconds": median("health_seconds"),
+        "videos_seconds": median("videos_seconds"),
+        "analyzer_import_seconds": median("analyzer_import_seconds"),
+        "heavy_modules_at_startup": sorted({name for r in runs for name in r["heavy_modules"]}),
+    }
+
+    print(f"🚀 後端啟動 ({args.repeat} 次冷啟動, 中位數)")
+    print(f"   - 導入 main: {result['import_seconds'] * 1000:.0f} ms (最快 {result['import_seconds_min'] * 1000:.0f} ms)")
+    print(f"   - 首個 /health: {result['health_seconds'] * 1000:.1f} ms, /videos: {result['videos_seconds'] * 1000:.1f} ms")
+    if result["analyzer_import_seconds"] is not None:
+        print(f"   - 第一次分析時導入 processor: {result['analyzer_import_seconds'] * 1000:.0f} ms")
+    heavy = result["heavy_modules_at_startup"]
+    print(f"   - 啟動時已載入的重型依賴: {', '.join(heavy) if heavy else '無'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 結果已保存: {args.output}")
+
+    if args.max_import_seconds is not None and result["import_seconds"] > args.max_import_seconds:
+        print(f"❌ 導入耗時超過 {args.max_import_seconds:.2f} 秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - 球軌跡過濾性能基準
+比較向量化拋物線異常檢測與逐點 np.polyfit 參考實現
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加AI核心到路徑
+sys.path.append(str(Path(__file__).parent.parent / "ai_core"))
+
+from trajectory import parabola_outlier_scores  # noqa: E402
+from reference_trajectory import parabola_outlier_scores_loop  # noqa: E402
+
+
+def synthetic_trajectory(num_points: int, seed: int = 0):
+    """生成由多段拋物線組成的球軌跡（含噪聲、缺幀和 1% 異常點）"""
+    rng = np.random.default_rng(seed)
+    frames = np.cumsum(rng.integers(1, 3, size=num_points)).astype(np.float64)
+    t = (frames % 60) / 30.0
+    xs = 200 + 400 * t + rng.normal(0, 2, num_points)
+    ys = 800 - 900 * t + 450 * t ** 2 + rng.normal(0, 2, num_points)
+    outliers = rng.random(num_points) < 0.01
+    xs[outliers] += rng.normal(0, 400, outliers.sum())
+    ys[outliers] += rng.normal(0, 400, outliers.sum())
+    return frames, np.round(xs), np.round(ys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="球軌跡異常檢測性能基準")
+    parser.add_argument("--points", type=int, default=100_000, help="軌跡點數")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    args = parser.parse_args()
+
+    frames, xs, ys = synthetic_trajectory(args.points)
+
+    start = time.perf_counter()
+    vectorized = parabola_outlier_scores(frames, xs, ys)
+    vectorized_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = parabola_outlier_scores_loop(frames.tolist(), xs.tolist(), ys.tolist())
+    loop_time = time.perf_counter() - start
+
+    max_error = float(np.max(np.abs(vectorized - reference) / np.maximum(1.0, np.abs(reference))))
+    result = {
+        "benchmark": "parabola_outlier_scores",
+        "points": args.points,
+        "vectorized_seconds": vectorized_time,
+        "loop_seconds": loop_time,
+        "speedup": loop_time / vectorized_time if vectorized_time > 0 else float("inf"),
+        "max_relative_error": max_error,
+    }
+
+    print(f"📊 拋物線異常檢測 ({args.points} 點)")
+    print(f"   - 向量化: {vectorized_time:.3f} 秒")
+    print(f"   - 逐點參考: {loop_time:.3f} 秒")
+    print(f"   - 加速比: {result['speedup']:.1f}x")
+    print(f"   - 最大相對誤差: {max_error:.2e}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
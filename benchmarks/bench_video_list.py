@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - 影片庫列表基準
+在不同視頻總數下，比較一次返回全部視頻（原 /videos）與游標分頁的第一頁、深層頁、狀態過濾頁、
+文件名搜索和狀態計數的耗時，檢查分頁耗時不隨總數增長
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加後端到路徑
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from database import Database  # noqa: E402
+
+
+def synthetic_videos(count: int):
+    """生成視頻記錄（上傳時間亂序，三分之一已完成）"""
+    return [{
+        "id": f"video-{i:07d}",
+        "filename": f"match_{i}.mp4",
+        "original_filename": f"Team {i % 97} vs Team {i % 89} set {i % 5}.mp4",
+        "file_path": f"data/uploads/video-{i:07d}.mp4",
+        "upload_time": f"2025-{1 + i * 7 % 12:02d}-{1 + i * 13 % 28:02d}T{i % 24:02d}:{i % 60:02d}:00",
+        "status": "completed" if i % 3 == 0 else "uploaded",
+        "file_size": 1000 * (i * 31 % 10007)
+    } for i in range(count)]
+
+
+def timed(fn, repeat: int) -> float:
+    """執行 repeat 次，返回中位數耗時（秒）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(db_path: Path, count: int, page_size: int, repeat: int) -> dict:
+    """在一個 count 個視頻的資料庫上測量各種列表查詢"""
+    db = Database(str(db_path))
+    db.add_videos(synthetic_videos(count))
+
+    # 深層頁：翻到大約一半位置的游標
+    cursor, seen = None, 0
+    while seen < count // 2:
+        page = db.list_videos(limit=1000, cursor=cursor)
+        cursor, seen = page["next_cursor"], seen + len(page["videos"])
+    deep_cursor = db.list_videos(limit=page_size, cursor=cursor)["next_cursor"] if cursor else None
+
+    result = {
+        "videos": count,
+        "get_all_videos_seconds": timed(db.get_all_videos, repeat),
+        "first_page_seconds": timed(lambda: db.list_videos(limit=page_size), repeat),
+        "deep_page_seconds": timed(lambda: db.list_videos(limit=page_size, cursor=deep_cursor), repeat),
+        "status_page_seconds": timed(lambda: db.list_videos(limit=page_size, status="completed", sort="filename",
+                                                            order="asc"), repeat),
+        # 搜索耗時與匹配的記錄數成正比（要按排序欄位排序所有匹配），這裡用選擇性的詞
+        "search_seconds": timed(lambda: db.list_videos(limit=page_size, query="match_4242"), repeat),
+        "status_counts_seconds": timed(db.get_status_counts, repeat),
+    }
+    db.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="影片庫列表基準")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="視頻總數")
+    parser.add_argument("--page-size", type=int, default=50, help="每頁記錄數")
+    parser.add_argument("--repeat", type=int, default=5, help="每個查詢重複次數（取中位數）")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            runs.append(run(Path(tmp) / f"videos_{count}.db", count, args.page_size, args.repeat))
+
+    result = {"benchmark": "video_list", "page_size": args.page_size, "runs": runs}
+
+    columns = [
+        ("全部視頻", "get_all_videos_seconds"),
+        ("第一頁", "first_page_seconds"),
+        ("深層頁", "deep_page_seconds"),
+        ("狀態過濾", "status_page_seconds"),
+        ("搜索", "search_seconds"),
+        ("狀態計數", "status_counts_seconds"),
+    ]
+    print(f"📚 影片庫列表 (每頁 {args.page_size} 個, 中位數 ms)")
+    print(f"   {'視頻數':<10}" + "".join(f"{label:>12}" for label, _ in columns))
+    for r in runs:
+        print(f"   {r['videos']:<10}" + "".join(f"{r[key] * 1000:>14.2f}" for _, key in columns))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 結果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - /videos 負載測試
+啟動一個 uvicorn 後端子進程（臨時資料目錄，後台執行緒模擬分析進度寫入資料庫），
+從本進程並發請求 /videos 和 /health 並持續上傳影片，
+比較端點直接調用同步 Database（原實現，阻塞事件循環）與通過 AsyncDatabase 時的延遲分位數
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+
+
+# ========== 服務端（子進程） ==========
+
+class BlockingDatabase:
+    """原實現：在事件循環執行緒中直接調用同步的 Database 方法"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name: str):
+        async def call(*args, **kwargs):
+            return getattr(self._database(), name)(*args, **kwargs)
+        return call
+
+
+def seed(database, count: int):
+    """寫入 count 個視頻記錄"""
+    database.add_videos([{
+        "id": f"video-{i:06d}",
+        "filename": f"match_{i}.mp4",
+        "file_path": f"data/uploads/video-{i:06d}.mp4",
+        "upload_time": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+        "status": "completed",
+        "file_size": 1000 * i
+    } for i in range(count)])
+
+
+def analysis_writer(database, video_id: str, interval: float):
+    """模擬分析執行緒：定期寫入進度"""
+    progress = 0
+    while True:
+        progress = (progress + 1) % 100
+        database.update_video(video_id, {"status": "processing", "file_size": progress})
+        time.sleep(interval)
+
+
+def serve(args):
+    """在臨時目錄上啟動後端"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    import uvicorn
+    import main
+    from database import Database, AsyncDatabase
+
+    root = Path(args.root)
+    main.PROJECT_ROOT = root
+    main.UPLOAD_DIR = root / "data" / "uploads"
+    main.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    main.db = Database(str(root / "data" / "load.db"))
+    seed(main.db, args.videos)
+    if args.mode == "async":
+        main.adb = AsyncDatabase(lambda: main.db, readers=args.readers)
+    else:
+        main.adb = BlockingDatabase(lambda: main.db)
+
+    for i in range(args.analyses):
+        threading.Thread(target=analysis_writer, args=(main.db, f"video-{i:06d}", args.write_interval),
+                         daemon=True).start()
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# ========== 客戶端 ==========
+
+async def request_loop(client, method: str, url: str, stop_at: float, latencies: list, **kwargs):
+    """重複發送請求直到 stop_at，記錄每次延遲"""
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+def percentiles(latencies: list) -> dict:
+    """毫秒分位數"""
+    if not latencies:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ms = np.asarray(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+        "max": float(ms.max())
+    }
+
+
+async def load(args, base_url: str) -> dict:
+    """對運行中的後端施加負載"""
+    import httpx
+
+    videos, health, uploads = [], [], []
+    payload = b"\x00" * (args.upload_kb * 1024)
+    limits = httpx.Limits(max_connections=args.clients + args.uploaders + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        stop_at = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *[request_loop(client, "GET", "/videos", stop_at, videos) for _ in range(args.clients)],
+            request_loop(client, "GET", "/health", stop_at, health),
+            *[request_loop(client, "POST", "/upload", stop_at, uploads,
+                           files={"file": ("clip.mp4", payload, "video/mp4")}) for _ in range(args.uploaders)]
+        )
+    return {
+        "videos_ms": percentiles(videos),
+        "health_ms": percentiles(health),
+        "upload_ms": percentiles(uploads),
+        "videos_per_second": len(videos) / args.duration
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_mode(mode: str, args) -> dict:
+    """啟動一種資料庫訪問方式的後端並施加負載"""
+    import httpx
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [sys.executable, __file__, "--serve", "--mode", mode, "--root", tmp, "--port", str(port),
+                   "--videos", str(args.videos), "--analyses", str(args.analyses),
+                   "--write-interval", str(args.write_interval), "--readers", str(args.readers)]
+        server = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            deadline = time.time() + 60
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"後端啟動失敗:\n{server.stderr.read().decode()[-2000:]}")
+                try:
+                    httpx.get(f"{base_url}/health", timeout=1)
+                    break
+                except httpx.TransportError:
+                    if time.time() > deadline:
+                        raise RuntimeError("後端啟動超時")
+                    time.sleep(0.2)
+            return asyncio.run(load(args, base_url))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/videos 負載測試")
+    parser.add_argument("--videos", type=int, default=2000, help="資料庫中的視頻記錄數")
+    parser.add_argument("--clients", type=int, default=8, help="並發 /videos 客戶端數")
+    parser.add_argument("--uploaders", type=int, default=2, help="並發上傳數")
+    parser.add_argument("--upload-kb", type=int, default=512, help="每次上傳的大小 (KB)")
+    parser.add_argument("--analyses", type=int, default=2, help="模擬的分析執行緒數")
+    parser.add_argument("--write-interval", type=float, default=0.01, help="每個分析執行緒寫入進度的間隔（秒）")
+    parser.add_argument("--readers", type=int, default=4, help="AsyncDatabase 讀取執行緒數")
+    parser.add_argument("--duration", type=float, default=10.0, help="每種方式的測試時長（秒）")
+    parser.add_argument("--output", help="將結果寫入 JSON 文件")
+    # 子進程參數
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["blocking", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return 0
+
+    modes = {mode: run_mode(mode, args) for mode in ("blocking", "async")}
+    config = {key: value for key, value in vars(args).items() if key not in ("serve", "mode", "root", "port", "output")}
+    result = {"benchmark": "videos_load", "config": config, **modes}
+
+    print(f"📈 /videos 負載測試 ({args.videos} 個視頻, {args.clients} 個客戶端, {args.uploaders} 個上傳, "
+          f"{args.analyses} 個分析寫入執行緒, 每種方式 {args.duration:.0f} 秒)")
+    labels = {"blocking": "直接調用 (阻塞事件循環)", "async": "AsyncDatabase"}
+    for mode, stats in modes.items():
+        v, h, u = stats["videos_ms"], stats["health_ms"], stats["upload_ms"]
+        print(f"   {labels[mode]}")
+        print(f"     - /videos: p50 {v['p50']:.1f} ms  p95 {v['p95']:.1f} ms  p99 {v['p99']:.1f} ms  "
+              f"({stats['videos_per_second']:.0f} 次/秒)")
+        print(f"     - /health: p50 {h['p50']:.1f} ms  p99 {h['p99']:.1f} ms")
+        print(f"     - /upload: p50 {u['p50']:.1f} ms  p99 {u['p99']:.1f} ms ({u['count']} 次)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 結果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+排球分析系統 - 球軌跡參考實現
+ai_core/trajectory.py 中向量化函數的逐點版本，由測試和 bench_trajectory.py 共用
+"""
+
+import numpy as np
+
+
+def parabola_outlier_scores_loop(frames, xs, ys, window_size: int = 7) -> np.ndarray:
+    """
+    parabola_outlier_scores 的逐點參考實現（每個點兩次 np.polyfit）
+    
+    供正確性測試和性能基準比較
+    """
+    n = len(frames)
+    scores = np.zeros(n)
+    for i in range(n):
+        start = max(0, i - window_size // 2)
+        end = min(n, i + window_size // 2 + 1)
+        if end - start < 4:
+            continue
+
+        idx = [j for j in range(start, end) if j != i]
+        window_frames = [frames[j] for j in idx]
+        window_x = [xs[j] for j in idx]
+        window_y = [ys[j] for j in idx]
+
+        try:
+            t_normalized = np.array(window_frames) - np.mean(window_frames)
+            x_coeffs = np.polyfit(t_normalized, window_x, 1)
+            y_coeffs = np.polyfit(t_normalized, window_y, 2)
+            t_curr = frames[i] - np.mean(window_frames)
+            deviation = ((xs[i] - np.polyval(x_coeffs, t_curr)) ** 2 +
+                         (ys[i] - np.polyval(y_coeffs, t_curr)) ** 2) ** 0.5
+
+            avg_distance = 0
+            for j in range(1, len(window_x)):
+                avg_distance += ((window_x[j] - window_x[j - 1]) ** 2 +
+                                 (window_y[j] - window_y[j - 1]) ** 2) ** 0.5
+            avg_distance /= max(1, len(window_x) - 1)
+
+            scores[i] = deviation / avg_distance if avg_distance > 0 else 0
+        except Exception:
+            scores[i] = 0
+    return scores
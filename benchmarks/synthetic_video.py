@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+排球分析系統 - 合成比賽影片生成器
+用 cv2.VideoWriter 畫出場地線、移動的球員框（含球衣號碼）和拋物線飛行的球，
+場景腳本來自 SyntheticBackend，可同時輸出對應的真實檢測（ReplayBackend 錄製格式）
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加AI核心到路徑
+sys.path.append(str(Path(__file__).parent.parent / "ai_core"))
+
+from backends import SyntheticBackend  # noqa: E402
+
+COURT_COLOR = (60, 140, 70)
+LINE_COLOR = (255, 255, 255)
+TEAM_COLORS = [(40, 40, 200), (200, 90, 30)]
+BALL_COLOR = (0, 230, 255)
+
+
+def court_background(width: int, height: int) -> np.ndarray:
+    """畫出靜態場地：底色、邊線、中線（網）和兩條進攻線"""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = COURT_COLOR
+    top, bottom = int(0.3 * height), int(0.95 * height)
+    left, right = int(0.03 * width), int(0.97 * width)
+    thickness = max(1, width // 400)
+    cv2.rectangle(frame, (left, top), (right, bottom), LINE_COLOR, thickness)
+    center = width // 2
+    attack = int(0.12 * width)
+    for x in (center - attack, center + attack):
+        cv2.line(frame, (x, top), (x, bottom), LINE_COLOR, thickness)
+    cv2.line(frame, (center, int(0.15 * height)), (center, bottom), (220, 220, 220), 2 * thickness)
+    return frame
+
+
+def render_frame(scene: SyntheticBackend, background: np.ndarray, frame_idx: int) -> np.ndarray:
+    """畫出一幀（frame_idx 從 1 開始）"""
+    frame = background.copy()
+    font_scale = scene.height / 900
+    for i, (box, number) in enumerate(zip(scene.player_boxes[frame_idx], scene.jersey_numbers)):
+        x1, y1, x2, y2 = (int(v) for v in box)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), TEAM_COLORS[int(scene.side[i])], -1)
+        cv2.putText(frame, str(number), (x1 + 1, y1 + int(0.4 * (y2 - y1))),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, LINE_COLOR, 1, cv2.LINE_AA)
+    x, y = scene.ball[frame_idx]
+    if not np.isnan(x):
+        cv2.circle(frame, (int(x), int(y)), max(3, scene.width // 160), BALL_COLOR, -1, cv2.LINE_AA)
+    return frame
+
+
+def ground_truth(scene: SyntheticBackend) -> dict:
+    """場景的檢測結果（ReplayBackend 錄製格式，球員附帶球衣號碼）"""
+    frames = []
+    for f in range(1, scene.num_frames + 1):
+        visible = np.flatnonzero(scene.player_visible[f])
+        frames.append({
+            "frame": f,
+            "ball": scene.detect_ball(None, f),
+            "players": [
+                {"bbox": scene.player_boxes[f, i].tolist(), "confidence": float(scene.player_scores[f, i]),
+                 "class_id": 0, "label": "person", "jersey_number": scene.jersey_numbers[i]}
+                for i in visible
+            ],
+            "actions": scene.detect_actions(None, f)
+        })
+    return {
+        "video_info": {"width": scene.width, "height": scene.height, "fps": scene.fps,
+                       "total_frames": scene.num_frames},
+        "frames": frames
+    }
+
+
+def generate_video(path: str, num_frames: int = 600, width: int = 1280, height: int = 720,
+                   fps: float = 30.0, seed: int = 0, codec: str = "mp4v") -> SyntheticBackend:
+    """
+    生成合成比賽影片
+
+    Args:
+        path: 輸出影片路徑
+        num_frames: 幀數
+        width, height: 幀尺寸
+        fps: 幀率
+        seed: 隨機種子（相同參數生成相同內容）
+        codec: FourCC 編碼
+
+    Returns:
+        場景（SyntheticBackend），可用於取得真實檢測
+    """
+    scene = SyntheticBackend(num_frames=num_frames, width=width, height=height, fps=fps, seed=seed)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"無法建立影片: {path}")
+    background = court_background(width, height)
+    try:
+        for f in range(1, num_frames + 1):
+            writer.write(render_frame(scene, background, f))
+    finally:
+        writer.release()
+    return scene
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成排球比賽影片")
+    parser.add_argument("output", help="輸出影片路徑（.mp4）")
+    parser.add_argument("--frames", type=int, default=600, help="幀數")
+    parser.add_argument("--width", type=int, default=1280, help="幀寬")
+    parser.add_argument("--height", type=int, default=720, help="幀高")
+    parser.add_argument("--fps", type=float, default=30.0, help="幀率")
+    parser.add_argument("--seed", type=int, default=0, help="隨機種子")
+    parser.add_argument("--codec", default="mp4v", help="FourCC 編碼")
+    parser.add_argument("--detections", help="同時輸出真實檢測 JSON（可用於 ReplayBackend）")
+    args = parser.parse_args()
+
+    scene = generate_video(args.output, args.frames, args.width, args.height, args.fps, args.seed, args.codec)
+    print(f"🎬 已生成: {args.output} ({args.frames} 幀, {args.width}x{args.height}, {len(scene.rallies)} 個回合)")
+    if args.detections:
+        with open(args.detections, "w", encoding="utf-8") as f:
+            json.dump(ground_truth(scene), f)
+        print(f"💾 真實檢測: {args.detections}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,18 @@ import { EmptyState } from './ui/EmptyState';
 
 export const Dashboard: React.FC = () => {
   const [videos, setVideos] = useState<any[]>([]);
+  const [counts, setCounts] = useState<Record<string, number> | null>(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     let isMounted = true;
     const loadVideos = async () => {
       try {
-        const res = await getVideos();
+        // 只顯示最近的 6 個影片；統計數字用後端的各狀態計數，不需要載入全部影片
+        const res = await getVideos({ limit: 6 });
         if (isMounted) {
           setVideos(res.videos || []);
+          setCounts(res.counts || null);
         }
       } catch (error: any) {
         console.error('Failed to load videos:', error);
@@ -37,7 +40,12 @@ export const Dashboard: React.FC = () => {
     };
   }, []);
 
-  const stats = {
+  const stats = counts ? {
+    total: counts.all || 0,
+    completed: counts.completed || 0,
+    processing: counts.processing || 0,
+    failed: counts.failed || 0,
+  } : {
     total: videos.length,
     completed: videos.filter(v => v.status === 'completed').length,
     processing: videos.filter(v => v.status === 'processing').length,
@@ -1,33 +1,78 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { getVideos, updateVideoName, deleteVideo } from '../services/api';
+import { getVideos, updateVideoName, deleteVideo, VideoListParams } from '../services/api';
 import { EmptyState } from './ui/EmptyState';
 import { StatusBadge } from './ui/StatusBadge';
-import { PlayCircle, Calendar, Search, Filter, Video as VideoIcon, Loader2, Edit2, Check, X, Trash2 } from 'lucide-react';
+import { PlayCircle, Calendar, Search, Filter, Video as VideoIcon, Loader2, Edit2, Check, X, Trash2, ArrowUpDown } from 'lucide-react';
+
+// 每頁影片數（後端按索引分頁，載入時間與影片總數無關）
+const PAGE_SIZE = 24;
+// 搜索輸入停止後多久才請求
+const SEARCH_DEBOUNCE_MS = 300;
+
+const SORT_OPTIONS = [
+  { value: 'upload_time:desc', label: 'Newest first' },
+  { value: 'upload_time:asc', label: 'Oldest first' },
+  { value: 'filename:asc', label: 'Name (A-Z)' },
+  { value: 'filename:desc', label: 'Name (Z-A)' },
+  { value: 'file_size:desc', label: 'Largest first' },
+  { value: 'file_size:asc', label: 'Smallest first' },
+];
+
+const buildParams = (statusFilter: string, search: string, sortOption: string, cursor?: string | null): VideoListParams => {
+  const [sort, order] = sortOption.split(':') as [VideoListParams['sort'], VideoListParams['order']];
+  return {
+    limit: PAGE_SIZE,
+    cursor: cursor || undefined,
+    status: statusFilter === 'all' ? undefined : statusFilter as VideoListParams['status'],
+    q: search || undefined,
+    sort,
+    order,
+  };
+};
 
 export const VideoLibrary: React.FC = () => {
   const [videos, setVideos] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [counts, setCounts] = useState<Record<string, number> | null>(null);
   const [searchQuery, setSearchQuery] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [statusFilter, setStatusFilter] = useState<string>('all');
+  const [sortOption, setSortOption] = useState<string>(SORT_OPTIONS[0].value);
   const [editingVideoId, setEditingVideoId] = useState<string | null>(null);
   const [editName, setEditName] = useState<string>('');
   const [deletingVideoId, setDeletingVideoId] = useState<string | null>(null);
   const [showDeleteConfirm, setShowDeleteConfirm] = useState<string | null>(null);
+  // 每次重新查詢第一頁時遞增，丟棄過濾條件改變前發出的「載入更多」結果
+  const queryId = useRef(0);
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchQuery.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
   useEffect(() => {
     let isMounted = true;
+    const currentQuery = ++queryId.current;
+    setLoading(true);
     const loadVideos = async () => {
       try {
-        const res = await getVideos();
-        if (isMounted) {
+        const res = await getVideos(buildParams(statusFilter, debouncedSearch, sortOption));
+        if (isMounted && currentQuery === queryId.current) {
           setVideos(res.videos || []);
+          setNextCursor(res.next_cursor || null);
+          if (res.counts) {
+            setCounts(res.counts);
+          }
         }
       } catch (error: any) {
         console.error('Failed to load videos:', error);
         // 如果請求失敗，設為空陣列而不是保持loading狀態
         if (isMounted) {
           setVideos([]);
+          setNextCursor(null);
         }
       } finally {
         if (isMounted) {
@@ -41,25 +86,45 @@ export const VideoLibrary: React.FC = () => {
     return () => {
       isMounted = false;
     };
-  }, []);
+  }, [statusFilter, debouncedSearch, sortOption]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) {
+      return;
+    }
+    const currentQuery = queryId.current;
+    setLoadingMore(true);
+    try {
+      const res = await getVideos(buildParams(statusFilter, debouncedSearch, sortOption, nextCursor));
+      if (currentQuery === queryId.current) {
+        setVideos(prev => [...prev, ...(res.videos || [])]);
+        setNextCursor(res.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Failed to load more videos:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   // 輔助函數：獲取顯示用的文件名（優先使用 original_filename）
   const getDisplayFilename = (video: any) => {
     return video.original_filename || video.filename || 'Untitled Video';
   };
 
-  const filteredVideos = videos.filter(v => {
-    const displayName = getDisplayFilename(v).toLowerCase();
-    const matchesSearch = displayName.includes(searchQuery.toLowerCase());
-    const matchesStatus = statusFilter === 'all' || v.status === statusFilter;
-    return matchesSearch && matchesStatus;
-  });
+  // 計數來自後端（全部影片）；舊版後端沒有 counts 時只能統計已載入的影片
+  const countFor = (status: string) => {
+    if (counts) {
+      return counts[status] || 0;
+    }
+    return status === 'all' ? videos.length : videos.filter(v => v.status === status).length;
+  };
 
   const statusCounts = {
-    all: videos.length,
-    completed: videos.filter(v => v.status === 'completed').length,
-    processing: videos.filter(v => v.status === 'processing').length,
-    failed: videos.filter(v => v.status === 'failed').length,
+    all: countFor('all'),
+    completed: countFor('completed'),
+    processing: countFor('processing'),
+    failed: countFor('failed'),
   };
 
   const handleStartEdit = (videoId: string, currentName: string) => {
@@ -99,7 +164,15 @@ export const VideoLibrary: React.FC = () => {
     try {
       await deleteVideo(videoId);
       // 從列表中移除
+      const deleted = videos.find(v => v.id === videoId);
       setVideos(videos.filter(v => v.id !== videoId));
+      if (deleted) {
+        setCounts(prev => prev && {
+          ...prev,
+          all: Math.max((prev.all || 0) - 1, 0),
+          [deleted.status]: Math.max((prev[deleted.status] || 0) - 1, 0),
+        });
+      }
       setShowDeleteConfirm(null);
     } catch (error) {
       console.error('Failed to delete video:', error);
@@ -161,6 +234,21 @@ export const VideoLibrary: React.FC = () => {
               ))}
             </div>
           </div>
+
+          {/* Sort */}
+          <div className="flex items-center gap-2">
+            <ArrowUpDown className="text-gray-400 w-5 h-5" />
+            <select
+              value={sortOption}
+              onChange={(e) => setSortOption(e.target.value)}
+              aria-label="Sort videos"
+              className="px-3 py-2 border border-gray-300 rounded-lg text-sm text-gray-700 focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+            >
+              {SORT_OPTIONS.map(option => (
+                <option key={option.value} value={option.value}>{option.label}</option>
+              ))}
+            </select>
+          </div>
         </div>
       </section>
 
@@ -172,7 +260,7 @@ export const VideoLibrary: React.FC = () => {
           </div>
         )}
 
-        {!loading && filteredVideos.length === 0 && (
+        {!loading && videos.length === 0 && (
           <div className="bg-white rounded-2xl shadow-xl p-12 border border-gray-100">
             <EmptyState
               title={searchQuery || statusFilter !== 'all' ? "No videos match your filters" : "No videos yet"}
@@ -194,9 +282,9 @@ export const VideoLibrary: React.FC = () => {
           </div>
         )}
 
-        {!loading && filteredVideos.length > 0 && (
+        {!loading && videos.length > 0 && (
           <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
-            {filteredVideos.map((v) => (
+            {videos.map((v) => (
               <div
                 key={v.id}
                 className="group bg-white rounded-xl shadow-md hover:shadow-xl transition-all duration-300 border border-gray-100 overflow-hidden"
@@ -285,6 +373,19 @@ export const VideoLibrary: React.FC = () => {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="px-6 py-2.5 rounded-lg border border-gray-300 bg-white text-gray-700 hover:bg-gray-50 transition-colors font-medium disabled:opacity-50 disabled:cursor-not-allowed flex items-center gap-2"
+            >
+              {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+              Load more
+            </button>
+          </div>
+        )}
       </section>
 
       {/* Delete Confirmation Dialog */}
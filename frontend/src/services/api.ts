@@ -47,6 +47,7 @@ longRunningApi.interceptors.response.use(responseInterceptor, responseErrorInter
 export interface Video {
   id: string;
   filename: string;
+  original_filename?: string;
   file_path: string;
   upload_time: string;
   status: 'uploaded' | 'processing' | 'completed' | 'failed';
@@ -55,6 +56,22 @@ export interface Video {
   analysis_time?: string;
 }
 
+// 影片列表查詢參數（後端游標分頁，省略的參數使用後端預設值）
+export interface VideoListParams {
+  limit?: number;
+  cursor?: string | null;
+  status?: Video['status'];
+  q?: string;
+  sort?: 'upload_time' | 'filename' | 'file_size';
+  order?: 'asc' | 'desc';
+}
+
+export interface VideoPage {
+  videos: Video[];
+  next_cursor: string | null;  // 傳回 cursor 取下一頁，沒有更多時為 null
+  counts: Record<string, number>;  // 各狀態影片數（含 all），不受 status/q 影響
+}
+
 export interface AnalysisTask {
   video_id: string;
   status: 'processing' | 'completed' | 'failed';
@@ -116,9 +133,49 @@ export interface AnalysisResults {
     actions: any[];
     scores: any[];
   }>;
+  summary?: ResultsSummary;
   analysis_time: number;
 }
 
+export interface ResultsSummary {
+  players: Array<{
+    player_id: number;
+    jersey_number: number | null;
+    track_ids: number[];
+    frames_on_screen: number;
+    first_frame: number | null;
+    last_frame: number | null;
+    total_actions: number;
+    action_counts: Record<string, number>;
+  }>;
+  track_to_player: Record<string, number>;
+  unassigned_actions: number;
+  action_stats: Record<string, {
+    count: number;
+    mean_confidence: number;
+    min_confidence: number;
+    max_confidence: number;
+    std_confidence: number | null;
+    mean_duration: number;
+  }>;
+  plays: Array<{
+    play_id: number;
+    start_frame: number;
+    end_frame: number;
+    start_timestamp: number;
+    end_timestamp: number;
+    total_actions: number;
+    action_counts: Record<string, number>;
+    actions: Array<{
+      frame: number;
+      action: string;
+      confidence: number;
+      track_id: number | null;
+      player_id: number | null;
+    }>;
+  }>;
+}
+
 // API函數
 export const apiService = {
   // 健康檢查
@@ -143,9 +200,9 @@ export const apiService = {
     return response.data;
   },
 
-  // 獲取所有影片
-  async getVideos() {
-    const response = await api.get('/videos');
+  // 獲取影片列表（一頁）
+  async getVideos(params: VideoListParams = {}): Promise<VideoPage> {
+    const response = await api.get('/videos', { params });
     return response.data;
   },
 
@@ -167,6 +224,27 @@ export const apiService = {
     return response.data;
   },
 
+  // 獲取分析結果彙總（球員/回合/動作統計）
+  async getResultsSummary(videoId: string): Promise<ResultsSummary> {
+    const response = await api.get(`/results/${videoId}/summary`);
+    return response.data;
+  },
+
+  // 獲取任意時間窗口的球員熱區圖（player 省略時為所有球員）
+  async getPlayerHeatmap(videoId: string, params: { player?: number; t0?: number; t1?: number; bins?: number } = {}) {
+    const response = await api.get(`/results/${videoId}/heatmap`, { params });
+    return response.data as {
+      player: number | null;
+      t0: number;
+      t1: number;
+      grid: [number, number];
+      cell_size: [number, number];
+      max: number;
+      total: number;
+      counts: number[][];
+    };
+  },
+
   // 更新視頻名稱
   async updateVideoName(videoId: string, newFilename: string) {
     const response = await api.put(`/videos/${videoId}`, {
@@ -228,6 +306,8 @@ export const getVideos = apiService.getVideos;
 export const getVideo = apiService.getVideo;
 export const getAnalysisStatus = apiService.getAnalysisStatus;
 export const getAnalysisResults = apiService.getAnalysisResults;
+export const getResultsSummary = apiService.getResultsSummary;
+export const getPlayerHeatmap = apiService.getPlayerHeatmap;
 export const getVideoUrl = apiService.getVideoUrl;
 export const updateVideoName = apiService.updateVideoName;
 export const deleteVideo = apiService.deleteVideo;
@@ -7,13 +7,38 @@
 import os
 import sys
 import argparse
+import cProfile
 import json
 from pathlib import Path
 
 # 添加AI核心到路徑
-sys.path.append(str(Path(__file__).parent / "ai_core"))
+sys.path.append(str(Path(__file__).parent.parent / "ai_core"))
 
 from processor import VolleyballAnalyzer
+from profiling import StageProfiler, format_profile
+
+
+def write_profile(prefix: str, profiler: StageProfiler, cprofile: cProfile.Profile = None):
+    """
+    寫出分段計時結果
+
+    Args:
+        prefix: 輸出路徑前綴，生成 <prefix>.profile.json、<prefix>.trace.json 和 <prefix>.prof
+        profiler: 分段計時器
+        cprofile: cProfile 結果（可選）
+    """
+    summary = profiler.summary()
+    with open(f"{prefix}.profile.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    profiler.write_chrome_trace(f"{prefix}.trace.json")
+    
+    print("\n" + "\n".join(format_profile(summary)))
+    print(f"💾 分段耗時: {prefix}.profile.json")
+    print(f"💾 Chrome trace: {prefix}.trace.json（chrome://tracing 或 https://ui.perfetto.dev 打開）")
+    if cprofile is not None:
+        cprofile.dump_stats(f"{prefix}.prof")
+        print(f"💾 cProfile: {prefix}.prof（python -m pstats 或 snakeviz 打開）")
+
 
 def main():
     parser = argparse.ArgumentParser(description="排球分析系統離線測試")
@@ -23,6 +48,11 @@ def main():
     parser.add_argument("--player-model", help="球員偵測模型路徑")
     parser.add_argument("--output", help="輸出結果路徑")
     parser.add_argument("--device", default="cpu", choices=["cpu", "cuda", "mps"], help="運行設備")
+    parser.add_argument("--profile", action="store_true",
+                        help="記錄各階段耗時（每幀 p50/p95），並輸出 cProfile 和 Chrome trace")
+    parser.add_argument("--profile-prefix", help="分析輸出文件前綴（預設與結果路徑相同）")
+    parser.add_argument("--no-cprofile", action="store_true",
+                        help="不執行 cProfile（cProfile 會放大 Python 代碼的耗時）")
     
     args = parser.parse_args()
     
@@ -79,10 +109,20 @@ def main():
         video_name = Path(args.video).stem
         output_path = f"{video_name}_analysis_results.json"
     
+    # 分段計時
+    profiler = StageProfiler(trace=True) if args.profile else None
+    cprofile = cProfile.Profile() if args.profile and not args.no_cprofile else None
+    
     # 執行分析
     print(f"🎬 開始分析影片: {args.video}")
     try:
-        results = analyzer.analyze_video(args.video, output_path)
+        if cprofile is not None:
+            cprofile.enable()
+        try:
+            results = analyzer.analyze_video(args.video, output_path, profiler=profiler)
+        finally:
+            if cprofile is not None:
+                cprofile.disable()
         
         print("\n" + "="*50)
         print("📊 分析結果摘要")
@@ -116,6 +156,10 @@ def main():
         print(f"   - 分析耗時: {results['analysis_time']:.2f} 秒")
         print(f"   - 平均幀率: {video_info['total_frames']/results['analysis_time']:.2f} FPS")
         
+        if profiler is not None:
+            prefix = args.profile_prefix or str(Path(output_path).with_suffix(""))
+            write_profile(prefix, profiler, cprofile)
+        
         print(f"\n✅ 分析完成! 結果已保存到: {output_path}")
         return 0
         
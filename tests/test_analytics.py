@@ -0,0 +1,160 @@
+"""
+Volleyball AI Analysis System - Analytics Tests
+All tests for analytics.py module
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from analytics import build_summary, HeatmapCube, heatmap_path_for, summary_path_for
+
+
+@pytest.fixture
+def sample_results():
+    """Minimal analysis results with tracks, actions and plays"""
+    return {
+        "players_tracking": [
+            {"frame": 1, "players": [
+                {"id": 1, "stable_id": 1, "bbox": [0, 0, 10, 20], "jersey_number": None},
+                {"id": 2, "stable_id": 2, "bbox": [50, 0, 60, 20], "jersey_number": None},
+            ]},
+            {"frame": 2, "players": [
+                {"id": 1, "stable_id": 7, "bbox": [1, 0, 11, 20], "jersey_number": 7},
+                {"id": 2, "stable_id": 2, "bbox": [51, 0, 61, 20], "jersey_number": None},
+            ]},
+            {"frame": 3, "players": [
+                {"id": 3, "stable_id": 7, "bbox": [2, 0, 12, 20], "jersey_number": 7},
+            ]},
+        ],
+        "action_recognition": {
+            "actions": [
+                {"frame": 1, "action": "spike", "confidence": 0.9, "player_id": 1, "duration": 0.2},
+                {"frame": 2, "action": "set", "confidence": 0.7, "player_id": 2, "duration": 0.1},
+                {"frame": 3, "action": "spike", "confidence": 0.8, "player_id": 3, "duration": 0.3},
+                {"frame": 20, "action": "block", "confidence": 0.6, "player_id": None, "duration": 0.1},
+            ]
+        },
+        "plays": [
+            {"play_id": 1, "start_frame": 1, "end_frame": 2},
+            {"play_id": 2, "start_frame": 3, "end_frame": 10},
+        ],
+    }
+
+
+class TestBuildSummary:
+    """Tests for build_summary"""
+
+    def test_empty_results(self):
+        """Test summary of empty results"""
+        summary = build_summary({})
+        assert summary["players"] == []
+        assert summary["plays"] == []
+        assert summary["unassigned_actions"] == 0
+        assert summary["action_stats"] == {}
+
+    def test_jersey_merges_tracks(self, sample_results):
+        """Test that tracks with the same jersey vote are merged into one player"""
+        summary = build_summary(sample_results)
+        players = {p["player_id"]: p for p in summary["players"]}
+
+        assert summary["track_to_player"] == {"1": 7, "2": 2, "3": 7}
+        assert players[7]["jersey_number"] == 7
+        assert players[7]["track_ids"] == [1, 3]
+        assert players[7]["frames_on_screen"] == 3
+        assert players[7]["action_counts"] == {"spike": 2}
+        assert players[2]["jersey_number"] is None
+        assert players[2]["total_actions"] == 1
+
+    def test_action_stats(self, sample_results):
+        """Test per-action confidence statistics"""
+        summary = build_summary(sample_results)
+        spike = summary["action_stats"]["spike"]
+
+        assert spike["count"] == 2
+        assert spike["max_confidence"] == pytest.approx(0.9)
+        assert spike["mean_confidence"] == pytest.approx(0.85)
+        assert summary["action_stats"]["block"]["std_confidence"] is None
+        assert summary["unassigned_actions"] == 1
+
+    def test_play_action_lists(self, sample_results):
+        """Test that actions are attached to the play containing them"""
+        summary = build_summary(sample_results)
+        plays = summary["plays"]
+
+        assert [p["total_actions"] for p in plays] == [2, 1]
+        assert [a["action"] for a in plays[0]["actions"]] == ["spike", "set"]
+        assert plays[1]["actions"][0]["player_id"] == 7
+
+
+class TestHeatmapCube:
+    """Tests for HeatmapCube"""
+
+    @pytest.fixture
+    def tracking(self):
+        """Two players over 4 seconds at 10 fps; player 2 only appears in the last second"""
+        entries = []
+        for frame in range(40):
+            players = [{"id": 1, "bbox": [0, 0, 10, 10]}]
+            if frame >= 30:
+                players.append({"id": 2, "bbox": [90, 90, 100, 100]})
+            entries.append({"frame": frame, "players": players})
+        return entries
+
+    def brute_force(self, tracking, player, t0, t1, fps=10.0, grid=(4, 4), size=100):
+        """Reference heatmap by scanning every tracked frame"""
+        heat = np.zeros((grid[1], grid[0]), dtype=np.int64)
+        for entry in tracking:
+            if not (t0 <= entry["frame"] / fps < t1):
+                continue
+            for p in entry["players"]:
+                if player is not None and p["id"] != player:
+                    continue
+                cx = (p["bbox"][0] + p["bbox"][2]) / 2
+                cy = (p["bbox"][1] + p["bbox"][3]) / 2
+                heat[min(int(cy / size * grid[1]), grid[1] - 1), min(int(cx / size * grid[0]), grid[0] - 1)] += 1
+        return heat
+
+    def test_window_matches_scan(self, tracking):
+        """Test window heatmaps equal a brute-force scan"""
+        cube = HeatmapCube.build(tracking, 100, 100, 10.0, grid=(4, 4), time_step=1.0)
+        for player in (None, 1, 2):
+            for t0, t1 in ((0, 4), (1, 3), (3, 4), (0, 1)):
+                result = cube.window(player, t0, t1)
+                assert np.array_equal(np.array(result["counts"]), self.brute_force(tracking, player, t0, t1))
+
+    def test_window_downsamples_bins(self, tracking):
+        """Test resampling to a coarser grid preserves totals"""
+        cube = HeatmapCube.build(tracking, 100, 100, 10.0, grid=(4, 4))
+        result = cube.window(None, 0, None, bins=2)
+        assert result["grid"] == [2, 2]
+        assert result["total"] == 50
+        assert result["counts"] == [[40, 0], [0, 10]]
+
+    def test_unknown_player(self, tracking):
+        """Test querying a player that was never tracked"""
+        cube = HeatmapCube.build(tracking, 100, 100, 10.0)
+        with pytest.raises(KeyError):
+            cube.window(99)
+
+    def test_save_and_load(self, tracking, tmp_path):
+        """Test npz round trip"""
+        cube = HeatmapCube.build(tracking, 100, 100, 10.0, grid=(4, 4))
+        path = heatmap_path_for(tmp_path / "abc_results.json")
+        assert path.name == "abc_heatmap.npz"
+        assert summary_path_for(tmp_path / "abc_results.json").name == "abc_summary.json"
+        cube.save(path)
+
+        loaded = HeatmapCube.load(path)
+        assert loaded.metadata() == cube.metadata()
+        assert loaded.window(2, 0, 4) == cube.window(2, 0, 4)
+
+    def test_empty_tracking(self):
+        """Test building from no tracks"""
+        cube = HeatmapCube.build([], 100, 100, 30.0)
+        assert cube.window()["total"] == 0
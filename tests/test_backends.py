@@ -0,0 +1,143 @@
+"""
+Volleyball AI Analysis System - Detector Backend Tests
+All tests for backends.py module
+"""
+
+import json
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+import cv2
+from backends import BlankCapture, DetectorBackend, ReplayBackend, SyntheticBackend
+
+
+class TestSyntheticBackend:
+    """Tests for SyntheticBackend and BlankCapture"""
+
+    def test_deterministic(self):
+        """Test the same seed produces identical detections"""
+        a, b = SyntheticBackend(num_frames=200, seed=3), SyntheticBackend(num_frames=200, seed=3)
+        for f in range(1, 201):
+            assert a.detect_ball(None, f) == b.detect_ball(None, f)
+            assert a.detect_players(None, f) == b.detect_players(None, f)
+            assert a.detect_actions(None, f) == b.detect_actions(None, f)
+
+    def test_rallies_and_actions(self):
+        """Test rallies are scripted between breaks and start with a serve"""
+        backend = SyntheticBackend(num_frames=600, rally_frames=200, break_frames=50)
+        assert backend.rallies == [(51, 250), (301, 500), (551, 600)]
+        for start, _ in backend.rallies:
+            assert backend.detect_actions(None, start)[0]["action"] == "serve"
+        # 回合之間沒有球和動作
+        assert backend.detect_ball(None, 275) is None
+        assert backend.detect_actions(None, 275) == []
+        assert backend.detect_players(None, 0) == []
+
+    def test_capture(self):
+        """Test the capture reports video info and yields numbered frames"""
+        backend = SyntheticBackend(num_frames=5, width=320, height=180, fps=25)
+        cap = backend.open_capture()
+        assert cap.isOpened()
+        assert cap.get(cv2.CAP_PROP_FRAME_WIDTH) == 320
+        assert cap.get(cv2.CAP_PROP_FPS) == 25
+        assert cap.get(cv2.CAP_PROP_FRAME_COUNT) == 5
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        assert len(frames) == 5
+        assert frames[0].shape == (180, 320, 3)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 2)
+        assert cap.grab() and cap.read()[0] and cap.read()[0]
+        assert cap.get(cv2.CAP_PROP_POS_FRAMES) == 5
+        assert not cap.read()[0]
+        cap.release()
+        assert not cap.isOpened()
+
+    def test_jersey_number_from_pixels(self):
+        """Test jersey numbers are read from the rendered frame and from crops"""
+        backend = SyntheticBackend(num_frames=10, num_players=2, player_miss_rate=0.0, seed=5)
+        frame = backend.render(4)
+        players = backend.detect_players(frame, 4)
+        numbers = [backend.detect_jersey_number(frame, p["bbox"], 4) for p in players]
+        assert sorted(numbers) == sorted(backend.jersey_numbers)
+
+        x1, y1, x2, y2 = (int(v) for v in players[0]["bbox"])
+        crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+        local = [0, 0, crop.shape[1], crop.shape[0]]
+        assert backend.detect_jersey_number(crop, local) == numbers[0]
+        assert backend.detect_jersey_number(np.zeros((0, 0, 3), dtype=np.uint8), local) is None
+
+    def test_blank_capture_default_frames(self):
+        """Test BlankCapture without a renderer returns black frames"""
+        cap = BlankCapture(64, 32, 30.0, 2)
+        ret, frame = cap.read()
+        assert ret and frame.shape == (32, 64, 3) and not frame.any()
+
+    def test_base_backend_detects_nothing(self, mock_frame):
+        """Test the default backend interface returns empty detections"""
+        backend = DetectorBackend()
+        assert backend.detect_ball(mock_frame, 1) is None
+        assert backend.detect_players(mock_frame, 1) == []
+        assert backend.detect_actions(mock_frame, 1) == []
+        assert backend.detect_jersey_number(mock_frame, [0, 0, 10, 10], 1) is None
+
+
+class TestReplayBackend:
+    """Tests for ReplayBackend"""
+
+    @pytest.fixture
+    def results(self):
+        """Minimal analysis result"""
+        return {
+            "video_info": {"width": 320, "height": 180, "fps": 30.0, "total_frames": 3},
+            "ball_tracking": {"trajectory": [
+                {"frame": 1, "center": [10, 20], "bbox": [6, 16, 14, 24], "confidence": 0.9},
+                {"frame": 2, "center": [12, 21], "bbox": [8, 17, 16, 25], "confidence": 0.5, "interpolated": True}
+            ]},
+            "players_tracking": [
+                {"frame": 1, "players": [{"id": 1, "bbox": [50, 50, 90, 150], "confidence": 0.8,
+                                          "jersey_number": 7}]}
+            ],
+            "action_recognition": {"action_detections": [
+                {"frame": 1, "action": "spike", "bbox": [50, 50, 90, 150], "confidence": 0.7}
+            ]}
+        }
+
+    def test_load_results(self, results):
+        """Test detections are restored from an analysis result"""
+        backend = ReplayBackend(results)
+        assert backend.detect_ball(None, 1)["center"] == [10, 20]
+        # 插值點不是檢測結果
+        assert backend.detect_ball(None, 2) is None
+        players = backend.detect_players(None, 1)
+        assert players == [{"bbox": [50, 50, 90, 150], "confidence": 0.8, "class_id": 0, "label": "person"}]
+        assert backend.detect_actions(None, 1)[0]["class_id"] == 0
+        assert backend.detect_players(None, 3) == []
+
+    def test_jersey_number_by_iou(self, results):
+        """Test jersey numbers are matched to recorded player boxes"""
+        backend = ReplayBackend(results)
+        assert backend.detect_jersey_number(None, [51, 52, 90, 150], 1) == 7
+        assert backend.detect_jersey_number(None, [200, 50, 240, 150], 1) is None
+        assert backend.detect_jersey_number(None, [51, 52, 90, 150]) is None
+
+    def test_record_round_trip(self, results, tmp_path):
+        """Test recorded detections can be written to JSON and replayed"""
+        path = tmp_path / "detections.json"
+        path.write_text(json.dumps(ReplayBackend.record(results)), encoding="utf-8")
+        backend = ReplayBackend(str(path))
+        assert backend.detect_actions(None, 1)[0]["action"] == "spike"
+        assert backend.detect_jersey_number(None, [50, 50, 90, 150], 1) == 7
+
+        cap = backend.open_capture(str(tmp_path / "missing.mp4"))
+        assert cap.get(cv2.CAP_PROP_FRAME_COUNT) == 3
+        assert cap.read()[1].shape == (180, 320, 3)
@@ -68,6 +68,35 @@ class TestDatabaseCRUD:
         
         video = temp_db.get_video(sample_video_dict["id"])
         assert video is None
+    
+    def test_add_videos_batch(self, temp_db, sample_video_dict):
+        """Test batch insert skips existing IDs and stores analysis_time"""
+        temp_db.add_video(sample_video_dict)
+        videos = [
+            dict(sample_video_dict, filename="changed.mp4"),
+            {"id": "batch-video-1", "filename": "a.mp4", "file_path": "data/uploads/a.mp4",
+             "status": "completed", "analysis_time": "2025-12-10T13:00:00"},
+            {"id": "batch-video-2", "filename": "b.mp4", "file_path": "data/uploads/b.mp4"}
+        ]
+        assert temp_db.add_videos(videos) == 2
+        assert temp_db.add_videos(videos) == 0
+        assert temp_db.add_videos([]) == 0
+        
+        assert temp_db.get_video(sample_video_dict["id"])["filename"] == sample_video_dict["filename"]
+        assert temp_db.get_video("batch-video-1")["analysis_time"] == "2025-12-10T13:00:00"
+        assert {"batch-video-1", "batch-video-2", sample_video_dict["id"]} <= temp_db.get_video_ids()
+    
+    def test_add_videos_batch_failure_logged(self, temp_db, monkeypatch):
+        """Test a failed batch insert is reported through the structured logger"""
+        from unittest.mock import Mock
+        import database
+        log = Mock()
+        monkeypatch.setattr(database, "log", log)
+        temp_db._get_connection().execute("DROP TABLE videos")
+        videos = [{"id": f"v{i}", "filename": "a.mp4", "file_path": "x"} for i in range(2)]
+        assert temp_db.add_videos(videos) == 0
+        log.error.assert_called_once()
+        assert log.error.call_args.kwargs["videos"] == 2
 
 
 # ============================================================================
@@ -263,6 +292,17 @@ class TestDatabaseEdgeCases:
         yield db
         db.close()
     
+    def test_query_observer(self, temp_db, sample_video_dict):
+        """Test every statement reports its operation and duration to the observer"""
+        observed = []
+        temp_db.query_observer = lambda operation, seconds: observed.append((operation, seconds))
+        temp_db.add_video(sample_video_dict)
+        temp_db.get_video(sample_video_dict["id"])
+        temp_db.query_observer = None
+        temp_db.get_all_videos()
+        assert [operation for operation, _ in observed] == ["insert", "select"]
+        assert all(seconds >= 0 for _, seconds in observed)
+    
     def test_add_video_duplicate_id(self, temp_db, sample_video_dict):
         """Test adding video with duplicate ID"""
         temp_db.add_video(sample_video_dict)
@@ -351,6 +391,350 @@ class TestDatabaseEdgeCases:
         assert mappings["1"]["bbox"] == [100, 200, 150, 250]
 
 
+# ============================================================================
+# Performance Layer Tests
+# ============================================================================
+
+class TestDatabasePerformance:
+    """Tests for pragmas, indexes, transactions and batch APIs"""
+    
+    @pytest.fixture
+    def temp_db(self, tmp_path):
+        """Create a temporary database"""
+        db_path = tmp_path / "test_performance.db"
+        from database import Database
+        db = Database(str(db_path))
+        yield db
+        db.close()
+    
+    def test_wal_and_pragmas(self, temp_db):
+        """Test connections use WAL and the tuned pragmas"""
+        conn = temp_db._get_connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    
+    def test_indexes_used(self, temp_db):
+        """Test listing videos and finding tasks by video use indexes"""
+        conn = temp_db._get_connection()
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM videos ORDER BY upload_time DESC"))
+        assert "idx_videos_upload_time" in plan
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM analysis_tasks WHERE video_id = ?", ("v",)))
+        assert "idx_analysis_tasks_video_id" in plan
+    
+    def test_connections_per_database(self, tmp_path, temp_db, sample_video_dict):
+        """Test databases opened in the same thread do not share a connection"""
+        from database import Database
+        other = Database(str(tmp_path / "other.db"))
+        try:
+            temp_db.add_video(sample_video_dict)
+            assert other.get_video(sample_video_dict["id"]) is None
+            assert other._get_connection() is not temp_db._get_connection()
+        finally:
+            other.close()
+    
+    def test_transaction_commits_once(self, temp_db, sample_video_dict):
+        """Test methods inside a transaction commit together at the end"""
+        with temp_db.transaction() as conn:
+            temp_db.add_video(sample_video_dict)
+            temp_db.set_jersey_mapping(sample_video_dict["id"], track_id=1, jersey_number=7)
+            assert conn.in_transaction
+        assert not conn.in_transaction
+        assert temp_db.get_jersey_mappings(sample_video_dict["id"])["1"]["jersey_number"] == 7
+    
+    def test_transaction_rollback(self, temp_db, sample_video_dict):
+        """Test an exception rolls back everything written in the transaction"""
+        with pytest.raises(RuntimeError):
+            with temp_db.transaction():
+                temp_db.add_video(sample_video_dict)
+                raise RuntimeError("boom")
+        assert temp_db.get_video(sample_video_dict["id"]) is None
+    
+    def test_nested_transaction_rolls_back_inner_only(self, temp_db, sample_video_dict):
+        """Test nested transactions use savepoints"""
+        with temp_db.transaction():
+            temp_db.add_video(sample_video_dict)
+            with pytest.raises(RuntimeError):
+                with temp_db.transaction():
+                    temp_db.add_video(dict(sample_video_dict, id="inner-video"))
+                    raise RuntimeError("boom")
+        assert temp_db.get_video(sample_video_dict["id"]) is not None
+        assert temp_db.get_video("inner-video") is None
+    
+    def test_set_jersey_mappings_batch(self, temp_db, sample_video_dict):
+        """Test batch jersey mappings overwrite per video/track"""
+        temp_db.add_video(sample_video_dict)
+        video_id = sample_video_dict["id"]
+        count = temp_db.set_jersey_mappings([
+            {"video_id": video_id, "track_id": "1", "jersey_number": 5, "frame": 10, "bbox": [1, 2, 3, 4]},
+            {"video_id": video_id, "track_id": 2, "jersey_number": 9},
+            {"video_id": video_id, "track_id": 1, "jersey_number": 6}
+        ])
+        assert count == 3
+        assert temp_db.set_jersey_mappings([]) == 0
+        mappings = temp_db.get_jersey_mappings(video_id)
+        assert mappings["1"]["jersey_number"] == 6
+        assert mappings["2"]["jersey_number"] == 9
+    
+    def test_migrate_from_json_single_transaction(self, temp_db, sample_video_dict):
+        """Test JSON migration writes videos and mappings in one commit"""
+        commits = []
+        conn = temp_db._get_connection()
+        temp_db._commit = lambda connection: commits.append(connection.transaction_depth)
+        temp_db.migrate_from_json(
+            [sample_video_dict, dict(sample_video_dict, id="migrated-2")],
+            {sample_video_dict["id"]: {"3": {"jersey_number": 11}}}
+        )
+        assert not conn.in_transaction
+        assert temp_db.get_video("migrated-2") is not None
+        assert temp_db.get_jersey_mappings(sample_video_dict["id"])["3"]["jersey_number"] == 11
+        assert all(depth > 0 for depth in commits)
+
+
+# ============================================================================
+# Video Listing Tests
+# ============================================================================
+
+class TestVideoListing:
+    """Tests for paginated, filtered and searchable video listing"""
+    
+    @pytest.fixture
+    def temp_db(self, tmp_path):
+        """Create a temporary database with 30 videos"""
+        db_path = tmp_path / "test_listing.db"
+        from database import Database
+        db = Database(str(db_path))
+        db.add_videos([{
+            "id": f"video-{i:02d}",
+            "filename": f"match_{i:02d}.mp4",
+            "original_filename": f"Final Round {i}.MP4" if i % 5 == 0 else f"training_{i}.mp4",
+            "file_path": f"data/uploads/video-{i:02d}.mp4",
+            "upload_time": f"2025-01-{1 + i % 7:02d}T00:00:00",  # 重複的排序值，由 id 決定順序
+            "status": "completed" if i % 3 == 0 else "uploaded",
+            "file_size": 1000 * (i % 4)
+        } for i in range(30)])
+        yield db
+        db.close()
+    
+    def _all_pages(self, db, limit, **kwargs):
+        """依次讀取所有頁，返回 id 列表"""
+        ids, cursor = [], None
+        while True:
+            page = db.list_videos(limit=limit, cursor=cursor, **kwargs)
+            assert len(page["videos"]) <= limit
+            ids.extend(video["id"] for video in page["videos"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+    
+    @pytest.mark.parametrize("sort", ["upload_time", "filename", "file_size"])
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_pages_cover_every_row_in_order(self, temp_db, sort, order):
+        """Test paging through any sort returns each row once, in sort order"""
+        ids = self._all_pages(temp_db, 7, sort=sort, order=order)
+        expected = sorted(temp_db.get_all_videos(), key=lambda v: (v[sort], v["id"]), reverse=order == "desc")
+        assert ids == [video["id"] for video in expected]
+    
+    def test_pages_with_missing_file_size(self, tmp_path):
+        """Test rows written with file_size None are stored as 0 and not skipped by the cursor"""
+        from database import Database
+        db_path = tmp_path / "nulls.db"
+        db = Database(str(db_path))
+        try:
+            db.add_video({"id": "v0", "filename": "a.mp4", "file_path": "x", "file_size": None})
+            db.add_videos([{"id": f"v{i}", "filename": "a.mp4", "file_path": "x", "file_size": None if i % 2 else i}
+                           for i in range(1, 7)])
+            db.update_video("v2", {"file_size": None})
+            # 舊版本直接寫入的 NULL 在下次打開時修正
+            db._get_connection().execute("UPDATE videos SET file_size = NULL WHERE id = 'v4'")
+            db._get_connection().commit()
+            db.close()
+            db = Database(str(db_path))
+            expected = ["v0", "v1", "v2", "v3", "v4", "v5", "v6"]
+            assert self._all_pages(db, 2, sort="file_size", order="asc") == expected
+            assert self._all_pages(db, 2, sort="file_size", order="desc") == expected[::-1]
+            assert db.get_video("v4")["file_size"] == 0
+        finally:
+            db.close()
+    
+    def test_status_filter(self, temp_db):
+        """Test status filtering combines with pagination"""
+        ids = self._all_pages(temp_db, 4, status="completed")
+        assert ids == [f"video-{i:02d}" for i in sorted(range(0, 30, 3), key=lambda i: (1 + i % 7, i), reverse=True)]
+    
+    def test_last_page_has_no_cursor(self, temp_db):
+        """Test an exact final page does not return a cursor"""
+        page = temp_db.list_videos(limit=30)
+        assert len(page["videos"]) == 30
+        assert page["next_cursor"] is None
+    
+    def test_search(self, temp_db):
+        """Test filename search covers both name columns, ignores case and ANDs the terms"""
+        assert {v["id"] for v in temp_db.list_videos(query="final")["videos"]} == {f"video-{i:02d}" for i in range(0, 30, 5)}
+        assert [v["id"] for v in temp_db.list_videos(query="FINAL round 25")["videos"]] == ["video-25"]
+        assert [v["id"] for v in temp_db.list_videos(query="match_07")["videos"]] == ["video-07"]
+        assert temp_db.list_videos(query="missing")["videos"] == []
+    
+    def test_search_short_terms_and_wildcards(self, temp_db):
+        """Test terms too short for the trigram index and LIKE wildcards are matched literally"""
+        assert [v["id"] for v in temp_db.list_videos(query="_0", sort="filename", order="asc")["videos"]] == [
+            f"video-{i:02d}" for i in range(10)]
+        assert temp_db.list_videos(query="%")["videos"] == []
+        assert temp_db.list_videos(query='"')["videos"] == []
+    
+    def test_search_without_fts(self, temp_db):
+        """Test search falls back to LIKE when FTS5 is unavailable"""
+        temp_db.fts_enabled = False
+        assert [v["id"] for v in temp_db.list_videos(query="round 25")["videos"]] == ["video-25"]
+    
+    def test_search_follows_updates_and_deletes(self, temp_db):
+        """Test the full-text index is kept in sync by triggers"""
+        temp_db.update_video("video-01", {"filename": "renamed_clip.mp4"})
+        assert [v["id"] for v in temp_db.list_videos(query="renamed")["videos"]] == ["video-01"]
+        assert temp_db.list_videos(query="match_01")["videos"] == []
+        temp_db.delete_video("video-01")
+        assert temp_db.list_videos(query="renamed")["videos"] == []
+    
+    def test_status_counts(self, temp_db):
+        """Test status counts follow inserts, status changes and deletes"""
+        assert temp_db.get_status_counts() == {"all": 30, "completed": 10, "uploaded": 20}
+        temp_db.update_video("video-01", {"status": "processing"})
+        temp_db.update_video("video-02", {"file_size": 1})
+        temp_db.delete_video("video-00")
+        assert temp_db.get_status_counts() == {"all": 29, "completed": 9, "uploaded": 19, "processing": 1}
+    
+    def test_status_counts_with_null_status(self, temp_db):
+        """Test videos without a status are counted once, only in all"""
+        temp_db.add_video({"id": "no-status", "filename": "a.mp4", "file_path": "x", "status": None})
+        assert temp_db.get_status_counts() == {"all": 31, "completed": 10, "uploaded": 20}
+        temp_db.update_video("no-status", {"status": "processing"})
+        temp_db.update_video("video-01", {"status": None})
+        assert temp_db.get_status_counts() == {"all": 31, "completed": 10, "uploaded": 19, "processing": 1}
+        temp_db.delete_video("video-01")
+        temp_db.delete_video("no-status")
+        assert temp_db.get_status_counts() == {"all": 29, "completed": 10, "uploaded": 19}
+    
+    def test_invalid_arguments(self, temp_db):
+        """Test unknown sorts, bad cursors and cursors from another sort are rejected"""
+        cursor = temp_db.list_videos(limit=5)["next_cursor"]
+        with pytest.raises(ValueError):
+            temp_db.list_videos(sort="status")
+        with pytest.raises(ValueError):
+            temp_db.list_videos(order="up")
+        with pytest.raises(ValueError):
+            temp_db.list_videos(cursor="not-a-cursor")
+        with pytest.raises(ValueError):
+            temp_db.list_videos(cursor=cursor, sort="filename")
+    
+    def test_pages_use_indexes(self, temp_db):
+        """Test keyset pages are index range scans, not sorts of the whole table"""
+        cursor = temp_db.list_videos(limit=5, status="completed", sort="file_size")["next_cursor"]
+        conn = temp_db._get_connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            temp_db.list_videos(limit=5, cursor=cursor, status="completed", sort="file_size")
+        finally:
+            conn.set_trace_callback(None)
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + statements[-1]))
+        assert "idx_videos_status_file_size_id" in plan
+        assert "TEMP B-TREE" not in plan
+    
+    def test_existing_database_upgraded(self, tmp_path):
+        """Test counts and the search index are built for rows written before they existed"""
+        import sqlite3
+        from database import Database
+        db_path = tmp_path / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE videos (id TEXT PRIMARY KEY, filename TEXT NOT NULL, original_filename TEXT, "
+                     "file_path TEXT NOT NULL, upload_time TEXT NOT NULL, status TEXT DEFAULT 'uploaded', "
+                     "file_size INTEGER DEFAULT 0, task_id TEXT, analysis_time TEXT, "
+                     "created_at TEXT DEFAULT CURRENT_TIMESTAMP, updated_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO videos (id, filename, file_path, upload_time, status) "
+                     "VALUES ('old', 'legacy_match.mp4', 'x', '2024-01-01', 'completed')")
+        conn.commit()
+        conn.close()
+        db = Database(str(db_path))
+        try:
+            assert db.get_status_counts() == {"all": 1, "completed": 1}
+            assert [v["id"] for v in db.list_videos(query="legacy")["videos"]] == ["old"]
+        finally:
+            db.close()
+
+
+# ============================================================================
+# Async Facade Tests
+# ============================================================================
+
+class TestAsyncDatabase:
+    """Tests for the AsyncDatabase facade"""
+    
+    @pytest.fixture
+    def temp_db(self, tmp_path):
+        """Create a temporary database"""
+        db_path = tmp_path / "test_async.db"
+        from database import Database
+        db = Database(str(db_path))
+        yield db
+        db.close()
+    
+    @pytest.mark.asyncio
+    async def test_reads_and_writes(self, temp_db, sample_video_dict):
+        """Test awaited methods return the same values as the sync methods"""
+        from database import AsyncDatabase
+        adb = AsyncDatabase(lambda: temp_db)
+        assert await adb.add_video(sample_video_dict) is True
+        video = await adb.get_video(sample_video_dict["id"])
+        assert video["filename"] == sample_video_dict["filename"]
+        assert await adb.update_video(sample_video_dict["id"], {"status": "completed"}) is True
+        assert (await adb.get_all_videos())[0]["status"] == "completed"
+    
+    @pytest.mark.asyncio
+    async def test_runs_on_database_threads(self, temp_db):
+        """Test reads run on the reader pool and writes on the single writer thread"""
+        import threading
+        from database import AsyncDatabase
+        adb = AsyncDatabase(lambda: temp_db, readers=2)
+        current = lambda: threading.current_thread().name
+        assert (await adb.run_read(current)).startswith("db-read")
+        writers = {await adb.run_write(current) for _ in range(5)}
+        assert len(writers) == 1 and writers.pop().startswith("db-write")
+    
+    @pytest.mark.asyncio
+    async def test_does_not_block_event_loop(self, temp_db):
+        """Test a slow database call does not stall other coroutines"""
+        import asyncio
+        import time
+        from database import AsyncDatabase
+        adb = AsyncDatabase(lambda: temp_db)
+        start = time.perf_counter()
+        slow = asyncio.ensure_future(adb.run_read(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - start < 0.2
+        await slow
+    
+    @pytest.mark.asyncio
+    async def test_resolves_database_per_call(self, tmp_path, temp_db, sample_video_dict):
+        """Test the provider is called on every access so the instance can be swapped"""
+        from database import AsyncDatabase, Database
+        current = [temp_db]
+        adb = AsyncDatabase(lambda: current[0])
+        await adb.add_video(sample_video_dict)
+        current[0] = Database(str(tmp_path / "swapped.db"))
+        assert await adb.get_video(sample_video_dict["id"]) is None
+    
+    def test_unknown_attribute(self, temp_db):
+        """Test only public Database methods are exposed"""
+        from database import AsyncDatabase
+        adb = AsyncDatabase(lambda: temp_db)
+        with pytest.raises(AttributeError):
+            adb.missing_method
+        with pytest.raises(AttributeError):
+            adb._get_connection
+
+
 # ============================================================================
 # Run Tests
 # ============================================================================
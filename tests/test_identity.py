@@ -0,0 +1,275 @@
+"""
+Volleyball AI Analysis System - Identity Tests
+All tests for identity.py module
+"""
+
+import threading
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from identity import (
+    IdentityStore, OCRScheduler, vote_is_stable, JerseyRecognitionPool, JerseyResult, crop_player,
+    select_best_frames, sharpness
+)
+
+
+class TestOCRScheduler:
+    """Tests for OCRScheduler"""
+
+    def run_frames(self, scheduler, track_ids, num_frames, histories=None, on_call=None):
+        """Plan and record num_frames frames, returning the selected tracks per frame"""
+        histories = histories if histories is not None else {}
+        selected = []
+        for _ in range(num_frames):
+            chosen = scheduler.plan(track_ids, histories)
+            for track_id in chosen:
+                if on_call:
+                    on_call(track_id, histories)
+                scheduler.record(track_id, histories.get(track_id))
+            selected.append(chosen)
+        return selected
+
+    def test_vote_is_stable(self):
+        """Test stability needs enough votes and a clear majority"""
+        assert not vote_is_stable(None)
+        assert not vote_is_stable([7, 7, 7])
+        assert vote_is_stable([7, 7, 7, 7, 1])
+        assert not vote_is_stable([7, 7, 7, 1, 1])
+
+    def test_new_tracks_due_immediately(self):
+        """Test every track gets OCR when it first appears (within budget)"""
+        scheduler = OCRScheduler(base_interval=5, frame_budget=10)
+        assert sorted(scheduler.plan([1, 2, 3], {})) == [1, 2, 3]
+
+    def test_cadence_independent_of_track_id(self):
+        """Test each track is recognised once per interval regardless of its ID"""
+        scheduler = OCRScheduler(base_interval=5, frame_budget=10)
+        selected = self.run_frames(scheduler, [3, 5, 11], 20)
+        for track_id in (3, 5, 11):
+            frames = [i for i, chosen in enumerate(selected) if track_id in chosen]
+            assert frames == [0, 5, 10, 15]
+
+    def test_frame_budget(self):
+        """Test no frame exceeds the budget and deferred tracks catch up"""
+        scheduler = OCRScheduler(base_interval=5, frame_budget=2)
+        selected = self.run_frames(scheduler, list(range(1, 7)), 10)
+
+        assert all(len(chosen) <= 2 for chosen in selected)
+        assert sorted(t for chosen in selected[:3] for t in chosen) == list(range(1, 7))
+        stats = scheduler.stats()
+        assert stats["max_calls_per_frame"] == 2
+        assert stats["deferred"] > 0
+        assert stats["total_calls"] == sum(len(chosen) for chosen in selected)
+
+    def test_unknown_jersey_priority(self):
+        """Test tracks without a stable vote are served first"""
+        scheduler = OCRScheduler(frame_budget=1)
+        histories = {1: [9] * 10, 2: []}
+        assert scheduler.plan([1, 2], histories) == [2]
+
+    def test_backoff_when_stable(self):
+        """Test the interval grows once the vote is stable and resets otherwise"""
+        scheduler = OCRScheduler(base_interval=4, max_interval=16, frame_budget=5)
+
+        def vote(track_id, histories):
+            histories.setdefault(track_id, []).append(track_id)
+
+        histories = {}
+        selected = self.run_frames(scheduler, [8], 100, histories, on_call=vote)
+        frames = [i for i, chosen in enumerate(selected) if chosen]
+        gaps = [b - a for a, b in zip(frames, frames[1:])]
+        assert gaps[:4] == [4, 4, 4, 4]
+        assert gaps[4:7] == [8, 16, 16]
+
+        histories[8] += [1, 2, 3]
+        scheduler.record(8, histories[8])
+        assert scheduler.interval[8] == 4
+
+    def test_stats_histogram(self):
+        """Test the calls-per-frame histogram covers every planned frame"""
+        scheduler = OCRScheduler(base_interval=3, frame_budget=3)
+        self.run_frames(scheduler, [1, 2], 6)
+        stats = scheduler.stats()
+        assert stats["frames"] == 6
+        assert stats["calls_per_frame"] == {"0": 4, "2": 2}
+        assert stats["mean_calls_per_frame"] == pytest.approx(4 / 6)
+
+    def test_prune_stale_tracks(self):
+        """Test tracks that disappear are forgotten"""
+        scheduler = OCRScheduler(stale_after=10)
+        scheduler.plan([1], {})
+        for _ in range(25):
+            scheduler.plan([2], {})
+        assert 1 not in scheduler.next_due
+        assert 2 in scheduler.next_due
+
+
+class TestJerseyRecognitionPool:
+    """Tests for JerseyRecognitionPool"""
+
+    def test_crop_player(self):
+        """Test the crop is a copy with the bbox moved into crop coordinates"""
+        frame = np.zeros((100, 200, 3), dtype=np.uint8)
+        crop, bbox = crop_player(frame, [40, 10, 80, 90])
+        assert crop.shape == (80, 44, 3)
+        assert bbox == [2.0, 0.0, 42.0, 80.0]
+        crop[:] = 255
+        assert frame.max() == 0
+
+    def test_results_folded_later(self):
+        """Test submit returns immediately and results arrive through collect/drain"""
+        release = threading.Event()
+
+        def recognizer(crop, bbox):
+            release.wait(5)
+            return int(crop[0, 0, 0])
+
+        pool = JerseyRecognitionPool(recognizer)
+        frame = np.full((50, 50, 3), 7, dtype=np.uint8)
+        assert pool.submit(1, 10, frame, [0, 0, 20, 40])
+        assert pool.submit(2, 10, frame, [20, 0, 40, 40])
+        assert pool.collect() == []
+
+        release.set()
+        results = pool.drain()
+        pool.shutdown()
+        assert results == [JerseyResult(1, 10, 7), JerseyResult(2, 10, 7)]
+        assert pool.stats["completed"] == 2
+
+    def test_backpressure_and_failures(self):
+        """Test jobs beyond max_pending are dropped and recognizer errors are counted"""
+        release = threading.Event()
+
+        def recognizer(crop, bbox):
+            release.wait(5)
+            raise RuntimeError("ocr failed")
+
+        pool = JerseyRecognitionPool(recognizer, max_pending=1)
+        frame = np.zeros((50, 50, 3), dtype=np.uint8)
+        assert pool.submit(1, 1, frame, [0, 0, 20, 40])
+        assert not pool.submit(2, 1, frame, [0, 0, 20, 40])
+
+        release.set()
+        assert pool.drain() == [JerseyResult(1, 1, None)]
+        pool.shutdown()
+        assert pool.stats == {"submitted": 1, "completed": 0, "dropped": 1, "failed": 1}
+
+
+class TestBestFrameSelection:
+    """Tests for select_best_frames and sharpness"""
+
+    @staticmethod
+    def tracking(sizes):
+        """One track whose bbox width follows sizes, plus a small distant track"""
+        return [
+            {"frame": f, "players": [
+                {"id": 1, "bbox": [0, 0, w, 2 * w], "confidence": 0.9},
+                {"id": 2, "bbox": [300, 0, 310 + f % 3, 20], "confidence": 0.5 + 0.1 * (f % 3)},
+            ]}
+            for f, w in enumerate(sizes, start=1)
+        ]
+
+    def test_largest_confident_first(self):
+        """Test candidates are ordered by size x confidence within each track"""
+        candidates = select_best_frames(self.tracking([10, 50, 20, 40, 30] * 4), per_track=3, min_frame_gap=1)
+        assert [c.frame for c in candidates[1]][:3] == [2, 7, 12]
+        assert candidates[1][0].score == pytest.approx(0.9)
+        assert candidates[2][0].score == pytest.approx(0.7)
+
+    def test_min_frame_gap(self):
+        """Test chosen frames of one track are spread out"""
+        candidates = select_best_frames(self.tracking(list(range(10, 40))), per_track=4, min_frame_gap=5)
+        frames = sorted(c.frame for c in candidates[1])
+        assert len(frames) == 4
+        assert all(b - a >= 5 for a, b in zip(frames, frames[1:]))
+
+    def test_empty(self):
+        """Test no tracks produce no candidates"""
+        assert select_best_frames([]) == {}
+        assert select_best_frames([{"frame": 1, "players": []}]) == {}
+
+    def test_sharpness(self):
+        """Test textured crops score higher than flat ones"""
+        rng = np.random.default_rng(0)
+        flat = np.full((40, 40, 3), 128, dtype=np.uint8)
+        noisy = rng.integers(0, 255, (40, 40, 3), dtype=np.uint8)
+        assert sharpness(flat) == 0.0
+        assert sharpness(noisy) > 100
+        assert sharpness(np.zeros((0, 0, 3), dtype=np.uint8)) == 0.0
+
+
+class TestIdentityStore:
+    """Tests for IdentityStore"""
+
+    def test_history_trimmed(self):
+        """Test vote history keeps only the most recent entries"""
+        store = IdentityStore(history_size=5)
+        for n in range(12):
+            store.record_vote(1, n)
+        assert store.histories[1] == [7, 8, 9, 10, 11]
+        assert store.stats()["history_entries"] == 5
+
+    def test_ttl_eviction(self):
+        """Test tracks unseen for ttl_frames are evicted and their vote retired"""
+        store = IdentityStore(ttl_frames=10)
+        store.touch([1, 2])
+        for _ in range(3):
+            store.record_vote(1, 7)
+        store.record_vote(1, 3)
+        store.jersey_cache[1] = 7
+        store.jersey_to_stable_id[7] = 7
+        store.jersey_to_track_ids[7] = [1, 2]
+        for _ in range(11):
+            store.touch([2])
+        assert 1 not in store.last_seen and 1 not in store.histories and 1 not in store.jersey_cache
+        assert store.jersey_to_track_ids[7] == [2]
+        assert store.jersey_to_stable_id[7] == 7
+        assert store.retired == {1: 7}
+        assert store.voted_jersey(1) == 7
+        assert store.evicted_ttl == 1
+        store.clear_retired()
+        assert store.voted_jersey(1) is None
+
+    def test_lru_capacity(self):
+        """Test the least recently seen tracks are evicted beyond max_tracks"""
+        store = IdentityStore(max_tracks=3, ttl_frames=1000)
+        store.touch([1, 2, 3])
+        store.touch([1])
+        store.touch([4])
+        assert list(store.last_seen) == [3, 1, 4]
+        assert store.evicted_lru == 1
+
+    def test_bounded_under_track_churn(self):
+        """Test store size stays bounded when every frame brings new track ids"""
+        store = IdentityStore(max_tracks=50, ttl_frames=30)
+        for frame in range(5000):
+            store.touch([frame, frame + 1])
+            store.record_vote(frame, frame % 99 + 1)
+            store.jersey_to_track_ids.setdefault(frame % 99 + 1, []).append(frame)
+        stats = store.stats()
+        assert stats["tracks"] <= 50
+        assert stats["history_entries"] <= 50
+        assert stats["linked_tracks"] <= 50
+        assert stats["evicted_ttl"] > 4000
+        assert stats["approx_bytes"] > 0
+
+    def test_reset(self):
+        """Test reset empties the store in place and restarts frame counting"""
+        store = IdentityStore(ttl_frames=2)
+        histories = store.histories
+        store.touch([1])
+        store.record_vote(1, 7)
+        store.jersey_to_stable_id[7] = 7
+        for _ in range(4):
+            store.touch([2])
+        assert store.retired == {1: 7}
+        store.reset()
+        assert store.histories is histories
+        assert store.stats()["tracks"] == 0 and store.stats()["retired"] == 0
+        assert store.jersey_to_stable_id == {} and store.frame == 0 and store.evicted_ttl == 0
@@ -5,7 +5,10 @@ All tests for logger.py module
 
 import pytest
 import sys
+import json
+import queue
 import logging
+import threading
 from pathlib import Path
 
 # Add project root to path
@@ -193,6 +196,118 @@ class TestLoggerIntegration:
         logger.error("Connection failed")
 
 
+# ============================================================================
+# Structured / Non-blocking Logging Tests
+# ============================================================================
+
+def _flush(name):
+    """Stop the logger's background listener so all queued records are written"""
+    from logger import _listeners
+    _listeners.pop(name).stop()
+
+
+class TestStructuredLogging:
+    """Tests for JSON output, bound context and the background writer"""
+    
+    def test_json_lines_with_context(self, tmp_path):
+        """Test records are JSON with bound task/video IDs and extra fields"""
+        from logger import setup_logger, log_context
+        
+        log_file = tmp_path / "app.log"
+        logger = setup_logger("test_json_context", log_file=log_file, console_output=False, json_format=True)
+        with log_context(task_id="task-1", video_id="video-1"):
+            logger.info("frame processed", extra={"frame": 7})
+        logger.info("outside")
+        _flush("test_json_context")
+        
+        entries = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+        assert entries[0]["message"] == "frame processed"
+        assert entries[0]["level"] == "INFO"
+        assert entries[0]["task_id"] == "task-1"
+        assert entries[0]["video_id"] == "video-1"
+        assert entries[0]["frame"] == 7
+        assert "task_id" not in entries[1]
+    
+    def test_exception_text(self, tmp_path):
+        """Test exceptions are serialized into the JSON record"""
+        from logger import setup_logger
+        
+        log_file = tmp_path / "app.log"
+        logger = setup_logger("test_json_exception", log_file=log_file, console_output=False, json_format=True)
+        try:
+            raise ValueError("bad frame")
+        except ValueError:
+            logger.error("detection failed", exc_info=True)
+        _flush("test_json_exception")
+        
+        entry = json.loads(log_file.read_text(encoding="utf-8").splitlines()[0])
+        assert "ValueError: bad frame" in entry["exception"]
+    
+    def test_writes_happen_on_listener_thread(self, tmp_path):
+        """Test the calling thread only enqueues; handlers run on the listener thread"""
+        from logger import setup_logger, _listeners
+        
+        threads = []
+        
+        class RecordingHandler(logging.Handler):
+            def emit(self, record):
+                threads.append(threading.get_ident())
+        
+        logger = setup_logger("test_listener_thread", console_output=False)
+        _listeners["test_listener_thread"].handlers = (RecordingHandler(),)
+        logger.info("hello")
+        _flush("test_listener_thread")
+        assert threads and threads[0] != threading.get_ident()
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test a full queue drops records and counts them"""
+        from logger import _NonBlockingQueueHandler
+        
+        handler = _NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        logger = logging.getLogger("test_full_queue")
+        propagate = logger.propagate
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            for i in range(5):
+                logger.warning("message %d", i)
+        finally:
+            logger.removeHandler(handler)
+            logger.propagate = propagate
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 4
+        assert handler not in logger.handlers
+
+
+class TestRateLimitFilter:
+    """Tests for rate limiting repeated warnings and errors"""
+    
+    def _record(self, message, level=logging.ERROR):
+        return logging.LogRecord("test_rate", level, __file__, 1, message, (), None)
+    
+    def test_repeated_errors_suppressed(self):
+        """Test identical errors pass once per interval and report the suppressed count"""
+        from logger import RateLimitFilter
+        
+        now = [100.0]
+        rate_filter = RateLimitFilter(interval=10.0, clock=lambda: now[0])
+        assert rate_filter.filter(self._record("decode failed"))
+        assert not any(rate_filter.filter(self._record("decode failed")) for _ in range(5))
+        assert rate_filter.filter(self._record("other error"))
+        
+        now[0] = 111.0
+        record = self._record("decode failed")
+        assert rate_filter.filter(record)
+        assert record.suppressed == 5
+    
+    def test_info_not_limited(self):
+        """Test records below the limited level always pass"""
+        from logger import RateLimitFilter
+        
+        rate_filter = RateLimitFilter(interval=10.0)
+        assert all(rate_filter.filter(self._record("progress", logging.INFO)) for _ in range(5))
+
+
 # ============================================================================
 # Run Tests
 # ============================================================================
@@ -50,6 +50,50 @@ class TestRootAndHealth:
         assert "timestamp" in data
 
 
+# ============================================================================
+# Metrics Endpoint Tests
+# ============================================================================
+
+class TestMetricsEndpoint:
+    """Tests for the Prometheus metrics endpoint"""
+    
+    def test_metrics_exposition(self, client):
+        """Test /metrics returns the text format with the analysis metrics"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for name in ("volleyball_analysis_queue_depth", "volleyball_analysis_running",
+                     "volleyball_analysis_stage_seconds", "volleyball_model_load_seconds",
+                     "volleyball_results_cache_requests_total", "volleyball_play_bytes_total",
+                     "volleyball_sqlite_query_seconds", "volleyball_process_resident_memory_bytes"):
+            assert f"# TYPE {name} " in response.text
+    
+    def test_metrics_count_queries_and_play_bytes(self, client, sample_video_in_db):
+        """Test SQLite queries and /play bytes show up in the metrics"""
+        import main
+        video_id, video_data = sample_video_in_db
+        Path(video_data["file_path"]).write_bytes(b"\x00" * 4096)
+        before = main.play_bytes.labels("partial").value
+        response = client.get(f"/play/{video_id}", headers={"Range": "bytes=0-1023"})
+        assert response.status_code == 206
+        assert main.play_bytes.labels("partial").value - before == 1024
+        text = client.get("/metrics").text
+        assert 'volleyball_sqlite_query_seconds_count{operation="select"}' in text
+    
+    def test_load_cached_hit_and_miss(self, tmp_path):
+        """Test the results cache counts hits and misses per kind"""
+        import main
+        path = tmp_path / "cached.json"
+        path.write_text("{}")
+        hits = main.cache_requests.labels("metrics-test", "hit")
+        misses = main.cache_requests.labels("metrics-test", "miss")
+        hits_before, misses_before = hits.value, misses.value
+        main.load_cached(path, "metrics-test", lambda p: 1)
+        main.load_cached(path, "metrics-test", lambda p: 1)
+        assert misses.value - misses_before == 1
+        assert hits.value - hits_before == 1
+
+
 # ============================================================================
 # Upload Endpoint Tests
 # ============================================================================
@@ -151,6 +195,52 @@ class TestVideoCRUD:
             
             response = client.delete(f"/videos/{video_id}")
             assert response.status_code in [500, 404]
+    
+    def test_videos_read_off_event_loop(self, client):
+        """Test /videos reads the database on a database thread"""
+        import threading
+        threads = []
+        
+        def list_videos(**kwargs):
+            threads.append(threading.current_thread().name)
+            return {"videos": [{"id": "v1", "filename": "a.mp4"}], "next_cursor": None}
+        
+        with patch('main.db') as mock_db:
+            mock_db.list_videos.side_effect = list_videos
+            mock_db.get_status_counts.return_value = {"all": 1}
+            response = client.get("/videos")
+        assert response.json() == {"videos": [{"id": "v1", "filename": "a.mp4"}], "next_cursor": None,
+                                   "counts": {"all": 1}}
+        assert threads[0].startswith("db-read")
+    
+    def test_get_videos_paginated_search(self, client):
+        """Test /videos pages through search results with the returned cursor"""
+        from database import get_database
+        db = get_database()
+        ids = [f"paging-test-video-{i}" for i in range(3)]
+        db.add_videos([{"id": video_id, "filename": f"pagingmarker_{i}.mp4", "file_path": f"/tmp/{video_id}.mp4",
+                        "upload_time": f"2025-01-0{i + 1}T00:00:00", "status": "uploaded"}
+                       for i, video_id in enumerate(ids)])
+        try:
+            params = {"q": "pagingmarker", "limit": 2, "sort": "upload_time", "order": "asc"}
+            first = client.get("/videos", params=params).json()
+            assert [v["id"] for v in first["videos"]] == ids[:2]
+            assert first["counts"]["all"] >= 3
+            second = client.get("/videos", params=dict(params, cursor=first["next_cursor"])).json()
+            assert [v["id"] for v in second["videos"]] == ids[2:]
+            assert second["next_cursor"] is None
+            assert client.get("/videos", params=dict(params, status="completed")).json()["videos"] == []
+        finally:
+            for video_id in ids:
+                db.delete_video(video_id)
+    
+    def test_get_videos_invalid_params(self, client):
+        """Test /videos rejects bad cursors, sorts and page sizes"""
+        assert client.get("/videos", params={"cursor": "bad"}).status_code == 400
+        assert client.get("/videos", params={"sort": "status"}).status_code == 422
+        assert client.get("/videos", params={"order": "up"}).status_code == 422
+        assert client.get("/videos", params={"limit": 0}).status_code == 422
+        assert client.get("/videos", params={"limit": 1000}).status_code == 422
 
 
 # ============================================================================
@@ -211,6 +301,81 @@ class TestAnalysisEndpoints:
         response = client.get("/results/nonexistent-results-999")
         assert response.status_code == 404
     
+    def test_get_results_summary_computed_for_legacy_results(self, client, tmp_path):
+        """Test summary endpoint falls back to computing the summary"""
+        video_id = "summary-legacy-video"
+        results_data = {
+            "players_tracking": [{"frame": 1, "players": [{"id": 4, "stable_id": 4, "jersey_number": None}]}],
+            "action_recognition": {"actions": [{"frame": 1, "action": "set", "confidence": 0.8, "player_id": 4}]},
+            "plays": []
+        }
+        with open(tmp_path / f"{video_id}_results.json", 'w') as f:
+            json.dump(results_data, f)
+
+        with patch('main.RESULTS_DIR', tmp_path):
+            response = client.get(f"/results/{video_id}/summary")
+            assert response.status_code == 200
+            data = response.json()
+            assert data["players"][0]["action_counts"] == {"set": 1}
+
+    def test_get_results_summary_from_sidecar(self, client, tmp_path):
+        """Test summary endpoint reads the summary file off the event loop without parsing the results"""
+        import threading
+        import main
+        video_id = "summary-sidecar-video"
+        (tmp_path / f"{video_id}_results.json").write_text("not json")
+        with open(tmp_path / f"{video_id}_summary.json", 'w') as f:
+            json.dump({"players": [], "plays": []}, f)
+        threads = []
+        read_json = main._read_json
+        
+        def recording_read_json(path):
+            threads.append(threading.current_thread())
+            return read_json(path)
+        
+        with patch('main.RESULTS_DIR', tmp_path), patch('main._read_json', recording_read_json):
+            response = client.get(f"/results/{video_id}/summary")
+        assert response.status_code == 200
+        assert response.json() == {"players": [], "plays": []}
+        assert threads[0].name.startswith("asyncio")  # 事件循環的預設執行緒池
+
+    def test_get_player_heatmap(self, client, tmp_path):
+        """Test heatmap endpoint built from legacy results"""
+        video_id = "heatmap-legacy-video"
+        results_data = {
+            "video_info": {"width": 100, "height": 100, "fps": 10.0},
+            "players_tracking": [
+                {"frame": f, "players": [{"id": 3, "bbox": [0, 0, 10, 10]}]} for f in range(20)
+            ]
+        }
+        with open(tmp_path / f"{video_id}_results.json", 'w') as f:
+            json.dump(results_data, f)
+
+        import threading
+        import main
+        threads = []
+        build_heatmap = main._build_heatmap
+
+        def recording_build_heatmap(path):
+            threads.append(threading.current_thread())
+            return build_heatmap(path)
+
+        with patch('main.RESULTS_DIR', tmp_path), patch('main._build_heatmap', recording_build_heatmap):
+            response = client.get(f"/results/{video_id}/heatmap?player=3&t0=1&t1=2&bins=4")
+            assert response.status_code == 200
+            data = response.json()
+            assert data["total"] == 10
+            assert data["grid"][0] == 4
+            assert threads[0].name.startswith("asyncio")  # 在執行緒池中建立，不阻塞事件循環
+
+            response = client.get(f"/results/{video_id}/heatmap?player=42")
+            assert response.status_code == 404
+
+    def test_get_results_summary_nonexistent(self, client):
+        """Test summary endpoint for nonexistent results"""
+        response = client.get("/results/nonexistent-results-999/summary")
+        assert response.status_code == 404
+
     def test_get_analysis_status_nonexistent(self, client):
         """Test getting status for nonexistent task"""
         response = client.get("/analysis/nonexistent-task-id")
@@ -448,14 +613,114 @@ class TestMigrationFunctions:
         video_file = upload_dir / "test-video-id.mp4"
         video_file.write_bytes(b'\x00' * 1000)
         
-        mock_db.get_all_videos.return_value = []
-        mock_db.get_video.return_value = None
+        mock_db.get_video_ids.return_value = set()
+        mock_db.add_videos.return_value = 1
         
         with patch('main.UPLOAD_DIR', upload_dir):
             with patch('main.PROJECT_ROOT', tmp_path):
                 scan_existing_videos()
         
-        assert mock_db.add_video.called
+        assert mock_db.add_videos.called
+        recovered = mock_db.add_videos.call_args[0][0]
+        assert [v["id"] for v in recovered] == ["test-video-id"]
+        assert recovered[0]["status"] == "uploaded"
+        assert recovered[0]["file_size"] == 1000
+    
+    def test_scan_existing_videos_incremental(self, tmp_path):
+        """Test rescans reuse the manifest and recover records missing from the database"""
+        from main import scan_existing_videos
+        from database import Database
+        
+        upload_dir = tmp_path / "uploads"
+        results_dir = tmp_path / "results"
+        upload_dir.mkdir()
+        results_dir.mkdir()
+        (upload_dir / "a.mp4").write_bytes(b'\x00' * 10)
+        (results_dir / "a_results.json").write_text("{}")
+        
+        def scan(db_name):
+            database = Database(str(tmp_path / db_name))
+            with patch('main.db', database), patch('main.PROJECT_ROOT', tmp_path), \
+                 patch('main.UPLOAD_DIR', upload_dir), patch('main.RESULTS_DIR', results_dir), \
+                 patch('main.BACKEND_UPLOAD_DIR', tmp_path / "missing"), \
+                 patch('main.BACKEND_RESULTS_DIR', tmp_path / "missing"):
+                scan_existing_videos()
+            video = database.get_video("a")
+            database.close()
+            return video
+        
+        video = scan("first.db")
+        assert video["status"] == "completed"
+        assert video["analysis_time"] is not None
+        assert (tmp_path / "data" / ".scan_manifest.json").exists()
+        
+        # 目錄未變更：不再列目錄；資料庫重建後仍能從清單恢復
+        with patch('scan_manifest.os.scandir') as mock_scandir:
+            video = scan("second.db")
+        assert not mock_scandir.called
+        assert video["file_size"] == 10
+
+
+# ============================================================================
+# Startup Tests
+# ============================================================================
+
+class TestStartup:
+    """Tests for lazy imports and background startup recovery"""
+    
+    def test_import_does_not_load_analysis_stack(self):
+        """Test importing main does not import processor or the ML libraries"""
+        import subprocess
+        code = (
+            "import sys, main\n"
+            "heavy = [m for m in ('processor', 'torch', 'ultralytics', 'cv2', 'pandas') if m in sys.modules]\n"
+            "sys.exit(1 if heavy else 0)"
+        )
+        completed = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT / "backend",
+                                   capture_output=True, text=True)
+        assert completed.returncode == 0, completed.stderr
+    
+    def test_analyzer_class_loaded_on_demand(self):
+        """Test main.VolleyballAnalyzer resolves to the processor class"""
+        import main
+        from processor import VolleyballAnalyzer
+        assert main.load_analyzer_class() is VolleyballAnalyzer
+        assert main.VolleyballAnalyzer is VolleyballAnalyzer
+    
+    def test_run_startup_recovery(self):
+        """Test recovery runs migration and scan and records the state"""
+        import main
+        with patch.dict(main.startup_state, {"recovery": "pending", "recovery_seconds": None}):
+            with patch('main.migrate_json_to_sqlite') as mock_migrate, \
+                 patch('main.scan_existing_videos') as mock_scan:
+                main.run_startup_recovery()
+            assert mock_migrate.called and mock_scan.called
+            assert main.startup_state["recovery"] == "completed"
+            assert main.startup_state["recovery_seconds"] is not None
+    
+    def test_run_startup_recovery_failure(self):
+        """Test recovery errors are recorded instead of raised"""
+        import main
+        with patch.dict(main.startup_state, {"recovery": "pending", "recovery_seconds": None}):
+            with patch('main.migrate_json_to_sqlite', side_effect=RuntimeError("boom")), \
+                 patch('main.scan_existing_videos'):
+                main.run_startup_recovery()
+            assert main.startup_state["recovery"] == "failed"
+    
+    def test_recovery_runs_on_startup(self):
+        """Test the startup event runs recovery in the background and /health reports it"""
+        import time
+        from fastapi.testclient import TestClient
+        import main
+        with patch.dict(main.startup_state, {"recovery": "pending", "recovery_seconds": None}):
+            with patch('main.migrate_json_to_sqlite'), patch('main.scan_existing_videos') as mock_scan:
+                with TestClient(main.app) as client:
+                    deadline = time.time() + 5
+                    while main.startup_state["recovery"] != "completed" and time.time() < deadline:
+                        time.sleep(0.01)
+                    data = client.get("/health").json()
+            assert mock_scan.called
+            assert data["startup"]["recovery"] == "completed"
 
 
 # ============================================================================
@@ -626,6 +891,34 @@ class TestProcessVideo:
         if task_id in analysis_tasks:
             del analysis_tasks[task_id]
     
+    @pytest.mark.asyncio
+    @patch('main.VolleyballAnalyzer')
+    @patch('main.asyncio.get_running_loop')
+    async def test_process_video_exposes_profile(self, mock_loop, mock_analyzer_class, sample_video_in_db, tmp_path):
+        """Test the stage profile of a finished analysis is returned by /analysis/{task_id}"""
+        from main import process_video, analysis_tasks, get_analysis_status
+        
+        video_id, video_data = sample_video_in_db
+        task_id = "test-task-profile"
+        analysis_tasks[task_id] = {"video_id": video_id, "status": "processing", "progress": 0}
+        
+        profile = {"frames": 100, "fps": 50.0, "stages": {"decode": {"total_seconds": 0.5, "calls": 101}}}
+        mock_executor_loop = Mock()
+        mock_executor_loop.run_in_executor = AsyncMock(return_value={"video_info": {}, "profile": profile})
+        mock_loop.return_value = mock_executor_loop
+        
+        with patch('main.RESULTS_DIR', tmp_path):
+            with patch('main.db') as mock_db:
+                mock_db.get_video.return_value = video_data
+                await process_video(video_id, task_id)
+        
+        status = await get_analysis_status(task_id)
+        assert status["status"] == "completed"
+        assert status["profile"] == profile
+        
+        # Cleanup
+        del analysis_tasks[task_id]
+    
     @pytest.mark.asyncio
     async def test_process_video_nonexistent_video(self):
         """Test process_video with nonexistent video"""
@@ -0,0 +1,116 @@
+"""
+Volleyball AI Analysis System - Matching Tests
+All tests for matching.py module
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from matching import (
+    box_iou_matrix, center_distance_matrix, action_player_scores,
+    assign_actions, best_match, greedy_assignment
+)
+
+
+def scalar_iou(boxA, boxB):
+    """Reference IoU (same formula as VolleyballAnalyzer._iou)"""
+    xA, yA = max(boxA[0], boxB[0]), max(boxA[1], boxB[1])
+    xB, yB = min(boxA[2], boxB[2]), min(boxA[3], boxB[3])
+    inter = max(0, xB - xA) * max(0, yB - yA)
+    areaA = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
+    areaB = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
+    return inter / float(areaA + areaB - inter + 1e-6)
+
+
+def random_boxes(rng, n):
+    xy = rng.uniform(0, 1000, (n, 2))
+    wh = rng.uniform(0, 200, (n, 2))
+    return np.concatenate([xy, xy + wh], axis=1)
+
+
+class TestPairwiseMatrices:
+    """Tests for IoU and centre distance matrices"""
+
+    def test_iou_matches_scalar(self):
+        """Test the IoU matrix equals the scalar IoU for every pair"""
+        rng = np.random.default_rng(0)
+        a, b = random_boxes(rng, 20), random_boxes(rng, 15)
+        matrix = box_iou_matrix(a, b)
+        assert matrix.shape == (20, 15)
+        expected = [[scalar_iou(x, y) for y in b] for x in a]
+        np.testing.assert_allclose(matrix, expected, rtol=1e-12, atol=1e-12)
+
+    def test_iou_edge_cases(self):
+        """Test identical, disjoint and zero-area boxes"""
+        iou = box_iou_matrix([[100, 100, 200, 200], [100, 100, 100, 100]],
+                             [[100, 100, 200, 200], [300, 300, 400, 400]])
+        assert iou[0, 0] == pytest.approx(1.0, abs=1e-3)
+        assert iou[0, 1] == 0.0
+        assert iou[1, 1] == 0.0
+
+    def test_empty_inputs(self):
+        """Test empty box lists produce empty matrices"""
+        assert box_iou_matrix([], [[0, 0, 1, 1]]).shape == (0, 1)
+        assert center_distance_matrix([[0, 0, 1, 1]], []).shape == (1, 0)
+
+    def test_center_distance(self):
+        """Test centre distances"""
+        dist = center_distance_matrix([[0, 0, 10, 10]], [[30, 40, 40, 50], [0, 0, 10, 10]])
+        np.testing.assert_allclose(dist, [[50.0, 0.0]])
+
+
+class TestActionAssignment:
+    """Tests for action-to-player assignment"""
+
+    def test_overlap_beats_distance(self):
+        """Test IoU matches score above distance-only matches"""
+        scores = action_player_scores([[100, 100, 150, 150]], [[160, 100, 210, 150], [120, 120, 170, 170]])
+        assert scores[0, 1] > 1.0 > scores[0, 0] > 0.0
+
+    def test_best_match(self):
+        """Test the single-action match picks the largest overlap, then the nearest player"""
+        players = [[0, 0, 50, 50], [90, 90, 200, 200], [110, 110, 160, 160]]
+        assert best_match([100, 100, 150, 150], players) == 2
+        assert best_match([300, 300, 350, 350], players) is None
+        assert best_match([205, 120, 245, 160], players) == 1
+        assert best_match([0, 0, 10, 10], []) is None
+
+    def test_one_player_per_action(self):
+        """Test two actions overlapping the same player do not both claim it"""
+        players = [[100, 100, 200, 300], [210, 100, 310, 300]]
+        actions = [[110, 110, 190, 290], [150, 120, 230, 280]]
+        assert best_match(actions[0], players) == best_match(actions[1], players) == 0
+        assert assign_actions(actions, players) == [0, 1]
+        assert assign_actions(actions, players, optimal=False) == [0, 1]
+
+    def test_more_actions_than_players(self):
+        """Test surplus actions are left unassigned"""
+        players = [[100, 100, 200, 300]]
+        actions = [[110, 110, 190, 290], [120, 120, 180, 280]]
+        assigned = assign_actions(actions, players)
+        assert sorted(a for a in assigned if a is not None) == [0]
+        assert assigned.count(None) == 1
+
+    def test_no_candidates(self):
+        """Test empty inputs and unmatched actions"""
+        assert assign_actions([], [[0, 0, 1, 1]]) == []
+        assert assign_actions([[0, 0, 10, 10]], []) == [None]
+        assert assign_actions([[0, 0, 10, 10]], [[500, 500, 600, 600]]) == [None]
+
+    def test_hungarian_not_worse_than_greedy(self):
+        """Test optimal matching scores at least as well as greedy matching"""
+        rng = np.random.default_rng(1)
+        for _ in range(20):
+            actions, players = random_boxes(rng, 6), random_boxes(rng, 8)
+            score = action_player_scores(actions, players)
+            optimal = assign_actions(actions, players)
+            greedy = dict(greedy_assignment(score))
+            total = lambda pairs: sum(score[r, c] for r, c in pairs)
+            assert total((r, c) for r, c in enumerate(optimal) if c is not None) >= total(greedy.items()) - 1e-9
+            assert len({c for c in optimal if c is not None}) == sum(c is not None for c in optimal)
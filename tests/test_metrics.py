@@ -0,0 +1,192 @@
+"""
+Volleyball AI Analysis System - Metrics Tests
+All tests for metrics.py module
+"""
+
+import urllib.error
+import urllib.request
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from metrics import MetricsRegistry, AnalysisMetrics, start_metrics_server, process_rss_bytes
+from profiling import StageProfiler
+
+
+def sample_lines(text: str, name: str):
+    """Sample lines of one metric family (without HELP/TYPE)"""
+    return [line for line in text.splitlines() if line.startswith(name) and not line.startswith("#")]
+
+
+class TestMetricsRegistry:
+    """Tests for Counter, Gauge, Histogram and the text exposition format"""
+
+    def test_counter_with_labels(self):
+        """Test counters render HELP/TYPE and one sample per label set"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests", ["kind", "result"])
+        counter.labels("summary", "hit").inc()
+        counter.labels(kind="summary", result="hit").inc(2)
+        counter.labels("summary", "miss").inc()
+        text = registry.render()
+        assert "# HELP requests_total Requests" in text
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{kind="summary",result="hit"} 3.0' in text
+        assert 'requests_total{kind="summary",result="miss"} 1.0' in text
+
+    def test_counter_rejects_negative(self):
+        """Test counters cannot decrease"""
+        counter = MetricsRegistry().counter("c_total", "C")
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_wrong_label_count(self):
+        """Test label values must match the declared label names"""
+        counter = MetricsRegistry().counter("c_total", "C", ["kind"])
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    def test_duplicate_name(self):
+        """Test registering the same name twice fails"""
+        registry = MetricsRegistry()
+        registry.gauge("g", "G")
+        with pytest.raises(ValueError):
+            registry.counter("g", "G")
+
+    def test_gauge_set_inc_dec_and_remove(self):
+        """Test gauges move both ways and removed children disappear"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("running", "Running")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        per_task = registry.gauge("job_fps", "FPS", ["task_id"])
+        per_task.labels("a").set(12.5)
+        per_task.labels("b").set(3)
+        per_task.remove("b")
+        text = registry.render()
+        assert "running 1.0" in sample_lines(text, "running")
+        assert sample_lines(text, "job_fps") == ['job_fps{task_id="a"} 12.5']
+
+    def test_gauge_function(self):
+        """Test callback gauges are evaluated at render time and failures render NaN"""
+        registry = MetricsRegistry()
+        values = iter([1.0, 2.0])
+        registry.gauge("depth", "Depth").set_function(lambda: next(values))
+        registry.gauge("broken", "Broken").set_function(lambda: 1 / 0)
+        assert "depth 1.0" in registry.render()
+        text = registry.render()
+        assert "depth 2.0" in text
+        assert "broken NaN" in text
+
+    def test_histogram_cumulative_buckets(self):
+        """Test histogram buckets are cumulative with le boundaries inclusive"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        lines = sample_lines(registry.render(), "latency_seconds")
+        assert lines == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 2.65",
+            "latency_seconds_count 4",
+        ]
+
+    def test_observe_many_matches_observe(self):
+        """Test vectorized observations give the same buckets as single ones"""
+        values = np.random.default_rng(0).exponential(0.01, 500)
+        values[:5] = [0.001, 0.0025, 0.1, 0.0, 5.0]
+        one, many = MetricsRegistry(), MetricsRegistry()
+        single = one.histogram("h", "H", ["stage"])
+        for value in values:
+            single.labels("decode").observe(value)
+        many.histogram("h", "H", ["stage"]).labels("decode").observe_many(values)
+        bucket_lines = lambda text: [line for line in sample_lines(text, "h_") if "_sum" not in line]
+        assert bucket_lines(one.render()) == bucket_lines(many.render())
+
+    def test_label_escaping(self):
+        """Test quotes, backslashes and newlines in label values are escaped"""
+        registry = MetricsRegistry()
+        registry.counter("c_total", "C", ["path"]).labels('a"b\\c\nd').inc()
+        assert 'c_total{path="a\\"b\\\\c\\nd"} 1.0' in registry.render()
+
+
+class TestAnalysisMetrics:
+    """Tests for the shared analysis metrics"""
+
+    def test_job_lifecycle(self):
+        """Test running count, live fps and job status over one job"""
+        registry = MetricsRegistry()
+        metrics = AnalysisMetrics(registry)
+        with metrics.job("task-1") as job:
+            job.progress(30)
+            text = registry.render()
+            assert "volleyball_analysis_running 1.0" in text
+            assert sample_lines(text, 'volleyball_analysis_job_fps{task_id="task-1"}')
+        text = registry.render()
+        assert "volleyball_analysis_running 0.0" in text
+        assert not sample_lines(text, "volleyball_analysis_job_fps{")
+        assert 'volleyball_analysis_jobs_total{status="completed"} 1.0' in text
+
+    def test_failed_job(self):
+        """Test jobs that raise are counted as failed"""
+        registry = MetricsRegistry()
+        metrics = AnalysisMetrics(registry)
+        with pytest.raises(RuntimeError):
+            with metrics.job("task-2"):
+                raise RuntimeError("boom")
+        text = registry.render()
+        assert 'volleyball_analysis_jobs_total{status="failed"} 1.0' in text
+        assert "volleyball_analysis_running 0.0" in text
+
+    def test_observe_analysis_and_model_loads(self):
+        """Test per-frame stage samples, fps and model load times feed histograms"""
+        registry = MetricsRegistry()
+        metrics = AnalysisMetrics(registry)
+        profiler = StageProfiler()
+        for frame in range(1, 11):
+            profiler.begin_frame(frame)
+            with profiler.stage("decode"):
+                pass
+            profiler.end_frame()
+        metrics.observe_analysis(profiler, {"profile": {"fps": 25.0}})
+        metrics.observe_analysis(None, {"profile": None})
+        metrics.observe_model_loads({"ball": 0.3})
+        text = registry.render()
+        assert 'volleyball_analysis_stage_seconds_count{stage="decode"} 10' in text
+        assert "volleyball_analysis_fps_count 1" in text
+        assert 'volleyball_model_load_seconds_count{model="ball"} 1' in text
+
+    def test_rss(self):
+        """Test the RSS gauge reports the process memory"""
+        assert process_rss_bytes() > 1e6
+        registry = MetricsRegistry()
+        AnalysisMetrics(registry)
+        value = float(sample_lines(registry.render(), "volleyball_process_resident_memory_bytes")[0].split()[1])
+        assert value > 1e6
+
+
+class TestMetricsServer:
+    """Tests for the standalone metrics HTTP server"""
+
+    def test_serves_metrics(self):
+        """Test /metrics is served on an ephemeral port and other paths 404"""
+        registry = MetricsRegistry()
+        registry.counter("served_total", "Served").inc()
+        server, port = start_metrics_server(registry, 0, host="127.0.0.1")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert "served_total 1.0" in response.read().decode("utf-8")
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,131 @@
+"""
+Volleyball AI Analysis System - Plays Tests
+All tests for plays.py module
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from plays import FrameIndex, GameStateMachine
+
+
+class TestFrameIndex:
+    """Tests for FrameIndex"""
+
+    def test_between_inclusive(self):
+        """Test range queries include both ends"""
+        index = FrameIndex()
+        for frame in [5, 10, 15, 20]:
+            index.add({"frame": frame})
+        assert [e["frame"] for e in index.between(10, 15)] == [10, 15]
+        assert index.between(21, 30) == []
+        assert len(index) == 4
+
+    def test_matches_linear_scan(self):
+        """Test out-of-order insertions give the same result as scanning the list"""
+        rng = np.random.default_rng(0)
+        index, events = FrameIndex(), []
+        for i, frame in enumerate(rng.integers(0, 500, 300)):
+            event = {"frame": int(frame), "seq": i}
+            index.add(event)
+            events.append(event)
+            start = int(rng.integers(0, 500))
+            end = start + int(rng.integers(0, 100))
+            expected = [e for e in events if start <= e.get("frame", 0) <= end]
+            assert index.between(start, end) == expected
+
+    def test_insertion_order_kept(self):
+        """Test events are returned in insertion order, not frame order"""
+        index = FrameIndex()
+        late = {"frame": 30}
+        early = {"frame": 10}
+        index.add(late)
+        index.add(early)
+        assert index.between(0, 100) == [late, early]
+
+    def test_custom_key_and_missing_frame(self):
+        """Test custom frame keys and events without a frame"""
+        index = FrameIndex(key="start_frame")
+        index.add({"start_frame": 7})
+        index.add({})
+        assert index.between(0, 0) == [{}]
+        assert index.between(7, 7) == [{"start_frame": 7}]
+
+
+def run_machine(machine, activity, fps=30.0):
+    """Feed a 0/1 activity sequence (frames start at 1) and return the ended plays"""
+    ended = []
+    for i, active in enumerate(activity, start=1):
+        ended.extend(machine.update(i, i / fps, bool(active)))
+    ended.extend(machine.finish())
+    return ended
+
+
+class TestGameStateMachine:
+    """Tests for GameStateMachine"""
+
+    def test_dropouts_do_not_split_play(self):
+        """Test short gaps inside a rally keep a single play"""
+        activity = [0] * 20 + ([1] * 8 + [0] * 2) * 10 + [0] * 40
+        machine = GameStateMachine(enter_frames=3, gap_frames=5, min_play_frames=15)
+        ended = run_machine(machine, activity)
+        assert [s["state"] for s in machine.states] == ["No-Play", "Play", "No-Play"]
+        assert len(machine.plays) == 1 and ended == machine.plays
+        play = machine.plays[0]
+        assert (play["start_frame"], play["end_frame"]) == (21, 118)
+        assert play["duration"] == pytest.approx((118 - 21) / 30.0)
+        assert machine.states[1]["end_frame"] == 118
+        assert machine.states[2]["start_frame"] == 119
+
+    def test_blips_are_not_plays(self):
+        """Test isolated active frames and short bursts never open a play"""
+        activity = ([1] + [0] * 10) * 20 + [1] * 6 + [0] * 50
+        machine = GameStateMachine(enter_frames=3, gap_frames=5, min_play_frames=15)
+        assert run_machine(machine, activity) == []
+        assert machine.plays == []
+        assert machine.discarded == 1
+        assert machine.states == [{
+            "state": "No-Play", "start_frame": 1, "end_frame": len(activity),
+            "start_timestamp": 1 / 30.0, "end_timestamp": len(activity) / 30.0
+        }]
+
+    def test_states_are_contiguous(self):
+        """Test state segments alternate and cover every frame exactly once"""
+        rng = np.random.default_rng(0)
+        activity = (rng.random(3000) < 0.6).astype(int)
+        machine = GameStateMachine(enter_frames=2, gap_frames=4, min_play_frames=10)
+        run_machine(machine, activity)
+        states = machine.states
+        assert states[0]["start_frame"] == 1 and states[-1]["end_frame"] == 3000
+        for prev, cur in zip(states, states[1:]):
+            assert cur["start_frame"] == prev["end_frame"] + 1
+            assert cur["state"] != prev["state"]
+        plays = [(p["start_frame"], p["end_frame"]) for p in machine.plays]
+        assert plays == [(s["start_frame"], s["end_frame"]) for s in states if s["state"] == "Play"]
+        assert [p["play_id"] for p in machine.plays] == list(range(1, len(plays) + 1))
+
+    def test_without_hysteresis_follows_every_frame(self):
+        """Test enter_frames=1, gap_frames=0 reproduces per-frame state changes"""
+        activity = [1, 1, 0, 1, 0, 0, 1, 1, 1]
+        machine = GameStateMachine(enter_frames=1, gap_frames=0, min_play_frames=1)
+        run_machine(machine, activity)
+        assert [(s["state"], s["start_frame"], s["end_frame"]) for s in machine.states] == [
+            ("Play", 1, 2), ("No-Play", 3, 3), ("Play", 4, 4), ("No-Play", 5, 6), ("Play", 7, 9)
+        ]
+        assert [(p["start_frame"], p["end_frame"]) for p in machine.plays] == [(1, 2), (4, 4), (7, 9)]
+
+    def test_finish_closes_open_play(self):
+        """Test the open play ends at its last active frame when the video ends"""
+        machine = GameStateMachine(enter_frames=1, gap_frames=30, min_play_frames=1)
+        ended = run_machine(machine, [0, 1, 1, 1, 0, 0])
+        assert [(p["start_frame"], p["end_frame"]) for p in ended] == [(2, 4)]
+        assert [(s["state"], s["start_frame"], s["end_frame"]) for s in machine.states] == [
+            ("No-Play", 1, 1), ("Play", 2, 4), ("No-Play", 5, 6)
+        ]
+        assert machine.finish() == []
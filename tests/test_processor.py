@@ -3,6 +3,7 @@ Volleyball AI Analysis System - Processor Tests
 All tests for processor.py module
 """
 
+import json
 import pytest
 import numpy as np
 from unittest.mock import Mock, patch, MagicMock
@@ -397,6 +398,19 @@ class TestPlayerTracking:
         tracked = analyzer.track_players(players, frame=mock_frame)
         assert isinstance(tracked, list)
     
+    def test_identity_ttl_counts_video_frames(self, analyzer):
+        """Test the identity store ages tracks by video frame, including frames without players"""
+        store = analyzer.identity_store
+        store.ttl_frames = 10
+        store.touch([99], frame=1)
+        analyzer._frame_idx = 5
+        analyzer.track_players([])
+        assert store.frame == 5 and 99 in store.last_seen
+        analyzer._frame_idx = 12
+        analyzer.track_players([])
+        assert 99 not in store.last_seen
+        assert store.evicted_ttl == 1
+    
     def test_assign_action_to_player(self, analyzer, sample_players):
         """Test assigning action to player"""
         # Add id to sample_players for tracking
@@ -422,6 +436,18 @@ class TestPlayerTracking:
         action_bbox = [250, 150, 300, 200]
         result = analyzer.assign_action_to_player(action_bbox, players)
         assert result is not None
+    
+    def test_assign_actions_to_players_one_to_one(self, analyzer):
+        """Test per-frame action assignment gives each player at most one action"""
+        players = [
+            {"id": 7, "bbox": [100, 100, 200, 300], "confidence": 0.9},
+            {"id": 9, "bbox": [210, 100, 310, 300], "confidence": 0.9},
+            {"id": 11, "bbox": [], "confidence": 0.9}
+        ]
+        actions = [[110, 110, 190, 290], [150, 120, 230, 280]]
+        assert analyzer.assign_action_to_player(actions[1], players) == 7
+        assert analyzer.assign_actions_to_players(actions, players) == [7, 9]
+        assert analyzer.assign_actions_to_players(actions, []) == [None, None]
 
 
 # ============================================================================
@@ -556,6 +582,339 @@ class TestJerseyNumberDetection:
         assert result == 1
 
 
+class FakeTensor:
+    """Minimal stand-in for a torch tensor in YOLO results"""
+
+    def __init__(self, value):
+        self.value = np.asarray(value, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.value
+
+
+class FakeJerseyModel:
+    """Jersey YOLO stand-in that sees digit 7 at a fixed spot of every input image"""
+
+    names = {i: str(i) for i in range(10)}
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        self.calls.append([image.shape for image in images])
+        results = []
+        for image in images:
+            h, w = image.shape[:2]
+            box = Mock(xyxy=[FakeTensor([w * 0.4, h * 0.4, w * 0.6, h * 0.6])],
+                       conf=[FakeTensor(0.9)], cls=[FakeTensor(7)])
+            results.append(Mock(boxes=[box]))
+        return results
+
+
+class TestJerseyNumberBatch:
+    """Tests for batched jersey number detection"""
+
+    def test_single_model_call_per_frame(self, analyzer, sample_frame):
+        """Test all ROIs of a frame go to the model in one uniformly sized batch"""
+        model = FakeJerseyModel()
+        analyzer.jersey_number_yolo_model = model
+        requests = [(i, [50 * i, 50, 50 * i + 40, 150]) for i in range(1, 7)]
+
+        numbers = analyzer._detect_jersey_numbers_batch(sample_frame, requests)
+
+        assert numbers == {i: 7 for i in range(1, 7)}
+        assert len(model.calls) == 1
+        size = analyzer.JERSEY_ROI_SIZE
+        assert model.calls[0] == [(size, size, 3)] * 12
+        assert analyzer.track_id_to_jersey_history[3] == [7]
+
+    def test_batch_matches_single_path(self, analyzer, sample_frame):
+        """Test batched and per-player detection agree"""
+        analyzer.jersey_number_yolo_model = FakeJerseyModel()
+        bbox = [100, 100, 160, 260]
+        single = analyzer._detect_jersey_number_yolo(sample_frame, bbox, track_id=1)
+        batched = analyzer._detect_jersey_numbers_batch(sample_frame, [(2, bbox)])
+        assert batched[2] == single == 7
+
+    def test_digit_boxes_mapped_to_roi(self, analyzer):
+        """Test letterboxed detections are mapped back to ROI coordinates"""
+        analyzer.jersey_number_yolo_model = FakeJerseyModel()
+        roi = np.zeros((80, 40, 3), dtype=np.uint8)
+        image, scale, pad_x, pad_y = analyzer._letterbox_roi(roi, 160)
+        assert image.shape == (160, 160, 3)
+        assert (scale, pad_x, pad_y) == (2.0, 40, 0)
+
+        result = Mock(boxes=[Mock(xyxy=[FakeTensor([60, 20, 100, 60])], conf=[FakeTensor(0.5)],
+                                  cls=[FakeTensor(3)])])
+        digits = analyzer._parse_digit_detections(result, 1.2, scale, pad_x, pad_y)
+        assert digits[0]["digit"] == 3
+        assert digits[0]["bbox"] == pytest.approx([10, 10, 30, 30])
+        assert digits[0]["confidence"] == pytest.approx(0.6)
+
+    def test_track_players_batches_jersey_model(self, analyzer, mock_frame):
+        """Test track_players makes at most one jersey model call per frame"""
+        model = FakeJerseyModel()
+        analyzer.jersey_number_yolo_model = model
+        players = [{"bbox": [100 * i, 100, 100 * i + 60, 250], "confidence": 0.9} for i in range(1, 5)]
+
+        tracked = []
+        for _ in range(8):
+            before = len(model.calls)
+            tracked = analyzer.track_players(players, frame=mock_frame)
+            assert len(model.calls) - before <= 1
+        assert tracked and all(p["jersey_number"] == 7 for p in tracked)
+        assert list(tracked[0].keys()) == ["id", "stable_id", "bbox", "confidence", "jersey_number"]
+
+
+class TestByteTrackBackend:
+    """Tests for the ByteTracker player tracking backend"""
+
+    def test_invalid_tracker(self):
+        """Test unknown tracker names are rejected"""
+        from processor import VolleyballAnalyzer
+        with pytest.raises(ValueError):
+            VolleyballAnalyzer(device="cpu", tracker="sort")
+
+    def test_track_players_bytetrack(self, mock_frame):
+        """Test track_players output with the ByteTracker backend"""
+        from processor import VolleyballAnalyzer
+        analyzer = VolleyballAnalyzer(device="cpu", tracker="bytetrack")
+        assert analyzer.player_conf_threshold < 0.5
+        players = [{"bbox": [100 * i, 100, 100 * i + 60, 250], "confidence": 0.9} for i in range(1, 4)]
+
+        tracked = []
+        for _ in range(4):
+            tracked = analyzer.track_players(players, frame=None)
+        assert sorted(p["id"] for p in tracked) == [1, 2, 3]
+        assert list(tracked[0].keys()) == ["id", "stable_id", "bbox", "confidence", "jersey_number"]
+        assert {tuple(p["bbox"]) for p in tracked} == {tuple(p["bbox"]) for p in players}
+        # 沒有檢測的幀也會推進追蹤器和身份存儲
+        assert analyzer.track_players([], frame=mock_frame) == []
+        assert analyzer.tracker.frame == 5
+        assert analyzer.identity_store.frame == 5
+
+
+class TestDetectorBackend:
+    """Tests for running the pipeline on model-free detector backends"""
+
+    def test_analyze_video_synthetic(self):
+        """Test the full pipeline runs on a synthetic scene without model files"""
+        from processor import VolleyballAnalyzer
+        from backends import SyntheticBackend
+        backend = SyntheticBackend(num_frames=600, seed=1)
+        analyzer = VolleyballAnalyzer(device="cpu", detector_backend=backend)
+        results = analyzer.analyze_video("synthetic.mp4")
+
+        assert results["video_info"]["total_frames"] == 600
+        assert len(results["plays"]) == len(backend.rallies)
+        assert all(p["actions"] for p in results["plays"])
+        assert results["action_recognition"]["total_actions"] > 0
+        numbers = {p["jersey_number"] for e in results["players_tracking"] for p in e["players"]}
+        assert set(backend.jersey_numbers) <= numbers
+
+    def test_synthetic_is_deterministic(self):
+        """Test two runs on the same synthetic scene produce identical results"""
+        from processor import VolleyballAnalyzer
+        from backends import SyntheticBackend
+        runs = [
+            VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=300, seed=2))
+            .analyze_video(None)
+            for _ in range(2)
+        ]
+        assert runs[0]["plays"] == runs[1]["plays"]
+        assert runs[0]["players_tracking"] == runs[1]["players_tracking"]
+        assert runs[0]["ball_tracking"] == runs[1]["ball_tracking"]
+
+    def test_reused_analyzer_resets_identities(self):
+        """Test a pooled analyzer starts each video with empty identity state"""
+        from processor import VolleyballAnalyzer
+        from backends import SyntheticBackend
+        analyzer = VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=300, seed=2))
+        analyzer.analyze_video(None)
+        # 上一個視頻留下的追蹤
+        analyzer.identity_store.record_vote(10 ** 6, 99)
+        second = analyzer.analyze_video(None)
+
+        seen = {p["id"] for entry in second["players_tracking"] for p in entry["players"]}
+        assert set(analyzer.identity_store.last_seen) <= seen
+        assert set(analyzer.identity_store.histories) <= seen
+        assert 10 ** 6 not in analyzer.identity_store.histories
+
+    def test_analyze_video_profiler(self):
+        """Test analyze_video reports per-stage timings to a profiler"""
+        from processor import VolleyballAnalyzer
+        from backends import SyntheticBackend
+        from profiling import StageProfiler, NullProfiler
+        analyzer = VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=120))
+        profiler = StageProfiler()
+        analyzer.analyze_video(None, profiler=profiler)
+
+        summary = profiler.summary()
+        assert summary["frames"] == 120
+        for stage in ("decode", "player_detect", "track", "ocr", "ball", "action", "merge"):
+            assert "per_frame_ms" in summary["stages"][stage]
+        assert summary["stages"]["decode"]["calls"] == 121
+        assert "post_pass" in summary["stages"] and "summary" in summary["stages"]
+        assert isinstance(analyzer.profiler, NullProfiler)
+
+    def test_analyze_video_profiler_released_on_error(self):
+        """Test a failed analysis does not leave the caller's profiler attached to the analyzer"""
+        from processor import VolleyballAnalyzer
+        from backends import SyntheticBackend
+        from profiling import StageProfiler, NullProfiler
+        analyzer = VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=30))
+        analyzer.track_players = Mock(side_effect=RuntimeError("boom"))
+        with pytest.raises(RuntimeError):
+            analyzer.analyze_video(None, profiler=StageProfiler())
+        assert isinstance(analyzer.profiler, NullProfiler)
+
+    def test_results_profile(self):
+        """Test stage timings are stored in results by default and can be disabled"""
+        from processor import VolleyballAnalyzer
+        from backends import SyntheticBackend
+        results = VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=60)) \
+            .analyze_video(None)
+        profile = results["profile"]
+        assert profile["frames"] == 60
+        assert profile["fps"] > 0 and profile["realtime_factor"] > 0
+        assert profile["environment"]["device"] == "cpu"
+        assert profile["stages"]["track"]["calls"] == 60
+        json.dumps(profile)
+
+        disabled = VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=60),
+                                      profile_stages=False).analyze_video(None)
+        assert "profile" not in disabled
+
+    def test_replay_reproduces_results(self):
+        """Test replaying recorded detections reproduces plays and actions"""
+        from processor import VolleyballAnalyzer
+        from backends import ReplayBackend, SyntheticBackend
+        first = VolleyballAnalyzer(device="cpu", detector_backend=SyntheticBackend(num_frames=600, seed=1)) \
+            .analyze_video(None)
+        replay = ReplayBackend(ReplayBackend.record(first))
+        second = VolleyballAnalyzer(device="cpu", detector_backend=replay).analyze_video(None)
+
+        assert [(p["start_frame"], p["end_frame"]) for p in second["plays"]] == \
+            [(p["start_frame"], p["end_frame"]) for p in first["plays"]]
+        assert second["action_recognition"]["total_actions"] == first["action_recognition"]["total_actions"]
+
+
+class TestAsyncJerseyRecognition:
+    """Tests for asynchronous jersey recognition in the frame loop"""
+
+    def test_track_players_submits_without_waiting(self, mock_frame):
+        """Test OCR runs on the pool and votes are folded on later frames"""
+        from processor import VolleyballAnalyzer
+        analyzer = VolleyballAnalyzer(async_jersey_workers=1)
+        analyzer._detect_jersey_number = Mock(side_effect=AssertionError("inline OCR"))
+        analyzer.jersey_pool.recognizer = lambda crop, bbox: 12
+        players = [{"bbox": [100, 100, 160, 250], "confidence": 0.9}]
+
+        tracked = []
+        for _ in range(10):
+            tracked = analyzer.track_players(players, frame=mock_frame)
+        analyzer._fold_jersey_results(analyzer.jersey_pool.drain())
+        analyzer.jersey_pool.shutdown()
+
+        track_id = tracked[0]["id"]
+        assert analyzer.track_id_to_jersey_history[track_id][0] == 12
+        assert analyzer.jersey_to_track_ids[12] == [track_id]
+        assert analyzer.jersey_pool.stats["submitted"] >= 1
+
+    def test_jobs_carry_video_frame_index(self, mock_frame):
+        """Test OCR jobs are tagged with the video frame number, not the scheduler's call count"""
+        from processor import VolleyballAnalyzer
+        analyzer = VolleyballAnalyzer(async_jersey_workers=1)
+        analyzer.jersey_pool.recognizer = lambda crop, bbox: 12
+        submit = analyzer.jersey_pool.submit
+        submitted = []
+
+        def recording_submit(track_id, frame_idx, frame, bbox):
+            submitted.append((analyzer._frame_idx, frame_idx))
+            return submit(track_id, frame_idx, frame, bbox)
+
+        analyzer.jersey_pool.submit = recording_submit
+        players = [{"bbox": [100, 100, 160, 250], "confidence": 0.9}]
+        for frame_idx in range(100, 110):
+            analyzer._frame_idx = frame_idx
+            analyzer.track_players(players, frame=mock_frame)
+        results = analyzer.jersey_pool.drain()
+        analyzer.jersey_pool.shutdown()
+
+        assert submitted
+        assert all(current == tagged for current, tagged in submitted)
+        assert all(100 <= r.frame_idx < 110 for r in results)
+
+    def test_backfill_stable_ids(self, analyzer):
+        """Test finalize rewrites stable_id of records emitted before the vote landed"""
+        analyzer.track_id_to_jersey_history = {3: [9, 9, 4], 5: []}
+        analyzer.jersey_to_stable_id = {9: 9}
+        players_tracking = [
+            {"frame": 1, "players": [{"id": 3, "stable_id": 3, "jersey_number": None},
+                                     {"id": 5, "stable_id": 5, "jersey_number": None}]},
+            {"frame": 2, "players": [{"id": 3, "stable_id": 9, "jersey_number": 9}]},
+        ]
+
+        assert analyzer._backfill_stable_ids(players_tracking) == 1
+        assert players_tracking[0]["players"][0] == {"id": 3, "stable_id": 9, "jersey_number": 9}
+        assert players_tracking[0]["players"][1]["stable_id"] == 5
+
+
+class TestBestFrameJerseyPostPass:
+    """Tests for the deferred best-frame jersey identification"""
+
+    @pytest.fixture
+    def video(self, tmp_path):
+        """30-frame video; the player region is textured only on frames 6, 16 and 26"""
+        path = tmp_path / "clip.avi"
+        writer = processor.cv2.VideoWriter(str(path), processor.cv2.VideoWriter_fourcc(*"MJPG"), 30, (160, 120))
+        rng = np.random.default_rng(0)
+        for frame_number in range(1, 31):
+            image = np.full((120, 160, 3), 90, dtype=np.uint8)
+            if frame_number in (6, 16, 26):
+                image[20:100, 40:80] = rng.integers(0, 255, (80, 40, 3), dtype=np.uint8)
+            writer.write(image)
+        writer.release()
+        return path
+
+    def test_recognizes_only_best_frames(self, analyzer, video):
+        """Test OCR runs K times per track, on the sharpest candidate crops"""
+        players_tracking = [
+            {"frame": f, "players": [{"id": 4, "stable_id": 4, "bbox": [40, 20, 80, 100],
+                                      "confidence": 0.9, "jersey_number": None}]}
+            for f in range(1, 31)
+        ]
+        seen = []
+
+        def recognizer(crop, bbox):
+            seen.append(float(crop.std()))
+            return 14 if crop.std() > 30 else None
+
+        analyzer._recognize_jersey_number = recognizer
+        stats = analyzer.identify_jerseys_from_best_frames(str(video), players_tracking, k=3,
+                                                           candidates_per_track=6)
+
+        assert stats["ocr_calls"] == 3
+        assert stats["recognized"] == 3
+        assert all(std > 30 for std in seen)
+        assert players_tracking[0]["players"][0]["stable_id"] == 14
+        assert players_tracking[-1]["players"][0]["jersey_number"] == 14
+
+    def test_post_pass_disables_inline_ocr(self, mock_frame):
+        """Test track_players skips OCR when the post-pass is enabled"""
+        from processor import VolleyballAnalyzer
+        analyzer = VolleyballAnalyzer(jersey_post_pass=True)
+        analyzer._detect_jersey_number = Mock(side_effect=AssertionError("inline OCR"))
+        players = [{"bbox": [100, 100, 160, 250], "confidence": 0.9}]
+        for _ in range(8):
+            analyzer.track_players(players, frame=mock_frame)
+        assert analyzer.ocr_scheduler.stats()["total_calls"] == 0
+
+
 # ============================================================================
 # Stable Player ID Tests
 # ============================================================================
@@ -571,6 +930,24 @@ class TestStablePlayerID:
         assert stable_id == track_id
         assert jersey_num is None
     
+    def test_track_players_ocr_schedule(self, analyzer, mock_frame):
+        """Test jersey OCR follows the scheduler budget rather than the track ID"""
+        from identity import OCRScheduler
+        analyzer.ocr_scheduler = OCRScheduler(base_interval=5, frame_budget=2)
+        calls = []
+        analyzer._detect_jersey_number = lambda frame, bbox, track_id=None: calls.append(track_id)
+        players = [{"bbox": [100 * i, 100, 100 * i + 60, 250], "confidence": 0.9} for i in range(1, 7)]
+
+        per_frame = []
+        for _ in range(20):
+            before = len(calls)
+            analyzer.track_players(players, frame=mock_frame)
+            per_frame.append(len(calls) - before)
+
+        assert max(per_frame) <= 2
+        assert len(set(calls)) == 6
+        assert analyzer.ocr_scheduler.stats()["total_calls"] == len(calls)
+    
     def test_set_jersey_number_mapping(self, analyzer):
         """Test setting jersey number mapping"""
         analyzer.set_jersey_number_mapping(track_id=1, jersey_number=10)
@@ -609,6 +986,40 @@ class TestAnalyzeVideo:
         assert "video_info" in result
         assert "ball_tracking" in result
         assert "action_recognition" in result
+        assert "summary" in result
+    
+    @patch('processor.cv2.VideoCapture')
+    def test_analyze_video_online_ball_filter(self, mock_capture, analyzer, tmp_path):
+        """Test the online Kalman filter output replaces the post-pass when disabled"""
+        video_file = tmp_path / "test_video.mp4"
+        video_file.touch()
+
+        mock_cap = Mock()
+        mock_cap.isOpened.return_value = True
+        mock_cap.get.side_effect = lambda prop: {
+            processor.cv2.CAP_PROP_FPS: 30.0,
+            processor.cv2.CAP_PROP_FRAME_COUNT: 20,
+            processor.cv2.CAP_PROP_FRAME_WIDTH: 1920,
+            processor.cv2.CAP_PROP_FRAME_HEIGHT: 1080
+        }.get(prop, 0)
+        frames = iter([(True, np.zeros((10, 10, 3), dtype=np.uint8))] * 20)
+        mock_cap.read.side_effect = lambda: next(frames, (False, None))
+        mock_capture.return_value = mock_cap
+
+        balls = iter([{"center": [100 + 10 * i, 500], "bbox": [95 + 10 * i, 495, 105 + 10 * i, 505],
+                       "confidence": 0.9} if i % 5 else None for i in range(20)])
+        analyzer.detect_ball = lambda frame: next(balls)
+        analyzer.ball_post_filter = False
+
+        live = []
+        result = analyzer.analyze_video(str(video_file), ball_callback=live.append)
+
+        trajectory = result["ball_tracking"]["trajectory"]
+        assert trajectory == live
+        assert [p["frame"] for p in trajectory] == list(range(2, 21))
+        assert result["ball_tracking"]["detected_frames"] == 16
+        assert result["ball_tracking"]["online_filter"]["predicted"] == 3
+        assert "filtered_trajectory" not in result["ball_tracking"]
     
     @patch('processor.cv2.VideoCapture')
     def test_analyze_video_cannot_open(self, mock_capture, analyzer, tmp_path):
@@ -680,6 +1091,8 @@ class TestAnalyzeVideo:
         
         assert output_file.exists()
         assert "video_info" in result
+        with open(processor.summary_path_for(output_file)) as f:
+            assert json.load(f) == result["summary"]
 
 
 # ============================================================================
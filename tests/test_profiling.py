@@ -0,0 +1,95 @@
+"""
+Volleyball AI Analysis System - Profiling Tests
+All tests for profiling.py module
+"""
+
+import json
+import time
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from profiling import StageProfiler, NullProfiler, format_profile
+
+
+class TestStageProfiler:
+    """Tests for StageProfiler"""
+
+    def test_nested_stages_count_own_time(self):
+        """Test a parent stage excludes time spent in nested stages"""
+        profiler = StageProfiler()
+        with profiler.stage("track"):
+            time.sleep(0.01)
+            with profiler.stage("ocr"):
+                time.sleep(0.03)
+        assert profiler.totals["ocr"] >= 0.03
+        assert 0.01 <= profiler.totals["track"] < 0.03
+        assert profiler.calls == {"track": 1, "ocr": 1}
+
+    def test_per_frame_distribution(self):
+        """Test per-frame percentiles only cover stages run inside frames"""
+        profiler = StageProfiler()
+        for frame in range(1, 21):
+            profiler.begin_frame(frame)
+            with profiler.stage("decode"):
+                pass
+            if frame == 20:
+                with profiler.stage("ball"):
+                    time.sleep(0.02)
+            profiler.end_frame()
+        with profiler.stage("write"):
+            pass
+
+        summary = profiler.summary()
+        assert summary["frames"] == 20
+        assert summary["stages"]["ball"]["per_frame_ms"]["p50"] == 0.0
+        assert summary["stages"]["ball"]["per_frame_ms"]["max"] >= 20.0
+        assert "per_frame_ms" not in summary["stages"]["write"]
+        assert summary["frame_ms"]["max"] >= 20.0
+        assert abs(sum(s["share"] for s in summary["stages"].values()) - 1.0) < 1e-9
+        # 按總耗時排序
+        assert list(summary["stages"])[0] == "ball"
+        assert format_profile(summary)[0].startswith("⏱️")
+
+    def test_frame_without_end_is_ignored(self):
+        """Test a frame that is begun but not ended is not counted"""
+        profiler = StageProfiler()
+        profiler.begin_frame(1)
+        with profiler.stage("decode"):
+            pass
+        assert profiler.summary()["frames"] == 0
+        assert profiler.summary()["stages"]["decode"]["calls"] == 1
+
+    def test_chrome_trace(self, tmp_path):
+        """Test trace events are written in Chrome trace format"""
+        profiler = StageProfiler(trace=True)
+        profiler.begin_frame(7)
+        with profiler.stage("decode"):
+            pass
+        profiler.end_frame()
+
+        path = tmp_path / "trace.json"
+        profiler.write_chrome_trace(str(path))
+        events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+        assert [e["name"] for e in events] == ["decode", "frame"]
+        assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+        assert events[0]["args"] == {"frame": 7}
+
+    def test_trace_disabled_by_default(self):
+        """Test no events are kept unless tracing is enabled"""
+        profiler = StageProfiler()
+        with profiler.stage("decode"):
+            pass
+        assert profiler.events == []
+
+    def test_null_profiler(self):
+        """Test NullProfiler accepts the same calls"""
+        profiler = NullProfiler()
+        profiler.begin_frame(1)
+        with profiler.stage("decode"):
+            value = 1
+        profiler.end_frame()
+        assert value == 1
@@ -0,0 +1,108 @@
+"""
+Volleyball AI Analysis System - Scan Manifest Tests
+All tests for scan_manifest.py module
+"""
+
+import os
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from scan_manifest import ScanManifest
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    """Upload directory with two videos and one unrelated file"""
+    directory = tmp_path / "uploads"
+    directory.mkdir()
+    (directory / "a.mp4").write_bytes(b'\x00' * 10)
+    (directory / "b.MOV").write_bytes(b'\x00' * 20)
+    (directory / "notes.txt").write_text("x")
+    (directory / "nested.mp4").mkdir()
+    return directory
+
+
+def bump_mtime(path: Path):
+    """Move a directory mtime forward so the change is visible on coarse clocks"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+class TestScanManifest:
+    """Tests for incremental directory scanning"""
+
+    def test_first_scan_lists_everything(self, tmp_path, uploads):
+        """Test the first scan returns all matching files as new"""
+        manifest = ScanManifest(tmp_path / "manifest.json")
+        files, new_files = manifest.scan(uploads, ['.mp4', '.mov'])
+        assert files == {
+            "a.mp4": (10, os.stat(uploads / "a.mp4").st_mtime_ns),
+            "b.MOV": (20, os.stat(uploads / "b.MOV").st_mtime_ns)
+        }
+        assert sorted(new_files) == ["a.mp4", "b.MOV"]
+        assert manifest.stats["listed_directories"] == 1
+
+    def test_unchanged_directory_is_not_listed(self, tmp_path, uploads):
+        """Test a saved manifest skips directories whose mtime did not change"""
+        first = ScanManifest(tmp_path / "manifest.json")
+        files, _ = first.scan(uploads, ['.mp4', '.mov'])
+        first.save()
+
+        second = ScanManifest(tmp_path / "manifest.json")
+        with patch('scan_manifest.os.scandir') as mock_scandir:
+            again, new_files = second.scan(uploads, ['.mp4', '.mov'])
+        assert not mock_scandir.called
+        assert again == files
+        assert new_files == []
+        assert second.stats["skipped_directories"] == 1
+
+    def test_changed_directory_stats_only_new_files(self, tmp_path, uploads):
+        """Test added and removed files are picked up and known files keep their signature"""
+        manifest = ScanManifest(tmp_path / "manifest.json")
+        files, _ = manifest.scan(uploads, ['.mp4', '.mov'])
+        manifest.save()
+
+        (uploads / "c.mp4").write_bytes(b'\x00' * 30)
+        (uploads / "b.MOV").unlink()
+        bump_mtime(uploads)
+
+        manifest = ScanManifest(tmp_path / "manifest.json")
+        again, new_files = manifest.scan(uploads, ['.mp4', '.mov'])
+        assert new_files == ["c.mp4"]
+        assert set(again) == {"a.mp4", "c.mp4"}
+        assert again["a.mp4"] == files["a.mp4"]
+        assert manifest.stats["removed_files"] == 1
+
+    def test_missing_directory(self, tmp_path):
+        """Test missing directories return nothing and are dropped from the manifest"""
+        manifest = ScanManifest(tmp_path / "manifest.json")
+        assert manifest.scan(tmp_path / "missing") == ({}, [])
+
+    def test_corrupt_manifest_falls_back_to_full_scan(self, tmp_path, uploads):
+        """Test unreadable or outdated manifests are ignored"""
+        path = tmp_path / "manifest.json"
+        path.write_text("{not json")
+        files, new_files = ScanManifest(path).scan(uploads, ['.mp4'])
+        assert new_files == ["a.mp4"]
+
+        path.write_text('{"version": 0, "directories": {}}')
+        assert ScanManifest(path).directories == {}
+
+    def test_save_is_atomic_and_skipped_when_clean(self, tmp_path, uploads):
+        """Test save replaces the file and does nothing without changes"""
+        path = tmp_path / "data" / "manifest.json"
+        manifest = ScanManifest(path)
+        manifest.save()
+        assert not path.exists()
+
+        manifest.scan(uploads)
+        manifest.save()
+        assert path.exists()
+        assert not (path.parent / "manifest.json.tmp").exists()
+        assert str(uploads) in ScanManifest(path).directories
@@ -0,0 +1,83 @@
+"""
+Volleyball AI Analysis System - Tracking Tests
+All tests for tracking.py module
+"""
+
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+
+from tracking import ByteTracker, TrackedBox
+
+
+def walking(frame, x0, step=5):
+    """Box of a player walking horizontally"""
+    return [x0 + step * frame, 100, x0 + step * frame + 80, 300]
+
+
+class TestByteTracker:
+    """Tests for ByteTracker"""
+
+    def test_confirmation_delay(self):
+        """Test tracks are only reported after min_hits consecutive matches"""
+        tracker = ByteTracker(min_hits=3)
+        outputs = [tracker.update([walking(f, 100)], [0.9]) for f in range(4)]
+        assert outputs[0] == [] and outputs[1] == []
+        assert outputs[2] == [TrackedBox(1, walking(2, 100), 0.9, 0)]
+        assert outputs[3][0].track_id == 1
+
+    def test_ids_stable_while_crossing(self):
+        """Test two players walking towards each other keep their ids"""
+        tracker = ByteTracker()
+        ids = []
+        for f in range(40):
+            out = tracker.update([walking(f, 100, 8), walking(f, 500, -8)], [0.9, 0.8])
+            ids.append({t.detection: t.track_id for t in out})
+        assert all(frame_ids == {0: 1, 1: 2} for frame_ids in ids[2:] if len(frame_ids) == 2)
+        assert tracker.stats["created"] == 2
+
+    def test_low_confidence_bridges_occlusion(self):
+        """Test low-confidence detections keep a confirmed track alive"""
+        tracker = ByteTracker()
+        for f in range(5):
+            tracker.update([walking(f, 100)], [0.9])
+        occluded = tracker.update([walking(5, 100)], [0.3])
+        assert [t.track_id for t in occluded] == [1]
+        assert tracker.stats["low_matches"] == 1
+        # 低置信度檢測不建立新追蹤
+        assert tracker.update([[900, 100, 980, 300]], [0.3]) == []
+        assert tracker.stats["created"] == 1
+
+    def test_lost_track_recovered_and_removed(self):
+        """Test confirmed tracks survive max_age missed frames and are then removed"""
+        tracker = ByteTracker(max_age=5)
+        for f in range(5):
+            tracker.update([walking(f, 100)], [0.9])
+        for _ in range(3):
+            assert tracker.update([], []) == []
+        assert [t.track_id for t in tracker.update([walking(8, 100)], [0.9])] == [1]
+        for _ in range(6):
+            tracker.update([], [])
+        assert len(tracker) == 0
+        assert tracker.stats["removed"] == 1
+
+    def test_unconfirmed_track_dropped(self):
+        """Test tentative tracks are removed as soon as they miss a frame"""
+        tracker = ByteTracker()
+        tracker.update([walking(0, 100)], [0.9])
+        tracker.update([], [])
+        assert len(tracker) == 0
+        tracker.update([walking(2, 100)], [0.9])
+        assert tracker.next_id == 3
+
+    def test_empty_and_reset(self):
+        """Test empty frames and reset"""
+        tracker = ByteTracker()
+        assert tracker.update(np.zeros((0, 4)), np.zeros(0)) == []
+        tracker.update([walking(0, 100)], [0.9])
+        tracker.reset()
+        assert len(tracker) == 0 and tracker.next_id == 1 and tracker.frame == 0
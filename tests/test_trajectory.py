@@ -0,0 +1,307 @@
+"""
+Volleyball AI Analysis System - Trajectory Tests
+All tests for trajectory.py module
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "ai_core"))
+sys.path.append(str(PROJECT_ROOT / "benchmarks"))
+
+from trajectory import (
+    parabola_outlier_scores,
+    outlier_threshold, trajectory_arrays,
+    BallTrajectory, velocity_filter, smooth_trajectory, interpolate_gaps, gaussian_kernel,
+    BallKalmanTracker
+)
+from reference_trajectory import parabola_outlier_scores_loop
+
+
+def parabola(num_points, seed=0, gaps=True):
+    """Noisy parabolic trajectory with optional frame gaps"""
+    rng = np.random.default_rng(seed)
+    steps = rng.integers(1, 3, size=num_points) if gaps else np.ones(num_points, dtype=int)
+    frames = np.cumsum(steps).astype(np.float64)
+    t = frames / 30.0
+    xs = np.round(100 + 300 * t + rng.normal(0, 1, num_points))
+    ys = np.round(600 - 500 * t + 250 * t ** 2 + rng.normal(0, 1, num_points))
+    return frames, xs, ys
+
+
+def points(num_points, seed=0, gaps=True):
+    """Trajectory dicts with bbox, confidence and a few velocity outliers"""
+    frames, xs, ys = parabola(num_points, seed, gaps)
+    rng = np.random.default_rng(seed + 100)
+    conf = rng.uniform(0.05, 1.0, num_points)
+    jumps = rng.random(num_points) < 0.05
+    xs[jumps] += 900
+    return [
+        {"frame": int(f), "timestamp": f / 30.0, "center": [int(x), int(y)],
+         "bbox": [x - 5, y - 5, x + 5, y + 5], "confidence": float(c)}
+        for f, x, y, c in zip(frames, xs, ys, conf)
+    ]
+
+
+def velocity_filter_loop(trajectory, max_velocity=3000.0, min_confidence=0.15):
+    """Reference: compare each point against the last kept point"""
+    filtered = [trajectory[0]]
+    for point in trajectory[1:]:
+        prev = filtered[-1]
+        dt = point["timestamp"] - prev["timestamp"]
+        if dt <= 0:
+            dt = 1.0 / 30.0
+        distance = ((point["center"][0] - prev["center"][0]) ** 2 +
+                    (point["center"][1] - prev["center"][1]) ** 2) ** 0.5
+        if distance / dt <= max_velocity and point["confidence"] >= min_confidence:
+            filtered.append(point)
+    return filtered
+
+
+def smooth_loop(trajectory, window_size=5):
+    """Reference: per-point Gaussian weighted average"""
+    half = window_size // 2
+    smoothed = []
+    for i in range(len(trajectory)):
+        start, end = max(0, i - half), min(len(trajectory), i + half + 1)
+        weights = [np.exp(-0.5 * (abs(j - (i - start)) / (half + 1)) ** 2) for j in range(end - start)]
+        sx = sum(w * p["center"][0] for w, p in zip(weights, trajectory[start:end])) / sum(weights)
+        sy = sum(w * p["center"][1] for w, p in zip(weights, trajectory[start:end])) / sum(weights)
+        smoothed.append({"center": [int(sx), int(sy)], "dx": sx - trajectory[i]["center"][0]})
+    return smoothed
+
+
+def interpolate_loop(trajectory, fps):
+    """Reference: per-gap np.polyfit interpolation"""
+    result = [dict(trajectory[0], method=None)]
+    for i in range(1, len(trajectory)):
+        prev, curr = trajectory[i - 1], trajectory[i]
+        gap = curr["frame"] - prev["frame"]
+        if 1 < gap <= 15:
+            if 2 <= i < len(trajectory) - 1:
+                pts = trajectory[i - 2:i + 1]
+                fr = np.array([p["frame"] for p in pts])
+                xc = np.polyfit(fr, [p["center"][0] for p in pts], 1)
+                yc = np.polyfit(fr, [p["center"][1] for p in pts], 2)
+                for j in range(1, gap):
+                    result.append({"frame": prev["frame"] + j, "method": "quadratic",
+                                   "center": [int(np.polyval(xc, prev["frame"] + j)),
+                                              int(np.polyval(yc, prev["frame"] + j))]})
+            else:
+                for j in range(1, gap):
+                    t = j / gap
+                    result.append({"frame": prev["frame"] + j, "method": "linear", "center": [
+                        int(prev["center"][0] + t * (curr["center"][0] - prev["center"][0])),
+                        int(prev["center"][1] + t * (curr["center"][1] - prev["center"][1]))]})
+        result.append(dict(curr, method=None))
+    return result
+
+
+class TestParabolaOutlierScores:
+    """Tests for parabola_outlier_scores"""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_loop(self, seed):
+        """Test vectorized scores equal the per-point polyfit reference"""
+        frames, xs, ys = parabola(200, seed)
+        xs[50] += 300
+        ys[120] -= 250
+
+        expected = parabola_outlier_scores_loop(frames.tolist(), xs.tolist(), ys.tolist())
+        result = parabola_outlier_scores(frames, xs, ys)
+        np.testing.assert_allclose(result, expected, rtol=1e-8, atol=1e-8)
+
+    @pytest.mark.parametrize("num_points", [0, 1, 3, 4, 5, 8])
+    def test_short_trajectories(self, num_points):
+        """Test trajectories shorter than or close to the window size"""
+        frames, xs, ys = parabola(num_points)
+        expected = parabola_outlier_scores_loop(frames.tolist(), xs.tolist(), ys.tolist())
+        result = parabola_outlier_scores(frames, xs, ys)
+        assert result.shape == (num_points,)
+        np.testing.assert_allclose(result, expected, rtol=1e-8, atol=1e-8)
+
+    def test_degenerate_windows(self):
+        """Test repeated frames and a stationary ball do not produce NaN"""
+        frames = np.array([1, 1, 1, 2, 2, 2, 3, 3], dtype=np.float64)
+        xs = np.full(8, 100.0)
+        ys = np.full(8, 200.0)
+        result = parabola_outlier_scores(frames, xs, ys)
+        assert np.all(np.isfinite(result))
+        assert np.all(result == 0)
+
+    def test_flags_spike(self):
+        """Test that an injected outlier gets the highest score"""
+        frames, xs, ys = parabola(60, gaps=False)
+        xs[30] += 400
+        scores = parabola_outlier_scores(frames, xs, ys)
+        assert int(np.argmax(scores)) == 30
+        assert scores[30] > outlier_threshold(scores)
+
+
+class TestBallTrajectory:
+    """Tests for the array-backed trajectory post-processing"""
+
+    def test_round_trip(self):
+        """Test untouched points come back as the original dicts"""
+        trajectory = points(20)
+        result = BallTrajectory.from_points(trajectory).to_points()
+        assert all(a is b for a, b in zip(result, trajectory))
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_velocity_filter_matches_loop(self, seed):
+        """Test velocity filter keeps the same points as the sequential reference"""
+        trajectory = points(300, seed)
+        result = velocity_filter(BallTrajectory.from_points(trajectory)).to_points()
+        assert result == velocity_filter_loop(trajectory)
+
+    def test_velocity_filter_keeps_all(self):
+        """Test the fully vectorized path when nothing is rejected"""
+        trajectory = [{"frame": i, "timestamp": i / 30.0, "center": [i, i], "confidence": 0.9} for i in range(10)]
+        result = velocity_filter(BallTrajectory.from_points(trajectory)).to_points()
+        assert result == trajectory
+
+    @pytest.mark.parametrize("window_size", [3, 5, 7])
+    def test_smooth_matches_loop(self, window_size):
+        """Test kernel convolution equals the per-point weighted average"""
+        trajectory = points(100)
+        result = smooth_trajectory(BallTrajectory.from_points(trajectory), window_size).to_points()
+        expected = smooth_loop(trajectory, window_size)
+
+        for point, ref, original in zip(result, expected, trajectory):
+            assert np.allclose(point["center"], ref["center"], atol=1)
+            assert point["bbox"][0] == pytest.approx(original["bbox"][0] + ref["dx"])
+            assert point is not original
+        assert trajectory == points(100)
+
+    def test_smooth_kernel_cached(self):
+        """Test the Gaussian kernel is computed once per window size"""
+        assert gaussian_kernel(5) is gaussian_kernel(5)
+        assert gaussian_kernel(5)[2] == 1.0
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_interpolate_matches_loop(self, seed):
+        """Test vectorized gap filling equals per-gap polyfit interpolation"""
+        rng = np.random.default_rng(seed)
+        trajectory = points(200, seed)
+        trajectory = [p for p in trajectory if rng.random() > 0.3]
+        result = interpolate_gaps(BallTrajectory.from_points(trajectory), 30.0).to_points()
+        expected = interpolate_loop(trajectory, 30.0)
+
+        assert len(result) == len(expected)
+        assert [p["frame"] for p in result] == [p["frame"] for p in expected]
+        for point, ref in zip(result, expected):
+            assert point.get("method") == ref["method"]
+            assert np.allclose(point["center"], ref["center"], atol=1)
+
+    def test_interpolated_points(self):
+        """Test interpolated dicts are JSON friendly and flagged"""
+        trajectory = [
+            {"frame": 0, "timestamp": 0.0, "center": [100, 200], "confidence": 0.9},
+            {"frame": 4, "timestamp": 0.133, "center": [140, 240], "confidence": 0.7},
+        ]
+        result = interpolate_gaps(BallTrajectory.from_points(trajectory), 30.0).to_points()
+        assert [p["frame"] for p in result] == [0, 1, 2, 3, 4]
+        assert result[1] == {"frame": 1, "timestamp": pytest.approx(1 / 30.0), "center": [110, 210],
+                             "confidence": 0.0, "interpolated": True, "method": "linear"}
+        assert all(type(v) is int for p in result for v in p["center"])
+
+
+class TestBallKalmanTracker:
+    """Tests for the online ball Kalman filter"""
+
+    @staticmethod
+    def ballistic(num_frames, fps=30.0):
+        """Noise-free ballistic flight: constant x velocity, gravity on y"""
+        t = np.arange(1, num_frames + 1) / fps
+        return np.stack([200 + 400 * t, 900 - 1200 * t + 750 * t ** 2], axis=1)
+
+    def run(self, tracker, detections, fps=30.0):
+        output = []
+        for frame, det in enumerate(detections, start=1):
+            output += tracker.update(frame, frame / fps, det)
+        return output
+
+    def test_follows_parabola(self):
+        """Test accepted points stay close to a clean ballistic path"""
+        truth = self.ballistic(60)
+        rng = np.random.default_rng(0)
+        detections = [{"center": [int(x), int(y)], "confidence": 0.9}
+                      for x, y in truth + rng.normal(0, 2, truth.shape)]
+        output = self.run(BallKalmanTracker(), detections)
+
+        assert [p["frame"] for p in output] == list(range(1, 61))
+        errors = [np.hypot(*(np.array(p["center"]) - truth[p["frame"] - 1])) for p in output[10:]]
+        assert max(errors) < 8
+
+    def test_rejects_outlier_and_predicts_gap(self):
+        """Test a far-off detection is gated out and missing frames are predicted"""
+        truth = self.ballistic(40)
+        detections = [{"center": [int(x), int(y)], "confidence": 0.9} for x, y in truth]
+        detections[20] = {"center": [1800, 100], "confidence": 0.9}
+        detections[25] = detections[26] = detections[27] = None
+        tracker = BallKalmanTracker()
+        output = self.run(tracker, detections)
+
+        by_frame = {p["frame"]: p for p in output}
+        assert tracker.stats["rejected"] == 1
+        assert by_frame[21]["interpolated"] is True
+        assert np.hypot(*(np.array(by_frame[21]["center"]) - truth[20])) < 10
+        assert [by_frame[f].get("method") for f in (26, 27, 28)] == ["kalman"] * 3
+        assert len(output) == 40
+
+    def test_pending_predictions_are_held(self):
+        """Test predictions are only emitted once a detection confirms the track"""
+        tracker = BallKalmanTracker(max_missed=3)
+        detections = [{"center": [100 + 10 * i, 500], "confidence": 0.9} for i in range(5)]
+        self.run(tracker, detections)
+
+        assert tracker.update(6, 6 / 30.0, None) == []
+        assert tracker.update(7, 7 / 30.0, None) == []
+        output = tracker.update(8, 8 / 30.0, {"center": [170, 500], "confidence": 0.9})
+        assert [p["frame"] for p in output] == [6, 7, 8]
+
+        for frame in range(9, 13):
+            assert tracker.update(frame, frame / 30.0, None) == []
+        assert not tracker.active
+        assert tracker.stats["dropped"] == 3
+
+    def test_reset_after_repeated_rejections(self):
+        """Test the track restarts after a sudden direction change (e.g. a hit)"""
+        tracker = BallKalmanTracker(max_rejections=3)
+        detections = [{"center": [100 + 15 * i, 500], "confidence": 0.9} for i in range(20)]
+        detections += [{"center": [1500 - 15 * i, 200], "confidence": 0.9} for i in range(5)]
+        output = self.run(tracker, detections)
+
+        assert tracker.stats["resets"] == 1
+        assert output[-1]["center"][0] < 1500
+        assert "interpolated" not in output[-1]
+
+    def test_low_confidence_ignored(self):
+        """Test detections below min_confidence never start a track"""
+        tracker = BallKalmanTracker(min_confidence=0.5)
+        assert tracker.update(1, 1 / 30.0, {"center": [10, 10], "confidence": 0.2}) == []
+        assert not tracker.active
+
+
+class TestTrajectoryHelpers:
+    """Tests for outlier_threshold and trajectory_arrays"""
+
+    def test_threshold_minimum(self):
+        """Test threshold never drops below 3"""
+        assert outlier_threshold(np.zeros(5)) == 3.0
+        assert outlier_threshold(np.array([0.1, 0.2, 0.3])) == 3.0
+        assert outlier_threshold(np.array([2.0, 4.0, 6.0])) == pytest.approx(10.0)
+
+    def test_trajectory_arrays(self):
+        """Test conversion from trajectory dicts"""
+        frames, xs, ys = trajectory_arrays([
+            {"frame": 5, "center": [10, 20]},
+            {"frame": 7, "center": [30, 40]},
+        ])
+        assert frames.tolist() == [5, 7]
+        assert xs.tolist() == [10, 30]
+        assert ys.tolist() == [20, 40]